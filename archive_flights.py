@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Moves the departed flights of the Flight Booking database to its archive.
+
+The flights departed before the given date (today by default) are moved,
+with their reservations and tickets, to the archive database by chunks, one
+transaction per chunk (see :py:mod:`flight_reservation.archive`). The API
+keeps serving their reservations and tickets from the archive. Run it
+periodically, e.g. from cron.
+
+Usage:
+    PYTHONPATH=. python3 archive_flights.py
+    PYTHONPATH=. python3 archive_flights.py --before 2018-06-01 --chunk-size 500
+"""
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation.archive import Archiver, DEFAULT_CHUNK_SIZE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--before", default=None,
+                        help="archive the flights departing before this date, "
+                             "YYYY-MM-DD (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="flights moved in one transaction (default: %(default)s)")
+    parser.add_argument("--pause", type=float, default=0.05,
+                        help="seconds waited between two chunks (default: %(default)s)")
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH,
+                        help="database to archive (default: %(default)s)")
+    parser.add_argument("--archive", default=database.DEFAULT_ARCHIVE_PATH,
+                        help="archive database (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🗄️  Flight Booking API - Flight archival")
+    print("=" * 60)
+    if not os.path.exists(args.db):
+        print("❌ No database at %s" % args.db)
+        return 1
+    try:
+        before = database.parse_date(args.before) if args.before else None
+        archiver = Archiver(database.Engine(args.db), args.archive, args.chunk_size)
+    except ValueError as excp:
+        print("❌ %s" % excp)
+        return 1
+
+    counts = archiver.archive_departed(before, pause=args.pause)
+    print("📁 Archive: %s" % args.archive)
+    print("✈️  %(flights)d flights, %(reservations)d reservations and "
+          "%(tickets)d tickets moved" % counts)
+    print("✅ Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the response compression of the Flight Booking API.
+
+Generates a realistic database, fetches the biggest Mason collections
+(``Users.get``, ``UserReservations.get`` of the heaviest user and
+``TemplateFlights.get``) through the API and, for gzip and deflate at every
+compression level, measures the CPU time needed to compress each payload
+against the number of bytes saved. It helps choosing the ``level`` and
+``min_size`` of :py:class:`flight_reservation.compression.CompressionMiddleware`.
+
+Usage:
+    PYTHONPATH=. python3 benchmark_compression.py
+    PYTHONPATH=. python3 benchmark_compression.py --users 5000 --levels 1 6 9
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation import resources
+from flight_reservation.compression import GZIP, DEFLATE, WBITS
+from flight_reservation.data_generator import DataGenerator
+
+API = "/flight-booking-system/api"
+
+
+def fetch_payloads(db_path):
+    """
+    :return: list of ``(name, body)`` with the bodies of the benchmarked
+        responses.
+    """
+    client = resources.create_app({"Engine": database.Engine(db_path)}).test_client()
+    connection = database.Engine(db_path).connect()
+    try:
+        #The user with most reservations
+        heaviest = connection.con.execute(
+            "SELECT creator_id FROM Reservation GROUP BY creator_id "
+            "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    finally:
+        connection.close()
+    payloads = []
+    for name, url in [("Users.get", API + "/users"),
+                      ("UserReservations.get", API + "/users/%d/reservations" % heaviest),
+                      ("TemplateFlights.get", API + "/template-flights/"),
+                      ("User.get", API + "/users/1")]:
+        resp = client.get(url)
+        if resp.status_code != 200:
+            raise RuntimeError("%s returned %d" % (url, resp.status_code))
+        payloads.append((name, resp.data))
+    return payloads
+
+
+def time_compression(body, coding, level, repeat):
+    """
+    :return: ``(seconds, compressed_size)``, the median time of *repeat*
+        compressions of *body*.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[coding])
+        data = compressor.compress(body) + compressor.flush()
+        timings.append(time.process_time() - start)
+    return statistics.median(timings), len(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000,
+                        help="number of users of the generated database (default: %(default)s)")
+    parser.add_argument("--levels", type=int, nargs="+", default=list(range(1, 10)),
+                        help="compression levels to measure (default: 1 to 9)")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="compressions timed per payload and level (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the generated database (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🗜️  Flight Booking API - Compression benchmark")
+    print("=" * 60)
+    workdir = tempfile.mkdtemp(prefix="flight_compression_")
+    try:
+        db_path = os.path.join(workdir, "compression.db")
+        print("🔧 Generating a database with %d users..." % args.users)
+        DataGenerator(db_path, seed=args.seed, users=args.users, templates=max(10, args.users // 20),
+                      flights=args.users // 2, reservations=args.users * 2).generate()
+        payloads = fetch_payloads(db_path)
+    finally:
+        shutil.rmtree(workdir)
+
+    header = "%-22s %-8s %5s %10s %10s %7s %10s %12s" % (
+        "payload", "coding", "level", "raw (B)", "sent (B)", "ratio", "cpu (ms)", "saved KB/ms")
+    print()
+    print(header)
+    print("-" * len(header))
+    for name, body in payloads:
+        for coding in (GZIP, DEFLATE):
+            for level in args.levels:
+                seconds, size = time_compression(body, coding, level, args.repeat)
+                saved = (len(body) - size) / 1024.0
+                print("%-22s %-8s %5d %10d %10d %6.1fx %10.3f %12.1f" % (
+                    name, coding, level, len(body), size, len(body) / float(size),
+                    seconds * 1000, saved / max(seconds * 1000, 1e-6)))
+    print()
+    print("✅ Payloads smaller than a few hundred bytes save little: keep them under min_size")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
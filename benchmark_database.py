@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the Flight Booking database API.
+
+Builds databases of increasing size (1k, 100k and 1M rows per table by
+default), times every public method of
+:py:class:`flight_reservation.flight_database.Connection` against each of
+them and prints the scaling curve of every method. The scaling exponent is
+the slope of log(time) against log(rows): ~0 means the method does not
+depend on the size of the database, ~1 means it is O(N).
+
+Usage:
+    PYTHONPATH=. python3 benchmark_database.py
+    PYTHONPATH=. python3 benchmark_database.py --sizes 1000 10000 --csv bench.csv
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# Methods that are not part of the data-access API and are not benchmarked
+NOT_BENCHMARKED = ['close', 'check_foreign_keys_status',
+                   'set_foreign_keys_support', 'unset_foreign_keys_support']
+
+# Slope of log(time)/log(rows) from which a method is reported as a hot spot
+HOT_SPOT_SLOPE = 0.5
+
+# Ids reserved for the rows created by the benchmark itself
+BENCH_TEMPLATE_ID = 10 ** 8
+BENCH_FLIGHT_ID = 10 ** 8
+# Full flight whose waitlist grows, flight of one seat given to its
+# waitlist, and the two legs of the itineraries
+BENCH_FULL_FLIGHT_ID = BENCH_FLIGHT_ID - 1
+BENCH_WAITLIST_FLIGHT_ID = BENCH_FLIGHT_ID - 2
+BENCH_ITINERARY_FLIGHT_IDS = [BENCH_FLIGHT_ID - 4, BENCH_FLIGHT_ID - 3]
+BENCH_USER_EMAIL = "bench.user@bench.fi"
+
+
+def build_database(db_path, size, seed=0):
+    """
+    Creates a database at *db_path* with *size* users, reservations and
+    tickets, *size* / 10 flights and *size* / 100 template flights.
+
+    :param str db_path: path of the database file to create.
+    :param int size: number of rows of the biggest tables.
+    :param int seed: seed of the random generator.
+    """
+    engine = database.Engine(db_path)
+    engine.remove_database()
+    engine.create_tables()
+
+    rnd = random.Random(seed)
+    nb_templates = max(5, size // 100)
+    nb_flights = max(10, size // 10)
+
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+    with con:
+        con.executemany("INSERT INTO User VALUES(?,?,?,?,?,?,?,?)",
+                        ((i, "Last%d" % i, "First%d" % i, "0401%07d" % i,
+                          "user%d@bench.fi" % i, "1980-01-01", "male", 1519423463929)
+                         for i in range(1, size + 1)))
+        con.executemany("INSERT INTO TemplateFlight VALUES(?,?,?,?,?)",
+                        ((i, "10:00", "12:00", "Origin%d" % (i % 50), "Destination%d" % i)
+                         for i in range(1, nb_templates + 1)))
+        con.executemany("INSERT INTO Flight VALUES(?,?,?,?,?,?,?,?,?)",
+                        ((i, "FL%d" % i, 100 + i % 400, "GATE%02d" % (i % 100),
+                          "2018-05-06", "2018-05-07", 1000, 1000, rnd.randint(1, nb_templates))
+                         for i in range(1, nb_flights + 1)))
+        con.executemany("INSERT INTO Reservation VALUES(?,?,?,?,?)",
+                        ((i, "R%07d" % i, "2018-02-20", i, rnd.randint(1, nb_flights))
+                         for i in range(1, size + 1)))
+        con.executemany("INSERT INTO Ticket VALUES(?,?,?,?,?,?,?)",
+                        ((i, "First%d" % i, "Last%d" % i, "male", 30, i, "1A")
+                         for i in range(1, size + 1)))
+    con.close()
+
+
+def build_cases(connection, size):
+    """
+    Returns the benchmark cases for a database built by
+    :py:func:`build_database` with the given *size*.
+
+    Each case is a tuple ``(method_name, prepare, call)``: ``prepare(i)`` is
+    not timed and returns the arguments of the ``i``-th timed ``call``. A
+    method can have several cases, the name of the others adds the path
+    they time in parentheses.
+    """
+    con = connection
+    pick = random.Random(1)
+
+    def some_id(limit):
+        return lambda i: (pick.randint(1, limit),)
+
+    nb_flights = max(10, size // 10)
+    nb_templates = max(5, size // 100)
+
+    # Rows used by the mutating methods. They are created once, outside of
+    # the timed sections, with ids out of the generated range.
+    con.create_template_flight({'searchid': BENCH_TEMPLATE_ID, 'origin': 'Bench',
+                                'destination': 'Mark', 'departuretime': '10:00',
+                                'arrivaltime': '12:00'})
+    con.create_flight({'flightid': BENCH_FLIGHT_ID, 'searchresultid': BENCH_TEMPLATE_ID,
+                       'code': 'BENCH0', 'price': 100, 'gate': 'GATE01',
+                       'departuredate': '2018-05-06', 'arrivaldate': '2018-05-07',
+                       'totalseats': 10 ** 6, 'seatsleft': 10 ** 6})
+    bench_reservation = con.create_reservation({'userid': 1, 'flightid': BENCH_FLIGHT_ID})
+    for flight_id, seats in [(BENCH_FULL_FLIGHT_ID, 0), (BENCH_WAITLIST_FLIGHT_ID, 1)] + \
+            [(flight_id, 10 ** 6) for flight_id in BENCH_ITINERARY_FLIGHT_IDS]:
+        con.create_flight({'flightid': flight_id, 'searchresultid': BENCH_TEMPLATE_ID,
+                           'code': 'BENCH%d' % flight_id, 'price': 100, 'gate': 'GATE01',
+                           'departuredate': '2018-05-06', 'arrivaldate': '2018-05-07',
+                           'totalseats': max(seats, 1), 'seatsleft': seats})
+    # The seat of the waitlist flight goes from a passenger to the head of
+    # its waitlist at every timed delete_ticket
+    seat_holder = {'ticket': con.create_ticket({
+        'reservationid': con.create_reservation({'userid': 1,
+                                                 'flightid': BENCH_WAITLIST_FLIGHT_ID}),
+        'firstname': 'Bench', 'lastname': 'Passenger', 'gender': 'male', 'age': 30})}
+
+    def new_user(i):
+        return ({'lastname': 'Bench', 'firstname': 'User', 'phonenumber': '0401234567',
+                 'email': 'bench%d@bench.fi' % i, 'dateofBirth': '1980-01-01',
+                 'gender': 'female'},)
+
+    def new_ticket(i):
+        return ({'reservationid': bench_reservation, 'firstname': 'Bench',
+                 'lastname': 'Passenger', 'gender': 'male', 'age': 30},)
+
+    def new_flight(i):
+        return ({'flightid': BENCH_FLIGHT_ID + 1 + i, 'searchresultid': BENCH_TEMPLATE_ID,
+                 'code': 'BENCH%d' % (i + 1), 'price': 100, 'gate': 'GATE01',
+                 'departuredate': '2018-05-06', 'arrivaldate': '2018-05-07',
+                 'totalseats': 90, 'seatsleft': 90},)
+
+    def new_template(i):
+        return ({'searchid': BENCH_TEMPLATE_ID + 1 + i, 'origin': 'Bench',
+                 'destination': 'Mark', 'departuretime': '10:00', 'arrivaltime': '12:00'},)
+
+    def new_waitlist_entry(flight_id, user_id):
+        return ({'userid': user_id, 'flightid': flight_id, 'priority': 0,
+                 'firstname': 'Bench', 'lastname': 'Waiting', 'gender': 'male', 'age': 30},)
+
+    def new_itinerary(i):
+        return ({'userid': 2 + i, 'flightids': BENCH_ITINERARY_FLIGHT_IDS,
+                 'tickets': [new_ticket(i)[0], new_ticket(i)[0]]},)
+
+    def created_waitlist_entry(i):
+        return (con.create_waitlist_entry(new_waitlist_entry(BENCH_FULL_FLIGHT_ID, size - i)[0]),)
+
+    def waiting_ticket(i):
+        # The seat was given to the entry of the previous call: its ticket is
+        # deleted and a new user waits for the seat
+        if 'entry' in seat_holder:
+            seat_holder['ticket'] = con.get_waitlist_entry(seat_holder['entry'])['ticketnumber']
+        seat_holder['entry'] = con.create_waitlist_entry(
+            new_waitlist_entry(BENCH_WAITLIST_FLIGHT_ID, size // 2 + i)[0])
+        return (seat_holder['ticket'],)
+
+    def created(create, make):
+        # Runs *create* outside of the timed section and returns its id
+        def prepare(i):
+            return (create(*make(10 ** 6 + i)),)
+        return prepare
+
+    def created_flight(i):
+        flight = new_flight(10 ** 6 + i)[0]
+        con.create_flight(flight)
+        return (flight['flightid'],)
+
+    def created_template(i):
+        template = new_template(10 ** 6 + i)[0]
+        con.create_template_flight(template)
+        return (template['searchid'],)
+
+    def created_reservation(i):
+        return (con.create_reservation({'userid': size - i, 'flightid': BENCH_FLIGHT_ID}),)
+
+    def modified_reservation(i):
+        # Every generated user owns exactly one reservation, with the same id
+        reservation_id = pick.randint(2, size)
+        return (reservation_id, 'BENCH1', reservation_id, pick.randint(1, nb_flights))
+
+    def some_route(i):
+        # The route of a generated template flight, see build_database
+        template_id = pick.randint(1, nb_templates)
+        return ('Origin%d' % (template_id % 50), 'Destination%d' % template_id,
+                '2018-05-01', '2018-06-01')
+
+    waitlist_entry = con.create_waitlist_entry(new_waitlist_entry(BENCH_FULL_FLIGHT_ID, 1)[0])
+    modified_user = new_user(0)[0]
+    modified_flight = new_flight(0)[0]
+    modified_template = new_template(0)[0]
+    modified_ticket = new_ticket(0)[0]
+
+    return [
+        ('get_user', some_id(size), con.get_user),
+        ('get_users', lambda i: (), con.get_users),
+        ('create_user', new_user, con.create_user),
+        ('modify_user', lambda i: (pick.randint(1, size), modified_user), con.modify_user),
+        ('delete_user', created(con.create_user, new_user), con.delete_user),
+        ('contains_user', some_id(size), con.contains_user),
+        ('contains_user_with_email', lambda i: (BENCH_USER_EMAIL,), con.contains_user_with_email),
+        ('get_template_flight', some_id(nb_templates), con.get_template_flight),
+        ('get_template_flights', lambda i: (), con.get_template_flights),
+        ('create_template_flight', new_template, con.create_template_flight),
+        ('modify_template_flight', lambda i: (pick.randint(1, nb_templates), modified_template),
+         con.modify_template_flight),
+        ('delete_template_flight', created_template, con.delete_template_flight),
+        ('contains_template_flight', some_id(nb_templates), con.contains_template_flight),
+        ('get_flight', some_id(nb_flights), con.get_flight),
+        ('get_flights_by_template', some_id(nb_templates), con.get_flights_by_template),
+        ('create_flight', lambda i: new_flight(2 * 10 ** 6 + i), con.create_flight),
+        ('modify_flight', lambda i: (pick.randint(1, nb_flights),
+                                     dict(modified_flight, code='MODIFIED%d' % i)),
+         con.modify_flight),
+        ('delete_flight', created_flight, con.delete_flight),
+        ('contains_flight', some_id(nb_flights), con.contains_flight),
+        ('get_fare_calendar', some_route, con.get_fare_calendar),
+        ('get_reservation', some_id(size), con.get_reservation),
+        ('get_reservation_list', lambda i: (), con.get_reservation_list),
+        ('get_reservations_by_user', some_id(size), con.get_reservations_by_user),
+        ('get_reservations_by_flight', some_id(nb_flights), con.get_reservations_by_flight),
+        ('create_reservation', lambda i: ({'userid': 2 + i, 'flightid': BENCH_FLIGHT_ID},),
+         con.create_reservation),
+        ('modify_reservation', modified_reservation, con.modify_reservation),
+        ('delete_reservation', created_reservation, con.delete_reservation),
+        ('contains_reservation', some_id(size), con.contains_reservation),
+        ('get_ticket', some_id(size), con.get_ticket),
+        ('get_tickets', lambda i: (), con.get_tickets),
+        ('get_tickets_by_reservation', some_id(size), con.get_tickets_by_reservation),
+        ('create_ticket', new_ticket, con.create_ticket),
+        ('modify_ticket', lambda i: (pick.randint(1, size), modified_ticket), con.modify_ticket),
+        ('delete_ticket', created(con.create_ticket, new_ticket), con.delete_ticket),
+        ('delete_ticket (waitlist served)', waiting_ticket, con.delete_ticket),
+        ('contains_ticket', some_id(size), con.contains_ticket),
+        ('generate_new_reservation_reference', lambda i: (),
+         con.generate_new_reservation_reference),
+        ('create_itinerary', new_itinerary, con.create_itinerary),
+        ('create_waitlist_entry', lambda i: new_waitlist_entry(BENCH_FULL_FLIGHT_ID, 2 + i),
+         con.create_waitlist_entry),
+        ('get_waitlist', lambda i: (BENCH_FULL_FLIGHT_ID,), con.get_waitlist),
+        ('get_waitlist_entry', lambda i: (waitlist_entry,), con.get_waitlist_entry),
+        ('delete_waitlist_entry', created_waitlist_entry, con.delete_waitlist_entry),
+        ('search', lambda i: ('First%d' % pick.randint(1, size),), con.search),
+        ('get_seat_changes', lambda i: (0, BENCH_FLIGHT_ID), con.get_seat_changes),
+        ('get_seat_change_range', lambda i: (), con.get_seat_change_range),
+        ('delete_seat_changes', lambda i: (int(time.time()) - 3600,), con.delete_seat_changes),
+        ('get_flight_seats', some_id(nb_flights), con.get_flight_seats),
+        ('get_seats_left', lambda i: (), con.get_seats_left),
+        ('reconcile_seats', lambda i: (), con.reconcile_seats),
+    ]
+
+
+def time_case(prepare, call, repeat, budget):
+    """
+    Times *call* up to *repeat* times, or less if the time *budget* (in
+    seconds) is exhausted. At least one call is always timed.
+
+    :return: the median duration of one call, in seconds.
+    """
+    samples = []
+    started = time.perf_counter()
+    for i in range(repeat):
+        args = prepare(i)
+        start = time.perf_counter()
+        call(*args)
+        samples.append(time.perf_counter() - start)
+        if time.perf_counter() - started > budget:
+            break
+    return statistics.median(samples)
+
+
+def scaling_exponent(sizes, timings):
+    """
+    Least squares slope of log(timing) against log(size).
+
+    :return: the slope or ``None`` if there are less than two points.
+    """
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, timings) if t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def public_methods():
+    """
+    :return: the sorted names of the public methods of
+        :py:class:`flight_reservation.flight_database.Connection`
+    """
+    return sorted(name for name in dir(database.Connection)
+                  if not name.startswith('_') and callable(getattr(database.Connection, name)))
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return "%.1f us" % (seconds * 1e6)
+    if seconds < 1:
+        return "%.2f ms" % (seconds * 1e3)
+    return "%.2f s" % seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="number of rows of the biggest tables (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="maximum number of timed calls per method (default: %(default)s)")
+    parser.add_argument("--budget", type=float, default=2.0,
+                        help="maximum seconds spent timing one method (default: %(default)s)")
+    parser.add_argument("--methods", nargs="+",
+                        help="only benchmark these Connection methods")
+    parser.add_argument("--workdir", default=None,
+                        help="directory for the generated databases (default: a temporary one)")
+    parser.add_argument("--csv", default=None,
+                        help="write the scaling curves (method, rows, seconds) to this file")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(args.sizes)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="flight_bench_")
+    results = {}
+
+    print("=" * 60)
+    print("⏱️  Flight Booking API - Database benchmark")
+    print("=" * 60)
+    for size in sizes:
+        db_path = os.path.join(workdir, "bench_%d.db" % size)
+        print("🔧 Building database with %d rows per table..." % size)
+        start = time.perf_counter()
+        build_database(db_path, size)
+        print("   done in %.1f s" % (time.perf_counter() - start))
+
+        connection = database.Engine(db_path).connect()
+        try:
+            for name, prepare, call in build_cases(connection, size):
+                if args.methods and name not in args.methods:
+                    continue
+                results.setdefault(name, {})[size] = time_case(prepare, call,
+                                                               args.repeat, args.budget)
+        finally:
+            connection.close()
+        os.remove(db_path)
+
+    # Report
+    print()
+    header = "%-36s" % "method" + "".join("%14s" % ("N=%d" % s) for s in sizes) + "%10s" % "slope"
+    print(header)
+    print("-" * len(header))
+    hot_spots = []
+    for name in sorted(results):
+        timings = [results[name].get(size) for size in sizes]
+        slope = scaling_exponent(sizes, [t or 0 for t in timings])
+        line = "%-36s" % name + "".join("%14s" % format_duration(t) for t in timings)
+        line += "%10s" % ("-" if slope is None else "%.2f" % slope)
+        if slope is not None and slope >= HOT_SPOT_SLOPE:
+            line += "  🔥"
+            hot_spots.append(name)
+        print(line)
+
+    skipped = [m for m in public_methods() if m not in results and m not in NOT_BENCHMARKED
+               and not args.methods]
+    print()
+    if hot_spots:
+        print("🔥 O(N) hot spots: " + ", ".join(hot_spots))
+    if skipped:
+        print("⚠️  Public methods without a benchmark: " + ", ".join(skipped))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["method", "rows", "seconds"])
+            for name in sorted(results):
+                for size in sizes:
+                    if size in results[name]:
+                        writer.writerow([name, size, "%.9f" % results[name][size]])
+        print("📊 Scaling curves written to " + args.csv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the write throughput of a single database against shards.
+
+Several processes book tickets at the same time, each one on a flight
+departing in a different month, with a database connection per booking as
+the API does. With a single database file the bookings wait for each other
+on its write lock; with :py:class:`flight_reservation.sharding.ShardedEngine`
+every flight is in the shard of its month and the bookings are written in
+parallel.
+
+Usage:
+    PYTHONPATH=. python3 benchmark_sharding.py
+    PYTHONPATH=. python3 benchmark_sharding.py --workers 1 2 4 8 --bookings 200
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation.sharding import ShardedEngine
+
+DEFAULT_WORKERS = [1, 2, 4]
+
+# Template flight and user of the data dump used by the benchmark flights
+TEMPLATE_ID = 1234
+USER_ID = 1
+
+TICKET = {"firstname": "Bench", "lastname": "Mark", "gender": "male", "age": 30}
+
+
+def build(engine, workers):
+    """
+    Creates the tables, the data of the dump and one flight per worker, each
+    departing in a different month.
+
+    :return: the ids of the reservations booked by the workers.
+    """
+    engine.create_tables()
+    engine.populate_tables()
+    connection = engine.connect()
+    try:
+        reservations = []
+        for i in range(workers):
+            date = "2030-%02d-01" % (i % 12 + 1) if i < 12 else "%d-01-01" % (2031 + i)
+            flight_id = connection.create_flight({
+                "searchresultid": TEMPLATE_ID, "flightid": 900000 + i, "code": "BM%03d" % i,
+                "price": 100, "departuredate": date, "arrivaldate": date, "gate": "GATE01",
+                "totalseats": 10 ** 6, "seatsleft": 10 ** 6})
+            reservations.append(connection.create_reservation({"userid": USER_ID,
+                                                               "flightid": flight_id}))
+        return reservations
+    finally:
+        connection.close()
+
+
+def _book(args):
+    engine, reservation_id, bookings = args
+    for _ in range(bookings):
+        connection = engine.connect()
+        try:
+            connection.create_ticket(dict(TICKET, reservationid=reservation_id))
+        finally:
+            connection.close()
+    return bookings
+
+
+def run(engine, workers, bookings):
+    """
+    :return: the bookings per second of *workers* processes booking
+        *bookings* tickets each.
+    """
+    reservations = build(engine, workers)
+    with multiprocessing.Pool(workers) as pool:
+        start = time.perf_counter()
+        total = sum(pool.map(_book, [(engine, reservation_id, bookings)
+                                     for reservation_id in reservations]))
+        return total / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS,
+                        help="numbers of booking processes (default: %(default)s)")
+    parser.add_argument("--bookings", type=int, default=100,
+                        help="tickets booked by each process (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🗂️  Flight Booking API - Sharding benchmark")
+    print("=" * 60)
+    header = "%8s %16s %16s %8s" % ("workers", "single (book/s)", "sharded (book/s)", "ratio")
+    print(header)
+    print("-" * len(header))
+    for workers in args.workers:
+        workdir = tempfile.mkdtemp(prefix="flight_shards_")
+        try:
+            single = run(database.Engine(os.path.join(workdir, "flight.db")), workers,
+                         args.bookings)
+            sharded = run(ShardedEngine(os.path.join(workdir, "shards")), workers,
+                          args.bookings)
+        finally:
+            shutil.rmtree(workdir)
+        print("%8d %16.0f %16.0f %7.2fx" % (workers, single, sharded, sharded / single))
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
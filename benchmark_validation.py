@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the request body validation of the Flight Booking API.
+
+For every schema of ``flight_reservation/static/schema`` it measures the
+time needed by the compiled validator of
+:py:mod:`flight_reservation.validation` to check a valid body and a body
+with several invalid fields. For the user schema it also times the checks
+done before the validators existed (a ``re.compile`` of each regular
+expression and ``datetime.strptime`` per request) and the whole
+``PUT /users/<id>`` request, to show the share of the validation in the
+cost of a request.
+
+Usage:
+    PYTHONPATH=. python3 benchmark_validation.py
+    PYTHONPATH=. python3 benchmark_validation.py --repeat 50000
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation import resources, validation
+
+#Schema name: (valid body, invalid body)
+BODIES = {
+    "user": ({"firstName": "James", "lastName": "Watt", "phoneNumber": "+44 871 222 3330",
+              "email": "james.watt@example.com", "birthDate": "1992-04-12", "gender": "male"},
+             {"firstName": "James", "phoneNumber": "A92722736387", "email": "james.watt",
+              "birthDate": "12-04-1992", "gender": 1}),
+    "reservation": ({"user_id": 1, "flight_id": 1111, "tickets": [
+                        {"firstName": "Jon", "familyName": "Doe", "age": 24, "gender": "male",
+                         "seat": "21A"},
+                        {"firstName": "Peter", "familyName": "Jackson", "age": 35,
+                         "gender": "male", "seat": "10B"}]},
+                    {"user_id": "1", "tickets": [{"firstName": "Jon", "age": -1}, "10B"]}),
+    "ticket": ({"firstName": "Jules", "familyName": "Larue", "age": 20, "gender": "male",
+                "seat": "21A", "reservation_id": 11},
+               {"firstName": "Jules", "age": "20", "seat": 21}),
+    "flight": ({"flightid": 1144, "code": "AY123", "price": 400, "departuredate": "2018-09-03",
+                "arrivaldate": "2018-09-04", "gate": "GATE10", "totalseats": 100,
+                "seatsleft": 15},
+               {"flightid": "1144", "code": "", "price": -1, "departuredate": "2018-09-33",
+                "gate": "10", "totalseats": 100}),
+    "template-flight": ({"searchid": 5665, "origin": "Oslo", "destination": "Oulu",
+                         "departuretime": "19:30", "arrivaltime": "20:30"},
+                        {"searchid": 5665, "origin": "", "departuretime": "25:30"}),
+}
+
+
+def per_call(function, repeat):
+    """
+    :return: the mean time of a call of *function*, in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def legacy_user_checks(body):
+    """
+    The checks of a user body as they were done in every request before the
+    compiled validators: key lookups, ``strptime`` and freshly compiled
+    regular expressions.
+    """
+    try:
+        fields = [body[key] for key in ("firstName", "lastName", "phoneNumber", "email",
+                                        "birthDate", "gender")]
+    except KeyError:
+        return False
+    try:
+        datetime.strptime(fields[4], database.DATE_FORMAT)
+    except ValueError:
+        return False
+    return bool(re.compile(database.PHONE_NUMBER_REGEX).match(fields[2]) and
+                re.compile(database.EMAIL_REGEX).match(fields[3]))
+
+
+def time_put_user(repeat):
+    """
+    :return: the mean time of a ``PUT /users/1`` request, in microseconds.
+    """
+    workdir = tempfile.mkdtemp(prefix="flight_validation_")
+    try:
+        engine = database.Engine(os.path.join(workdir, "validation.db"))
+        engine.create_tables()
+        engine.populate_tables()
+        client = resources.create_app({"Engine": engine, "TESTING": True}).test_client()
+        data = json.dumps(BODIES["user"][0])
+        headers = {"Content-Type": "application/json"}
+        return per_call(lambda: client.put("/flight-booking-system/api/users/1", data=data,
+                                           headers=headers), repeat)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000,
+                        help="validations timed per body (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="PUT requests timed (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("📋 Flight Booking API - Validation benchmark")
+    print("=" * 60)
+    start = time.perf_counter()
+    for name in BODIES:
+        validation.registry.validator(name)
+    print("🔧 Compiled %d schemas in %.2f ms" % (len(BODIES), (time.perf_counter() - start) * 1000))
+
+    header = "%-16s %-8s %7s %12s" % ("schema", "body", "errors", "time (us)")
+    print()
+    print(header)
+    print("-" * len(header))
+    for name, (valid, invalid) in BODIES.items():
+        for label, body in (("valid", valid), ("invalid", invalid)):
+            errors = validation.validate(name, body)
+            if (label == "valid") == bool(errors):
+                raise RuntimeError("unexpected result for the %s %s body: %s" % (label, name, errors))
+            print("%-16s %-8s %7d %12.2f" % (name, label, len(errors),
+                                            per_call(lambda: validation.validate(name, body),
+                                                     args.repeat)))
+
+    compiled = per_call(lambda: validation.validate("user", BODIES["user"][0]), args.repeat)
+    legacy = per_call(lambda: legacy_user_checks(BODIES["user"][0]), args.repeat)
+    request = time_put_user(args.requests)
+    print()
+    print("👤 User body, previous per-request checks: %8.2f us" % legacy)
+    print("👤 User body, compiled validator:          %8.2f us" % compiled)
+    print("🌐 PUT /users/1, whole request:            %8.2f us (validation %.1f%%)"
+          % (request, compiled * 100 / request))
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Builds the fingerprinted, precompressed assets of the admin interface.
+
+The stylesheets and scripts of every page of the admin interface are
+bundled, the bundles and the files they reference are written with the hash
+of their content in their name, with a gzip variant, and the pages are
+rewritten to reference them (see :py:mod:`flight_reservation_admin.assets`).
+The admin interface serves the build as soon as it exists; run it again
+after changing a file of ``static``.
+
+Usage:
+    PYTHONPATH=. python3 build_static.py
+    PYTHONPATH=. python3 build_static.py --clean
+"""
+import argparse
+import os
+import shutil
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation_admin import assets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=assets.STATIC_DIR,
+                        help="directory of the pages (default: %(default)s)")
+    parser.add_argument("--target", default=assets.BUILD_DIR,
+                        help="directory of the build (default: %(default)s)")
+    parser.add_argument("--clean", action="store_true",
+                        help="remove the build, the pages are served from the source again")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("📦 Flight Booking API - Admin assets build")
+    print("=" * 60)
+    if args.clean:
+        if os.path.isdir(args.target):
+            shutil.rmtree(args.target)
+        print("🧹 Removed %s" % args.target)
+        return 0
+    if not os.path.isdir(args.source):
+        print("❌ No directory at %s" % args.source)
+        return 1
+
+    builder = assets.build(args.source, args.target)
+    total = compressed = 0
+    for root, _, files in os.walk(args.target):
+        for name in files:
+            size = os.path.getsize(os.path.join(root, name))
+            if name.endswith(".gz"):
+                compressed += size
+            else:
+                total += size
+    print("📁 Build: %s" % args.target)
+    print("📄 %d files, %d bytes (%d bytes gzipped)" % (len(builder.manifest), total, compressed))
+    for name in sorted(builder.missing):
+        print("⚠️  Missing file referenced by the pages: %s" % name)
+    print("✅ Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
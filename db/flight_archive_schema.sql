@@ -0,0 +1,34 @@
+PRAGMA foreign_keys=OFF;
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS Flight(
+     flight_id  INTEGER PRIMARY KEY,
+     code   TEXT,
+     price  INTEGER,
+     gate   TEXT,
+     depDate    TEXT,
+     arrDate    TEXT,
+     nbInitialSeats     INTEGER,
+     nbSeatsLeft    INTEGER,
+     template_id    INTEGER NOT NULL);
+
+CREATE TABLE IF NOT EXISTS Reservation(
+     reservation_id INTEGER PRIMARY KEY,
+     reference  TEXT,
+     re_date    TEXT,
+     creator_id     INTEGER NOT NULL,
+     flight_id  INTEGER NOT NULL);
+
+CREATE TABLE IF NOT EXISTS Ticket(
+     ticket_id  INTEGER PRIMARY KEY,
+     firstName   TEXT,
+     lastName   TEXT,
+     gender   TEXT,
+     age    INTEGER,
+     reservation_id     INTEGER NOT NULL,
+     seat   TEXT);
+
+CREATE INDEX IF NOT EXISTS Reservation_flight ON Reservation(flight_id);
+CREATE INDEX IF NOT EXISTS Ticket_reservation ON Ticket(reservation_id);
+
+COMMIT;
@@ -0,0 +1,55 @@
+PRAGMA foreign_keys=OFF;
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS User(
+     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+     lastName   TEXT,
+     firstName  TEXT,
+     phoneNumber    TEXT,
+     email  TEXT,
+     birthDate  TEXT,
+     gender     TEXT,
+     registrationDate INTEGER);
+
+CREATE TABLE IF NOT EXISTS TemplateFlight(
+     tflight_id INTEGER PRIMARY KEY AUTOINCREMENT,
+     depTime    TEXT,
+     arrTime    TEXT,
+     origin     TEXT,
+     destination TEXT);
+
+CREATE TABLE IF NOT EXISTS FlightShard(
+     flight_id  INTEGER PRIMARY KEY,
+     shard  TEXT NOT NULL,
+     template_id    INTEGER NOT NULL);
+
+CREATE INDEX IF NOT EXISTS FlightShard_template ON FlightShard(template_id);
+CREATE INDEX IF NOT EXISTS TemplateFlight_route ON TemplateFlight(origin, destination);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS UserSearch USING fts5(
+     firstName, lastName, email, phoneNumber,
+     content='User', content_rowid='user_id',
+     tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+
+INSERT INTO UserSearch(UserSearch, rank) VALUES('rank', 'bm25(10.0, 10.0, 1.0, 1.0)');
+
+CREATE TRIGGER IF NOT EXISTS User_search_insert AFTER INSERT ON User BEGIN
+     INSERT INTO UserSearch(rowid, firstName, lastName, email, phoneNumber)
+          VALUES (new.user_id, new.firstName, new.lastName, new.email, new.phoneNumber);
+END;
+
+CREATE TRIGGER IF NOT EXISTS User_search_delete AFTER DELETE ON User BEGIN
+     INSERT INTO UserSearch(UserSearch, rowid, firstName, lastName, email, phoneNumber)
+          VALUES ('delete', old.user_id, old.firstName, old.lastName, old.email, old.phoneNumber);
+END;
+
+CREATE TRIGGER IF NOT EXISTS User_search_update
+     AFTER UPDATE OF firstName, lastName, email, phoneNumber ON User BEGIN
+     INSERT INTO UserSearch(UserSearch, rowid, firstName, lastName, email, phoneNumber)
+          VALUES ('delete', old.user_id, old.firstName, old.lastName, old.email, old.phoneNumber);
+     INSERT INTO UserSearch(rowid, firstName, lastName, email, phoneNumber)
+          VALUES (new.user_id, new.firstName, new.lastName, new.email, new.phoneNumber);
+END;
+
+COMMIT;
+PRAGMA foreign_keys=ON;
@@ -5,9 +5,11 @@ INSERT INTO "TemplateFlight" VALUES(1237,"04:00","06:00",'Finland','Berlin');
 INSERT INTO "TemplateFlight" VALUES(1238,"20:52","23:40",'Finland','Poland');
 
 
-INSERT INTO "Flight" VALUES(1111,'AY101',200,'GATE02',"2018-05-06","2018-05-07",90,10,1234);
-INSERT INTO "Flight" VALUES(1122,'AY201',150,'GATE04',"2018-06-10","2018-06-10",90,15,1235);
-INSERT INTO "Flight" VALUES(1133,'AY523',180,'GATE01',"2018-07-05","2018-07-05",90,0,1237);
+-- The triggers of Ticket take the seats of the tickets below: 10, 15 and 0
+-- seats are left once they are inserted
+INSERT INTO "Flight" VALUES(1111,'AY101',200,'GATE02',"2018-05-06","2018-05-07",90,12,1234);
+INSERT INTO "Flight" VALUES(1122,'AY201',150,'GATE04',"2018-06-10","2018-06-10",90,17,1235);
+INSERT INTO "Flight" VALUES(1133,'AY523',180,'GATE01',"2018-07-05","2018-07-05",90,1,1237);
 
 
 INSERT INTO "User" VALUES(1,'Tilton','John', "92722736387",'john.tilton@jhj.jh',"1981-04-04",'male',1519423463929);
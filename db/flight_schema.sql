@@ -50,8 +50,279 @@ CREATE TABLE IF NOT EXISTS Ticket(
      seat   TEXT,
     FOREIGN KEY( reservation_id ) REFERENCES  Reservation ( reservation_id ) ON DELETE CASCADE);
 
+CREATE TABLE IF NOT EXISTS SeatChange(
+     change_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+     flight_id  INTEGER NOT NULL,
+     nbSeatsLeft    INTEGER,
+     created    INTEGER,
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS SeatChange_flight ON SeatChange(flight_id, change_id);
+
+-- Users waiting for a seat of a full flight, served by decreasing priority
+-- then in order of arrival. The seats returned to the flight are booked for
+-- the waiting entries, whose ticket_id is then set.
+CREATE TABLE IF NOT EXISTS Waitlist(
+     waitlist_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+     flight_id  INTEGER NOT NULL,
+     user_id    INTEGER NOT NULL,
+     priority   INTEGER NOT NULL DEFAULT 0,
+     firstName   TEXT,
+     lastName   TEXT,
+     gender   TEXT,
+     age    INTEGER,
+     created    INTEGER,
+     ticket_id  INTEGER,
+     unique (user_id, flight_id),
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE,
+    FOREIGN KEY( user_id ) REFERENCES  User( user_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS Waitlist_queue ON Waitlist(flight_id, priority DESC, waitlist_id)
+     WHERE ticket_id IS NULL;
+
+-- Price of a flight before its first repricing, see
+-- flight_reservation/repricing.py. The repricing applies the pricing curve
+-- to it, not to the price it set itself.
+CREATE TABLE IF NOT EXISTS FlightBasePrice(
+     flight_id  INTEGER PRIMARY KEY,
+     basePrice  INTEGER NOT NULL,
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS Reservation_flight ON Reservation(flight_id);
+CREATE INDEX IF NOT EXISTS Ticket_reservation ON Ticket(reservation_id);
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_insert AFTER INSERT ON Ticket BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft - 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_delete AFTER DELETE ON Ticket BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft + 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_update AFTER UPDATE OF reservation_id ON Ticket
+     WHEN new.reservation_id IS NOT old.reservation_id BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft + 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id);
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft - 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id);
+END;
+
+-- The reservation is already deleted when its tickets are deleted by cascade,
+-- so their seats are returned before
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_delete BEFORE DELETE ON Reservation BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft +
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = old.reservation_id)
+          WHERE flight_id = old.flight_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_update AFTER UPDATE OF flight_id ON Reservation
+     WHEN new.flight_id IS NOT old.flight_id BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft +
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = new.reservation_id)
+          WHERE flight_id = old.flight_id;
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft -
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = new.reservation_id)
+          WHERE flight_id = new.flight_id;
+END;
+
+-- A flight can not give more seats than it has left. The bookings check the
+-- seats left before writing, but two concurrent bookings may both see the
+-- last seat: these checks are made by the statement that takes it.
+-- flight_database.NO_SEAT_ERROR is the message of the error.
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_insert_check BEFORE INSERT ON Ticket
+     WHEN (SELECT nbSeatsLeft FROM Flight WHERE flight_id =
+               (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id)) < 1 BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_update_check BEFORE UPDATE OF reservation_id ON Ticket
+     WHEN (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id) IS NOT
+          (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id)
+     AND (SELECT nbSeatsLeft FROM Flight WHERE flight_id =
+               (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id)) < 1 BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_update_check BEFORE UPDATE OF flight_id ON Reservation
+     WHEN new.flight_id IS NOT old.flight_id
+     AND (SELECT nbSeatsLeft FROM Flight WHERE flight_id = new.flight_id) <
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = old.reservation_id) BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+-- Lowest fare of every route and day: the cheapest flight with seats left,
+-- the seats left and the number of flights of the day. The triggers below
+-- refresh the day of a flight when it changes, its tickets included.
+CREATE TABLE IF NOT EXISTS FareCalendar(
+     origin     TEXT NOT NULL,
+     destination    TEXT NOT NULL,
+     depDate    TEXT NOT NULL,
+     minPrice   INTEGER,
+     seatsLeft  INTEGER NOT NULL,
+     nbFlights  INTEGER NOT NULL,
+     PRIMARY KEY (origin, destination, depDate)) WITHOUT ROWID;
+
+-- Holds a row while a batch updating many prices refreshes their days
+-- itself, once, in the same transaction (see flight_reservation/repricing.py)
+CREATE TABLE IF NOT EXISTS FareCalendarBatch(
+     batch  INTEGER);
+
+CREATE INDEX IF NOT EXISTS TemplateFlight_route ON TemplateFlight(origin, destination);
+CREATE INDEX IF NOT EXISTS Flight_template_date ON Flight(template_id, depDate);
+
+CREATE TRIGGER IF NOT EXISTS Flight_fares_insert AFTER INSERT ON Flight BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin = (SELECT origin FROM TemplateFlight WHERE tflight_id = new.template_id)
+          AND destination = (SELECT destination FROM TemplateFlight WHERE tflight_id = new.template_id)
+          AND depDate = new.depDate;
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT route.origin, route.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight AS route
+               JOIN TemplateFlight ON TemplateFlight.origin = route.origin
+                    AND TemplateFlight.destination = route.destination
+               JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id AND Flight.depDate = new.depDate
+          WHERE route.tflight_id = new.template_id
+          GROUP BY Flight.depDate;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Flight_fares_delete AFTER DELETE ON Flight BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin = (SELECT origin FROM TemplateFlight WHERE tflight_id = old.template_id)
+          AND destination = (SELECT destination FROM TemplateFlight WHERE tflight_id = old.template_id)
+          AND depDate = old.depDate;
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT route.origin, route.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight AS route
+               JOIN TemplateFlight ON TemplateFlight.origin = route.origin
+                    AND TemplateFlight.destination = route.destination
+               JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id AND Flight.depDate = old.depDate
+          WHERE route.tflight_id = old.template_id
+          GROUP BY Flight.depDate;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Flight_fares_update
+     AFTER UPDATE OF price, depDate, nbSeatsLeft, template_id ON Flight
+     WHEN NOT EXISTS (SELECT 1 FROM FareCalendarBatch) BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin = (SELECT origin FROM TemplateFlight WHERE tflight_id = new.template_id)
+          AND destination = (SELECT destination FROM TemplateFlight WHERE tflight_id = new.template_id)
+          AND depDate = new.depDate;
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT route.origin, route.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight AS route
+               JOIN TemplateFlight ON TemplateFlight.origin = route.origin
+                    AND TemplateFlight.destination = route.destination
+               JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id AND Flight.depDate = new.depDate
+          WHERE route.tflight_id = new.template_id
+          GROUP BY Flight.depDate;
+END;
+
+-- Refreshes the day a flight is moved from
+CREATE TRIGGER IF NOT EXISTS Flight_fares_move AFTER UPDATE OF depDate, template_id ON Flight
+     WHEN new.depDate IS NOT old.depDate OR new.template_id IS NOT old.template_id BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin = (SELECT origin FROM TemplateFlight WHERE tflight_id = old.template_id)
+          AND destination = (SELECT destination FROM TemplateFlight WHERE tflight_id = old.template_id)
+          AND depDate = old.depDate;
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT route.origin, route.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight AS route
+               JOIN TemplateFlight ON TemplateFlight.origin = route.origin
+                    AND TemplateFlight.destination = route.destination
+               JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id AND Flight.depDate = old.depDate
+          WHERE route.tflight_id = old.template_id
+          GROUP BY Flight.depDate;
+END;
+
+-- The template flight is already deleted when its flights are deleted by
+-- cascade, so the days of its flights are refreshed without them before
+CREATE TRIGGER IF NOT EXISTS TemplateFlight_fares_delete BEFORE DELETE ON TemplateFlight BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin = old.origin AND destination = old.destination
+          AND depDate IN (SELECT depDate FROM Flight WHERE template_id = old.tflight_id);
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT old.origin, old.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id
+          WHERE TemplateFlight.origin = old.origin AND TemplateFlight.destination = old.destination
+               AND TemplateFlight.tflight_id != old.tflight_id
+               AND Flight.depDate IN (SELECT depDate FROM Flight WHERE template_id = old.tflight_id)
+          GROUP BY Flight.depDate;
+END;
+
+CREATE TRIGGER IF NOT EXISTS TemplateFlight_fares_update AFTER UPDATE OF origin, destination ON TemplateFlight
+     WHEN new.origin IS NOT old.origin OR new.destination IS NOT old.destination BEGIN
+     DELETE FROM FareCalendar
+          WHERE origin IN (old.origin, new.origin) AND destination IN (old.destination, new.destination)
+          AND depDate IN (SELECT depDate FROM Flight WHERE template_id = new.tflight_id);
+     INSERT INTO FareCalendar (origin, destination, depDate, minPrice, seatsLeft, nbFlights)
+          SELECT TemplateFlight.origin, TemplateFlight.destination, Flight.depDate,
+               MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END),
+               SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*)
+          FROM TemplateFlight JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id
+          WHERE TemplateFlight.origin IN (old.origin, new.origin)
+               AND TemplateFlight.destination IN (old.destination, new.destination)
+               AND Flight.depDate IN (SELECT depDate FROM Flight WHERE template_id = new.tflight_id)
+          GROUP BY TemplateFlight.origin, TemplateFlight.destination, Flight.depDate;
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS UserSearch USING fts5(
+     firstName, lastName, email, phoneNumber,
+     content='User', content_rowid='user_id',
+     tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+
+INSERT INTO UserSearch(UserSearch, rank) VALUES('rank', 'bm25(10.0, 10.0, 1.0, 1.0)');
+
+CREATE TRIGGER IF NOT EXISTS User_search_insert AFTER INSERT ON User BEGIN
+     INSERT INTO UserSearch(rowid, firstName, lastName, email, phoneNumber)
+          VALUES (new.user_id, new.firstName, new.lastName, new.email, new.phoneNumber);
+END;
+
+CREATE TRIGGER IF NOT EXISTS User_search_delete AFTER DELETE ON User BEGIN
+     INSERT INTO UserSearch(UserSearch, rowid, firstName, lastName, email, phoneNumber)
+          VALUES ('delete', old.user_id, old.firstName, old.lastName, old.email, old.phoneNumber);
+END;
+
+CREATE TRIGGER IF NOT EXISTS User_search_update
+     AFTER UPDATE OF firstName, lastName, email, phoneNumber ON User BEGIN
+     INSERT INTO UserSearch(UserSearch, rowid, firstName, lastName, email, phoneNumber)
+          VALUES ('delete', old.user_id, old.firstName, old.lastName, old.email, old.phoneNumber);
+     INSERT INTO UserSearch(rowid, firstName, lastName, email, phoneNumber)
+          VALUES (new.user_id, new.firstName, new.lastName, new.email, new.phoneNumber);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS PassengerSearch USING fts5(
+     firstName, lastName,
+     content='Ticket', content_rowid='ticket_id',
+     tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+
+CREATE TRIGGER IF NOT EXISTS Ticket_search_insert AFTER INSERT ON Ticket BEGIN
+     INSERT INTO PassengerSearch(rowid, firstName, lastName)
+          VALUES (new.ticket_id, new.firstName, new.lastName);
+END;
 
+CREATE TRIGGER IF NOT EXISTS Ticket_search_delete AFTER DELETE ON Ticket BEGIN
+     INSERT INTO PassengerSearch(PassengerSearch, rowid, firstName, lastName)
+          VALUES ('delete', old.ticket_id, old.firstName, old.lastName);
+END;
 
+CREATE TRIGGER IF NOT EXISTS Ticket_search_update AFTER UPDATE OF firstName, lastName ON Ticket BEGIN
+     INSERT INTO PassengerSearch(PassengerSearch, rowid, firstName, lastName)
+          VALUES ('delete', old.ticket_id, old.firstName, old.lastName);
+     INSERT INTO PassengerSearch(rowid, firstName, lastName)
+          VALUES (new.ticket_id, new.firstName, new.lastName);
+END;
 
 COMMIT;
 PRAGMA foreign_keys=ON;
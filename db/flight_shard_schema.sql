@@ -0,0 +1,159 @@
+PRAGMA foreign_keys=OFF;
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS Flight(
+     flight_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+     code   TEXT UNIQUE,
+     price  INTEGER,
+     gate   TEXT,
+     depDate    TEXT,
+     arrDate    TEXT,
+     nbInitialSeats     INTEGER,
+     nbSeatsLeft    INTEGER,
+     template_id    INTEGER NOT NULL);
+
+CREATE TABLE IF NOT EXISTS Reservation(
+     reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+     reference  TEXT,
+     re_date    TEXT,
+     creator_id     INTEGER NOT NULL,
+     flight_id  INTEGER NOT NULL,
+     unique (creator_id, flight_id),
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE TABLE IF NOT EXISTS Ticket(
+     ticket_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+     firstName   TEXT,
+     lastName   TEXT,
+     gender   TEXT,
+     age    INTEGER,
+     reservation_id     INTEGER NOT NULL,
+     seat   TEXT,
+    FOREIGN KEY( reservation_id ) REFERENCES  Reservation ( reservation_id ) ON DELETE CASCADE);
+
+CREATE TABLE IF NOT EXISTS SeatChange(
+     change_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+     flight_id  INTEGER NOT NULL,
+     nbSeatsLeft    INTEGER,
+     created    INTEGER,
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS SeatChange_flight ON SeatChange(flight_id, change_id);
+
+-- Users waiting for a seat of a full flight, served by decreasing priority
+-- then in order of arrival. The seats returned to the flight are booked for
+-- the waiting entries, whose ticket_id is then set.
+CREATE TABLE IF NOT EXISTS Waitlist(
+     waitlist_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+     flight_id  INTEGER NOT NULL,
+     user_id    INTEGER NOT NULL,
+     priority   INTEGER NOT NULL DEFAULT 0,
+     firstName   TEXT,
+     lastName   TEXT,
+     gender   TEXT,
+     age    INTEGER,
+     created    INTEGER,
+     ticket_id  INTEGER,
+     unique (user_id, flight_id),
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS Waitlist_queue ON Waitlist(flight_id, priority DESC, waitlist_id)
+     WHERE ticket_id IS NULL;
+
+-- Price of a flight before its first repricing, see
+-- flight_reservation/repricing.py. The repricing applies the pricing curve
+-- to it, not to the price it set itself.
+CREATE TABLE IF NOT EXISTS FlightBasePrice(
+     flight_id  INTEGER PRIMARY KEY,
+     basePrice  INTEGER NOT NULL,
+    FOREIGN KEY( flight_id ) REFERENCES  Flight ( flight_id ) ON DELETE CASCADE);
+
+CREATE INDEX IF NOT EXISTS Reservation_flight ON Reservation(flight_id);
+CREATE INDEX IF NOT EXISTS Ticket_reservation ON Ticket(reservation_id);
+CREATE INDEX IF NOT EXISTS Flight_template_date ON Flight(template_id, depDate);
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_insert AFTER INSERT ON Ticket BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft - 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_delete AFTER DELETE ON Ticket BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft + 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_update AFTER UPDATE OF reservation_id ON Ticket
+     WHEN new.reservation_id IS NOT old.reservation_id BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft + 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id);
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft - 1
+          WHERE flight_id = (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id);
+END;
+
+-- The reservation is already deleted when its tickets are deleted by cascade,
+-- so their seats are returned before
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_delete BEFORE DELETE ON Reservation BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft +
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = old.reservation_id)
+          WHERE flight_id = old.flight_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_update AFTER UPDATE OF flight_id ON Reservation
+     WHEN new.flight_id IS NOT old.flight_id BEGIN
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft +
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = new.reservation_id)
+          WHERE flight_id = old.flight_id;
+     UPDATE Flight SET nbSeatsLeft = nbSeatsLeft -
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = new.reservation_id)
+          WHERE flight_id = new.flight_id;
+END;
+
+-- A flight can not give more seats than it has left. The bookings check the
+-- seats left before writing, but two concurrent bookings may both see the
+-- last seat: these checks are made by the statement that takes it.
+-- flight_database.NO_SEAT_ERROR is the message of the error.
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_insert_check BEFORE INSERT ON Ticket
+     WHEN (SELECT nbSeatsLeft FROM Flight WHERE flight_id =
+               (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id)) < 1 BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_seats_update_check BEFORE UPDATE OF reservation_id ON Ticket
+     WHEN (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id) IS NOT
+          (SELECT flight_id FROM Reservation WHERE reservation_id = old.reservation_id)
+     AND (SELECT nbSeatsLeft FROM Flight WHERE flight_id =
+               (SELECT flight_id FROM Reservation WHERE reservation_id = new.reservation_id)) < 1 BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+CREATE TRIGGER IF NOT EXISTS Reservation_seats_update_check BEFORE UPDATE OF flight_id ON Reservation
+     WHEN new.flight_id IS NOT old.flight_id
+     AND (SELECT nbSeatsLeft FROM Flight WHERE flight_id = new.flight_id) <
+          (SELECT COUNT(*) FROM Ticket WHERE reservation_id = old.reservation_id) BEGIN
+     SELECT RAISE(ABORT, 'No seat available for the flight');
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS PassengerSearch USING fts5(
+     firstName, lastName,
+     content='Ticket', content_rowid='ticket_id',
+     tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+
+CREATE TRIGGER IF NOT EXISTS Ticket_search_insert AFTER INSERT ON Ticket BEGIN
+     INSERT INTO PassengerSearch(rowid, firstName, lastName)
+          VALUES (new.ticket_id, new.firstName, new.lastName);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_search_delete AFTER DELETE ON Ticket BEGIN
+     INSERT INTO PassengerSearch(PassengerSearch, rowid, firstName, lastName)
+          VALUES ('delete', old.ticket_id, old.firstName, old.lastName);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Ticket_search_update AFTER UPDATE OF firstName, lastName ON Ticket BEGIN
+     INSERT INTO PassengerSearch(PassengerSearch, rowid, firstName, lastName)
+          VALUES ('delete', old.ticket_id, old.firstName, old.lastName);
+     INSERT INTO PassengerSearch(rowid, firstName, lastName)
+          VALUES (new.ticket_id, new.firstName, new.lastName);
+END;
+
+COMMIT;
+PRAGMA foreign_keys=ON;
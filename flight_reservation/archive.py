@@ -0,0 +1,169 @@
+"""
+Created on 19.10.2026
+
+Archival of the departed flights.
+
+Nothing removes the flights from the database once they have departed, so
+the ``Flight``, ``Reservation`` and ``Ticket`` tables and their indexes keep
+growing. :py:class:`Archiver` moves the flights departed before a date,
+with their reservations and tickets, to an archive database.
+
+The flights are moved by chunks, each one in its own write transaction: the
+rows are copied to the archive, which is attached to the connection, and
+deleted from the database in the same transaction, so a row is never lost
+nor in both databases. The ``ON DELETE CASCADE`` foreign keys delete the
+reservations, the tickets and the seat changes of the flights. The write
+lock is released between two chunks so that the bookings are not blocked
+while a large backlog is archived.
+
+The archive is read only for the API: a
+:py:class:`~flight_reservation.flight_database.Connection` created with an
+``archive_path`` reads the reservations and tickets it does not find in the
+database from it.
+
+"""
+import io
+import sqlite3
+import time
+from datetime import datetime, date
+
+from flight_reservation.flight_database import parse_date, DEFAULT_ARCHIVE_PATH
+
+DEFAULT_ARCHIVE_SCHEMA = "db/flight_archive_schema.sql"
+
+# Flights moved in one transaction
+DEFAULT_CHUNK_SIZE = 100
+
+# The columns are named: the order of the columns of the tables of the
+# older databases is not the one of the schema
+FLIGHT_COLUMNS = ("flight_id, code, price, gate, depDate, arrDate, nbInitialSeats, "
+                  "nbSeatsLeft, template_id")
+RESERVATION_COLUMNS = "reservation_id, reference, re_date, creator_id, flight_id"
+TICKET_COLUMNS = "ticket_id, firstName, lastName, gender, age, reservation_id, seat"
+
+
+class Archiver(object):
+    """
+    Moves the departed flights of a database to its archive.
+
+    :param engine: the :py:class:`~flight_reservation.flight_database.Engine`
+        of the database.
+    :param str archive_path: path of the archive database. Defaults to the
+        ``archive_path`` of the engine, then to *db/flight_archive.db*.
+    :param int chunk_size: number of flights moved in one transaction.
+    :param str schema: path to the .sql schema file of the archive. Defaults
+        to *db/flight_archive_schema.sql*
+
+    """
+
+    def __init__(self, engine, archive_path=None, chunk_size=DEFAULT_CHUNK_SIZE, schema=None):
+        super(Archiver, self).__init__()
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be positive")
+        self.engine = engine
+        if archive_path is None:
+            archive_path = engine.archive_path or DEFAULT_ARCHIVE_PATH
+        self.archive_path = archive_path
+        self.chunk_size = chunk_size
+        self.schema = schema or DEFAULT_ARCHIVE_SCHEMA
+
+    def create_archive(self):
+        """
+        Creates the archive database, if it does not exist, from the schema
+        file.
+
+        """
+        con = sqlite3.connect(self.archive_path)
+        try:
+            with io.open(self.schema, encoding="utf-8") as f:
+                con.executescript(f.read())
+        finally:
+            con.close()
+
+    def departed_flights(self, before):
+        """
+        :param datetime before: the flights departing before this date are
+            departed.
+        :return: the ids of the departed flights, sorted. The flights whose
+            departure date is not valid are never departed.
+        :rtype: list
+        """
+        con = sqlite3.connect(self.engine.db_path)
+        try:
+            rows = con.execute("SELECT flight_id, depDate FROM Flight").fetchall()
+        finally:
+            con.close()
+        departed = []
+        for flight_id, dep_date in rows:
+            try:
+                if parse_date(str(dep_date)) < before:
+                    departed.append(flight_id)
+            except ValueError:
+                pass
+        return sorted(departed)
+
+    def archive_departed(self, before=None, pause=0):
+        """
+        Moves the flights departed before a date, with their reservations
+        and tickets, to the archive.
+
+        :param datetime before: the flights departing before this date are
+            moved. Defaults to today: the flights departing today are kept.
+        :param float pause: seconds waited between two chunks.
+        :return: dictionary with the number of ``flights``, ``reservations``
+            and ``tickets`` moved.
+        """
+        if before is None:
+            before = datetime.combine(date.today(), datetime.min.time())
+        flight_ids = self.departed_flights(before)
+        counts = {"flights": 0, "reservations": 0, "tickets": 0}
+        if not flight_ids:
+            return counts
+        self.create_archive()
+        #The transactions are handled explicitly
+        con = sqlite3.connect(self.engine.db_path, isolation_level=None)
+        try:
+            con.execute("PRAGMA foreign_keys = ON")
+            con.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            for start in range(0, len(flight_ids), self.chunk_size):
+                if start and pause:
+                    time.sleep(pause)
+                moved = self._move_chunk(con, flight_ids[start:start + self.chunk_size])
+                for key in counts:
+                    counts[key] += moved[key]
+        finally:
+            con.close()
+        return counts
+
+    def _move_chunk(self, con, flight_ids):
+        """
+        Moves some flights, with their reservations and tickets, in one
+        transaction.
+
+        :return: dictionary with the number of rows moved by table.
+        """
+        marks = ",".join("?" * len(flight_ids))
+        reservations = "SELECT reservation_id FROM main.Reservation WHERE flight_id IN (%s)" % marks
+        statements = (
+            ("flights", "INSERT OR REPLACE INTO archive.Flight (%s) SELECT %s FROM main.Flight "
+                        "WHERE flight_id IN (%s)" % (FLIGHT_COLUMNS, FLIGHT_COLUMNS, marks)),
+            ("reservations", "INSERT OR REPLACE INTO archive.Reservation (%s) SELECT %s "
+                             "FROM main.Reservation WHERE flight_id IN (%s)"
+                             % (RESERVATION_COLUMNS, RESERVATION_COLUMNS, marks)),
+            ("tickets", "INSERT OR REPLACE INTO archive.Ticket (%s) SELECT %s FROM main.Ticket "
+                        "WHERE reservation_id IN (%s)"
+                        % (TICKET_COLUMNS, TICKET_COLUMNS, reservations)),
+        )
+        moved = {}
+        #Taking the write lock first, the flights cannot be booked meanwhile
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for key, statement in statements:
+                moved[key] = con.execute(statement, flight_ids).rowcount
+            #The reservations, tickets and seat changes are deleted in cascade
+            con.execute("DELETE FROM main.Flight WHERE flight_id IN (%s)" % marks, flight_ids)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        return moved
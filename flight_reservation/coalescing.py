@@ -0,0 +1,214 @@
+"""
+Created on 19.10.2026
+
+Single-flight coalescing of identical GET requests.
+
+When a popular route opens for sale, many clients request the same
+collection within a few milliseconds. :py:class:`CoalescingMiddleware` lets
+the first of those requests (the leader) run the application while the
+identical requests arriving before it finishes (the followers) wait for it,
+and then sends them the same status, headers and body. The database is read
+and the envelope serialized once for the whole group.
+
+Nothing is kept once the leader has finished: this is not a cache, a request
+arriving after the response was produced runs the application again. The
+followers therefore never see data older than the start of the request they
+joined.
+
+Two requests are identical when they have the same host, path, query string
+and ``Accept`` and ``Accept-Encoding`` headers. Responses setting cookies,
+marked ``Cache-Control: no-store`` or streamed as ``text/event-stream`` are
+not shared: the followers of such a request run the application themselves.
+
+The coalescing only happens between the threads of a process, so it needs a
+threaded server (``serve.py --threaded``).
+
+"""
+import itertools
+import threading
+
+from werkzeug.wsgi import ClosingIterator
+
+DEFAULT_PREFIXES = ("/flight-booking-system/api/",)
+
+# Request headers that select the representation, part of the request key
+VARY_ENVIRON_KEYS = ("HTTP_ACCEPT", "HTTP_ACCEPT_ENCODING")
+
+# Seconds a follower waits for its leader before running the request itself
+DEFAULT_TIMEOUT = 30.0
+
+LEADER = "leader"
+FOLLOWER = "follower"
+FALLBACK = "fallback"
+
+
+class _Call(object):
+    """
+    A request being run by a leader, with the response shared with the
+    followers once it is done.
+
+    """
+    __slots__ = ("done", "response", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        #(status, headers, body) or None if the response is not shared
+        self.response = None
+        self.followers = 0
+
+
+def shareable(headers):
+    """
+    :param headers: the headers of a response, as a list of tuples.
+    :return: ``True`` if the response can be sent to other clients.
+    """
+    for name, value in headers:
+        name = name.lower()
+        if name == "set-cookie":
+            return False
+        if name == "cache-control" and "no-store" in value.lower():
+            return False
+        if name == "content-type" and value.lower().startswith("text/event-stream"):
+            return False
+    return True
+
+
+class CoalescingMiddleware(object):
+    """
+    WSGI middleware running concurrent identical GET requests once.
+
+    :param app: the WSGI application to wrap.
+    :param prefixes: paths starting with one of these prefixes are
+        coalesced.
+    :param float timeout: seconds a follower waits for the leader before
+        running the request itself.
+
+    """
+
+    def __init__(self, app, prefixes=DEFAULT_PREFIXES, timeout=DEFAULT_TIMEOUT):
+        super(CoalescingMiddleware, self).__init__()
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.timeout = timeout
+        #request key: _Call
+        self._calls = {}
+        self._lock = threading.Lock()
+        #role: number of requests
+        self.requests = {LEADER: 0, FOLLOWER: 0, FALLBACK: 0}
+
+    def key(self, environ):
+        """
+        :return: the key of the request, or ``None`` if it is not coalesced.
+        """
+        if environ.get("REQUEST_METHOD") != "GET":
+            return None
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        if not path.startswith(self.prefixes):
+            return None
+        return (environ.get("HTTP_HOST", ""), path, environ.get("QUERY_STRING", "")) + \
+            tuple(environ.get(key, "") for key in VARY_ENVIRON_KEYS)
+
+    def __call__(self, environ, start_response):
+        key = self.key(environ)
+        if key is None:
+            return self.app(environ, start_response)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+        if leader:
+            return self._lead(key, call, environ, start_response)
+        return self._follow(call, environ, start_response)
+
+    def _finish(self, key, call, response):
+        with self._lock:
+            del self._calls[key]
+            self.requests[LEADER] += 1
+        call.response = response
+        call.done.set()
+
+    def _lead(self, key, call, environ, start_response):
+        captured = []
+        written = []
+        forward = []
+
+        def _start_response(status, headers, exc_info=None):
+            if forward:
+                return start_response(status, headers, exc_info)
+            captured[:] = [status, headers, exc_info]
+            return written.append
+
+        try:
+            app_iter = self.app(environ, _start_response)
+        except BaseException:
+            self._finish(key, call, None)
+            raise
+
+        if not captured or not shareable(captured[1]):
+            #Streamed or private: the followers run the request themselves
+            self._finish(key, call, None)
+            forward.append(True)
+            if not captured:
+                return app_iter
+            start_response(*captured)
+            if not written:
+                return app_iter
+            return ClosingIterator(itertools.chain(written, app_iter),
+                                   getattr(app_iter, "close", None))
+
+        response = None
+        try:
+            body = b"".join(itertools.chain(written, app_iter))
+            response = (captured[0], captured[1], body)
+        finally:
+            try:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+            finally:
+                self._finish(key, call, response)
+        start_response(captured[0], list(captured[1]))
+        return [body]
+
+    def _follow(self, call, environ, start_response):
+        if call.done.wait(self.timeout) and call.response is not None:
+            with self._lock:
+                self.requests[FOLLOWER] += 1
+            status, headers, body = call.response
+            start_response(status, list(headers))
+            return [body]
+        with self._lock:
+            self.requests[FALLBACK] += 1
+        return self.app(environ, start_response)
+
+    def ratio(self):
+        """
+        :return: the fraction of the coalesced requests that were answered
+            with the response of another request.
+        """
+        with self._lock:
+            total = sum(self.requests.values())
+            return self.requests[FOLLOWER] / float(total) if total else 0.0
+
+    def collect(self):
+        """
+        :return: the lines, in the Prometheus text format, of the coalescing
+            counters of this process. To be registered with
+            :py:meth:`flight_reservation.metrics.MetricsMiddleware.add_collector`.
+        """
+        ratio = self.ratio()
+        with self._lock:
+            requests = sorted(self.requests.items())
+        lines = ["# HELP flight_coalescing_requests_total Coalesced GET requests by role: "
+                 "leader (ran the application), follower (got the response of a leader) "
+                 "or fallback (ran the application after waiting).",
+                 "# TYPE flight_coalescing_requests_total counter"]
+        for role, count in requests:
+            lines.append('flight_coalescing_requests_total{role="%s"} %d' % (role, count))
+        lines += ["# HELP flight_coalescing_ratio Fraction of the coalesced requests answered "
+                  "by a follower.",
+                  "# TYPE flight_coalescing_ratio gauge",
+                  "flight_coalescing_ratio %s" % repr(ratio)]
+        return lines
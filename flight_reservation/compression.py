@@ -0,0 +1,261 @@
+"""
+Created on 19.10.2026
+
+Response compression.
+
+:py:class:`CompressionMiddleware` negotiates the ``Accept-Encoding`` header
+of the request and compresses the body of the responses with gzip or deflate
+while it is being sent. The Mason envelopes repeat the same ``@controls`` for
+every item of a collection, so they shrink to a small fraction of their size.
+
+Responses smaller than ``min_size``, responses with a media type that does
+not compress (images...), event streams, responses that are already encoded
+and responses with ``Cache-Control: no-transform`` are sent unchanged.
+
+The compressed body is not byte for byte the representation tagged by the
+application, so a strong ``ETag`` is sent weak (``W/"..."``) with it.
+
+"""
+import zlib
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+IDENTITY = "identity"
+
+DEFAULT_MIN_SIZE = 500
+DEFAULT_LEVEL = 6
+
+# Media types compressed by default
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/vnd.mason+json",
+                      "application/javascript", "application/xml", "image/svg+xml",
+                      "application/schema+json")
+
+# Media types never compressed: the events must reach the client as soon as
+# they are produced, not buffered until min_size bytes are available
+STREAMED_TYPES = ("text/event-stream",)
+
+# Preference of the server when the client accepts several encodings with
+# the same quality
+_PREFERENCE = {GZIP: 2, DEFLATE: 1}
+
+# zlib window bits producing a gzip file or a zlib stream (HTTP "deflate")
+WBITS = {GZIP: 16 + zlib.MAX_WBITS, DEFLATE: zlib.MAX_WBITS}
+
+
+def parse_accept_encoding(header):
+    """
+    Parses an ``Accept-Encoding`` header.
+
+    :return: dictionary ``{coding: quality}``, with lower case codings.
+    """
+    codings = {}
+    for item in (header or "").split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def negotiate(header, available=(GZIP, DEFLATE)):
+    """
+    Chooses the content coding of the response.
+
+    :param str header: value of the ``Accept-Encoding`` header.
+    :param available: codings supported by the server.
+    :return: the chosen coding or ``None`` to send the body unencoded.
+    """
+    codings = parse_accept_encoding(header)
+    best, best_key = None, (0.0, 0)
+    for coding in available:
+        quality = codings.get(coding, codings.get("*", 0.0))
+        key = (quality, _PREFERENCE.get(coding, 0))
+        if quality > 0 and key > best_key:
+            best, best_key = coding, key
+    if best is None:
+        return None
+    #Identity is kept when the client explicitly rates it higher
+    if codings.get(IDENTITY, 0.0) > best_key[0]:
+        return None
+    return best
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def weak_etag(etag):
+    """
+    :return: the ``ETag`` header value *etag* made weak, unchanged if it
+        is already weak.
+    """
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        return etag
+    return "W/" + etag
+
+
+class CompressionMiddleware(object):
+    """
+    WSGI middleware compressing the responses.
+
+    :param app: the WSGI application to wrap.
+    :param int min_size: responses smaller than this number of bytes are not
+        compressed. When the application does not set ``Content-Length`` the
+        body is buffered until this size is reached to decide.
+    :param int level: zlib compression level, from 1 (fastest) to 9
+        (smallest).
+    :param compressible_types: prefixes of the media types that are
+        compressed.
+    """
+
+    def __init__(self, app, min_size=DEFAULT_MIN_SIZE, level=DEFAULT_LEVEL,
+                 compressible_types=COMPRESSIBLE_TYPES):
+        super(CompressionMiddleware, self).__init__()
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.compressible_types = tuple(compressible_types)
+
+    def compressible(self, status, headers):
+        """
+        :return: True if the response can be compressed, whatever the client
+            accepts.
+        """
+        if status[:3] in ("204", "304") or status[0] == "1":
+            return False
+        content_type = (_header(headers, "Content-Type") or "").lower()
+        if not content_type.startswith(self.compressible_types):
+            return False
+        if content_type.startswith(STREAMED_TYPES):
+            return False
+        if _header(headers, "Content-Encoding"):
+            return False
+        if "no-transform" in (_header(headers, "Cache-Control") or "").lower():
+            return False
+        return True
+
+    def __call__(self, environ, start_response):
+        coding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            coding = negotiate(environ.get("HTTP_ACCEPT_ENCODING"))
+        response = _CompressedResponse(self, coding, start_response)
+        app_iter = self.app(environ, response.start_response)
+        return response.wrap(app_iter)
+
+
+class _CompressedResponse(object):
+    """
+    State of one response going through the :py:class:`CompressionMiddleware`.
+    """
+
+    def __init__(self, middleware, coding, start_response):
+        self.middleware = middleware
+        self.coding = coding
+        self._start_response = start_response
+        self.status = None
+        self.headers = None
+        self.exc_info = None
+        self.started = False
+        self.compressor = None
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None and self.started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status, self.headers, self.exc_info = status, list(headers), exc_info
+        return self._write_unsupported
+
+    def _write_unsupported(self, data):
+        raise RuntimeError("The compression middleware does not support the write callable")
+
+    def _start(self, compress):
+        headers = self.headers
+        if self.middleware.compressible(self.status, headers):
+            vary = _header(headers, "Vary")
+            if vary is None:
+                headers.append(("Vary", "Accept-Encoding"))
+            elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+                headers = [(k, v) for k, v in headers if k.lower() != "vary"]
+                headers.append(("Vary", vary + ", Accept-Encoding"))
+        if compress:
+            headers = [(k, weak_etag(v) if k.lower() == "etag" else v)
+                       for k, v in headers if k.lower() != "content-length"]
+            headers.append(("Content-Encoding", self.coding))
+            self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED,
+                                               WBITS[self.coding])
+        self.started = True
+        self._start_response(self.status, headers, self.exc_info)
+
+    def wrap(self, app_iter):
+        if self.coding is None or not self.middleware.compressible(self.status, self.headers):
+            self._start(False)
+            return app_iter
+        length = _header(self.headers, "Content-Length")
+        if length is not None and length.isdigit():
+            if int(length) < self.middleware.min_size:
+                self._start(False)
+                return app_iter
+            self._start(True)
+            return _ClosingIterator(self._compress(app_iter, []), app_iter)
+        return _ClosingIterator(self._buffer_then_compress(app_iter), app_iter)
+
+    def _compress(self, chunks, pending):
+        compressor = self.compressor
+        for chunk in pending:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            #Flush so that the streamed chunks reach the client as they are produced
+            if chunk:
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def _buffer_then_compress(self, app_iter):
+        iterator = iter(app_iter)
+        pending, size = [], 0
+        for chunk in iterator:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= self.middleware.min_size:
+                self._start(True)
+                for data in self._compress(iterator, pending):
+                    yield data
+                return
+        #The whole body is smaller than the threshold
+        self._start(False)
+        for chunk in pending:
+            yield chunk
+
+
+class _ClosingIterator(object):
+    """
+    Iterates over *iterable* and closes *app_iter* as required by WSGI.
+    """
+
+    def __init__(self, iterable, app_iter):
+        self._iterable = iterable
+        self._app_iter = app_iter
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        if hasattr(self._app_iter, "close"):
+            self._app_iter.close()
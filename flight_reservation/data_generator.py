@@ -0,0 +1,354 @@
+"""
+Created on 19.10.2026
+
+Deterministic generator of realistic synthetic data for the flight booking
+database, meant for capacity testing.
+
+The same seed and cardinalities always produce the same database. Demand is
+skewed the way real traffic is: a few routes concentrate most of the
+bookings and a few users make many reservations, both following a Zipf
+distribution.
+
+:Example:
+
+>>> generator = DataGenerator("db/flight_big.db", seed=1, users=100000)
+>>> counts = generator.generate()
+
+or, from the command line, a database of about 10 million rows:
+
+    python3 -m flight_reservation.data_generator db/flight_big.db --rows 10000000
+
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from flight_reservation import flight_database as database
+
+FIRST_NAMES = ["John", "Jacob", "Sam", "Mike", "Niil", "Molly", "Anna", "Maria",
+               "Juha", "Mikko", "Laura", "Emma", "Liam", "Noah", "Olivia", "Sofia",
+               "Aino", "Eero", "Helmi", "Ville", "Lucas", "Chloe", "Ines", "Hugo"]
+LAST_NAMES = ["Tilton", "Jacob", "Simon", "Jac", "Jain", "Virtanen", "Korhonen",
+              "Nieminen", "Smith", "Jones", "Martin", "Bernard", "Garcia", "Muller",
+              "Rossi", "Novak", "Larsen", "Andersson", "Kowalski", "Dubois"]
+EMAIL_DOMAINS = ["example.com", "mail.fi", "jhj.jh", "post.eu"]
+GENDERS = ["male", "female"]
+AIRPORTS = ["Finland", "France", "Spain", "Sweeden", "Berlin", "Poland", "Norway",
+            "Italy", "Greece", "Portugal", "Estonia", "Denmark", "Iceland", "Austria",
+            "Hungary", "Ireland", "Latvia", "Netherlands", "Belgium", "Croatia"]
+# Aircraft capacities and their share of the fleet
+AIRCRAFT_SEATS = [70, 120, 180, 220, 300]
+AIRCRAFT_WEIGHTS = [15, 30, 35, 15, 5]
+# Number of tickets per reservation (1 to 4) and their share
+PASSENGER_WEIGHTS = [55, 25, 12, 8]
+
+# Reservation references follow the format [A-Z][A-Z][0-9][0-9][A-Z]
+REFERENCE_SPACE = 26 * 26 * 10 * 10 * 26
+# Coprime with REFERENCE_SPACE, used to spread consecutive ids over the space
+REFERENCE_MULTIPLIER = 7919
+
+# Share of each table in a database of a given total number of rows
+ROWS_SHARE = {'users': 0.19, 'templates': 0.0002, 'flights': 0.02, 'reservations': 0.29}
+
+
+def zipf_cum_weights(n, skew):
+    """
+    Cumulative Zipf weights for ranks 1..n: the rank ``k`` has a weight
+    proportional to ``1 / k ** skew``. A skew of 0 means uniform.
+    """
+    return list(itertools.accumulate(1.0 / (k ** skew) for k in range(1, n + 1)))
+
+
+def reservation_reference(reservation_id):
+    """
+    Deterministic reservation reference for an id. Ids smaller than
+    :py:data:`REFERENCE_SPACE` map to distinct references with the format
+    used by :py:meth:`Connection.generate_new_reservation_reference`; bigger
+    ids get extra leading letters.
+    """
+    n = (reservation_id * REFERENCE_MULTIPLIER) % REFERENCE_SPACE
+    n, last = divmod(n, 26)
+    n, digits = divmod(n, 100)
+    second, first = divmod(n, 26)
+    reference = (chr(65 + second) + chr(65 + first) + "%02d" % digits + chr(65 + last))
+    extra = reservation_id // REFERENCE_SPACE
+    while extra:
+        extra, letter = divmod(extra, 26)
+        reference = chr(65 + letter) + reference
+    return reference
+
+
+class DataGenerator(object):
+    """
+    Writes a synthetic but realistic dataset in a flight booking database.
+
+    :param str db_path: path of the database file. It is created with the
+        default schema if it does not exist. Existing rows are kept but the
+        ids generated start at 1, so it should normally be a new file.
+    :param int seed: seed of the random generator.
+    :param int users: number of users.
+    :param int templates: number of template flights (routes).
+    :param int flights: number of scheduled flights.
+    :param int reservations: number of reservations wanted. Fewer are
+        written if the flights do not have enough seats.
+    :param float route_skew: Zipf exponent of the route popularity.
+    :param float user_skew: Zipf exponent of the number of reservations per user.
+    :param start_date: first departure date (:py:class:`datetime.date`).
+    :param int days: number of days over which flights are scheduled.
+    :param int batch_size: number of rows per ``executemany`` call.
+    :param bool in_memory: build the database in memory and copy it to
+        *db_path* with the sqlite backup API at the end.
+    """
+
+    def __init__(self, db_path, seed=0, users=1000, templates=50, flights=500,
+                 reservations=2000, route_skew=1.1, user_skew=0.9,
+                 start_date=date(2018, 5, 1), days=365, batch_size=50000,
+                 in_memory=False):
+        super(DataGenerator, self).__init__()
+        self.db_path = db_path
+        self.seed = seed
+        self.users = users
+        self.templates = max(1, templates)
+        self.flights = flights
+        self.reservations = reservations
+        self.route_skew = route_skew
+        self.user_skew = user_skew
+        self.start_date = start_date
+        self.days = max(1, days)
+        self.batch_size = batch_size
+        self.in_memory = in_memory
+
+    @classmethod
+    def for_rows(cls, db_path, rows, **kwargs):
+        """
+        Creates a generator whose database will contain about *rows* rows in
+        total, split between the tables like in a real deployment.
+        """
+        counts = dict((table, max(1, int(rows * share))) for table, share in ROWS_SHARE.items())
+        counts.update(kwargs)
+        return cls(db_path, **counts)
+
+    def generate(self):
+        """
+        Writes the dataset.
+
+        :return: a dictionary with the number of rows written in each table.
+        """
+        if self.in_memory:
+            con = sqlite3.connect(":memory:")
+        else:
+            con = sqlite3.connect(self.db_path)
+        try:
+            with open(database.DEFAULT_SCHEMA, encoding="utf-8") as f:
+                con.executescript(f.read())
+            # The data is consistent by construction: skip the checks and the
+            # journal while loading.
+            con.execute("PRAGMA foreign_keys = OFF")
+            con.execute("PRAGMA synchronous = OFF")
+            con.execute("PRAGMA journal_mode = OFF")
+            # The triggers keep the fare calendar and the search indexes up
+            # to date row by row: they are dropped while loading and the
+            # derived tables are rebuilt once at the end.
+            triggers = con.execute("SELECT name, sql FROM sqlite_master "
+                                   "WHERE type = 'trigger'").fetchall()
+            for name, _ in triggers:
+                con.execute('DROP TRIGGER "%s"' % name)
+            counts = self._write(con)
+            for _, sql in triggers:
+                con.execute(sql)
+            if self.in_memory:
+                target = sqlite3.connect(self.db_path)
+                try:
+                    con.backup(target)
+                finally:
+                    target.close()
+        finally:
+            con.close()
+        engine = database.Engine(self.db_path)
+        engine.rebuild_fare_calendar()
+        engine.rebuild_search_index()
+        return counts
+
+    def _insert(self, con, statement, rows):
+        """
+        Inserts the *rows* iterator in batches of :py:attr:`batch_size` and
+        returns the number of rows inserted.
+        """
+        count = 0
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return count
+            con.executemany(statement, batch)
+            count += len(batch)
+
+    def _write(self, con):
+        rnd = random.Random(self.seed)
+        counts = {}
+        with con:
+            counts['User'] = self._insert(con, 'INSERT INTO User VALUES(?,?,?,?,?,?,?,?)',
+                                          self._users(rnd))
+            routes = self._routes(rnd)
+            counts['TemplateFlight'] = self._insert(con, 'INSERT INTO TemplateFlight VALUES(?,?,?,?,?)',
+                                                    routes)
+            flights = self._flights(rnd, routes)
+            counts['Reservation'], counts['Ticket'] = self._bookings(con, rnd, flights)
+            # Flights are written last, once their seats left are known
+            counts['Flight'] = self._insert(con, 'INSERT INTO Flight VALUES(?,?,?,?,?,?,?,?,?)',
+                                            (flight[:9] for flight in flights))
+        return counts
+
+    def _users(self, rnd):
+        registration_start = 1483228800000  # 2017-01-01
+        for user_id in range(1, self.users + 1):
+            first = rnd.choice(FIRST_NAMES)
+            last = rnd.choice(LAST_NAMES)
+            birth = date(1940, 1, 1) + timedelta(days=rnd.randrange(365 * 60))
+            yield (user_id, last, first,
+                   "+358 40%07d" % rnd.randrange(10 ** 7),
+                   "%s.%s.%d@%s" % (first.lower(), last.lower(), user_id, rnd.choice(EMAIL_DOMAINS)),
+                   birth.strftime(database.DATE_FORMAT),
+                   rnd.choice(GENDERS),
+                   registration_start + rnd.randrange(400 * 24 * 3600 * 1000))
+
+    def _routes(self, rnd):
+        routes = []
+        for tflight_id in range(1, self.templates + 1):
+            origin, destination = rnd.sample(AIRPORTS, 2)
+            departure = rnd.randrange(24 * 12) * 5
+            arrival = (departure + 60 + rnd.randrange(36) * 10) % (24 * 60)
+            routes.append((tflight_id, "%02d:%02d" % divmod(departure, 60),
+                           "%02d:%02d" % divmod(arrival, 60), origin, destination))
+        return routes
+
+    def _flights(self, rnd, routes):
+        """
+        :return: a list of flight rows, with the popularity of the flight
+            appended after the columns of the Flight table.
+        """
+        route_weights = zipf_cum_weights(len(routes), self.route_skew)
+        total = route_weights[-1]
+        # The popularity rank of a route is independent of its id
+        ranks = list(range(len(routes)))
+        rnd.shuffle(ranks)
+        flights = []
+        for flight_id in range(1, self.flights + 1):
+            rank = min(bisect.bisect_left(route_weights, rnd.random() * total), len(routes) - 1)
+            route = routes[ranks[rank]]
+            popularity = (route_weights[rank] - (route_weights[rank - 1] if rank else 0.0))
+            popularity *= rnd.uniform(0.5, 1.5)
+            departure = self.start_date + timedelta(days=rnd.randrange(self.days))
+            overnight = route[2] < route[1]
+            arrival = departure + timedelta(days=1) if overnight else departure
+            seats = rnd.choices(AIRCRAFT_SEATS, AIRCRAFT_WEIGHTS)[0]
+            price = int(rnd.lognormvariate(5, 0.4))
+            flights.append([flight_id, "AY%05d" % flight_id, price, "GATE%02d" % rnd.randint(1, 40),
+                            departure.strftime(database.DATE_FORMAT),
+                            arrival.strftime(database.DATE_FORMAT),
+                            seats, seats, route[0], popularity])
+        return flights
+
+    def _bookings(self, con, rnd, flights):
+        """
+        Distributes the reservations between the flights according to their
+        popularity, writes them with their tickets and updates the seats left
+        of the flights.
+
+        :return: the number of reservations and tickets written.
+        """
+        total = sum(flight[9] for flight in flights) or 1.0
+        user_weights = zipf_cum_weights(self.users, self.user_skew)
+        user_total = user_weights[-1]
+        # The heavy users are not simply the first ones
+        user_ids = list(range(1, self.users + 1))
+        rnd.shuffle(user_ids)
+
+        reservations = []
+        tickets = []
+        reservation_id = 0
+        ticket_id = 0
+        for flight in flights:
+            seats_left = flight[7]
+            wanted = int(round(self.reservations * flight[9] / total))
+            wanted = min(wanted, seats_left, self.users)
+            departure = date(*map(int, flight[4].split("-")))
+            booked_by = set()
+            while len(booked_by) < wanted and seats_left > 0:
+                rank = bisect.bisect_left(user_weights, rnd.random() * user_total)
+                user_id = user_ids[min(rank, self.users - 1)]
+                if user_id in booked_by:
+                    continue
+                booked_by.add(user_id)
+                reservation_id += 1
+                booking_date = departure - timedelta(days=rnd.randrange(1, 120))
+                reservations.append((reservation_id, reservation_reference(reservation_id),
+                                     booking_date.strftime(database.DATE_FORMAT),
+                                     user_id, flight[0]))
+                passengers = min(rnd.choices(range(1, 5), PASSENGER_WEIGHTS)[0], seats_left)
+                for _ in range(passengers):
+                    ticket_id += 1
+                    seat = flight[6] - seats_left + 1
+                    tickets.append((ticket_id, rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES),
+                                    rnd.choice(GENDERS), rnd.randint(1, 90), reservation_id,
+                                    "%d%s" % ((seat - 1) // 6 + 1, "ABCDEF"[(seat - 1) % 6])))
+                    seats_left -= 1
+            flight[7] = seats_left
+            # Keep the memory bounded on big datasets
+            if len(tickets) >= self.batch_size:
+                self._insert(con, 'INSERT INTO Reservation VALUES(?,?,?,?,?)', reservations)
+                self._insert(con, 'INSERT INTO Ticket VALUES(?,?,?,?,?,?,?)', tickets)
+                reservations = []
+                tickets = []
+        self._insert(con, 'INSERT INTO Reservation VALUES(?,?,?,?,?)', reservations)
+        self._insert(con, 'INSERT INTO Ticket VALUES(?,?,?,?,?,?,?)', tickets)
+        return reservation_id, ticket_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic flight booking database.")
+    parser.add_argument("db_path", help="database file to create")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="approximate total number of rows; sets the default cardinalities")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--templates", type=int)
+    parser.add_argument("--flights", type=int)
+    parser.add_argument("--reservations", type=int)
+    parser.add_argument("--route-skew", type=float)
+    parser.add_argument("--user-skew", type=float)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--in-memory", action="store_true",
+                        help="build in memory and write the file with the sqlite backup API")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing file")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db_path):
+        if not args.force:
+            parser.error("%s already exists (use --force to overwrite it)" % args.db_path)
+        os.remove(args.db_path)
+
+    options = dict((name, value) for name, value in vars(args).items()
+                   if value is not None and name in ('seed', 'users', 'templates', 'flights',
+                                                     'reservations', 'route_skew', 'user_skew',
+                                                     'days', 'in_memory'))
+    if args.rows:
+        generator = DataGenerator.for_rows(args.db_path, args.rows, **options)
+    else:
+        generator = DataGenerator(args.db_path, **options)
+
+    start = time.time()
+    counts = generator.generate()
+    elapsed = time.time() - start
+    for table, count in counts.items():
+        print("%-15s %10d" % (table, count))
+    print("%-15s %10d rows in %.1f s" % ("Total", sum(counts.values()), elapsed))
+
+
+if __name__ == '__main__':
+    main()
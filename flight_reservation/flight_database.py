@@ -12,9 +12,11 @@ This code has been wriiten based on forum - exercise 1
 """
 from datetime import datetime
 from time import gmtime, strftime
+from urllib.request import pathname2url
 import time, sqlite3, re, os, io
 #Default paths for .db and .sql files to create and populate the database.
 DEFAULT_DB_PATH = "db/flight.db"
+DEFAULT_ARCHIVE_PATH = "db/flight_archive.db"
 DEFAULT_SCHEMA = "db/flight_schema.sql"
 DEFAULT_DATA_DUMP = "db/flight_data_dump.sql"
 
@@ -27,10 +29,72 @@ TIME_FORMAT = "%H:%M"
 ## REGULAR EXPRESSIONS ##
 
 # Phone number regex
-PHONE_NUMBER_REGEX = "^(\+)?(\s)?([0-9](\s)?)+[0-9]$"
+PHONE_NUMBER_REGEX = r"^(\+)?(\s)?([0-9](\s)?)+[0-9]$"
 
 # Email regex
-EMAIL_REGEX = "^(([a-zA-Z]|[0-9])+)(\.([a-zA-Z]|[0-9])+)*\@(([a-zA-Z]|[0-9])+)(\.([a-zA-Z]|[0-9]])+)+$"
+EMAIL_REGEX = r"^(([a-zA-Z]|[0-9])+)(\.([a-zA-Z]|[0-9])+)*\@(([a-zA-Z]|[0-9])+)(\.([a-zA-Z]|[0-9]])+)+$"
+
+# Gate regex
+GATE_REGEX = r"GATE\d{2}"
+
+# Date regex, the same dates as DATE_FORMAT
+DATE_REGEX = r"^(\d{4})-(\d{1,2})-(\d{1,2})$"
+
+# The regular expressions are compiled once, when the module is imported
+PHONE_NUMBER_PATTERN = re.compile(PHONE_NUMBER_REGEX)
+EMAIL_PATTERN = re.compile(EMAIL_REGEX)
+GATE_PATTERN = re.compile(GATE_REGEX)
+DATE_PATTERN = re.compile(DATE_REGEX)
+# Message of the error raised by the seat checks of the schema when a flight
+# has not enough seats left for the tickets written
+NO_SEAT_ERROR = "No seat available for the flight"
+
+# Words of a search, see search_query
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+# Maximum number of words of a search
+MAX_SEARCH_WORDS = 8
+
+# Minimum length of a word of a search: the prefixes of one character match
+# too many rows to be ranked quickly
+MIN_SEARCH_WORD = 2
+
+
+def parse_date(text):
+    """
+    Parses a date with the format :py:data:`DATE_FORMAT`. It accepts the
+    same strings as :py:meth:`datetime.strptime` but is several times
+    faster.
+
+    :param str text: the date, e.g. ``2018-04-21``
+    :return: the date at midnight
+    :rtype: datetime
+    :raises: ValueError if the text is not a valid date
+    """
+    match = DATE_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError("time data %r does not match format %r" % (text, DATE_FORMAT))
+    year, month, day = match.groups()
+    return datetime(int(year), int(month), int(day))
+
+
+def search_query(text):
+    """
+    Builds the FTS5 query matching the rows containing words starting with
+    every word of a search. The punctuation of the search is ignored, so
+    that it cannot be interpreted as FTS5 syntax, and so are the words
+    shorter than :py:data:`MIN_SEARCH_WORD`.
+
+    :param str text: the search, e.g. ``jac tilt``
+    :return: the FTS5 query, e.g. ``"jac"* "tilt"*``, or ``None`` if the
+        search has no word.
+    """
+    words = [word for word in SEARCH_WORD_PATTERN.findall(text)
+             if len(word) >= MIN_SEARCH_WORD][:MAX_SEARCH_WORDS]
+    if not words:
+        return None
+    return " ".join('"%s"*' % word for word in words)
+
 
 class Engine(object):
 
@@ -50,10 +114,14 @@ class Engine(object):
     :param db_path: The path of the database file (always with respect to the
         calling script. If not specified, the Engine will use the file located
         at *db/flight.db*
+    :param archive_path: The path of the archive database where the departed
+        flights are moved (see :py:mod:`flight_reservation.archive`). The
+        connections read the reservations and tickets missing from the
+        database file in it. If not specified, there is no archive.
 
     """
 
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, archive_path=None):
         """
         """
         super(Engine, self).__init__()
@@ -61,6 +129,7 @@ class Engine(object):
             self.db_path = db_path
         else:
             self.db_path = DEFAULT_DB_PATH
+        self.archive_path = archive_path
 
     def connect(self):
         """
@@ -70,7 +139,15 @@ class Engine(object):
         :rtype: Connection
 
         """
-        return Connection(self.db_path)
+        return Connection(self.db_path, self.archive_path)
+
+    def engine_for_flight(self, flight_id):
+        """
+        :return: the engine of the database file holding the rows of a
+            flight. It is this engine: all the flights are in its file.
+
+        """
+        return self
 
     def remove_database(self):
         """
@@ -313,6 +390,246 @@ class Engine(object):
                 return False
         return True
 
+    def create_seat_change_table(self):
+        """
+        Create the table ``SeatChange`` programmatically, without using
+        .sql file. It is the outbox of the changes of the seats left of the
+        flights, see :py:meth:`Connection.get_seat_changes`.
+
+        Print an error message in the console if it could not be created.
+
+        :return: ``True`` if the table was successfully created or ``False``
+            otherwise.
+
+        """
+        keys_on = 'PRAGMA foreign_keys = ON'
+        stmnt = 'CREATE TABLE SeatChange(change_id INTEGER PRIMARY KEY AUTOINCREMENT,\
+                                    flight_id INTEGER NOT NULL, \
+                                    nbSeatsLeft INTEGER, \
+                                    created INTEGER, \
+                                    FOREIGN KEY(flight_id) REFERENCES Flight(flight_id) ON DELETE CASCADE)'
+        index = 'CREATE INDEX SeatChange_flight ON SeatChange(flight_id, change_id)'
+
+        #Connects to the database. Gets a connection object
+        con = sqlite3.connect(self.db_path)
+        with con:
+            #Get the cursor object.
+            #It allows to execute SQL code and traverse the result set
+            cur = con.cursor()
+            try:
+                cur.execute(keys_on)
+                #execute the statements
+                cur.execute(stmnt)
+                cur.execute(index)
+            except sqlite3.Error as excp:
+                print("Error %s:" % excp.args[0])
+                return False
+        return True
+
+
+    def rebuild_search_index(self, schema=None):
+        """
+        Creates the full-text search tables of the users and passengers and
+        their triggers if they are missing, as in an older database, and
+        indexes the rows already in the database.
+
+        :param schema: path to the .sql schema file. If this parmeter is
+            None, then *db/flight_schema.sql* is utilized.
+        """
+        self.create_tables(schema)
+        con = sqlite3.connect(self.db_path)
+        try:
+            with con:
+                con.execute("INSERT INTO UserSearch(UserSearch) VALUES('rebuild')")
+                con.execute("INSERT INTO PassengerSearch(PassengerSearch) VALUES('rebuild')")
+        finally:
+            con.close()
+
+
+    def rebuild_fare_calendar(self, schema=None):
+        """
+        Creates the ``FareCalendar`` table and its triggers if they are
+        missing, as in an older database, and fills it from the flights
+        already in the database.
+
+        :param schema: path to the .sql schema file. If this parmeter is
+            None, then *db/flight_schema.sql* is utilized.
+        """
+        self.create_tables(schema)
+        con = sqlite3.connect(self.db_path)
+        try:
+            with con:
+                con.execute("DELETE FROM FareCalendar")
+                con.execute("INSERT INTO FareCalendar (origin, destination, depDate, minPrice, \
+                                                       seatsLeft, nbFlights) \
+                             SELECT TemplateFlight.origin, TemplateFlight.destination, Flight.depDate, \
+                                    MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END), \
+                                    SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*) \
+                             FROM TemplateFlight \
+                                  JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id \
+                             GROUP BY TemplateFlight.origin, TemplateFlight.destination, Flight.depDate")
+        finally:
+            con.close()
+
+
+class SnapshotEngine(Engine):
+    """
+    Engine for the tests that restores the database from in-memory images
+    instead of executing the schema and the data dump scripts.
+
+    The first time it is needed, the engine builds in memory a database with
+    the schema only and another one with the schema and the data dump. They
+    are kept for the whole process and copied over the database file with
+    :py:meth:`sqlite3.Connection.backup` by :py:meth:`create_tables`,
+    :py:meth:`populate_tables` and :py:meth:`clear`. The images are rebuilt
+    if the schema or the dump files change.
+
+    :param db_path: The path of the database file.
+    :param schema: path to the .sql schema file of the images. Defaults to
+        *db/flight_schema.sql*
+    :param dump: path to the .sql dump file of the seeded image. Defaults to
+        *db/flight_data_dump.sql*
+    :param archive_path: The path of the archive database, see
+        :py:class:`Engine`.
+
+    """
+    #(schema, schema mtime, dump, dump mtime): (empty image, seeded image)
+    _images = {}
+
+    def __init__(self, db_path=None, schema=None, dump=None, archive_path=None):
+        super(SnapshotEngine, self).__init__(db_path, archive_path)
+        self.schema = schema if schema is not None else DEFAULT_SCHEMA
+        self.dump = dump if dump is not None else DEFAULT_DATA_DUMP
+
+    def _image(self, seeded):
+        key = (os.path.abspath(self.schema), os.path.getmtime(self.schema),
+               os.path.abspath(self.dump), os.path.getmtime(self.dump))
+        images = SnapshotEngine._images.get(key)
+        if images is None:
+            empty = sqlite3.connect(":memory:", check_same_thread=False)
+            with io.open(self.schema, encoding="utf-8") as f:
+                empty.executescript(f.read())
+            full = sqlite3.connect(":memory:", check_same_thread=False)
+            empty.backup(full)
+            full.execute('PRAGMA foreign_keys = ON')
+            with io.open(self.dump, encoding="utf-8") as f:
+                full.executescript(f.read())
+            images = SnapshotEngine._images[key] = (empty, full)
+        return images[1] if seeded else images[0]
+
+    def _restore(self, seeded):
+        con = sqlite3.connect(self.db_path)
+        try:
+            #The test database does not need to survive a power failure
+            con.execute('PRAGMA synchronous = OFF')
+            self._image(seeded).backup(con)
+        finally:
+            con.close()
+
+    def clear(self):
+        """
+        Restores the database with the schema and no records.
+
+        """
+        self._restore(False)
+
+    def create_tables(self, schema=None):
+        """
+        Restores the database with the schema and no records. A *schema*
+        other than the one of the images is executed like in
+        :py:meth:`Engine.create_tables`.
+
+        """
+        if schema is not None and schema != self.schema:
+            return super(SnapshotEngine, self).create_tables(schema)
+        self._restore(False)
+
+    def populate_tables(self, dump=None):
+        """
+        Restores the database with the schema and the records of the data
+        dump. A *dump* other than the one of the image is executed like in
+        :py:meth:`Engine.populate_tables`.
+
+        """
+        if dump is not None and dump != self.dump:
+            return super(SnapshotEngine, self).populate_tables(dump)
+        self._restore(True)
+
+
+class _InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that measures the time spent in sqlite and reports every executed
+    statement to its :py:class:`_InstrumentedConnection`.
+
+    The time spent fetching the rows is added to the total database time of
+    the connection but it is not part of the duration reported for the
+    statement.
+
+    """
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super(_InstrumentedCursor, self).execute(sql, parameters)
+        finally:
+            self.connection._statement_executed(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super(_InstrumentedCursor, self).executemany(sql, seq_of_parameters)
+        finally:
+            self.connection._statement_executed(sql, None, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super(_InstrumentedCursor, self).fetchone()
+        finally:
+            self.connection.db_time += time.perf_counter() - start
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        try:
+            return super(_InstrumentedCursor, self).fetchmany(*args)
+        finally:
+            self.connection.db_time += time.perf_counter() - start
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super(_InstrumentedCursor, self).fetchall()
+        finally:
+            self.connection.db_time += time.perf_counter() - start
+
+
+class _InstrumentedConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose cursors are :py:class:`_InstrumentedCursor`.
+
+    It keeps the total time spent in the database (:py:attr:`db_time`) and
+    the number of statements executed (:py:attr:`statement_count`). The
+    callables in :py:attr:`statement_listeners` are called after every
+    statement with the arguments ``(sql, parameters, duration)``.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super(_InstrumentedConnection, self).__init__(*args, **kwargs)
+        self.db_time = 0.0
+        self.statement_count = 0
+        self.statement_listeners = []
+
+    def cursor(self, factory=_InstrumentedCursor):
+        return super(_InstrumentedConnection, self).cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def _statement_executed(self, sql, parameters, duration):
+        self.db_time += duration
+        self.statement_count += 1
+        for listener in self.statement_listeners:
+            listener(sql, parameters, duration)
+
 
 class Connection(object):
     """
@@ -328,23 +645,74 @@ class Connection(object):
     A :py:class:`Connection` **MUST** always be closed once when it is not going to be
     utilized anymore in order to release internal locks.
 
+    The reservations and tickets that are not in the database are read from
+    the archive database, if there is one. It is opened read only the first
+    time it is needed.
+
+    The callables in :py:attr:`seat_listeners` are called with the arguments
+    ``(flight_id, seats_left, change_id)`` once a change of the seats left of
+    a flight is committed, ``change_id`` being the id of its ``SeatChange``
+    row.
+
     :param db_path: Location of the database file.
     :type dbpath: str
+    :param archive_path: Location of the archive database file, or ``None``.
 
     """
-    def __init__(self, db_path):
+    def __init__(self, db_path, archive_path=None):
         super(Connection, self).__init__()
-        self.con = sqlite3.connect(db_path)
+        self.con = sqlite3.connect(db_path, factory=_InstrumentedConnection)
+        self.archive_path = archive_path
+        self._archive = None
+        self.seat_listeners = []
+        #(flight_id, seats_left, change_id) of the transaction, until it is committed
+        self._seat_changes = []
+
+    @property
+    def db_time(self):
+        """
+        Total time, in seconds, spent in the database by this connection.
+
+        """
+        if self._archive is not None:
+            return self.con.db_time + self._archive.db_time
+        return self.con.db_time
 
     def close(self):
         """
         Closes the database connection, commiting all changes.
 
         """
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
         if self.con:
             self.con.commit()
             self.con.close()
 
+    def _read_archive(self, query, pvalue):
+        """
+        Executes a query on the archive database.
+
+        :return: the rows of the result, an empty list if there is no
+            archive.
+        """
+        if self.archive_path is None:
+            return []
+        try:
+            if self._archive is None:
+                uri = "file:%s?mode=ro" % pathname2url(os.path.abspath(self.archive_path))
+                self._archive = sqlite3.connect(uri, uri=True, factory=_InstrumentedConnection)
+                self._archive.row_factory = sqlite3.Row
+                #The statements of the archive are seen by the observers of the connection
+                self._archive.statement_listeners = self.con.statement_listeners
+            cur = self._archive.cursor()
+            cur.execute(query, pvalue)
+            return cur.fetchall()
+        except sqlite3.OperationalError:
+            #The archive has not been created yet
+            return []
+
     #FOREIGN KEY STATUS
     def check_foreign_keys_status(self):
         """
@@ -660,6 +1028,43 @@ class Connection(object):
 
         return ticket
 
+    #Helper for Waitlist
+    def _create_waitlist_object(self, row, position):
+        """
+        It takes a :py:class:`sqlite3.Row` and transform it into a dictionary.
+        The resulting dictionary is targeted to build an entry of a waitlist.
+
+        :param row: The row obtained from the database.
+        :type row: sqlite3.Row
+        :param position: the position of the entry in the waitlist, 1 for
+            its head, or None if it has been served.
+        :return: a dictionary containing the following keys:
+
+            * ``waitlistid``: id of the entry (INT)
+            * ``flightid``: id of the flight (INT)
+            * ``userid``: id of the user waiting (INT)
+            * ``priority``: priority of the entry, the highest first (INT)
+            * ``firstname``: firstname of the passenger (TEXT)
+            * ``lastname``: lastname of the passenger (TEXT)
+            * ``gender``: passenger's gender (TEXT)
+            * ``age``: passenger's age (INT)
+            * ``created``: UNIX timestamp of the entry (INT)
+            * ``ticketnumber``: id of the ticket booked for the entry, None
+              while it is waiting (INT)
+            * ``position``: position in the waitlist, None once served (INT)
+        """
+        return {'waitlistid': row['waitlist_id'],
+                'flightid': row['flight_id'],
+                'userid': row['user_id'],
+                'priority': row['priority'],
+                'firstname': row['firstName'],
+                'lastname': row['lastName'],
+                'gender': row['gender'],
+                'age': row['age'],
+                'created': row['created'],
+                'ticketnumber': row['ticket_id'],
+                'position': position}
+
     #API ITSELF
 
     #User Table API
@@ -775,7 +1180,7 @@ class Connection(object):
 
         # Check birth date format
         try:
-            birthDate_date = datetime.strptime(birthDate, DATE_FORMAT)
+            birthDate_date = parse_date(birthDate)
 
             # Check that user is at least 18 years old
             now = datetime.now()
@@ -787,13 +1192,11 @@ class Connection(object):
             raise DateFormatException("Birth date format is incorrect")
 
         # Check phone number format
-        phone_number_pattern = re.compile(PHONE_NUMBER_REGEX)
-        if not phone_number_pattern.match(phoneNumber):
+        if not PHONE_NUMBER_PATTERN.match(phoneNumber):
             raise PhoneNumberFormatException("Phone number format is incorrect")
 
         # Check email format
-        email_pattern = re.compile(EMAIL_REGEX)
-        if not email_pattern.match(email):
+        if not EMAIL_PATTERN.match(email):
             raise EmailFormatException("Email format is incorrect")
 
 
@@ -875,7 +1278,7 @@ class Connection(object):
 
         # Check birth date format
         try:
-            birthDate_date = datetime.strptime(birthDate, DATE_FORMAT)
+            birthDate_date = parse_date(birthDate)
 
             # Check that user is at least 18 years old
             now = datetime.now()
@@ -888,13 +1291,11 @@ class Connection(object):
             raise DateFormatException("Birth date format is incorrect")
 
         # Check phone number format
-        phone_number_pattern = re.compile(PHONE_NUMBER_REGEX)
-        if not phone_number_pattern.match(phoneNumber):
+        if not PHONE_NUMBER_PATTERN.match(phoneNumber):
             raise PhoneNumberFormatException("Phone number format is incorrect")
 
         # Check email format
-        email_pattern = re.compile(EMAIL_REGEX)
-        if not email_pattern.match(email):
+        if not EMAIL_PATTERN.match(email):
             raise EmailFormatException("Email format is incorrect")
 
         #Activate foreign key support
@@ -939,15 +1340,28 @@ class Connection(object):
         #Cursor and row initialization
         self.con.row_factory = sqlite3.Row
         cur = self.con.cursor()
-        #Execute the statement to delete
+        #Execute the statement to delete. The reservations are deleted
+        #first, so that their seats are recorded in the outbox
         pvalue = (user_id,)
+        self._delete_user_reservations(cur, user_id)
         cur.execute(query, pvalue)
+        deleted = cur.rowcount
         self.con.commit()
+        self._publish_seat_changes()
         #Check that if the user has been deleted
-        if cur.rowcount < 1:
+        if deleted < 1:
             return False
         return True
 
+    def _delete_user_reservations(self, cur, user_id):
+        """
+        Deletes the reservations of a user, see
+        :py:meth:`_delete_reservations`. The user leaves the waitlists first,
+        so that the seats returned are not booked for them again.
+        """
+        cur.execute('DELETE FROM Waitlist WHERE user_id = ?', (user_id,))
+        self._delete_reservations(cur, 'creator_id = ?', (user_id,))
+
     def contains_user(self, user_id):
         """
         :param user_id: The id of the user.
@@ -1311,14 +1725,13 @@ class Connection(object):
         nbSeatsLeft = flight.get('seatsleft', None)
 
         # Check that gate format
-        gate_pattern = re.compile("GATE\d{2}")
-        if not gate_pattern.match(gate):
+        if not GATE_PATTERN.match(gate):
             raise ValueError("Gate is not well formed")
 
         # Check departure date  and arrival date format
         try:
-            depDate_date = datetime.strptime(depDate, DATE_FORMAT)
-            arrDate_date = datetime.strptime(arrDate, DATE_FORMAT)
+            depDate_date = parse_date(depDate)
+            arrDate_date = parse_date(arrDate)
         except ValueError:
             raise DateFormatException("departure date  and arrival date format are incorrect.")
         # Check that arrival date is higher that departure date
@@ -1403,14 +1816,13 @@ class Connection(object):
         nbSeatsLeft = flight.get('seatsleft', None)
 
         # Check that gate format is incorrect
-        pattern = re.compile("GATE\d{2}")
-        if not pattern.match(gate):
+        if not GATE_PATTERN.match(gate):
             raise ValueError("Gate format is incorrect")
 
         # Check departure date  and arrival date format
         try:
-            depDate_date = datetime.strptime(depDate, DATE_FORMAT)
-            arrDate_date = datetime.strptime(arrDate, DATE_FORMAT)
+            depDate_date = parse_date(depDate)
+            arrDate_date = parse_date(arrDate)
             # Check that arrival date is higher that departure date
             if arrDate_date < depDate_date:
                 return False
@@ -1437,10 +1849,18 @@ class Connection(object):
             #execute the main statement
             pvalue = (code, price, gate, depDate, arrDate, nbInitialSeats, nbSeatsLeft, template_id, flight_id)
             cur.execute(query2, pvalue)
-            self.con.commit()
             #Check that if the flight is modified.
             if cur.rowcount < 1:
+                self.con.commit()
                 return None
+            if row['nbSeatsLeft'] != nbSeatsLeft:
+                self._offer_seats(cur, flight_id)
+                self._add_seat_change(cur, flight_id)
+            #A price set by hand is the new base price of the repricing
+            if row['price'] != price:
+                cur.execute('DELETE FROM FlightBasePrice WHERE flight_id = ?', (flight_id,))
+            self.con.commit()
+            self._publish_seat_changes()
             return True
 
     def delete_flight(self, flight_id):
@@ -1501,9 +1921,12 @@ class Connection(object):
         self.con.commit()
         row = cur.fetchone()
         if row is None:
-            return None
-        else:
-            return self._create_reservation_object(row)
+            #The reservations of the departed flights are in the archive
+            rows = self._read_archive(query, pvalue)
+            if not rows:
+                return None
+            row = rows[0]
+        return self._create_reservation_object(row)
 
     def get_reservation_list(self):
         """
@@ -1661,6 +2084,8 @@ class Connection(object):
         Note that all values are string if they are not otherwise indicated.
 
         :return: True when reservation is modified or False is the reservationid does not exist
+        :raises NoMoreSeatsAvailableException: if the seats move to a flight
+            without enough seats left
         """
 
         query1 = 'SELECT * from Reservation WHERE reservation_id = ?'
@@ -1686,13 +2111,27 @@ class Connection(object):
         if row is None:
             return False
         else:
-            #execute the main statement
+            #execute the main statement. The trigger Reservation_seats_update
+            #moves the seats of its tickets if the flight changes
             pvalue = (reference, creator_id, flight_id, reservation_id)
-            cur.execute(query2, pvalue)
-            self.con.commit()
+            try:
+                cur.execute(query2, pvalue)
+            except sqlite3.IntegrityError as excp:
+                self.con.rollback()
+                if str(excp) == NO_SEAT_ERROR:
+                    raise NoMoreSeatsAvailableException(NO_SEAT_ERROR, flight_id)
+                raise
             #Check that If reservation has been modified
             if cur.rowcount < 1:
+                self.con.commit()
                 return None
+            #The seats returned are booked for the head of the waitlist, if
+            #any. The move, the seats left and the outbox rows are
+            #committed together
+            if row['flight_id'] != flight_id:
+                self._move_seats(cur, (row['flight_id'], flight_id))
+            self.con.commit()
+            self._publish_seat_changes()
             return True
 
     def delete_reservation(self, reservation_id):
@@ -1704,9 +2143,6 @@ class Connection(object):
 
         :return: True if the reservation is deleted, False otherwise.
         """
-        #Create the SQL Statements
-          #SQL Statement for deleting a reservation information
-        query = 'DELETE FROM Reservation WHERE reservation_id = ?'
         #Activate foreign key support
         self.set_foreign_keys_support()
         #Cursor and row initialization
@@ -1714,13 +2150,35 @@ class Connection(object):
         cur = self.con.cursor()
         #Execute the statement to delete
         pvalue = (reservation_id,)
-        cur.execute(query, pvalue)
+        deleted = self._delete_reservations(cur, 'reservation_id = ?', pvalue)
         self.con.commit()
+        self._publish_seat_changes()
         #Check that if the reservation has been deleted
-        if cur.rowcount < 1:
+        if deleted < 1:
             return False
         return True
 
+    def _delete_reservations(self, cur, condition, pvalue):
+        """
+        Deletes the reservations matching a condition and, by cascade, their
+        tickets. The triggers return their seats to the flights, which are
+        recorded in the ``SeatChange`` outbox. It must be executed before
+        the commit, see :py:meth:`_add_seat_change`.
+
+        :param cur: the cursor of the transaction.
+        :param str condition: the ``WHERE`` clause, with ``?`` parameters.
+        :param tuple pvalue: the values of the parameters.
+        :return: the number of reservations deleted.
+        """
+        cur.execute('SELECT DISTINCT flight_id FROM Reservation WHERE ' + condition, pvalue)
+        flight_ids = [row[0] for row in cur.fetchall()]
+        cur.execute('DELETE FROM Reservation WHERE ' + condition, pvalue)
+        deleted = cur.rowcount
+        for flight_id in flight_ids:
+            self._offer_seats(cur, flight_id)
+            self._add_seat_change(cur, flight_id)
+        return deleted
+
     def contains_reservation(self, reservation_id):
         """
         :param reservation_id: The id of the reservation.
@@ -1754,9 +2212,12 @@ class Connection(object):
         row = cur.fetchone()
         #Process the response.
         if row is None:
-            return None
-        else:
-            return self._create_ticket_object(row)
+            #The tickets of the departed flights are in the archive
+            rows = self._read_archive(query, pvalue)
+            if not rows:
+                return None
+            row = rows[0]
+        return self._create_ticket_object(row)
 
 
     def get_tickets(self):
@@ -1808,13 +2269,13 @@ class Connection(object):
         cur.execute(query, pvalue)
         #Process the response.
         rows = cur.fetchall()
-        if rows is None:
-            return None
-        else:
-            tickets = []
-            for row in rows:
-                tickets.append(self._create_ticket_object(row))
-            return tickets
+        if not rows:
+            #The tickets of the departed flights are in the archive
+            rows = self._read_archive(query, pvalue)
+        tickets = []
+        for row in rows:
+            tickets.append(self._create_ticket_object(row))
+        return tickets
 
 
     def create_ticket(self, ticket):
@@ -1847,7 +2308,6 @@ class Connection(object):
         query1 = 'SELECT * from Ticket WHERE ticket_id = ?'
         query2 = 'SELECT flight_id from Reservation WHERE reservation_id = ?'
         query3 = 'SELECT nbSeatsLeft, nbInitialSeats from Flight WHERE flight_id = ?'
-        query4 = 'UPDATE Flight SET nbSeatsLeft = ? WHERE flight_id = ?'
         query = 'INSERT INTO Ticket (ticket_id, firstName, lastName, gender, age, reservation_id, seat )\
                   VALUES(?,?,?,?,?,?,?)'
 
@@ -1888,17 +2348,26 @@ class Connection(object):
 
             # Check that there is enough seats left
             if nbSeatsLeft < 1:
-                raise NoMoreSeatsAvailableException("No seat available for the flight")
+                raise NoMoreSeatsAvailableException(NO_SEAT_ERROR, flight_id)
 
             seat = nbInitialSeats - nbSeatsLeft + 1
             # Execute the statement
             pvalue = (ticket_id, firstName, lastName, gender, age, reservation_id, seat)
-            cur.execute(query, pvalue)
-            self.con.commit()
+            #The trigger Ticket_seats_insert takes the seat of the flight.
+            #Ticket_seats_insert_check fails if a concurrent booking took
+            #the last one since it was read
+            try:
+                cur.execute(query, pvalue)
+            except sqlite3.IntegrityError as excp:
+                self.con.rollback()
+                if str(excp) == NO_SEAT_ERROR:
+                    raise NoMoreSeatsAvailableException(NO_SEAT_ERROR, flight_id)
+                return None
             new_ticket_id = cur.lastrowid
-            nbSeatsLeft = nbSeatsLeft - 1
-            pvalue =(nbSeatsLeft, flight_id,)
-            cur.execute(query4, pvalue)
+            #The ticket, the seats left and the outbox row are committed together
+            self._add_seat_change(cur, flight_id)
+            self.con.commit()
+            self._publish_seat_changes()
             return new_ticket_id
 
         else:
@@ -1933,6 +2402,8 @@ class Connection(object):
         Note that all values are string if they are not otherwise indicated.
 
         :return: True when ticket is modified or False is the ticket_id does not exist
+        :raises NoMoreSeatsAvailableException: if the seats move to a flight
+            without enough seats left
         """
 
         query1 = 'SELECT * from Ticket WHERE ticket_id = ?'
@@ -1941,6 +2412,8 @@ class Connection(object):
                                         age = ?, reservation_id = ? \
                                            WHERE ticket_id = ?'
 
+        query_flight = 'SELECT flight_id FROM Reservation WHERE reservation_id = ?'
+
         reservation_id = ticket.get('reservationid', None)
         firstName = ticket.get('firstname', None)
         lastName = ticket.get('lastname', None)
@@ -1960,13 +2433,33 @@ class Connection(object):
         if row is None:
             return False
         else:
-            #execute the main statement
+            #Flights of the current and of the new reservation
+            flight_ids = set()
+            for pvalue in ((row['reservation_id'],), (reservation_id,)):
+                cur.execute(query_flight, pvalue)
+                flight_row = cur.fetchone()
+                flight_ids.add(flight_row[0] if flight_row is not None else None)
+            #execute the main statement. The trigger Ticket_seats_update
+            #moves the seat if the reservation is of another flight
             pvalue = (firstName, lastName, gender, age, reservation_id, ticket_id,)
-            cur.execute(query2, pvalue)
-            self.con.commit()
+            try:
+                cur.execute(query2, pvalue)
+            except sqlite3.IntegrityError as excp:
+                self.con.rollback()
+                if str(excp) == NO_SEAT_ERROR:
+                    raise NoMoreSeatsAvailableException(NO_SEAT_ERROR)
+                raise
             #Check that if ticket is modified
             if cur.rowcount < 1:
+                self.con.commit()
                 return False
+            #The seat returned is booked for the head of the waitlist, if
+            #any. The move, the seats left and the outbox rows are
+            #committed together
+            if len(flight_ids) > 1:
+                self._move_seats(cur, flight_ids)
+            self.con.commit()
+            self._publish_seat_changes()
             return True
 
     def delete_ticket(self, ticket_id):
@@ -1981,8 +2474,7 @@ class Connection(object):
         #Create the SQL Statements
           #SQL Statement for deleting the ticket information
         query = 'DELETE FROM Ticket WHERE ticket_id = ?'
-        query_get_flight_id = 'SELECT flight_id, nbSeatsLeft FROM Ticket natural join Reservation natural join Flight WHERE ticket_id = ?'
-        query_increase_seats = 'UPDATE Flight SET nbSeatsLeft = nbSeatsLeft + 1 WHERE flight_id = ?'
+        query_get_flight_id = 'SELECT flight_id FROM Ticket natural join Reservation WHERE ticket_id = ?'
 
         #Activate foreign key support
         self.set_foreign_keys_support()
@@ -1997,21 +2489,23 @@ class Connection(object):
         if flight_row is None:
             return False
         flight_id = flight_row[0]
-        nbSeatsLeft = flight_row[1]
 
-        #Execute the statement to delete
+        #Execute the statement to delete. The trigger Ticket_seats_delete
+        #returns the seat to the flight
         cur = self.con.cursor()
         pvalue = (ticket_id,)
         cur.execute(query, pvalue)
-        self.con.commit()
         #Check that if the ticket has been deleted
         if cur.rowcount < 1:
+            self.con.commit()
             return False
 
-        # Increase seats available fo flight
-        pvalue = (flight_id,)
-        cur.execute(query_increase_seats, pvalue)
+        #The seat is booked for the head of the waitlist, if any. The
+        #deletion, the seats left and the outbox row are committed together
+        self._offer_seats(cur, flight_id)
+        self._add_seat_change(cur, flight_id)
         self.con.commit()
+        self._publish_seat_changes()
         return True
 
     def contains_ticket(self, ticket_id):
@@ -2023,6 +2517,565 @@ class Connection(object):
         return self.get_ticket(ticket_id) is not None
 
 
+    #Itinerary API
+    def create_itinerary(self, itinerary):
+        """
+        Books several flights at once, e.g. the two legs of a round trip:
+        a reservation of the user for every flight, with a ticket for every
+        passenger. All the reservations and tickets are created in one
+        transaction, or none of them.
+
+        :param dict itinerary: a dictionary with the information of the
+            itinerary:
+
+                .. code-block:: javascript
+
+                    itinerary = {'userid': user_id,
+                                 'flightids': [flight_id, ...],
+                                 'tickets': [ticket, ...]}
+
+            where every ticket is a dictionary with the keys ``firstname``,
+            ``lastname``, ``gender`` and ``age`` of
+            :py:meth:`create_ticket`.
+
+        :return: dictionary ``{flight_id: reservation_id}``, or None if the
+            user or a flight does not exist, a flight is given twice or the
+            user has already booked one of the flights.
+        :raises NoMoreSeatsAvailableException: if a flight has not enough
+            seats left for the passengers.
+        """
+        #Activate foreign key support
+        self.set_foreign_keys_support()
+        #Cursor and row initialization
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        #The seats left can not change between their check and the bookings
+        if not self.con.in_transaction:
+            cur.execute('BEGIN IMMEDIATE')
+        try:
+            reservations = self._book_itinerary(cur, itinerary.get('userid', None),
+                                                itinerary.get('flightids', []),
+                                                itinerary.get('tickets', []))
+        except NoMoreSeatsAvailableException:
+            self.con.rollback()
+            raise
+        if reservations is None:
+            self.con.rollback()
+            return None
+        self.con.commit()
+        self._publish_seat_changes()
+        return reservations
+
+    def _book_itinerary(self, cur, user_id, flight_ids, tickets):
+        """
+        Creates the reservations and tickets of an itinerary, see
+        :py:meth:`create_itinerary`, without committing them. The flights
+        are booked by increasing id, so that two itineraries sharing flights
+        always update them in the same order.
+
+        :return: dictionary ``{flight_id: reservation_id}``, or None if the
+            itinerary can not be booked. The caller must then roll back the
+            transaction.
+        :raises NoMoreSeatsAvailableException: if a flight has not enough
+            seats left. The caller must then roll back the transaction.
+        """
+        query_flight = 'SELECT nbSeatsLeft, nbInitialSeats FROM Flight WHERE flight_id = ?'
+        query_reservation = 'INSERT INTO Reservation (reference, re_date, creator_id, flight_id) \
+                             VALUES(?,?,?,?)'
+        query_ticket = 'INSERT INTO Ticket (firstName, lastName, gender, age, reservation_id, seat) \
+                        VALUES(?,?,?,?,?,?)'
+        if len(set(flight_ids)) != len(flight_ids):
+            return None
+        timestamp = strftime("%Y-%m-%d", gmtime())
+        reservations = {}
+        for flight_id in sorted(flight_ids):
+            cur.execute(query_flight, (flight_id,))
+            flight_row = cur.fetchone()
+            if flight_row is None:
+                return None
+            nbSeatsLeft, nbInitialSeats = flight_row[0], flight_row[1]
+            if nbSeatsLeft < len(tickets):
+                raise NoMoreSeatsAvailableException("Not enough seats available for the flight %d"
+                                                    % flight_id, flight_id)
+            try:
+                cur.execute(query_reservation, (self.generate_new_reservation_reference(),
+                                                timestamp, user_id, flight_id))
+            except sqlite3.IntegrityError:
+                return None
+            reservation_id = reservations[flight_id] = cur.lastrowid
+            #The trigger Ticket_seats_insert takes a seat for every ticket
+            for seat, ticket in enumerate(tickets, nbInitialSeats - nbSeatsLeft + 1):
+                cur.execute(query_ticket, (ticket.get('firstname', None), ticket.get('lastname', None),
+                                           ticket.get('gender', None), ticket.get('age', None),
+                                           reservation_id, seat))
+            if tickets:
+                self._add_seat_change(cur, flight_id)
+        return reservations
+
+    #Waitlist Table API
+    def get_waitlist_entry(self, waitlist_id):
+        """
+        Extracts an entry of the waitlist of a flight, with its position.
+
+        :param waitlist_id: The id of the entry.
+        :return: dictionary with the format provided in the method:
+            :py:meth:`_create_waitlist_object`, or None if it does not exist.
+        """
+        query = 'SELECT * FROM Waitlist WHERE waitlist_id = ?'
+        #Activate foreign key support
+        self.set_foreign_keys_support()
+        #Cursor and row initialization
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        cur.execute(query, (waitlist_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        position = None
+        if row['ticket_id'] is None:
+            #The entries served before it, by priority then by arrival
+            cur.execute('SELECT COUNT(*) FROM Waitlist \
+                         WHERE flight_id = ? AND ticket_id IS NULL \
+                         AND (priority > ? OR (priority = ? AND waitlist_id < ?))',
+                        (row['flight_id'], row['priority'], row['priority'], waitlist_id))
+            position = cur.fetchone()[0] + 1
+        return self._create_waitlist_object(row, position)
+
+    def get_waitlist(self, flight_id):
+        """
+        Extracts the entries of the waitlist of a flight still waiting.
+
+        :param flight_id: The id of the flight.
+        :return: list of dictionaries with the format provided in the method:
+            :py:meth:`_create_waitlist_object`, head of the waitlist first.
+        """
+        query = 'SELECT * FROM Waitlist WHERE flight_id = ? AND ticket_id IS NULL \
+                 ORDER BY priority DESC, waitlist_id'
+        #Activate foreign key support
+        self.set_foreign_keys_support()
+        #Cursor and row initialization
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        cur.execute(query, (flight_id,))
+        return [self._create_waitlist_object(row, position)
+                for position, row in enumerate(cur.fetchall(), 1)]
+
+    def create_waitlist_entry(self, entry):
+        """
+        Adds a user to the waitlist of a flight. The seats the flight may
+        have got back meanwhile are booked for the head of the waitlist in
+        the same transaction.
+
+        :param dict entry: a dictionary with the information of the entry:
+
+                .. code-block:: javascript
+
+                    entry = {'userid': user_id,
+                             'flightid': flight_id,
+                             'priority': priority,
+                             'firstname': firstname,
+                             'lastname': lastname,
+                             'gender': gender,
+                             'age': age}
+
+            where ``priority`` (INT, 0 by default) orders the waitlist, the
+            highest first, and the other values describe the passenger of
+            the ticket booked for the entry.
+
+        :return: the id of the new entry, or None if the user or the flight
+            does not exist or the user is already in the waitlist of the
+            flight.
+        """
+        query = 'INSERT INTO Waitlist (flight_id, user_id, priority, firstName, lastName, \
+                                       gender, age, created) \
+                 VALUES(?,?,?,?,?,?,?,?)'
+        flight_id = entry.get('flightid', None)
+        pvalue = (flight_id, entry.get('userid', None), entry.get('priority', 0),
+                  entry.get('firstname', None), entry.get('lastname', None),
+                  entry.get('gender', None), entry.get('age', None), int(time.time()))
+        #Activate foreign key support
+        self.set_foreign_keys_support()
+        #Cursor and row initialization
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        try:
+            cur.execute(query, pvalue)
+        except sqlite3.IntegrityError:
+            self.con.rollback()
+            return None
+        waitlist_id = cur.lastrowid
+        if self._offer_seats(cur, flight_id):
+            self._add_seat_change(cur, flight_id)
+        self.con.commit()
+        self._publish_seat_changes()
+        return waitlist_id
+
+    def delete_waitlist_entry(self, waitlist_id):
+        """
+        Removes an entry from the waitlist of its flight. The ticket booked
+        for an entry already served is kept.
+
+        :param waitlist_id: The id of the entry.
+        :return: True if the entry is deleted, False otherwise.
+        """
+        query = 'DELETE FROM Waitlist WHERE waitlist_id = ?'
+        #Activate foreign key support
+        self.set_foreign_keys_support()
+        #Cursor and row initialization
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        cur.execute(query, (waitlist_id,))
+        self.con.commit()
+        return cur.rowcount > 0
+
+    def _offer_seats(self, cur, flight_id):
+        """
+        Books the seats left of a flight for the head of its waitlist: every
+        entry served gets a ticket in the reservation of its user for the
+        flight, created if needed, and the id of the ticket. It must be
+        executed in the transaction that returned the seats, before
+        :py:meth:`_add_seat_change`.
+
+        :param cur: the cursor of the transaction.
+        :param flight_id: the id of the flight.
+        :return: the number of entries served.
+        """
+        query_flight = 'SELECT nbSeatsLeft, nbInitialSeats FROM Flight WHERE flight_id = ?'
+        query_head = 'SELECT waitlist_id, user_id, firstName, lastName, gender, age FROM Waitlist \
+                      WHERE flight_id = ? AND ticket_id IS NULL \
+                      ORDER BY priority DESC, waitlist_id LIMIT 1'
+        served = 0
+        while True:
+            cur.execute(query_flight, (flight_id,))
+            flight_row = cur.fetchone()
+            if flight_row is None or flight_row[0] < 1:
+                return served
+            cur.execute(query_head, (flight_id,))
+            entry = cur.fetchone()
+            if entry is None:
+                return served
+            waitlist_id, user_id = entry[0], entry[1]
+            cur.execute('SELECT reservation_id FROM Reservation WHERE creator_id = ? AND flight_id = ?',
+                        (user_id, flight_id))
+            reservation_row = cur.fetchone()
+            if reservation_row is None:
+                cur.execute('INSERT INTO Reservation (reference, re_date, creator_id, flight_id) \
+                             VALUES(?,?,?,?)',
+                            (self.generate_new_reservation_reference(),
+                             strftime("%Y-%m-%d", gmtime()), user_id, flight_id))
+                reservation_id = cur.lastrowid
+            else:
+                reservation_id = reservation_row[0]
+            #The trigger Ticket_seats_insert takes the seat of the flight
+            seat = flight_row[1] - flight_row[0] + 1
+            cur.execute('INSERT INTO Ticket (firstName, lastName, gender, age, reservation_id, seat) \
+                         VALUES(?,?,?,?,?,?)', tuple(entry[2:6]) + (reservation_id, seat))
+            cur.execute('UPDATE Waitlist SET ticket_id = ? WHERE waitlist_id = ?',
+                        (cur.lastrowid, waitlist_id))
+            served += 1
+
+    def _move_seats(self, cur, flight_ids):
+        """
+        Completes a move of tickets between flights, made by the triggers of
+        the schema: the seats returned to a flight are booked for the head
+        of its waitlist and the seats left of the flights are recorded in
+        the ``SeatChange`` outbox. It must be executed before the commit,
+        see :py:meth:`_add_seat_change`.
+
+        :param cur: the cursor of the transaction.
+        :param flight_ids: the ids of the flights the tickets left and
+            joined. ``None`` is ignored.
+        """
+        for flight_id in sorted(f for f in flight_ids if f is not None):
+            self._offer_seats(cur, flight_id)
+            self._add_seat_change(cur, flight_id)
+
+    #SeatChange Table API
+    def _add_seat_change(self, cur, flight_id):
+        """
+        Records the current seats left of a flight in the ``SeatChange``
+        outbox. It must be executed in the transaction that changed them,
+        before the commit, so that a change is never lost nor published
+        without being committed.
+
+        :param cur: the cursor of the transaction.
+        :param flight_id: the id of the flight.
+        """
+        query = 'INSERT INTO SeatChange (flight_id, nbSeatsLeft, created) \
+                 SELECT flight_id, nbSeatsLeft, ? FROM Flight WHERE flight_id = ?'
+        cur.execute(query, (int(time.time()), flight_id))
+        if self.seat_listeners:
+            change_id = cur.lastrowid
+            cur.execute('SELECT nbSeatsLeft FROM SeatChange WHERE change_id = ?', (change_id,))
+            self._seat_changes.append((flight_id, cur.fetchone()[0], change_id))
+
+    def _publish_seat_changes(self):
+        """
+        Calls the :py:attr:`seat_listeners` with the changes of the seats
+        left recorded by :py:meth:`_add_seat_change`. It must be executed
+        after the commit.
+        """
+        changes, self._seat_changes = self._seat_changes, []
+        for change in changes:
+            for listener in self.seat_listeners:
+                listener(*change)
+
+    def _create_seat_change_object(self, row):
+        """
+        It takes a database Row and transform it into a python dictionary.
+
+        :param row: The row obtained from the database.
+        :type row: sqlite3.Row
+        :return: a dictionary with the following format:
+
+            .. code-block:: javascript
+
+                {'changeid': change_id,
+                'flightid': flight_id,
+                'seatsleft': seats_left,
+                'created': created}
+
+        where:
+            * ``changeid``: id of the change, increasing with the commits (INT)
+            * ``flightid``: id of the flight (INT)
+            * ``seatsleft``: seats left after the change (INT)
+            * ``created``: UNIX timestamp of the change (INT)
+        """
+        return {'changeid': row['change_id'],
+                'flightid': row['flight_id'],
+                'seatsleft': row['nbSeatsLeft'],
+                'created': row['created']}
+
+    def get_seat_changes(self, after_id=0, flight_id=None, limit=None):
+        """
+        Extracts the changes of the seats left committed after a change.
+
+        :param int after_id: only the changes with a greater id are returned.
+        :param flight_id: only the changes of this flight are returned. All
+            the flights if ``None``.
+        :param int limit: maximum number of changes returned.
+        :return: list of dictionaries with the format provided in the
+            method: :py:meth:`_create_seat_change_object`, ordered by id.
+        """
+        query = 'SELECT * FROM SeatChange WHERE change_id > ?'
+        pvalue = (after_id,)
+        if flight_id is not None:
+            query += ' AND flight_id = ?'
+            pvalue += (flight_id,)
+        query += ' ORDER BY change_id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            pvalue += (limit,)
+        self.con.row_factory = sqlite3.Row
+        cur = self.con.cursor()
+        cur.execute(query, pvalue)
+        return [self._create_seat_change_object(row) for row in cur.fetchall()]
+
+    def get_seat_change_range(self):
+        """
+        :return: ``(oldest, last)``: the id of the oldest change still in the
+            outbox, ``None`` if it is empty, and the id of the last change
+            ever recorded, ``0`` if there was none.
+        """
+        query = "SELECT (SELECT MIN(change_id) FROM SeatChange), \
+                        (SELECT seq FROM sqlite_sequence WHERE name = 'SeatChange')"
+        cur = self.con.cursor()
+        cur.execute(query)
+        oldest, last = cur.fetchone()
+        return oldest, last or 0
+
+    def get_flight_seats(self, flight_id):
+        """
+        Reads the seats left of a flight together with the id of the last
+        change recorded, in one statement, so that the changes with a
+        greater id are the ones the seats left do not include yet.
+
+        :param flight_id: The id of the flight.
+        :return: ``(seats_left, last_change_id)`` or ``None`` if the flight
+            does not exist.
+        """
+        query = "SELECT nbSeatsLeft, \
+                        IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'SeatChange'), 0) \
+                 FROM Flight WHERE flight_id = ?"
+        cur = self.con.cursor()
+        cur.execute(query, (flight_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return row[0], row[1]
+
+    def get_seats_left(self):
+        """
+        Reads the seats left of all the flights together with the id of the
+        last change recorded, in one statement.
+
+        :return: list of tuples ``(flight_id, seats_left, departure_date,
+            last_change_id)``.
+        """
+        query = "SELECT flight_id, nbSeatsLeft, depDate, \
+                        IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'SeatChange'), 0) \
+                 FROM Flight"
+        cur = self.con.cursor()
+        cur.execute(query)
+        return [tuple(row) for row in cur.fetchall()]
+
+    def reconcile_seats(self, fix=True):
+        """
+        Recomputes the seats left of every flight from its tickets, in one
+        grouped query, and corrects the flights whose seats left differ. The
+        triggers of the ``Ticket`` and ``Reservation`` tables keep them
+        right; this repairs the databases written without them. The
+        corrections are recorded in the ``SeatChange`` outbox.
+
+        :param bool fix: if ``False``, the flights are only reported.
+        :return: dictionary ``{flight_id: (seats_left, recomputed)}`` of the
+            flights whose seats left differ from the recomputed ones.
+        """
+        query = 'SELECT Flight.flight_id, Flight.nbSeatsLeft, \
+                        Flight.nbInitialSeats - COUNT(Ticket.ticket_id) AS recomputed \
+                 FROM Flight LEFT JOIN Reservation ON Reservation.flight_id = Flight.flight_id \
+                             LEFT JOIN Ticket ON Ticket.reservation_id = Reservation.reservation_id \
+                 GROUP BY Flight.flight_id \
+                 HAVING Flight.nbSeatsLeft IS NOT recomputed'
+        update = 'UPDATE Flight SET nbSeatsLeft = ? WHERE flight_id = ?'
+        cur = self.con.cursor()
+        #No ticket can be written between the count and the update
+        if fix and not self.con.in_transaction:
+            cur.execute('BEGIN IMMEDIATE')
+        cur.execute(query)
+        drift = dict((row[0], (row[1], row[2])) for row in cur.fetchall())
+        if fix:
+            for flight_id, (_, recomputed) in sorted(drift.items()):
+                cur.execute(update, (recomputed, flight_id))
+                self._add_seat_change(cur, flight_id)
+        self.con.commit()
+        self._publish_seat_changes()
+        return drift
+
+    def delete_seat_changes(self, before):
+        """
+        Removes from the outbox the changes older than a timestamp.
+
+        :param int before: UNIX timestamp.
+        :return: the number of changes removed.
+        """
+        cur = self.con.cursor()
+        cur.execute('DELETE FROM SeatChange WHERE created < ?', (before,))
+        self.con.commit()
+        return cur.rowcount
+
+    #FareCalendar Table API
+    def get_fare_calendar(self, origin, destination, start, end):
+        """
+        Extracts the lowest fares of a route from the ``FareCalendar``
+        table, which the triggers of the ``Flight`` and ``TemplateFlight``
+        tables keep up to date.
+
+        :param str origin: the origin of the template flights.
+        :param str destination: the destination of the template flights.
+        :param str start: the first day, with the format ``YYYY-MM-DD``.
+        :param str end: the day after the last day, with the same format.
+        :return: list of dictionaries, one per day with flights, ordered by
+            day, with the format
+
+            .. code-block:: javascript
+
+                {'date': 'YYYY-MM-DD',
+                 'minprice': price of the cheapest flight with seats left,
+                     None if all the flights are full,
+                 'seatsleft': seats left in all the flights of the day,
+                 'flights': number of flights of the day}
+        """
+        query = 'SELECT depDate, minPrice, seatsLeft, nbFlights FROM FareCalendar \
+                 WHERE origin = ? AND destination = ? AND depDate >= ? AND depDate < ? \
+                 ORDER BY depDate'
+        cur = self.con.cursor()
+        cur.execute(query, (origin, destination, start, end))
+        return [self._create_fare_object(row) for row in cur.fetchall()]
+
+    def _get_fares_of_templates(self, template_ids, start, end):
+        """
+        Computes the lowest fares of the flights of some template flights
+        from the ``Flight`` table, in the format of
+        :py:meth:`get_fare_calendar`.
+        """
+        if not template_ids:
+            return []
+        query = 'SELECT depDate, MIN(CASE WHEN nbSeatsLeft > 0 THEN price END), \
+                        SUM(MAX(nbSeatsLeft, 0)), COUNT(*) \
+                 FROM Flight WHERE template_id IN (%s) AND depDate >= ? AND depDate < ? \
+                 GROUP BY depDate ORDER BY depDate' % ",".join("?" * len(template_ids))
+        cur = self.con.cursor()
+        cur.execute(query, tuple(template_ids) + (start, end))
+        return [self._create_fare_object(row) for row in cur.fetchall()]
+
+    def _create_fare_object(self, row):
+        return {'date': row[0], 'minprice': row[1], 'seatsleft': row[2], 'flights': row[3]}
+
+    #Search API
+    def search(self, text, limit=20, offset=0):
+        """
+        Full-text search of the users, by name, email and phone number, and
+        of the passengers of the tickets, by name. Every word of the search
+        matches the words starting with it. The ``UserSearch`` and
+        ``PassengerSearch`` FTS5 tables are kept in sync with the ``User``
+        and ``Ticket`` tables by triggers.
+
+        :param str text: the search, see :py:func:`search_query`.
+        :param int limit: the maximum number of results.
+        :param int offset: the number of best results skipped.
+        :return: list of dictionaries, best match first, with the format
+
+            .. code-block:: javascript
+
+                {'kind': 'user' or 'passenger',
+                 'id': the user id or the ticket id,
+                 'userid': the user id or the id of the creator of the
+                     reservation of the ticket,
+                 'reservationid': the reservation of the ticket, None for a
+                     user,
+                 'firstname': '',
+                 'lastname': '',
+                 'rank': bm25 rank, the lower the better}
+        """
+        match = search_query(text)
+        if match is None:
+            return []
+        results = self._search_users(match, offset + limit) + \
+            self._search_passengers(match, offset + limit)
+        results.sort(key=lambda result: result["rank"])
+        return results[offset:offset + limit]
+
+    def _search_users(self, match, limit):
+        """
+        :return: the best *limit* users matching an FTS5 query, in the
+            format of :py:meth:`search`.
+        """
+        query = 'SELECT User.user_id, User.firstName, User.lastName, UserSearch.rank \
+                 FROM UserSearch JOIN User ON User.user_id = UserSearch.rowid \
+                 WHERE UserSearch MATCH ? ORDER BY UserSearch.rank LIMIT ?'
+        cur = self.con.cursor()
+        cur.execute(query, (match, limit))
+        return [{'kind': 'user', 'id': row[0], 'userid': row[0], 'reservationid': None,
+                 'firstname': row[1], 'lastname': row[2], 'rank': row[3]}
+                for row in cur.fetchall()]
+
+    def _search_passengers(self, match, limit):
+        """
+        :return: the best *limit* passengers matching an FTS5 query, in the
+            format of :py:meth:`search`.
+        """
+        query = 'SELECT Ticket.ticket_id, Reservation.creator_id, Reservation.reservation_id, \
+                        Ticket.firstName, Ticket.lastName, PassengerSearch.rank \
+                 FROM PassengerSearch JOIN Ticket ON Ticket.ticket_id = PassengerSearch.rowid \
+                      JOIN Reservation ON Reservation.reservation_id = Ticket.reservation_id \
+                 WHERE PassengerSearch MATCH ? ORDER BY PassengerSearch.rank LIMIT ?'
+        cur = self.con.cursor()
+        cur.execute(query, (match, limit))
+        return [{'kind': 'passenger', 'id': row[0], 'userid': row[1], 'reservationid': row[2],
+                 'firstname': row[3], 'lastname': row[4], 'rank': row[5]}
+                for row in cur.fetchall()]
+
     # UTIL METHODS
     def generate_new_reservation_reference(self):
         """
@@ -2061,8 +3114,10 @@ class Connection(object):
 
 class NoMoreSeatsAvailableException(Exception):
 
-    def __init__(self, message):
+    def __init__(self, message, flight_id=None):
         super(NoMoreSeatsAvailableException, self).__init__(message)
+        #The full flight, when known
+        self.flight_id = flight_id
 
 class DateFormatException(ValueError):
 
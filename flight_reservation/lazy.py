@@ -0,0 +1,76 @@
+"""
+Created on 19.10.2026
+
+Lazily initialized WSGI applications.
+
+:py:class:`LazyWSGIApp` stands for a WSGI application that is only imported
+(or built by a factory) when it receives its first request. Mounting a
+rarely used application, such as the admin interface, through it keeps its
+imports out of the start up of the server and of every worker process.
+
+"""
+import importlib
+import threading
+
+
+def import_string(target):
+    """
+    Imports an object from a ``"package.module:attribute"`` string.
+    """
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name)
+    if not attribute:
+        return module
+    obj = module
+    for name in attribute.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+class LazyWSGIApp(object):
+    """
+    WSGI application loaded on its first request.
+
+    :param target: ``"package.module:attribute"`` string naming the WSGI
+        application, or a factory called without arguments that returns it.
+    """
+
+    def __init__(self, target):
+        super(LazyWSGIApp, self).__init__()
+        self.target = target
+        self._app = None
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def loaded(self):
+        return self._app is not None
+
+    def on_load(self, callback):
+        """
+        Registers a callable receiving the application once it is loaded. It
+        is called at once if the application is already loaded.
+        """
+        with self._lock:
+            if self._app is None:
+                self._callbacks.append(callback)
+                return
+        callback(self._app)
+
+    def load(self):
+        """
+        Imports or builds the application if it is not done yet.
+
+        :return: the WSGI application
+        """
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    app = self.target() if callable(self.target) else import_string(self.target)
+                    for callback in self._callbacks:
+                        callback(app)
+                    self._app = app
+        return self._app
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
@@ -0,0 +1,453 @@
+"""
+Created on 19.10.2026
+
+Per-request metrics for the flight booking WSGI application.
+
+:py:class:`MetricsMiddleware` wraps the WSGI application built in
+``main.py``. It keeps, per endpoint, histograms of the request latency, the
+response size and the time spent in the database, counts the responses per
+status code and the unhandled exceptions, and tracks the number of requests
+in flight. The metrics are exposed in the Prometheus text format on
+``/metrics``.
+
+When several worker processes serve the application, give every worker the
+same ``multiprocess_dir`` (or set the ``FLIGHT_METRICS_DIR`` environment
+variable): each process then writes its metrics to a file in that directory
+and ``/metrics`` returns the sum over all the processes, whichever worker
+answers the scrape. The files are named after the pid and the start time of
+their process, so that a new process reusing a pid does not overwrite them.
+The scrape folds the counters of the processes that exited into a single
+cumulative file and deletes their files.
+
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+
+# Key of the WSGI environ where the application stores the time spent in the
+# database while handling the request (see resources.close_connection)
+DB_TIME_ENVIRON_KEY = "flight_reservation.db_time"
+
+METRICS_PATH = "/metrics"
+METRICS_DIR_ENV = "FLIGHT_METRICS_DIR"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metrics of the processes that exited, summed, and the lock serializing
+# the scrapes that fold them
+DEAD_PROCESSES_FILE = "metrics-dead.json"
+LOCK_FILE = "metrics.lock"
+
+# Endpoint label of the requests that do not match any rule of the url map
+UNMATCHED_ENDPOINT = "other"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help, buckets)
+METRICS = {
+    "flight_http_requests_total": (
+        "counter", "Number of HTTP responses by endpoint, method and status code.", None),
+    "flight_http_request_exceptions_total": (
+        "counter", "Number of requests that raised an unhandled exception.", None),
+    "flight_http_requests_in_flight": (
+        "gauge", "Number of requests being processed.", None),
+    "flight_http_request_duration_seconds": (
+        "histogram", "Time to produce the whole response, in seconds.", LATENCY_BUCKETS),
+    "flight_http_response_size_bytes": (
+        "histogram", "Size of the response body, in bytes.", SIZE_BUCKETS),
+    "flight_db_time_seconds": (
+        "histogram", "Time spent in the database per request, in seconds.", LATENCY_BUCKETS),
+}
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe store of the counters, gauges and histograms of one process.
+
+    Every value is identified by the metric name and a tuple of
+    ``(label, value)`` pairs. A histogram is stored as a list with the count
+    of each bucket, followed by the sum and the number of observations.
+
+    """
+
+    def __init__(self):
+        super(MetricsRegistry, self).__init__()
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        """
+        Adds *amount* to a counter or a gauge.
+        """
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        """
+        Records one observation in a histogram.
+        """
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        """
+        :return: a JSON serializable copy of all the values, as a list of
+            ``[name, labels, value]``.
+        """
+        with self._lock:
+            return [[name, [list(pair) for pair in labels],
+                     list(value) if isinstance(value, list) else value]
+                    for (name, labels), value in self._values.items()]
+
+
+def merge_snapshots(snapshots):
+    """
+    Sums snapshots of several processes.
+
+    :param snapshots: iterable of ``(snapshot, alive)`` pairs. The gauges of
+        the processes that are not *alive* anymore are ignored.
+    :return: a dictionary ``{(name, labels): value}``
+    """
+    merged = {}
+    for snapshot, alive in snapshots:
+        for name, labels, value in snapshot:
+            if name not in METRICS or (METRICS[name][0] == "gauge" and not alive):
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                current = merged.get(key)
+                merged[key] = value if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render_prometheus(values):
+    """
+    Renders merged values (see :py:func:`merge_snapshots`) in the Prometheus
+    text exposition format.
+
+    :rtype: str
+    """
+    lines = []
+    for name in sorted(METRICS):
+        kind, description, buckets = METRICS[name]
+        lines.append("# HELP %s %s" % (name, description))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for (metric, labels), value in sorted(values.items()):
+            if metric != name:
+                continue
+            if kind != "histogram":
+                lines.append("%s%s %s" % (name, _format_labels(labels), _format_number(value)))
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append("%s_bucket%s %d" % (name, _format_labels(labels, [("le", bound)]),
+                                                 cumulative))
+            lines.append("%s_bucket%s %d" % (name, _format_labels(labels, [("le", "+Inf")]),
+                                             value[-1]))
+            lines.append("%s_sum%s %s" % (name, _format_labels(labels), _format_number(value[-2])))
+            lines.append("%s_count%s %d" % (name, _format_labels(labels), value[-1]))
+    return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start(pid):
+    """
+    :return: the start time of the process *pid*, in clock ticks since the
+        boot, or 0 where ``/proc`` is not available.
+    """
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            #The fields after the command name, which may contain spaces,
+            #start with the third one; the start time is the 22nd
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _process_running(pid, start):
+    if not _process_alive(pid):
+        return False
+    return not start or process_start(pid) == start
+
+
+def _to_snapshot(values):
+    return [[name, [list(pair) for pair in labels], value]
+            for (name, labels), value in values.items()]
+
+
+class MetricsMiddleware(object):
+    """
+    WSGI middleware recording the metrics of every request and serving them
+    on :py:data:`METRICS_PATH`.
+
+    :param app: the WSGI application to wrap.
+    :param url_map: optional :py:class:`werkzeug.routing.Map` used to label
+        the requests with the rule they match (e.g.
+        ``/flight-booking-system/api/users/<int:user_id>``) instead of the
+        raw path, which keeps the number of series bounded.
+    :param str metrics_path: path on which the metrics are served.
+    :param str multiprocess_dir: directory shared by the worker processes.
+        Defaults to the ``FLIGHT_METRICS_DIR`` environment variable. If
+        ``None`` only the metrics of the current process are served.
+    :param float flush_interval: number of seconds between two writes of
+        the metrics file of the process, done by a background thread when
+        requests were recorded.
+
+    """
+
+    def __init__(self, app, url_map=None, metrics_path=METRICS_PATH,
+                 multiprocess_dir=None, flush_interval=1.0):
+        super(MetricsMiddleware, self).__init__()
+        self.app = app
+        self.url_map = url_map
+        self.metrics_path = metrics_path
+        self.multiprocess_dir = multiprocess_dir or os.environ.get(METRICS_DIR_ENV)
+        self.flush_interval = flush_interval
+        self.registry = MetricsRegistry()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        #Pid of the process running the flushing thread (threads do not
+        #survive a fork)
+        self._flusher_pid = None
+        #(pid, file) of the metrics file of the process, see _path
+        self._file = (None, None)
+        #Extra exposition text producers, see add_collector
+        self._collectors = []
+        if self.multiprocess_dir:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            atexit.register(self._flush_at_exit)
+
+    def add_collector(self, collector):
+        """
+        Registers a callable returning additional lines, in the Prometheus
+        text format, to append to the output of :py:attr:`metrics_path`.
+        """
+        self._collectors.append(collector)
+
+    def endpoint(self, environ):
+        """
+        :return: the label identifying the endpoint of the request.
+        """
+        if self.url_map is None:
+            return environ.get("PATH_INFO", "")
+        try:
+            rule, _ = self.url_map.bind_to_environ(environ).match(return_rule=True)
+        except (HTTPException, RoutingException):
+            return UNMATCHED_ENDPOINT
+        return rule.rule
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == self.metrics_path:
+            return self.serve_metrics(environ, start_response)
+
+        labels = (("endpoint", self.endpoint(environ)), ("method", environ.get("REQUEST_METHOD", "")))
+        state = {"status": "500"}
+
+        def _start_response(status, headers, exc_info=None):
+            state["status"] = status.split(" ", 1)[0]
+            return start_response(status, headers, exc_info)
+
+        self.registry.inc("flight_http_requests_in_flight", ())
+        start = time.perf_counter()
+        try:
+            app_iter = self.app(environ, _start_response)
+        except Exception:
+            self.registry.inc("flight_http_request_exceptions_total", labels)
+            self._record(environ, labels, state["status"], start, 0)
+            raise
+        return _MeasuredIterable(app_iter, self, environ, labels, state, start)
+
+    def _record(self, environ, labels, status, start, size):
+        registry = self.registry
+        registry.inc("flight_http_requests_in_flight", (), -1)
+        registry.inc("flight_http_requests_total", labels + (("status", status),))
+        registry.observe("flight_http_request_duration_seconds", labels, time.perf_counter() - start)
+        registry.observe("flight_http_response_size_bytes", labels, size)
+        db_time = environ.get(DB_TIME_ENVIRON_KEY)
+        if db_time is not None:
+            registry.observe("flight_db_time_seconds", labels, db_time)
+        if self.multiprocess_dir:
+            self._dirty = True
+            if self._flusher_pid != os.getpid():
+                self._start_flusher()
+
+    def _start_flusher(self):
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        thread = threading.Thread(target=self._flush_periodically, name="metrics-flusher")
+        thread.daemon = True
+        thread.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+    def flush(self):
+        """
+        Writes the metrics of this process to its file in the
+        :py:attr:`multiprocess_dir`.
+        """
+        if not self.multiprocess_dir:
+            return
+        with self._flush_lock:
+            self._dirty = False
+            path = self._path()
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(tmp_path, path)
+
+    def _path(self):
+        pid = os.getpid()
+        if self._file[0] != pid:
+            self._file = (pid, os.path.join(self.multiprocess_dir, "metrics-%d-%d.json"
+                                            % (pid, process_start(pid))))
+        return self._file[1]
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except OSError:
+            #The directory was removed before the process ended
+            pass
+
+    def collect(self):
+        """
+        :return: the metrics of all the processes, merged.
+        """
+        if not self.multiprocess_dir:
+            return merge_snapshots([(self.registry.snapshot(), True)])
+        self.flush()
+        with open(os.path.join(self.multiprocess_dir, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead_path = os.path.join(self.multiprocess_dir, DEAD_PROCESSES_FILE)
+            dead = self._read(dead_path) or []
+            live, exited = [], []
+            for path in glob.glob(os.path.join(self.multiprocess_dir, "metrics-*-*.json")):
+                try:
+                    pid, start = map(int, os.path.basename(path)[len("metrics-"):-len(".json")]
+                                     .split("-"))
+                except ValueError:
+                    #Not ours
+                    continue
+                snapshot = self._read(path)
+                if snapshot is None:
+                    continue
+                if _process_running(pid, start):
+                    live.append(snapshot)
+                else:
+                    exited.append(path)
+                    dead = _to_snapshot(merge_snapshots([(dead, False), (snapshot, False)]))
+            if exited:
+                tmp_path = dead_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(dead, f)
+                os.replace(tmp_path, dead_path)
+                for path in exited:
+                    os.remove(path)
+        return merge_snapshots([(dead, False)] + [(snapshot, True) for snapshot in live])
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            #Being replaced
+            return None
+
+    def serve_metrics(self, environ, start_response):
+        text = render_prometheus(self.collect())
+        for collector in self._collectors:
+            text += "".join(line + "\n" for line in collector())
+        body = text.encode("utf-8")
+        start_response("200 OK", [("Content-Type", PROMETHEUS_CONTENT_TYPE),
+                                  ("Content-Length", str(len(body)))])
+        return [body]
+
+
+class _MeasuredIterable(object):
+    """
+    Wraps the iterable returned by the application to count the bytes sent
+    and record the metrics of the request once the response is closed.
+
+    """
+
+    def __init__(self, app_iter, middleware, environ, labels, state, start):
+        self.app_iter = app_iter
+        self.middleware = middleware
+        self.environ = environ
+        self.labels = labels
+        self.state = state
+        self.start = start
+        self.size = 0
+        self.recorded = False
+
+    def __iter__(self):
+        for chunk in self.app_iter:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, "close"):
+                self.app_iter.close()
+        finally:
+            if not self.recorded:
+                self.recorded = True
+                self.middleware._record(self.environ, self.labels, self.state["status"],
+                                        self.start, self.size)
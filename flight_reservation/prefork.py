@@ -0,0 +1,375 @@
+"""
+Created on 19.10.2026
+
+Pre-forking WSGI server.
+
+The master process opens the listening socket and forks the workers, which
+all accept connections on that shared socket. Each worker imports the
+application itself (so a reload picks up new code), runs an optional warmup
+and serves requests with a werkzeug server, one at a time or, with
+``threaded``, in a thread per request. A worker exits
+after ``max_requests`` requests and the master replaces it, which bounds the
+memory growth of long running processes.
+
+A worker that stops accepting connections tells the master through a pipe.
+The master starts its replacement right away and kills it if it is still
+finishing its requests after ``graceful_timeout`` seconds.
+
+Signals handled by the master:
+
+* ``SIGHUP``: graceful reload. New workers are started with a freshly
+  imported application and the old ones finish their current request before
+  exiting.
+* ``SIGTERM`` / ``SIGINT``: graceful shutdown.
+* ``SIGTTIN`` / ``SIGTTOU``: one worker more / less.
+
+This server relies on ``fork`` and only runs on Unix.
+
+"""
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+DEFAULT_MAX_REQUESTS = 1000
+DEFAULT_GRACEFUL_TIMEOUT = 30
+# Seconds a worker waits for a connection before checking for a shutdown
+POLL_INTERVAL = 0.5
+
+
+def log(message):
+    print("[%d] %s" % (os.getpid(), message), file=sys.stderr)
+    sys.stderr.flush()
+
+
+class Worker(object):
+    """
+    Code run in a forked worker process.
+
+    :param listener: the shared listening socket.
+    :param load_app: callable returning the WSGI application.
+    :param warmup: optional callable receiving the application, run before
+        accepting requests.
+    :param int max_requests: number of requests after which the worker
+        exits. 0 means never.
+    :param on_exit: optional callable receiving the application, run when
+        the worker stops.
+    :param bool threaded: handle every request in its own thread.
+    :param on_stop: optional callable receiving the application, run when
+        the worker stops accepting connections, before it waits for the
+        requests in progress. It must end the requests that never end by
+        themselves (event streams...).
+    :param int stopping_fd: write end of the pipe on which the worker sends
+        its pid to the master when it stops accepting connections.
+    """
+
+    def __init__(self, listener, load_app, warmup=None, max_requests=DEFAULT_MAX_REQUESTS,
+                 on_exit=None, threaded=False, on_stop=None, stopping_fd=None):
+        super(Worker, self).__init__()
+        self.listener = listener
+        self.load_app = load_app
+        self.warmup = warmup
+        self.max_requests = max_requests
+        self.on_exit = on_exit
+        self.threaded = threaded
+        self.on_stop = on_stop
+        self.stopping_fd = stopping_fd
+        self.alive = True
+        self.handled = 0
+
+    def _stop(self, signum, frame):
+        self.alive = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        for signum in (signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+
+        app = self.load_app()
+        if self.warmup is not None:
+            start = time.perf_counter()
+            self.warmup(app)
+            log("worker warmed up in %.3f s" % (time.perf_counter() - start))
+
+        host, port = self.listener.getsockname()[:2]
+        server = make_server(host, port, app, threaded=self.threaded, fd=self.listener.fileno())
+        #server_close waits for the requests being handled by the threads
+        server.daemon_threads = False
+        #The master made the shared socket non-blocking: when another worker
+        #takes the connection accept fails instead of blocking
+        server.timeout = POLL_INTERVAL
+        process_request = server.process_request
+
+        def _counting(request, client_address):
+            self.handled += 1
+            return process_request(request, client_address)
+
+        server.process_request = _counting
+        while self.alive:
+            server.handle_request()
+            if self.max_requests and self.handled >= self.max_requests:
+                log("worker recycled after %d requests" % self.handled)
+                break
+        if self.stopping_fd is not None:
+            try:
+                os.write(self.stopping_fd, b"%d\n" % os.getpid())
+            except OSError:
+                #The master is gone
+                pass
+        if self.on_stop is not None:
+            self.on_stop(app)
+        server.server_close()
+        if self.on_exit is not None:
+            self.on_exit(app)
+
+
+class PreforkServer(object):
+    """
+    Master process of the pre-forking server.
+
+    :param load_app: callable returning the WSGI application. It is called in
+        every worker, after the fork.
+    :param str host: interface to listen on.
+    :param int port: port to listen on.
+    :param int workers: number of worker processes. Defaults to the number of
+        CPU cores.
+    :param int max_requests: requests served by a worker before it is
+        replaced. 0 disables the recycling.
+    :param int max_requests_jitter: random number of requests, up to this
+        value, added to *max_requests* for each worker so that they are not
+        all recycled at the same time.
+    :param warmup: optional callable receiving the application, run in each
+        worker before it accepts requests.
+    :param worker_stop: optional callable receiving the application, run in
+        each worker when it stops accepting connections, see
+        :py:class:`Worker`.
+    :param worker_exit: optional callable receiving the application, run in
+        each worker when it stops. The workers end with ``os._exit`` so the
+        ``atexit`` handlers do not run.
+    :param int graceful_timeout: seconds given to the workers to finish their
+        requests on shutdown, reload or recycling before they are killed.
+    :param int backlog: size of the queue of pending connections.
+    :param bool threaded: workers handle every request in its own thread.
+    """
+
+    def __init__(self, load_app, host="localhost", port=8000, workers=None,
+                 max_requests=DEFAULT_MAX_REQUESTS, max_requests_jitter=0, warmup=None,
+                 worker_exit=None, graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT, backlog=128,
+                 threaded=False, worker_stop=None):
+        super(PreforkServer, self).__init__()
+        self.load_app = load_app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.warmup = warmup
+        self.worker_exit = worker_exit
+        self.worker_stop = worker_stop
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.threaded = threaded
+        self.listener = None
+        #pid: generation of the worker, -1 for the workers stopping
+        self.children = {}
+        #pid: time after which a stopping worker is killed
+        self.deadlines = {}
+        self.generation = 0
+        self._signals = []
+        #The workers write their pid when they stop accepting connections
+        self._stopping_r, self._stopping_w = os.pipe()
+        os.set_blocking(self._stopping_r, False)
+        self._stopping_buffer = b""
+
+    def bind(self):
+        """
+        Opens the listening socket shared by the workers.
+        """
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(self.backlog)
+        listener.setblocking(False)
+        listener.set_inheritable(True)
+        self.listener = listener
+        self.port = listener.getsockname()[1]
+        return listener
+
+    def spawn(self):
+        """
+        Forks one worker of the current generation.
+        """
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self.generation
+            return pid
+        #In the worker
+        status = 0
+        try:
+            os.close(self._stopping_r)
+            Worker(self.listener, self.load_app, self.warmup, max_requests,
+                   self.worker_exit, self.threaded, self.worker_stop, self._stopping_w).run()
+        except BaseException as excp:
+            log("worker failed: %r" % (excp,))
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    def _signal(self, signum, frame):
+        self._signals.append(signum)
+
+    def run(self):
+        """
+        Starts the workers and supervises them until a shutdown signal.
+        """
+        if self.listener is None:
+            self.bind()
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT,
+                       signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self._signal)
+        log("listening on http://%s:%d/ with %d workers" % (self.host, self.port, self.workers))
+        for _ in range(self.workers):
+            self.spawn()
+        try:
+            while True:
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum in (signal.SIGTERM, signal.SIGINT):
+                        log("shutting down")
+                        return
+                    if signum == signal.SIGHUP:
+                        self.reload()
+                    elif signum == signal.SIGTTIN:
+                        self.workers += 1
+                    elif signum == signal.SIGTTOU and self.workers > 1:
+                        self.workers -= 1
+                self.reap()
+                self.read_stopping()
+                self.kill_late()
+                self.manage_workers()
+                time.sleep(0.1)
+        finally:
+            self.stop()
+            self.listener.close()
+            os.close(self._stopping_r)
+            os.close(self._stopping_w)
+
+    def reload(self):
+        """
+        Starts a new generation of workers and stops the old ones.
+        """
+        log("reloading")
+        self.generation += 1
+        old = [pid for pid, generation in self.children.items() if generation < self.generation]
+        for _ in range(self.workers):
+            self.spawn()
+        for pid in old:
+            self.stop_worker(pid)
+
+    def reap(self):
+        """
+        Collects the exited workers.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            self.children.pop(pid, None)
+            self.deadlines.pop(pid, None)
+
+    def read_stopping(self):
+        """
+        Stops counting the workers that stopped accepting connections, so
+        that they are replaced while they finish their requests.
+        """
+        while True:
+            try:
+                data = os.read(self._stopping_r, 4096)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            self._stopping_buffer += data
+        *lines, self._stopping_buffer = self._stopping_buffer.split(b"\n")
+        for line in lines:
+            pid = int(line)
+            if pid in self.children:
+                self.children[pid] = -1
+                self.deadlines.setdefault(pid, time.time() + self.graceful_timeout)
+
+    def kill_late(self):
+        """
+        Kills the stopping workers still running after
+        :py:attr:`graceful_timeout` seconds.
+        """
+        now = time.time()
+        for pid, deadline in list(self.deadlines.items()):
+            if now > deadline:
+                log("killing worker %d, still running after %d s"
+                    % (pid, self.graceful_timeout))
+                del self.deadlines[pid]
+                self._kill(pid, signal.SIGKILL)
+
+    def stop_worker(self, pid):
+        """
+        Asks a worker to stop. It is not counted anymore and killed if it
+        does not exit within :py:attr:`graceful_timeout` seconds.
+        """
+        self._kill(pid, signal.SIGTERM)
+        if pid in self.children:
+            self.children[pid] = -1
+            self.deadlines.setdefault(pid, time.time() + self.graceful_timeout)
+
+    def manage_workers(self):
+        """
+        Starts or stops workers of the current generation to keep
+        :py:attr:`workers` of them.
+        """
+        current = sorted(pid for pid, generation in self.children.items()
+                         if generation == self.generation)
+        for _ in range(self.workers - len(current)):
+            self.spawn()
+        for pid in current[:max(0, len(current) - self.workers)]:
+            self.stop_worker(pid)
+
+    def stop(self):
+        """
+        Stops all the workers, killing the ones still running after
+        :py:attr:`graceful_timeout` seconds.
+        """
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while self.children and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGKILL)
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            self.children.pop(pid, None)
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.children.pop(pid, None)
+            self.deadlines.pop(pid, None)
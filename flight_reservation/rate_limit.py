@@ -0,0 +1,249 @@
+"""
+Created on 19.10.2026
+
+Admission control for the flight booking WSGI application.
+
+:py:class:`RateLimitMiddleware` gives every client two token buckets, one
+for the read requests (GET, HEAD, OPTIONS) and one for the write requests
+(POST, PUT, PATCH, DELETE), which go through the single SQLite writer and
+get a smaller budget. A client is identified by its API key header or, when
+it sends none, by its address. A request finding its bucket empty is
+rejected with ``429 Too Many Requests`` and a ``Retry-After`` header telling
+when the next token is available.
+
+Independently of the buckets, the middleware counts the requests in flight.
+When there are already ``max_in_flight`` requests being processed, or
+``max_writes_in_flight`` write requests, new requests are shed with
+``503 Service Unavailable`` instead of queueing behind the database lock.
+
+Event streams (``text/event-stream``) stay open for as long as the client
+listens. They are counted in flight only until their headers are sent, so
+that the listening clients do not make the other requests shed.
+
+A decision is a dictionary lookup and a few arithmetic operations under a
+lock. The buckets are kept in an LRU of at most ``max_clients`` entries, so
+the memory does not grow with the number of clients; a client evicted from
+the LRU starts again with a full bucket.
+
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.wsgi import ClosingIterator
+
+READ = "read"
+WRITE = "write"
+
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
+API_KEY_HEADER = "X-Api-Key"
+
+# Longest client key kept, longer API keys are truncated
+MAX_KEY_LENGTH = 64
+
+# Media type of the long lived responses, not counted in flight
+EVENT_STREAM = "text/event-stream"
+
+# Same media type as resources.create_error_response
+MASON_ERROR_TYPE = "application/vnd.mason+json;/profiles/error-profile"
+
+LIMITED = "limited"
+SHED = "shed"
+ADMITTED = "admitted"
+
+
+class TokenBucket(object):
+    """
+    Tokens available to a client for one budget, refilled continuously.
+
+    """
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimitMiddleware(object):
+    """
+    WSGI middleware limiting the rate of the requests of every client and
+    shedding the load when too many requests are in flight.
+
+    :param app: the WSGI application to wrap.
+    :param float read_rate: read requests per second allowed per client.
+    :param float read_burst: size of the read bucket, the number of read
+        requests a client can send at once.
+    :param float write_rate: write requests per second allowed per client.
+    :param float write_burst: size of the write bucket.
+    :param int max_in_flight: number of requests in flight above which the
+        new requests get a 503. ``None`` disables the shedding.
+    :param int max_writes_in_flight: number of write requests in flight
+        above which the new write requests get a 503. Defaults to
+        ``max_in_flight``.
+    :param int max_clients: maximum number of buckets kept.
+    :param str key_header: header identifying the client.
+    :param bool trust_forwarded: use the first address of
+        ``X-Forwarded-For`` instead of the address of the peer, when the
+        application runs behind a proxy.
+    :param float shed_retry_after: seconds sent in the ``Retry-After``
+        header of the 503 responses.
+    :param clock: function returning the current time in seconds.
+
+    """
+
+    def __init__(self, app, read_rate=50.0, read_burst=100, write_rate=5.0, write_burst=10,
+                 max_in_flight=64, max_writes_in_flight=None, max_clients=10000,
+                 key_header=API_KEY_HEADER, trust_forwarded=False, shed_retry_after=1,
+                 clock=time.monotonic):
+        super(RateLimitMiddleware, self).__init__()
+        self.app = app
+        self.rates = {READ: float(read_rate), WRITE: float(write_rate)}
+        self.bursts = {READ: float(read_burst), WRITE: float(write_burst)}
+        self.max_in_flight = max_in_flight
+        self.max_writes_in_flight = (max_writes_in_flight if max_writes_in_flight is not None
+                                     else max_in_flight)
+        self.max_clients = max_clients
+        self.key_environ = "HTTP_" + key_header.upper().replace("-", "_")
+        self.trust_forwarded = trust_forwarded
+        self.shed_retry_after = shed_retry_after
+        self.clock = clock
+        self.in_flight = 0
+        self.writes_in_flight = 0
+        #(client key, budget): TokenBucket, least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        #(decision, budget): number of requests
+        self.decisions = {}
+
+    def client_key(self, environ):
+        """
+        :return: the key identifying the client of the request.
+        """
+        key = environ.get(self.key_environ)
+        if key:
+            return "key:" + key[:MAX_KEY_LENGTH]
+        if self.trust_forwarded and environ.get("HTTP_X_FORWARDED_FOR"):
+            return environ["HTTP_X_FORWARDED_FOR"].split(",")[0].strip()[:MAX_KEY_LENGTH]
+        return environ.get("REMOTE_ADDR", "")
+
+    def admit(self, key, budget):
+        """
+        Decides whether a request is processed and, if so, counts it in
+        flight. An admitted request must be given back with
+        :py:meth:`release`.
+
+        :param str key: the client key.
+        :param str budget: :py:data:`READ` or :py:data:`WRITE`.
+        :return: ``(decision, retry_after)``: :py:data:`ADMITTED`,
+            :py:data:`LIMITED` or :py:data:`SHED` and the seconds to wait
+            before retrying.
+        """
+        now = self.clock()
+        with self._lock:
+            if self.max_in_flight is not None and (
+                    self.in_flight >= self.max_in_flight or
+                    (budget == WRITE and self.writes_in_flight >= self.max_writes_in_flight)):
+                return self._count(SHED, budget), self.shed_retry_after
+
+            bucket = self._buckets.get((key, budget))
+            rate = self.rates[budget]
+            if bucket is None:
+                bucket = self._buckets[(key, budget)] = TokenBucket(self.bursts[budget], now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((key, budget))
+                bucket.tokens = min(self.bursts[budget],
+                                    bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+
+            if bucket.tokens < 1:
+                return self._count(LIMITED, budget), (1 - bucket.tokens) / rate
+            bucket.tokens -= 1
+            self.in_flight += 1
+            if budget == WRITE:
+                self.writes_in_flight += 1
+            return self._count(ADMITTED, budget), 0
+
+    def release(self, budget):
+        """
+        Removes a request admitted by :py:meth:`admit` from the requests in
+        flight.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if budget == WRITE:
+                self.writes_in_flight -= 1
+
+    def _count(self, decision, budget):
+        self.decisions[(decision, budget)] = self.decisions.get((decision, budget), 0) + 1
+        return decision
+
+    def __call__(self, environ, start_response):
+        budget = WRITE if environ.get("REQUEST_METHOD") in WRITE_METHODS else READ
+        decision, retry_after = self.admit(self.client_key(environ), budget)
+        if decision == LIMITED:
+            return self.reject(environ, start_response, "429 Too Many Requests", retry_after,
+                               "Too many requests",
+                               "The client has exceeded its %s rate of %g requests per second"
+                               % (budget, self.rates[budget]))
+        if decision == SHED:
+            return self.reject(environ, start_response, "503 Service Unavailable", retry_after,
+                               "Service overloaded",
+                               "Too many requests are being processed, retry later")
+        streamed = []
+
+        def _start_response(status, headers, exc_info=None):
+            for name, value in headers:
+                if name.lower() == "content-type" and value.lower().startswith(EVENT_STREAM):
+                    streamed.append(True)
+            return start_response(status, headers, exc_info)
+
+        try:
+            app_iter = self.app(environ, _start_response)
+        except BaseException:
+            self.release(budget)
+            raise
+        if streamed:
+            self.release(budget)
+            return app_iter
+        return ClosingIterator(app_iter, lambda: self.release(budget))
+
+    def reject(self, environ, start_response, status, retry_after, title, message):
+        """
+        Sends a Mason error with a ``Retry-After`` header.
+        """
+        body = json.dumps({
+            "resource_url": environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", ""),
+            "@error": {"@message": title, "@messages": [message]},
+        }).encode("utf-8")
+        start_response(status, [("Content-Type", MASON_ERROR_TYPE),
+                                ("Content-Length", str(len(body))),
+                                ("Retry-After", str(max(1, int(math.ceil(retry_after)))))])
+        return [body]
+
+    def collect(self):
+        """
+        :return: the lines, in the Prometheus text format, of the decisions
+            of this process. To be registered with
+            :py:meth:`flight_reservation.metrics.MetricsMiddleware.add_collector`.
+        """
+        with self._lock:
+            decisions = sorted(self.decisions.items())
+            clients = len(self._buckets)
+            in_flight = self.in_flight
+        lines = ["# HELP flight_rate_limit_decisions_total Admission decisions by budget.",
+                 "# TYPE flight_rate_limit_decisions_total counter"]
+        for (decision, budget), count in decisions:
+            lines.append('flight_rate_limit_decisions_total{budget="%s",decision="%s"} %d'
+                         % (budget, decision, count))
+        lines += ["# HELP flight_rate_limit_buckets Token buckets kept in memory.",
+                  "# TYPE flight_rate_limit_buckets gauge",
+                  "flight_rate_limit_buckets %d" % clients,
+                  "# HELP flight_rate_limit_in_flight Requests admitted and not finished.",
+                  "# TYPE flight_rate_limit_in_flight gauge",
+                  "flight_rate_limit_in_flight %d" % in_flight]
+        return lines
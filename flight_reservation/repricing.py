@@ -0,0 +1,352 @@
+"""
+Created on 19.10.2026
+
+Batch repricing of the flights from their load factor.
+
+The price of a flight is only changed by hand, whatever the number of seats
+sold and the days left before its departure. :py:class:`Repricer` sets the
+price of the flights not departed yet to their base price multiplied by the
+factor of a :py:class:`PricingCurve`, which grows with the load factor (the
+share of the seats sold) and with the proximity of the departure.
+
+The base price of a flight is its price before its first repricing, kept in
+the ``FlightBasePrice`` table: the curve is never applied to a price it
+computed itself. Modifying the price of a flight by hand
+(:py:meth:`~flight_reservation.flight_database.Connection.modify_flight`)
+makes the new price its base price.
+
+The repricing works by columns, not by flights: the capacities, seats left,
+days to departure and base prices of a chunk of flights are read with one
+query, their prices computed with one pass over the columns and the prices
+that changed written back with one ``executemany``, the chunk in its own
+write transaction. The factors of the curve are computed once for every
+load factor (by steps of :py:data:`LOAD_STEPS`) and every day to departure,
+so a price costs a lookup in a table and a multiplication.
+
+"""
+import sqlite3
+import time
+from bisect import bisect_right
+from datetime import datetime, date
+
+from flight_reservation.flight_database import parse_date
+from flight_reservation.sharding import ShardedEngine
+
+# Flights repriced in one transaction
+DEFAULT_CHUNK_SIZE = 10000
+
+# The load factors are rounded down to 1/LOAD_STEPS
+LOAD_STEPS = 1000
+
+# (load factor, multiplier) points of the default curve
+DEFAULT_LOAD_CURVE = ((0.0, 0.85), (0.5, 1.0), (0.8, 1.2), (1.0, 1.5))
+
+# (days to departure, multiplier) points of the default curve, the flights
+# departing later than the last point have its multiplier
+DEFAULT_DAYS_CURVE = ((0, 1.4), (7, 1.2), (21, 1.05), (60, 1.0), (120, 0.9))
+
+# Bounds of the factor applied to the base price
+DEFAULT_MIN_FACTOR = 0.5
+DEFAULT_MAX_FACTOR = 2.0
+
+
+def interpolate(points, x):
+    """
+    :param points: ``(x, y)`` points sorted by ``x``.
+    :return: the value in *x* of the piecewise linear function through the
+        points, constant before the first one and after the last one.
+    """
+    xs = [point[0] for point in points]
+    index = bisect_right(xs, x)
+    if index == 0:
+        return points[0][1]
+    if index == len(points):
+        return points[-1][1]
+    (x0, y0), (x1, y1) = points[index - 1], points[index]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def _check_points(points, name):
+    points = tuple((float(x), float(y)) for x, y in points)
+    if not points:
+        raise ValueError("The %s curve has no point" % name)
+    for (x0, _), (x1, _) in zip(points, points[1:]):
+        if x1 <= x0:
+            raise ValueError("The points of the %s curve must be sorted" % name)
+    if any(y <= 0 for _, y in points):
+        raise ValueError("The multipliers of the %s curve must be positive" % name)
+    return points
+
+
+class PricingCurve(object):
+    """
+    Factor applied to the base price of a flight: the product of a
+    multiplier of its load factor and a multiplier of its days to departure,
+    both interpolated linearly between points, bounded by *min_factor* and
+    *max_factor*.
+
+    :param load: ``(load factor, multiplier)`` points, the load factors
+        between 0 and 1.
+    :param days: ``(days to departure, multiplier)`` points.
+    :param float min_factor: the lowest factor.
+    :param float max_factor: the highest factor.
+    :param int rounding: the prices are rounded to a multiple of it.
+    :raises ValueError: if the points are not sorted, a multiplier is not
+        positive or the bounds are not consistent.
+
+    """
+
+    def __init__(self, load=DEFAULT_LOAD_CURVE, days=DEFAULT_DAYS_CURVE,
+                 min_factor=DEFAULT_MIN_FACTOR, max_factor=DEFAULT_MAX_FACTOR, rounding=1):
+        super(PricingCurve, self).__init__()
+        self.load = _check_points(load, "load")
+        self.days = _check_points(days, "days")
+        if not 0 < min_factor <= max_factor:
+            raise ValueError("The factor bounds must be positive and ordered")
+        if rounding < 1:
+            raise ValueError("The rounding must be positive")
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.rounding = int(rounding)
+        #The days after the last point have the same factors
+        self.max_days = max(0, int(self.days[-1][0]))
+        #Factor of (days, load step) at days * (LOAD_STEPS + 1) + load step
+        load_multipliers = [interpolate(self.load, step / LOAD_STEPS)
+                            for step in range(LOAD_STEPS + 1)]
+        self._factors = []
+        for day in range(self.max_days + 1):
+            day_multiplier = interpolate(self.days, day)
+            self._factors.extend(min(max(multiplier * day_multiplier, min_factor), max_factor)
+                                 for multiplier in load_multipliers)
+
+    @classmethod
+    def from_dict(cls, config):
+        """
+        :param dict config: the arguments of the constructor, e.g. read from
+            a JSON file: ``{"load": [[0, 0.8], [1, 1.5]], "days": [[0, 1.3],
+            [30, 1]], "min_factor": 0.5, "max_factor": 2, "rounding": 5}``.
+            The missing ones have their default value.
+        :raises ValueError: if a key is unknown or a value is not valid.
+        """
+        unknown = set(config) - {"load", "days", "min_factor", "max_factor", "rounding"}
+        if unknown:
+            raise ValueError("Unknown pricing curve settings: %s" % ", ".join(sorted(unknown)))
+        try:
+            return cls(**config)
+        except TypeError as excp:
+            raise ValueError("Invalid pricing curve: %s" % excp)
+
+    def factor(self, load_factor, days):
+        """
+        :param float load_factor: the share of the seats sold.
+        :param int days: the days to departure.
+        :return: the factor applied to the base price.
+        """
+        step = min(max(int(load_factor * LOAD_STEPS), 0), LOAD_STEPS)
+        day = min(max(days, 0), self.max_days)
+        return self._factors[day * (LOAD_STEPS + 1) + step]
+
+    def prices(self, capacities, seats_left, days, base_prices):
+        """
+        Computes the prices of several flights, given by columns.
+
+        :param capacities: the initial seats of the flights.
+        :param seats_left: their seats left.
+        :param days: their days to departure.
+        :param base_prices: their base prices.
+        :return: the list of their prices.
+        """
+        factors = self._factors
+        width = LOAD_STEPS + 1
+        max_days = self.max_days
+        rounding = self.rounding
+        #Offsets of the load factors and the days in the table of factors
+        loads = [min(max((capacity - left) * LOAD_STEPS // capacity, 0), LOAD_STEPS)
+                 if capacity and capacity > 0 and left is not None else 0
+                 for capacity, left in zip(capacities, seats_left)]
+        days = [min(max(day, 0), max_days) * width for day in days]
+        if rounding == 1:
+            return [int(base * factors[day + load] + 0.5)
+                    for base, day, load in zip(base_prices, days, loads)]
+        return [int(base * factors[day + load] / rounding + 0.5) * rounding
+                for base, day, load in zip(base_prices, days, loads)]
+
+
+class Repricer(object):
+    """
+    Reprices the flights not departed yet of a database, or of every shard
+    of a :py:class:`~flight_reservation.sharding.ShardedEngine`.
+
+    :param engine: the :py:class:`~flight_reservation.flight_database.Engine`
+        of the database.
+    :param curve: the :py:class:`PricingCurve`, the default one if ``None``.
+    :param int chunk_size: number of flights repriced in one transaction.
+
+    """
+
+    def __init__(self, engine, curve=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        super(Repricer, self).__init__()
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be positive")
+        self.engine = engine
+        self.curve = curve if curve is not None else PricingCurve()
+        self.chunk_size = chunk_size
+
+    def databases(self):
+        """
+        :return: the paths of the databases holding flights.
+        """
+        if isinstance(self.engine, ShardedEngine):
+            shard_map = self.engine.shard_map
+            return [shard_map.path(key) for key in shard_map.keys()]
+        return [self.engine.db_path]
+
+    def reprice(self, today=None, dry_run=False, pause=0):
+        """
+        Sets the price of the flights departing today or later from their
+        base price, load factor and days to departure. The flights whose
+        departure date is not valid are not repriced.
+
+        :param datetime today: defaults to the current date.
+        :param bool dry_run: computes the prices without writing them.
+        :param float pause: seconds waited between two chunks.
+        :return: dictionary with the number of ``flights`` not departed yet
+            and of flights ``repriced``, whose price changed.
+        """
+        if today is None:
+            today = datetime.combine(date.today(), datetime.min.time())
+        counts = {"flights": 0, "repriced": 0}
+        #Days to departure of each departure date
+        days = {}
+        for path in self.databases():
+            #The transactions are handled explicitly
+            con = sqlite3.connect(path, isolation_level=None)
+            try:
+                #The shards have no fare calendar
+                calendar = not dry_run and con.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' \
+                     AND name = 'FareCalendarBatch'").fetchone() is not None
+                if calendar:
+                    con.execute("CREATE TEMP TABLE IF NOT EXISTS RepricedDay( \
+                                     template_id INTEGER, depDate TEXT, \
+                                     PRIMARY KEY (template_id, depDate)) WITHOUT ROWID")
+                    con.execute("DELETE FROM temp.RepricedDay")
+                last_id = None
+                repriced = 0
+                while True:
+                    if last_id is not None and pause:
+                        time.sleep(pause)
+                    last_id, flights, changed = self._reprice_chunk(con, last_id, today, days,
+                                                                    dry_run, calendar)
+                    counts["flights"] += flights
+                    repriced += changed
+                    if last_id is None:
+                        break
+                if calendar and repriced:
+                    self._refresh_fares(con)
+                counts["repriced"] += repriced
+            finally:
+                con.close()
+        return counts
+
+    def _reprice_chunk(self, con, after, today, days, dry_run, calendar):
+        """
+        Reprices the flights of the chunk following the flight *after* in
+        one transaction.
+
+        :param dict days: the days to departure of the departure dates,
+            completed with the ones of the chunk.
+        :param bool calendar: whether the database has a fare calendar. The
+            days of the flights repriced are added to ``temp.RepricedDay``
+            instead of being refreshed by the triggers.
+        :return: ``(id of the last flight of the chunk or None after the
+            last chunk, flights not departed yet, flights repriced)``.
+        """
+        if after is None:
+            after = -1
+        #Taking the write lock first, the flights cannot be booked meanwhile
+        con.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+        try:
+            rows = con.execute('SELECT Flight.flight_id, Flight.price, Flight.depDate, \
+                                       Flight.nbInitialSeats, Flight.nbSeatsLeft, \
+                                       Flight.template_id, FlightBasePrice.basePrice \
+                                FROM Flight LEFT JOIN FlightBasePrice \
+                                     ON FlightBasePrice.flight_id = Flight.flight_id \
+                                WHERE Flight.flight_id > ? ORDER BY Flight.flight_id LIMIT ?',
+                               (after, self.chunk_size)).fetchall()
+            if not rows:
+                con.execute("COMMIT")
+                return None, 0, 0
+            (flight_ids, prices, dep_dates, capacities, seats_left, template_ids,
+             base_prices) = zip(*rows)
+            for dep_date in set(dep_dates) - set(days):
+                try:
+                    days[dep_date] = (parse_date(str(dep_date)) - today).days
+                except ValueError:
+                    days[dep_date] = None
+            active = [index for index, dep_date in enumerate(dep_dates)
+                      if days[dep_date] is not None and days[dep_date] >= 0
+                      and prices[index] is not None]
+            #The first repricing of a flight keeps its price as base price
+            new_bases = [(flight_ids[index], prices[index]) for index in active
+                         if base_prices[index] is None]
+            base_prices = [prices[index] if base_prices[index] is None else base_prices[index]
+                           for index in active]
+            new_prices = self.curve.prices([capacities[index] for index in active],
+                                           [seats_left[index] for index in active],
+                                           [days[dep_dates[index]] for index in active],
+                                           base_prices)
+            changed = [(price, flight_ids[index]) for index, price in zip(active, new_prices)
+                       if price != prices[index]]
+            if not dry_run:
+                con.executemany('INSERT INTO FlightBasePrice (flight_id, basePrice) VALUES (?, ?)',
+                                new_bases)
+                if calendar and changed:
+                    #The trigger refreshing the day of every flight updated
+                    #is skipped, the days are refreshed once at the end
+                    con.execute("INSERT INTO FareCalendarBatch VALUES (1)")
+                    con.executemany("INSERT OR IGNORE INTO temp.RepricedDay VALUES (?, ?)",
+                                    ((template_ids[index], dep_dates[index])
+                                     for index, price in zip(active, new_prices)
+                                     if price != prices[index]))
+                con.executemany('UPDATE Flight SET price = ? WHERE flight_id = ?', changed)
+                if calendar and changed:
+                    con.execute("DELETE FROM FareCalendarBatch")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        last_id = flight_ids[-1] if len(rows) == self.chunk_size else None
+        return last_id, len(active), len(changed)
+
+    def _refresh_fares(self, con):
+        """
+        Computes again the ``FareCalendar`` rows of the routes and days in
+        ``temp.RepricedDay``, like the triggers of the ``Flight`` table, in
+        one transaction.
+        """
+        days = "SELECT DISTINCT TemplateFlight.origin, TemplateFlight.destination, \
+                                RepricedDay.depDate \
+                FROM temp.RepricedDay \
+                     JOIN TemplateFlight ON TemplateFlight.tflight_id = RepricedDay.template_id"
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute("DELETE FROM FareCalendar WHERE (origin, destination, depDate) IN (%s)"
+                        % days)
+            #The joins are written in the order of the indexes to use
+            con.execute("INSERT INTO FareCalendar (origin, destination, depDate, minPrice, \
+                                                   seatsLeft, nbFlights) \
+                         SELECT day.origin, day.destination, day.depDate, \
+                                MIN(CASE WHEN Flight.nbSeatsLeft > 0 THEN Flight.price END), \
+                                SUM(MAX(Flight.nbSeatsLeft, 0)), COUNT(*) \
+                         FROM (%s) AS day \
+                              CROSS JOIN TemplateFlight ON TemplateFlight.origin = day.origin \
+                                   AND TemplateFlight.destination = day.destination \
+                              CROSS JOIN Flight ON Flight.template_id = TemplateFlight.tflight_id \
+                                   AND Flight.depDate = day.depDate \
+                         GROUP BY day.origin, day.destination, day.depDate" % days)
+            con.execute("DELETE FROM temp.RepricedDay")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
@@ -4,10 +4,12 @@ Created on 29.03.2018
 '''
 
 import json
+import sys
+from datetime import datetime
 
 from urllib.parse import unquote
 
-from flask import Flask, request, Response, g, _request_ctx_stack, redirect, send_from_directory
+from flask import Flask, request, Response, g, _request_ctx_stack, redirect, current_app
 from flask_restful import Resource, Api, abort
 from werkzeug.exceptions import NotFound, UnsupportedMediaType
 
@@ -15,6 +17,9 @@ from flight_reservation import flight_database as database
 #import flight_database as database
 from flight_reservation.flight_database import NoMoreSeatsAvailableException, EmailFormatException, DateFormatException, PhoneNumberFormatException
 #from flight_database import NoMoreSeatsAvailableException, EmailFormatException, DateFormatException, PhoneNumberFormatException
+from flight_reservation.metrics import DB_TIME_ENVIRON_KEY
+from flight_reservation import validation
+from flight_reservation import seat_events
 
 # Constants for hypermedia formats and profiles
 MASON = "application/vnd.mason+json"
@@ -24,6 +29,7 @@ FLIGHT_BOOKING_SYSTEM_RESERVATION_PROFILE = "/profiles/reservation-profile/"
 FLIGHT_BOOKING_SYSTEM_TICKET_PROFILE = "/profiles/ticket-profile/"
 FLIGHT_BOOKING_SYSTEM_FLIGHT_PROFILE = "/profiles/flight-profile/"
 FLIGHT_BOOKING_SYSTEM_TEMPLATE_FLIGHT_PROFILE = "/profiles/template-flight-profile/"
+FLIGHT_BOOKING_SYSTEM_WAITLIST_PROFILE = "/profiles/waitlist-profile/"
 ERROR_PROFILE = "/profiles/error-profile"
 
 # Apiary documentation
@@ -36,17 +42,35 @@ RESERVATION_SCHEMA_URL = "/flight-booking-system/schema/user/reservation"
 TICKET_SCHEMA_URL = "/flight-booking-system/schema/user/ticket"
 FLIGHT_SCHEMA_URL = "/flight-booking-system/schema/user/flight"
 TEMPLATE_FLIGHT_SCHEMA_URL="/flight-booking-system/schema/template-flight"
+WAITLIST_SCHEMA_URL = "/flight-booking-system/schema/user/waitlist"
+ITINERARY_SCHEMA_URL = "/flight-booking-system/schema/user/itinerary"
 LINK_RELATIONS_URL = "/flight-booking-system/link-relations/"
 
-# Define the application and the api
-app = Flask(__name__, static_folder="static", static_url_path="/.")
-app.debug = True
-# Set the database Engine. In order to modify the database file (e.g. for
-# testing) provide the database path   app.config to modify the
-# database to be used (for instance for testing)
-app.config.update({"Engine": database.Engine()})
-# Start the RESTful API.
-api = Api(app)
+# Items of a page of search results
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Months of fares of a route returned by the fare calendar
+FARE_CALENDAR_MONTH_FORMAT = "%Y-%m"
+
+# Schema url (without the /flight-booking-system/schema/ prefix): name of the
+# schema in static/schema, also used to validate the request bodies
+SCHEMA_NAMES = {
+    "user": "user",
+    "user/reservation": "reservation",
+    "user/ticket": "ticket",
+    "user/flight": "flight",
+    "template-flight": "template-flight",
+    "user/waitlist": "waitlist",
+    "user/itinerary": "itinerary",
+}
+
+# Seconds the clients may reuse a schema before revalidating it with its ETag
+SCHEMA_MAX_AGE = 86400
+
+# Define the api. Its resources are registered on the application built by
+# create_app
+api = Api()
 
 
 # These two classes below are how we make producing the resource representation
@@ -70,16 +94,16 @@ class MasonObject(dict):
         object, and only in error scenarios.
 
         Note: Mason allows more than one string in the @messages property (it's
-        in fact an array). However we are being lazy and supporting just one
-        message.
+        in fact an array). A list of details is sent as several messages, for
+        instance one message per invalid field.
 
         :param str title: Short title for the error
-        :param str details: Longer human-readable description
+        :param details: Longer human-readable description, or a list of them
         """
 
         self["@error"] = {
             "@message": title,
-            "@messages": [details],
+            "@messages": details if isinstance(details, list) else [details],
         }
 
     def add_namespace(self, ns, uri):
@@ -225,6 +249,31 @@ class FlightBookingObject(MasonObject):
             "schemaUrl": RESERVATION_SCHEMA_URL
         }
 
+    def add_control_book_itinerary(self):
+        """
+        Adds the control to book several flights at once
+        """
+        self["@controls"]["flight-booking-system:book-itinerary"] = {
+            "title": "Book this flight with other flights, all or none",
+            "href": api.url_for(Itineraries),
+            "encoding": "application/json",
+            "method": "POST",
+            "schemaUrl": ITINERARY_SCHEMA_URL
+        }
+
+    def add_control_join_waitlist(self, flight_id):
+        """
+        Adds the control to wait for a seat of a full flight
+        :param flight_id: the id of the flight
+        """
+        self["@controls"]["flight-booking-system:join-waitlist"] = {
+            "title": "Wait for a seat of this flight",
+            "href": api.url_for(FlightWaitlist, flight_id=flight_id),
+            "encoding": "application/json",
+            "method": "POST",
+            "schemaUrl": WAITLIST_SCHEMA_URL
+        }
+
     def add_control_add_flight(self, template_id):
         """
         Adds the control to add a new flight.
@@ -250,6 +299,20 @@ class FlightBookingObject(MasonObject):
             "method": "GET",
         }
 
+    def add_control_fare_calendar(self, origin, destination):
+        """
+        Adds the control to get the lowest fares of a route, per day of a
+        month
+        :param origin: the origin of the route
+        :param destination: the destination of the route
+        """
+        self["@controls"]["flight-booking-system:fare-calendar"] = {
+            "title": "Lowest fares of the route per day of a month",
+            "href": api.url_for(FareCalendar, origin=origin, destination=destination) + "{&month}",
+            "isHrefTemplate": True,
+            "method": "GET",
+        }
+
     def add_control_add_ticket(self):
         """
         Adds the control to create a new ticket
@@ -351,7 +414,20 @@ def create_error_response(status_code, title, message=None):
     return Response(json.dumps(envelope), status_code, mimetype=MASON + ";" + ERROR_PROFILE)
 
 
-@app.before_request
+def optional_feature(name):
+    """
+    :param str name: the name of an optional module of the package
+        (``sql_tracer``, ``slow_query_log`` or ``seat_counters``).
+    :return: the object installed in the configuration of the current
+        application by the ``enable`` function of the module, or None. The
+        module is not imported here: it can only be enabled once imported.
+    """
+    module = sys.modules.get("flight_reservation." + name)
+    if module is None:
+        return None
+    return current_app.config.get(module.CONFIG_KEY)
+
+
 def connect_db():
     """
     Creates a database connection before the request is proccessed.
@@ -362,11 +438,36 @@ def connect_db():
     @author: ivan
     """
 
-    g.con = app.config["Engine"].connect()
+    g.con = current_app.config["Engine"].connect()
+    tracer = optional_feature("sql_tracer")
+    if tracer is not None:
+        g.sql_trace = tracer.start(g.con)
+    slow_queries = optional_feature("slow_query_log")
+    if slow_queries is not None:
+        slow_queries.attach(g.con)
+    seat_counters = optional_feature("seat_counters")
+    if seat_counters is not None:
+        g.con.seat_listeners.append(seat_counters.set)
+        seat_counters.maybe_reconcile(g.con)
+
+
+def counters_flight_full(flight_id, nb_tickets):
+    """
+    Checks the seats left of a flight in the shared seat counters, without
+    a query. The counters are only a fast path to refuse a full flight: the
+    database still checks the seats left of every booking.
+
+    :return: True if the seat counters hold the flight with fewer seats
+        left than *nb_tickets*.
+    """
+    seat_counters = optional_feature("seat_counters")
+    if seat_counters is None or not nb_tickets:
+        return False
+    seats = seat_counters.get(flight_id)
+    return seats is not None and seats < nb_tickets
 
 
 # HOOKS
-@app.teardown_request
 def close_connection(exc):
     """
     Closes the database connection
@@ -376,10 +477,158 @@ def close_connection(exc):
     @author: ivan
     """
 
+    if hasattr(g, "sql_trace"):
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        optional_feature("sql_tracer").finish(g.sql_trace, endpoint)
     if hasattr(g, "con"):
+        #Time spent in the database, recorded by the metrics middleware
+        request.environ[DB_TIME_ENVIRON_KEY] = g.con.db_time
         g.con.close()
 
 
+class Search(Resource):
+
+    def get(self):
+        """
+            Full-text search of the users, by name, email and phone number,
+            and of the passengers of the tickets, by name.
+
+            QUERY PARAMETERS:
+            * q: the words searched. Every word of two characters or more
+              matches the words starting with it.
+            * limit: the maximum number of items, 1 to 100 (default 20).
+            * offset: the number of best items skipped (default 0).
+
+            RESPONSE STATUS CODE:
+             * 200 with the items, best match first.
+             * 400 if q has no word or limit or offset is not valid.
+
+            RESPONSE ENTITITY BODY:
+
+             OUTPUT:
+                * Media type: application/vnd.mason+json
+                    https://github.com/JornWildt/Mason
+                * Profile: User
+                    /profiles/user-profile
+
+            Link relations used: self, next, prev
+            Link relations used in items: self, profile, author
+
+            Semantic descriptions used in items: kind, user_id, ticket_id,
+            reservation_id, firstName, lastName
+        """
+        text = request.args.get("q", "")
+        try:
+            limit = int(request.args.get("limit", SEARCH_DEFAULT_LIMIT))
+            offset = int(request.args.get("offset", 0))
+        except ValueError:
+            return create_error_response(400, "Wrong request format",
+                                         "limit and offset must be integers")
+        if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+            return create_error_response(400, "Wrong request format",
+                                         "limit must be between 1 and %d and offset positive"
+                                         % SEARCH_MAX_LIMIT)
+        if database.search_query(text) is None:
+            return create_error_response(400, "Wrong request format",
+                                         "The search must contain a word of at least %d characters"
+                                         % database.MIN_SEARCH_WORD)
+
+        #One more result tells whether there is a next page
+        results = g.con.search(text, limit + 1, offset)
+
+        envelope = FlightBookingObject()
+        envelope.add_namespace("flight-booking-system", LINK_RELATIONS_URL)
+        envelope.add_control("self", href=api.url_for(Search, q=text, limit=limit, offset=offset))
+        if len(results) > limit:
+            envelope.add_control("next", href=api.url_for(Search, q=text, limit=limit,
+                                                          offset=offset + limit))
+        if offset > 0:
+            envelope.add_control("prev", href=api.url_for(Search, q=text, limit=limit,
+                                                          offset=max(offset - limit, 0)))
+
+        items = envelope["items"] = []
+        for result in results[:limit]:
+            item = FlightBookingObject(
+                kind=result["kind"],
+                user_id=result["userid"],
+                firstName=result["firstname"],
+                lastName=result["lastname"],
+            )
+            if result["kind"] == "user":
+                item.add_control("self", href=api.url_for(User, user_id=result["userid"]))
+                item.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_USER_PROFILE)
+            else:
+                item["ticket_id"] = result["id"]
+                item["reservation_id"] = result["reservationid"]
+                item.add_control("self", href=api.url_for(Ticket, ticket_id=result["id"]))
+                item.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_TICKET_PROFILE)
+                item.add_control_author(result["userid"])
+            items.append(item)
+
+        return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_USER_PROFILE)
+
+
+class FareCalendar(Resource):
+
+    def get(self):
+        """
+            Gets the lowest fare of a route for every day of a month, for
+            the date pickers.
+
+            QUERY PARAMETERS:
+            * origin: the origin of the template flights.
+            * destination: the destination of the template flights.
+            * month: the month, YYYY-MM.
+
+            RESPONSE STATUS CODE:
+             * 200 with one item per day with flights, ordered by day.
+             * 400 if a parameter is missing or the month is not valid.
+
+            RESPONSE ENTITITY BODY:
+
+             OUTPUT:
+                * Media type: application/vnd.mason+json
+                    https://github.com/JornWildt/Mason
+                * Profile: Flight
+                    /profiles/flight-profile/
+
+            Link relations used: self, prev, next
+
+            Semantic descriptions used in items: date, minPrice, seatsLeft,
+            nbFlights. minPrice is the price of the cheapest flight with
+            seats left, null if all the flights of the day are full.
+        """
+        origin = request.args.get("origin")
+        destination = request.args.get("destination")
+        month = request.args.get("month", "")
+        if not origin or not destination:
+            return create_error_response(400, "Wrong request format",
+                                         "origin and destination are required")
+        try:
+            start = datetime.strptime(month, FARE_CALENDAR_MONTH_FORMAT)
+        except ValueError:
+            return create_error_response(400, "Wrong request format",
+                                         "month must have the format YYYY-MM")
+        end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        previous = datetime(start.year - (start.month == 1), (start.month - 2) % 12 + 1, 1)
+
+        fares = g.con.get_fare_calendar(origin, destination, start.strftime(database.DATE_FORMAT),
+                                        end.strftime(database.DATE_FORMAT))
+
+        envelope = FlightBookingObject(origin=origin, destination=destination,
+                                       month=start.strftime(FARE_CALENDAR_MONTH_FORMAT))
+        envelope.add_namespace("flight-booking-system", LINK_RELATIONS_URL)
+        for rel, first_day in (("self", start), ("prev", previous), ("next", end)):
+            envelope.add_control(rel, href=api.url_for(
+                FareCalendar, origin=origin, destination=destination,
+                month=first_day.strftime(FARE_CALENDAR_MONTH_FORMAT)))
+        envelope["items"] = [{"date": fare["date"], "minPrice": fare["minprice"],
+                              "seatsLeft": fare["seatsleft"], "nbFlights": fare["flights"]}
+                             for fare in fares]
+
+        return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_FLIGHT_PROFILE)
+
+
 class User(Resource):
 
     def get(self, user_id):
@@ -462,23 +711,21 @@ class User(Resource):
         if not request_body:
             return create_error_response(415, "Unsupported Media Type", "Use  JSON format")
 
-        # Get the user info from database
-        user_db = g.con.get_user(user_id)
-
-        try:
-            # Create a dict with the updated info of the user
-            # We don't need the id and registration date as
-            # we DO NOT allow to edit these attributes
-            updated_user = {
-                "firstname": request_body["firstName"],
-                "lastname": request_body["lastName"],
-                "email": request_body["email"],
-                "phonenumber": request_body["phoneNumber"],
-                "dateofBirth": request_body["birthDate"],
-                "gender": request_body["gender"],
-            }
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        errors = validation.validate("user", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
+        # Create a dict with the updated info of the user
+        # We don't need the id and registration date as
+        # we DO NOT allow to edit these attributes
+        updated_user = {
+            "firstname": request_body["firstName"],
+            "lastname": request_body["lastName"],
+            "email": request_body["email"],
+            "phonenumber": request_body["phoneNumber"],
+            "dateofBirth": request_body["birthDate"],
+            "gender": request_body["gender"],
+        }
 
         try:
             if g.con.modify_user(user_id, updated_user) is None:
@@ -547,6 +794,9 @@ class Users(Resource):
 
         envelope.add_control("self", href=api.url_for(Users))
         envelope.add_control_add_user()
+        envelope.add_control("flight-booking-system:search",
+                             href=api.url_for(Search) + "{?q,limit,offset}", isHrefTemplate=True,
+                             title="Search users and passengers", method="GET")
 
         items = envelope["items"] = []
 
@@ -610,35 +860,24 @@ class Users(Resource):
                                          "Use a JSON compatible format",
                                          )
 
-        # Check conflict with email
-        try:
-            email = request_body["email"]
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "User email was missing from the request")
+        errors = validation.validate("user", request_body)
 
         # Conflict if the email already exists
-        if g.con.contains_user_with_email(email):
+        email = request_body.get("email") if isinstance(request_body, dict) else None
+        if isinstance(email, str) and g.con.contains_user_with_email(email):
             return create_error_response(409, "Wrong email",
                                          "There is already a user with the same email: " + email)
 
-        # pick up rest of the mandatory fields
-        try:
-            first_name = request_body["firstName"]
-            last_name = request_body["lastName"]
-            phone_number = request_body["phoneNumber"]
-            email = request_body["email"]
-            birth_date = request_body["birthDate"]
-            gender = request_body["gender"]
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
 
         user = {
-            'firstname': first_name,
-            'lastname': last_name,
-            'phonenumber': phone_number,
+            'firstname': request_body["firstName"],
+            'lastname': request_body["lastName"],
+            'phonenumber': request_body["phoneNumber"],
             'email': email,
-            'dateofBirth': birth_date,
-            'gender': gender,
+            'dateofBirth': request_body["birthDate"],
+            'gender': request_body["gender"],
         }
 
         try:
@@ -814,16 +1053,18 @@ class Reservations(Resource):
             RESPONSE STATUS CODE:
              * Returns 201 + the url of the new resource in the Location header if the reservation is created
              * Return 409 if the user has already booked the flight
+             * Return 409 if the flight is full, the client should join its waitlist
              * Return 400 if the request body is not well formed or user id / flight id is incorrect
              * Return 415 if it receives a media type != application/json
              * Return 500 if there is a database error
 
             NOTE:
-            The: py: method:`Connection.create_reservation()` receives as a parameter a
-            dictionary with the following format.
+            The: py: method:`Connection.create_itinerary()` receives as a parameter a
+            dictionary with the following format, with the only flight booked.
             {
                 'userid': ,
-                'flightid': ,
+                'flightids': [flight_id],
+                'tickets': [{'firstname': , 'lastname': , 'age': , 'gender': }]
             }
 
         """
@@ -839,14 +1080,19 @@ class Reservations(Resource):
             return create_error_response(415, "Unsupported Media Type",
                                          "Use a JSON compatible format")
 
-        # pick up rest of the mandatory fields
-        try:
-            user_id = request_body["user_id"]
-            flight_id = request_body["flight_id"]
-            tickets = request_body.get("tickets", [])
-        except KeyError:
-            return create_error_response(400, "Wrong request format",
-                                         "Be sure to include all mandatory properties")
+        errors = validation.validate("reservation", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
+        user_id = request_body["user_id"]
+        flight_id = request_body["flight_id"]
+        tickets = request_body.get("tickets", [])
+
+        # A flight the shared seat counters see full is refused before any query
+        if counters_flight_full(flight_id, len(tickets)):
+            return create_error_response(409, "Flight is full",
+                                         "No more seats are available for the flight. Join its waitlist: "
+                                         + api.url_for(FlightWaitlist, flight_id=flight_id))
 
         # Check if user exists
         if not g.con.contains_user(user_id):
@@ -868,42 +1114,139 @@ class Reservations(Resource):
         if has_booked:
             return create_error_response(409, "Already booked",
                                          "The user " + str(user_id) + " has already booked the flight " + str(flight_id))
-        reservation = {
+        # The reservation and its tickets are created in one transaction: a
+        # full flight books none of them
+        itinerary = {
             'userid': user_id,
-            'flightid': flight_id
+            'flightids': [flight_id],
+            'tickets': [{'firstname': ticket["firstName"],
+                         'lastname': ticket["familyName"],
+                         'age': ticket["age"],
+                         'gender': ticket["gender"]} for ticket in tickets]
         }
 
         try:
-            reservation_id = g.con.create_reservation(reservation)
-        except ValueError:
-            return create_error_response(400, "Wrong request format",
-                                         "Be sure you include all mandatory properties")
-
-        # Create the tickets specified (if any)
-        for ticket in tickets:
-            # Check fields
-            try:
-                first_name = ticket["firstName"]
-                last_name = ticket["familyName"]
-                age = ticket["age"]
-                gender = ticket["gender"]
-                seat = ticket["seat"]
-            except ValueError:
-                return create_error_response(400, "Wrong request format",
-                                             "Be sure you include all mandatory properties")
-
-            # Try to create the ticket
-            try:
-                ticket["reservationid"] = reservation_id
-                g.con.create_ticket(ticket)
-            except NoMoreSeatsAvailableException:
-                return create_error_response(500, "Flight is full",
-                                             "No more seats are available for the flight")
+            reservations = g.con.create_itinerary(itinerary)
+        except NoMoreSeatsAvailableException:
+            return create_error_response(409, "Flight is full",
+                                         "No more seats are available for the flight. Join its waitlist: "
+                                         + api.url_for(FlightWaitlist, flight_id=flight_id))
+        if reservations is None:
+            return create_error_response(409, "Already booked",
+                                         "The user " + str(user_id) + " has already booked the flight " + str(flight_id))
+        reservation_id = reservations[flight_id]
 
         # CREATE RESPONSE AND RENDER
         return Response(status=201,
                         headers={"Location": api.url_for(Reservation, reservation_id=reservation_id)})
 
+class Itineraries(Resource):
+
+    def post(self):
+        """
+            Books several flights at once, e.g. the two legs of a round trip:
+            a reservation of the user for every flight, with a ticket for
+            every passenger. Either all the reservations are created or none.
+
+            REQUEST ENTITY BODY:
+             * Media type: JSON
+             * Profile: Itinerary
+
+            Semantic descriptors used in template: user_id, flight_ids, tickets
+
+            RESPONSE STATUS CODE:
+             * Returns 201 + the url of the reservations of the user in the Location header
+               and the reservations created in the body
+             * Return 409 if the user has already booked one of the flights
+             * Return 409 if one of the flights has not enough seats left
+             * Return 400 if the request body is not well formed or the user id / a flight id is incorrect
+             * Return 415 if it receives a media type != application/json
+
+            NOTE:
+            The: py: method:`Connection.create_itinerary()` receives as a parameter a
+            dictionary with the following format.
+            {
+                'userid': ,
+                'flightids': [],
+                'tickets': [{'firstname': , 'lastname': , 'age': , 'gender': }]
+            }
+        """
+
+        # Check Content-Type
+        if JSON != request.headers.get("Content-Type", ""):
+            abort(415)
+        # PARSE THE REQUEST:
+        request_body = request.get_json(force=True)
+
+        # Check that body is JSON
+        if not request_body:
+            return create_error_response(415, "Unsupported Media Type",
+                                         "Use a JSON compatible format")
+
+        errors = validation.validate("itinerary", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
+        user_id = request_body["user_id"]
+        flight_ids = request_body["flight_ids"]
+
+        # A flight the shared seat counters see full is refused before any query
+        for flight_id in flight_ids:
+            if counters_flight_full(flight_id, len(request_body["tickets"])):
+                return create_error_response(409, "Flight is full",
+                                             "No more seats are available for the flight " + str(flight_id)
+                                             + ". Join its waitlist: "
+                                             + api.url_for(FlightWaitlist, flight_id=flight_id))
+
+        if not g.con.contains_user(user_id):
+            return create_error_response(400, "Invalid user",
+                                         "The user chosen to book the itinerary does not exist.")
+        if len(set(flight_ids)) != len(flight_ids):
+            return create_error_response(400, "Invalid flight",
+                                         "A flight is given more than once in the itinerary.")
+        for flight_id in flight_ids:
+            if not g.con.contains_flight(flight_id):
+                return create_error_response(400, "Invalid flight",
+                                             "The flight " + str(flight_id) + " does not exist.")
+
+        itinerary = {
+            'userid': user_id,
+            'flightids': flight_ids,
+            'tickets': [{'firstname': ticket["firstName"],
+                         'lastname': ticket["familyName"],
+                         'age': ticket["age"],
+                         'gender': ticket["gender"]} for ticket in request_body["tickets"]]
+        }
+
+        try:
+            reservations = g.con.create_itinerary(itinerary)
+        except NoMoreSeatsAvailableException as excp:
+            return create_error_response(409, "Flight is full",
+                                         "No more seats are available for the flight " + str(excp.flight_id)
+                                         + ". Join its waitlist: "
+                                         + api.url_for(FlightWaitlist, flight_id=excp.flight_id))
+        if reservations is None:
+            return create_error_response(409, "Already booked",
+                                         "The user " + str(user_id) + " has already booked one of the flights")
+
+        # CREATE RESPONSE AND RENDER
+        envelope = FlightBookingObject()
+        envelope.add_namespace("flight-booking-system", LINK_RELATIONS_URL)
+        envelope.add_control("collection", href=api.url_for(UserReservations, user_id=user_id))
+
+        items = envelope["items"] = []
+        for flight_id in flight_ids:
+            item = FlightBookingObject(
+                reservation_id=reservations[flight_id],
+                flight_id=flight_id
+            )
+            item.add_control("self", href=api.url_for(Reservation, reservation_id=reservations[flight_id]))
+            item.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_RESERVATION_PROFILE)
+            items.append(item)
+
+        return Response(json.dumps(envelope), 201, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_RESERVATION_PROFILE,
+                        headers={"Location": api.url_for(UserReservations, user_id=user_id)})
+
 class Ticket(Resource):
     def get(self, ticket_id):
         """
@@ -983,21 +1326,22 @@ class Ticket(Resource):
         if not request_body:
             return create_error_response(415, "Unsupported Media Type", "Use  JSON format")
 
+        errors = validation.validate("ticket", request_body, require=("seat",))
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
         # Get the ticket info from database
         ticket = g.con.get_ticket(ticket_id)
-        try:
-            # Create a dict with the updated info of the ticket
-            # We don't need the id
-            # we DO NOT allow to edit these attributes
-            updated_ticket = {
-                "firstname": request_body["firstName"],
-                "lastname": request_body["familyName"],
-                "age": request_body["age"],
-                "gender": request_body["gender"],
-                "seat": request_body["seat"],
-            }
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        # Create a dict with the updated info of the ticket
+        # We don't need the id
+        # we DO NOT allow to edit these attributes
+        updated_ticket = {
+            "firstname": request_body["firstName"],
+            "lastname": request_body["familyName"],
+            "age": request_body["age"],
+            "gender": request_body["gender"],
+            "seat": request_body["seat"],
+        }
 
         updated_ticket["reservationid"] = g.con.get_ticket(ticket_id)["reservationid"]
         if g.con.modify_ticket(ticket_id, updated_ticket) is None:
@@ -1085,22 +1429,16 @@ class Tickets(Resource):
                                          "There is already a user with the same email: " + email)
         """
 
-        # pick up rest of the mandatory fields
-        try:
-            firstName = request_body["firstName"]
-            familyName = request_body["familyName"]
-            age = request_body["age"]
-            gender = request_body["gender"]
-            reservation_id = request_body["reservation_id"]
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        errors = validation.validate("ticket", request_body, require=("reservation_id",))
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
 
         ticket = {
             'firstname': request_body["firstName"],
-            'lastname': familyName,
-            'age': age,
-            'gender': gender,
-            'reservationid': reservation_id,
+            'lastname': request_body["familyName"],
+            'age': request_body["age"],
+            'gender': request_body["gender"],
+            'reservationid': request_body["reservation_id"],
         }
 
         try:
@@ -1196,7 +1534,8 @@ class Flight(Resource):
             * Media type recommended: application/vnd.mason+json
             * Profile recommended: Flight
 
-            Link relations used: self, profile, collection, make-reservation, subsection
+            Link relations used: self, profile, collection, make-reservation, book-itinerary,
+            join-waitlist, seats-stream, subsection
             Semantic descriptors used in template: flight_id, template_id, code, gate ,
             price,depDate,arrDate, nbInitialSeats, nbSeatsLeft
 
@@ -1244,11 +1583,244 @@ class Flight(Resource):
         envelope.add_control("subsection", href=api.url_for(TemplateFlights, template_id = flight_db["searchresultid"]),
                                                             method="GET")
         envelope.add_control_make_reservation()
+        envelope.add_control_book_itinerary()
+        envelope.add_control_join_waitlist(flight_id)
+        envelope.add_control("flight-booking-system:seats-stream",
+                             href=api.url_for(FlightSeats, flight_id=flight_id),
+                             title="Stream of the seats left", method="GET")
 
 
         return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_FLIGHT_PROFILE)
 
 
+class FlightSeats(Resource):
+    def get(self, flight_id):
+        """
+            Stream of the seats left of a flight, as Server-Sent Events.
+
+            INPUT PARAMETER:
+            : param str flight_id: identifier of the flight.
+
+            OUTPUT:
+            * Return 200 and keep the response open if the flight id exists.
+            * Return 404 if the flight id is not stored in the system.
+            * Return 503 if the process has too many streams open.
+
+            RESPONSE ENTITY BODY:
+            * Media type: text/event-stream
+
+            Every event is named ``seats`` and its data is
+            ``{"flight_id": , "nbSeatsLeft": }``. The first event carries the
+            current seats left. A client reconnecting with the
+            ``Last-Event-ID`` header receives the changes since that event
+            instead. See :py:mod:`flight_reservation.seat_events`.
+            """
+
+        state = g.con.get_flight_seats(flight_id)
+        engine = current_app.config["Engine"].engine_for_flight(flight_id)
+        if state is None or engine is None:
+            return create_error_response(404,
+                                         title="Unknown flight",
+                                         message="There is no flight with id " + str(flight_id))
+        limiter = seat_events.stream_limiter
+        if not limiter.acquire():
+            resp = create_error_response(503, "Too many streams",
+                                         "Too many seat streams are open, try again later.")
+            resp.headers["Retry-After"] = str(seat_events.STREAMS_RETRY_AFTER)
+            return resp
+        try:
+            broker = seat_events.broker_for(engine)
+            last_event_id = seat_events.parse_last_event_id(request.headers.get("Last-Event-ID"))
+            stream = seat_events.SeatStream(broker, flight_id, state, last_event_id, limiter=limiter)
+        except Exception:
+            limiter.release()
+            raise
+        return Response(stream, 200, mimetype=seat_events.EVENT_STREAM,
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class FlightWaitlist(Resource):
+    def get(self, flight_id):
+        """
+            Gets the users waiting for a seat of a flight, head of the
+            waitlist first.
+
+            RESPONSE STATUS CODE:
+             * 200 if the flight exists
+             * 404 if the flight_id does not exist in the database
+
+            RESPONSE ENTITITY BODY:
+            * Media type: application/vnd.mason+json
+            * Profile: Waitlist
+
+            Link relations used: self, up, join-waitlist
+
+            Semantic descriptors used in items: waitlist_id, user_id, priority,
+            position
+        """
+
+        if not g.con.contains_flight(flight_id):
+            return create_error_response(404,
+                                         title="Unknown flight",
+                                         message="There is no flight with id " + str(flight_id))
+
+        envelope = FlightBookingObject()
+
+        envelope.add_namespace("flight-booking-system", LINK_RELATIONS_URL)
+
+        envelope.add_control("self", href=api.url_for(FlightWaitlist, flight_id=flight_id))
+        envelope.add_control("up", href=api.url_for(Flight, flight_id=flight_id))
+        envelope.add_control_join_waitlist(flight_id)
+
+        items = envelope["items"] = []
+
+        for entry in g.con.get_waitlist(flight_id):
+            item = FlightBookingObject(
+                waitlist_id=entry["waitlistid"],
+                user_id=entry["userid"],
+                priority=entry["priority"],
+                position=entry["position"]
+            )
+            item.add_control("self", href=api.url_for(WaitlistEntry, waitlist_id=entry["waitlistid"]))
+            item.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_WAITLIST_PROFILE)
+            items.append(item)
+
+        return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_WAITLIST_PROFILE)
+
+    def post(self, flight_id):
+        """
+            Adds a user to the waitlist of a full flight. The seats returned
+            to the flight are booked for the head of the waitlist, highest
+            priority first then in order of arrival.
+
+            REQUEST ENTITY BODY:
+             * Media type: JSON
+             * Profile: Waitlist
+
+            Semantic descriptors used in template: user_id, priority,
+            firstName, familyName, age, gender
+
+            RESPONSE STATUS CODE:
+             * Returns 201 + the url of the entry in the Location header
+             * Return 404 if the flight does not exist
+             * Return 409 if the flight has seats left or the user is already waiting for it
+             * Return 400 if the request body is not well formed or the user id is incorrect
+             * Return 415 if it receives a media type != application/json
+        """
+
+        # Check Content-Type
+        if JSON != request.headers.get("Content-Type", ""):
+            abort(415)
+        # PARSE THE REQUEST:
+        request_body = request.get_json(force=True)
+
+        # Check that body is JSON
+        if not request_body:
+            return create_error_response(415, "Unsupported Media Type",
+                                         "Use a JSON compatible format")
+
+        errors = validation.validate("waitlist", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
+        flight_db = g.con.get_flight(flight_id)
+        if not flight_db:
+            return create_error_response(404,
+                                         title="Unknown flight",
+                                         message="There is no flight with id " + str(flight_id))
+
+        user_id = request_body["user_id"]
+        if not g.con.contains_user(user_id):
+            return create_error_response(400, "Invalid user",
+                                         "The user chosen to wait for the flight does not exist.")
+
+        if flight_db["seatsleft"] > 0:
+            return create_error_response(409, "Seats available",
+                                         "The flight " + str(flight_id) + " has seats left, book one instead")
+
+        entry = {
+            'userid': user_id,
+            'flightid': flight_id,
+            'priority': request_body.get("priority", 0),
+            'firstname': request_body["firstName"],
+            'lastname': request_body["familyName"],
+            'age': request_body["age"],
+            'gender': request_body["gender"],
+        }
+        waitlist_id = g.con.create_waitlist_entry(entry)
+        if waitlist_id is None:
+            return create_error_response(409, "Already waiting",
+                                         "The user " + str(user_id) + " is already waiting for the flight "
+                                         + str(flight_id))
+
+        # CREATE RESPONSE AND RENDER
+        return Response(status=201,
+                        headers={"Location": api.url_for(WaitlistEntry, waitlist_id=waitlist_id)})
+
+
+class WaitlistEntry(Resource):
+    def get(self, waitlist_id):
+        """
+            Gets an entry of a waitlist and its position.
+
+            OUTPUT:
+             * Return 200 if the entry exists.
+             * Return 404 if the waitlist id is not stored in the system.
+
+            RESPONSE ENTITY BODY:
+            * Media type recommended: application/vnd.mason+json
+            * Profile recommended: Waitlist
+
+            Link relations used: self, profile, up, delete, ticket
+
+            Semantic descriptors used: waitlist_id, flight_id, user_id,
+            priority, status, position. The status is ``waiting``, with the
+            position of the entry in the waitlist (1 for its head), or
+            ``booked`` once a ticket has been booked for it, linked by the
+            ticket control.
+        """
+        entry = g.con.get_waitlist_entry(waitlist_id)
+        if entry is None:
+            return create_error_response(404, "Unknown waitlist entry",
+                                         "There is no waitlist entry with id " + str(waitlist_id))
+
+        envelope = FlightBookingObject(
+            waitlist_id=entry["waitlistid"],
+            flight_id=entry["flightid"],
+            user_id=entry["userid"],
+            priority=entry["priority"],
+            status="waiting" if entry["ticketnumber"] is None else "booked",
+            position=entry["position"]
+        )
+
+        envelope.add_namespace("flight-booking-system", LINK_RELATIONS_URL)
+        envelope.add_control("self", href=api.url_for(WaitlistEntry, waitlist_id=waitlist_id))
+        envelope.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_WAITLIST_PROFILE)
+        envelope.add_control("up", href=api.url_for(FlightWaitlist, flight_id=entry["flightid"]))
+        envelope.add_control("flight-booking-system:delete", href=api.url_for(WaitlistEntry, waitlist_id=waitlist_id),
+                             title="Leave the waitlist", method="DELETE")
+        if entry["ticketnumber"] is not None:
+            envelope.add_control("flight-booking-system:ticket",
+                                 href=api.url_for(Ticket, ticket_id=entry["ticketnumber"]),
+                                 title="Ticket booked", method="GET")
+
+        return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_WAITLIST_PROFILE)
+
+    def delete(self, waitlist_id):
+        """
+            Removes an entry from its waitlist. The ticket booked for the
+            entry, if any, is kept.
+
+            RESPONSE STATUS CODE:
+             * If the entry is deleted returns 204.
+             * If the waitlist id does not exist return 404
+        """
+        if g.con.delete_waitlist_entry(waitlist_id):
+            return '', 204
+        return create_error_response(404, "Unknown waitlist entry",
+                                     "There is no waitlist entry with id " + str(waitlist_id))
+
+
 class Flights(Resource):
     def get(self, template_id):
         """
@@ -1360,19 +1932,18 @@ class Flights(Resource):
         if not request_body:
             return create_error_response(415, "Unsupported Media Type",
                                          "Use a JSON compatible format")
-        # pick up rest of the mandatory fields
-        try:
-            flight_id=request_body["flightid"]
-            template_id = template_id
-            code = request_body["code"]
-            price = request_body["price"]
-            departure_date = request_body["departuredate"]
-            arrival_date = request_body["arrivaldate"]
-            gate = request_body["gate"]
-            total_seats = request_body["totalseats"]
-            seats_left = request_body["seatsleft"]
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        errors = validation.validate("flight", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
+
+        flight_id = request_body["flightid"]
+        code = request_body["code"]
+        price = request_body["price"]
+        departure_date = request_body["departuredate"]
+        arrival_date = request_body["arrivaldate"]
+        gate = request_body["gate"]
+        total_seats = request_body["totalseats"]
+        seats_left = request_body["seatsleft"]
         # Check if the  template flight exists
         if g.con.contains_flight(flight_id):
             return create_error_response(409, "Wrong flight id",
@@ -1420,7 +1991,7 @@ class TemplateFlight(Resource):
             * Media type recommended: application/vnd.mason+json
             * Profile recommended: Template Flight
 
-            Link relations used: self, profile, collection, flights-scheduled
+            Link relations used: self, profile, collection, flights-scheduled, fare-calendar
             Semantic descriptors used: tflight_id, depTime, arrTime, origin, destination
 
             NOTE:
@@ -1455,6 +2026,7 @@ class TemplateFlight(Resource):
         envelope.add_control("profile", href=FLIGHT_BOOKING_SYSTEM_TEMPLATE_FLIGHT_PROFILE)
         envelope.add_control("collection", href=api.url_for(TemplateFlights), method="GET")
         envelope.add_control_flights_scheduled(template_id=template_id)
+        envelope.add_control_fare_calendar(tflight_db["origin"], tflight_db["destination"])
 
         return Response(json.dumps(envelope), 200, mimetype=MASON + ";" + FLIGHT_BOOKING_SYSTEM_TEMPLATE_FLIGHT_PROFILE)
 
@@ -1560,15 +2132,9 @@ class TemplateFlights(Resource):
             return create_error_response(415, "Unsupported Media Type",
                                          "Use a JSON compatible format")
 
-        # pick up rest of the mandatory fields
-        try:
-            tflight_id = request_body["searchid"],
-            origin = request_body["origin"],
-            destination = request_body["destination"],
-            dep_time = request_body["departuretime"],
-            arr_time = request_body["arrivaltime"],
-        except KeyError:
-            return create_error_response(400, "Wrong request format", "Be sure to include all mandatory properties")
+        errors = validation.validate("template-flight", request_body)
+        if errors:
+            return create_error_response(400, "Wrong request format", errors)
 
         # Check if the  template flight exists
         if g.con.contains_template_flight(tflight_id=request_body["searchid"]):
@@ -1593,12 +2159,18 @@ class TemplateFlights(Resource):
 
 api.add_resource(Users, "/flight-booking-system/api/users",
                  endpoint="users")
+api.add_resource(Search, "/flight-booking-system/api/search",
+                 endpoint="search")
+api.add_resource(FareCalendar, "/flight-booking-system/api/fare-calendar",
+                 endpoint="farecalendar")
 api.add_resource(User, "/flight-booking-system/api/users/<int:user_id>",
                  endpoint="user")
 api.add_resource(UserReservations, "/flight-booking-system/api/users/<int:user_id>/reservations",
                  endpoint="user_reservations")
 api.add_resource(Reservations, "/flight-booking-system/api/reservations",
                  endpoint="reservations")
+api.add_resource(Itineraries, "/flight-booking-system/api/itineraries",
+                 endpoint="itineraries")
 api.add_resource(Reservation, "/flight-booking-system/api/reservations/<int:reservation_id>",
                  endpoint="reservation")
 api.add_resource(ReservationTickets, "/flight-booking-system/api/reservations/<int:reservation_id>/tickets",
@@ -1609,6 +2181,12 @@ api.add_resource(Ticket, "/flight-booking-system/api/tickets/<int:ticket_id>",
                  endpoint="ticket")
 api.add_resource(Flight, "/flight-booking-system/api/flights/<int:flight_id>",
                  endpoint="flight")
+api.add_resource(FlightSeats, "/flight-booking-system/api/flights/<int:flight_id>/seats",
+                 endpoint="flight_seats")
+api.add_resource(FlightWaitlist, "/flight-booking-system/api/flights/<int:flight_id>/waitlist",
+                 endpoint="flight_waitlist")
+api.add_resource(WaitlistEntry, "/flight-booking-system/api/waitlist/<int:waitlist_id>",
+                 endpoint="waitlist_entry")
 api.add_resource(Flights, "/flight-booking-system/api/template-flights/<int:template_id>/flights",
                  endpoint="flights")
 api.add_resource(TemplateFlight, "/flight-booking-system/api/template-flights/<int:template_id>",
@@ -1616,13 +2194,50 @@ api.add_resource(TemplateFlight, "/flight-booking-system/api/template-flights/<i
 api.add_resource(TemplateFlights, "/flight-booking-system/api/template-flights/",
                  endpoint="templateflights")
 
-#Send our schema file(s)
-@app.route("/flight-booking-system/schema/<schema_name>/")
+#Send our schema file(s) from memory. The schema urls are linked without
+#the trailing slash: they are served without redirect.
 def send_json_schema(schema_name):
-    return send_from_directory(app.static_folder, "schema/{}.json".format("user"))
+    name = SCHEMA_NAMES.get(schema_name.rstrip("/"), schema_name)
+    if name not in SCHEMA_NAMES.values():
+        raise NotFound()
+    body, etag = validation.registry.document(name)
+    response = Response(body, mimetype=JSON)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = SCHEMA_MAX_AGE
+    return response.make_conditional(request)
+
+
+def create_app(config=None):
+    """
+    Creates the Flask application of the API. Nothing is built when this
+    module is imported: the application, its database Engine and the
+    compiled schemas are created by the first call.
+
+    :param dict config: configuration overriding the default one, e.g. the
+        ``Engine`` of the database for testing.
+    :rtype: :py:class:`flask.Flask`
+    """
+    app = Flask(__name__, static_folder="static", static_url_path="/.")
+    app.debug = True
+    # Set the database Engine. In order to modify the database file (e.g. for
+    # testing) provide the database path in the config. The reservations and
+    # tickets of the archived flights are read from the archive database.
+    app.config.update({"Engine": database.Engine(archive_path=database.DEFAULT_ARCHIVE_PATH)})
+    if config is not None:
+        app.config.update(config)
+    app.before_request(connect_db)
+    app.teardown_request(close_connection)
+    app.add_url_rule("/flight-booking-system/schema/<path:schema_name>/", "send_json_schema",
+                     send_json_schema, strict_slashes=False)
+    # Start the RESTful API.
+    api.init_app(app)
+    #The schemas are read and compiled once, when the application starts
+    validation.registry.load()
+    return app
 
 #Start the application
 #DATABASE SHOULD HAVE BEEN POPULATED PREVIOUSLY
 if __name__ == '__main__':
     #Debug true activates automatic code reloading and improved error messages
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,362 @@
+"""
+Created on 19.10.2026
+
+Seat counters shared by the worker processes.
+
+With several worker processes (see :py:mod:`flight_reservation.prefork`)
+every availability check reads ``nbSeatsLeft`` from SQLite.
+:py:class:`SeatCounterTable` keeps the seats left of the active flights in a
+``multiprocessing.shared_memory`` block created by the master process and
+attached by the workers, so that any worker reads them without a query and
+without a lock. The reservations and itineraries of a flight the table sees
+full are refused before the database is read; the bookings it lets through
+are checked by the database, which remains the only source of the seats
+left the API returns.
+
+The block is an array of 64 bits integers: a header, then ``capacity``
+slots of four integers ``(sequence, flight_id, seats_left, change_id)``
+indexed by a hash of the flight id, with linear probing. A writer makes the
+sequence of the slot odd, writes the slot and makes it even again; a reader
+retries while the sequence is odd or changed during its read, so it never
+sees a half written slot (a seqlock). The writers, which are far less
+frequent than the readers, are serialized by a file lock shared by the
+processes. A removed flight does not leave a tombstone: the following
+flights of its probe sequence are shifted back (backward-shift deletion),
+so that the lookups of the flights not in the table stop at the first
+empty slot however many flights went through the table. A reader racing
+with the shift may miss a flight being moved, which is read as a flight
+not in the table.
+
+The database connections publish the seats left committed by
+:py:meth:`~flight_reservation.flight_database.Connection.create_ticket`,
+:py:meth:`~flight_reservation.flight_database.Connection.delete_ticket` and
+:py:meth:`~flight_reservation.flight_database.Connection.modify_flight` to
+the table, with the id of their ``SeatChange`` row: a value is only
+replaced by a value of a later change, whatever the order in which the
+workers publish them. :py:meth:`SeatCounterTable.reconcile` reloads the
+seats left of the flights not departed yet from the database every
+``reconcile_interval`` seconds, which repairs a change a worker could not
+publish, adds the new flights and removes the departed and deleted ones.
+
+"""
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, date
+from multiprocessing import shared_memory
+
+from flight_reservation.flight_database import parse_date
+
+# Environment variable with the name of the shared memory block, set by the
+# master process for the workers
+SEAT_COUNTERS_ENV = "FLIGHT_SEAT_COUNTERS"
+
+# Key of the application config holding the table of the process
+CONFIG_KEY = "SEAT_COUNTERS"
+
+# Number of flights the table can hold
+DEFAULT_CAPACITY = 4096
+
+# Seconds between two reconciliations with the database
+DEFAULT_RECONCILE_INTERVAL = 60
+
+# Header: capacity, time of the last reconciliation in milliseconds
+HEADER_SIZE = 2
+CAPACITY_FIELD = 0
+RECONCILED_FIELD = 1
+
+# Slot: sequence, flight id, seats left, change id
+SLOT_SIZE = 4
+ITEM_SIZE = 8
+
+# Flight id of the free slots
+EMPTY = 0
+
+# Reads of a slot being written before giving up
+READ_RETRIES = 100
+
+
+class SeatCounterTable(object):
+    """
+    Table of the seats left of the flights in shared memory.
+
+    An instance of this class should not be instantiated directly using the
+    constructor. Instead use :py:meth:`create` in the master process and
+    :py:meth:`attach` in the workers.
+
+    :param shm: the ``SharedMemory`` block.
+    :param bool owner: whether this process created the block and removes
+        it in :py:meth:`close`.
+    :param float reconcile_interval: seconds between two reconciliations.
+
+    """
+
+    def __init__(self, shm, owner=False, reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+        super(SeatCounterTable, self).__init__()
+        self.shm = shm
+        self.owner = owner
+        self.reconcile_interval = reconcile_interval
+        self._array = shm.buf.cast("q")
+        self.capacity = self._array[CAPACITY_FIELD]
+        #The file lock serializes the processes, the thread lock the threads
+        #of a process, which share the file descriptor
+        self._lock_file = os.open(self.lock_path(shm.name), os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY, **kwargs):
+        """
+        :return: a new empty table in a new shared memory block.
+        """
+        if capacity < 1:
+            raise ValueError("The capacity must be positive")
+        size = (HEADER_SIZE + capacity * SLOT_SIZE) * ITEM_SIZE
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        array = shm.buf.cast("q")
+        array[CAPACITY_FIELD] = capacity
+        array.release()
+        return cls(shm, True, **kwargs)
+
+    @classmethod
+    def attach(cls, name, **kwargs):
+        """
+        :return: the table of an existing shared memory block, created by
+            this process or by its parent before the fork.
+        """
+        return cls(shared_memory.SharedMemory(name), False, **kwargs)
+
+    @staticmethod
+    def lock_path(name):
+        return os.path.join(tempfile.gettempdir(), "%s.lock" % name.lstrip("/"))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        """
+        Detaches the block, and removes it if this process created it.
+        """
+        if self._array is None:
+            return
+        self._array.release()
+        self._array = None
+        os.close(self._lock_file)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            try:
+                os.remove(self.lock_path(self.shm.name))
+            except OSError:
+                pass
+
+    def _locked(self):
+        return _TableLock(self._thread_lock, self._lock_file)
+
+    def _home(self, flight_id):
+        """
+        :return: the index of the first slot probed for a flight.
+        """
+        return (flight_id * 2654435761) % self.capacity
+
+    def _slots(self, flight_id):
+        """
+        :return: the offsets of the slots where a flight may be, in the
+            order they are probed.
+        """
+        start = self._home(flight_id)
+        for index in range(self.capacity):
+            yield HEADER_SIZE + ((start + index) % self.capacity) * SLOT_SIZE
+
+    def _read(self, offset):
+        """
+        :return: ``(flight_id, seats_left, change_id)`` of a slot, or
+            ``None`` if it is being written.
+        """
+        array = self._array
+        for _ in range(READ_RETRIES):
+            sequence = array[offset]
+            if sequence & 1:
+                continue
+            slot = (array[offset + 1], array[offset + 2], array[offset + 3])
+            if array[offset] == sequence:
+                return slot
+        return None
+
+    def _write(self, offset, flight_id, seats_left, change_id):
+        array = self._array
+        array[offset] += 1
+        array[offset + 1] = flight_id
+        array[offset + 2] = seats_left
+        array[offset + 3] = change_id
+        array[offset] += 1
+
+    def get(self, flight_id):
+        """
+        Reads the seats left of a flight, without lock.
+
+        :return: the seats left, or ``None`` if the flight is not in the
+            table or is being written or moved.
+        """
+        for offset in self._slots(flight_id):
+            slot = self._read(offset)
+            if slot is None:
+                return None
+            if slot[0] == flight_id:
+                return slot[1]
+            if slot[0] == EMPTY:
+                return None
+        return None
+
+    def set(self, flight_id, seats_left, change_id):
+        """
+        Writes the seats left of a flight, unless the table holds the value
+        of a later change.
+
+        It has the signature of the
+        :py:attr:`~flight_reservation.flight_database.Connection.seat_listeners`.
+
+        :return: ``True`` if the value was written, ``False`` if it is older
+            than the one of the table or the table is full.
+        """
+        with self._locked():
+            for offset in self._slots(flight_id):
+                current = self._array[offset + 1]
+                if current == flight_id:
+                    if self._array[offset + 3] > change_id:
+                        return False
+                    break
+                if current == EMPTY:
+                    break
+            else:
+                return False
+            self._write(offset, flight_id, seats_left, change_id)
+            return True
+
+    def remove(self, flight_id):
+        """
+        Removes a flight from the table.
+
+        :return: ``True`` if it was in the table.
+        """
+        with self._locked():
+            for offset in self._slots(flight_id):
+                current = self._array[offset + 1]
+                if current == flight_id:
+                    self._shift_back((offset - HEADER_SIZE) // SLOT_SIZE)
+                    return True
+                if current == EMPTY:
+                    return False
+            return False
+
+    def _shift_back(self, hole):
+        """
+        Empties the slot *hole* and moves back the following flights of the
+        probe sequence, so that no flight is after an empty slot on its
+        probe sequence. Called with the lock held.
+        """
+        array = self._array
+        index = hole
+        for _ in range(self.capacity - 1):
+            index = (index + 1) % self.capacity
+            offset = HEADER_SIZE + index * SLOT_SIZE
+            flight_id = array[offset + 1]
+            if flight_id == EMPTY:
+                break
+            #Distances from the home slot of the flight: it can move back
+            #to the hole if the hole is on its probe sequence
+            home = self._home(flight_id)
+            if (hole - home) % self.capacity < (index - home) % self.capacity:
+                self._write(HEADER_SIZE + hole * SLOT_SIZE, flight_id, array[offset + 2],
+                            array[offset + 3])
+                hole = index
+        self._write(HEADER_SIZE + hole * SLOT_SIZE, EMPTY, 0, 0)
+
+    def flights(self):
+        """
+        :return: dictionary ``{flight_id: seats_left}`` of the flights of the
+            table.
+        """
+        flights = {}
+        for index in range(self.capacity):
+            slot = self._read(HEADER_SIZE + index * SLOT_SIZE)
+            if slot is not None and slot[0] != EMPTY:
+                flights[slot[0]] = slot[1]
+        return flights
+
+    def reconcile(self, connection, today=None):
+        """
+        Reloads the seats left of the flights departing today or later from
+        the database and removes the other flights from the table.
+
+        :param connection: a
+            :py:class:`~flight_reservation.flight_database.Connection`.
+        :param datetime today: defaults to the current date.
+        :return: the number of flights in the table.
+        """
+        if today is None:
+            today = datetime.combine(date.today(), datetime.min.time())
+        active = set()
+        for flight_id, seats_left, departure_date, change_id in connection.get_seats_left():
+            try:
+                if parse_date(str(departure_date)) < today:
+                    continue
+            except ValueError:
+                continue
+            if self.set(flight_id, seats_left, change_id) or self.get(flight_id) is not None:
+                active.add(flight_id)
+        for flight_id in set(self.flights()) - active:
+            self.remove(flight_id)
+        return len(active)
+
+    def maybe_reconcile(self, connection):
+        """
+        Runs :py:meth:`reconcile` if no process did it during the last
+        ``reconcile_interval`` seconds.
+
+        :return: ``True`` if the table was reconciled.
+        """
+        now = int(time.time() * 1000)
+        interval = int(self.reconcile_interval * 1000)
+        if now - self._array[RECONCILED_FIELD] < interval:
+            return False
+        with self._locked():
+            #Another process may have started it meanwhile
+            if now - self._array[RECONCILED_FIELD] < interval:
+                return False
+            self._array[RECONCILED_FIELD] = now
+        self.reconcile(connection)
+        return True
+
+
+class _TableLock(object):
+    """
+    Exclusive lock of the writers of a table.
+    """
+
+    def __init__(self, thread_lock, lock_file):
+        self.thread_lock = thread_lock
+        self.lock_file = lock_file
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+
+def enable(app, table):
+    """
+    Makes the database connections of the Flask application *app* publish
+    the seats left to *table* and the flight resources read them from it.
+    """
+    app.config[CONFIG_KEY] = table
+    return table
+
+
+def disable(app):
+    app.config[CONFIG_KEY] = None
@@ -0,0 +1,424 @@
+"""
+Created on 19.10.2026
+
+Server-Sent Events stream of the seats left of the flights.
+
+The database methods changing the seats left of a flight
+(:py:meth:`~flight_reservation.flight_database.Connection.create_ticket`,
+:py:meth:`~flight_reservation.flight_database.Connection.delete_ticket` and
+:py:meth:`~flight_reservation.flight_database.Connection.modify_flight`)
+record the new value in the ``SeatChange`` outbox table in the same
+transaction. The ids of the outbox rows increase with the commits, so they
+are used as the ids of the events.
+
+A :py:class:`SeatChangeBroker` per database polls the outbox with a single
+query whatever the number of clients and fans the new changes out to the
+subscriptions of their flight. A subscription has a bounded queue: a client
+reading too slowly to keep up is not given more memory, its stream reads
+the changes it missed from the outbox instead.
+
+A client reconnecting with a ``Last-Event-ID`` header receives the changes
+committed since that event. When they have been pruned from the outbox, it
+receives the current state of the flight instead.
+
+An open stream holds a thread of the server for as long as the client stays
+connected. The :py:data:`stream_limiter` of the process caps the number of
+streams open at once, so that they can not take all the threads of a
+worker: the streams over the cap are refused with a 503. A worker that
+stops calls :py:func:`close_streams` so that its streams end instead of
+keeping it alive; the clients reconnect to another worker with their
+``Last-Event-ID``.
+
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+EVENT_STREAM = "text/event-stream"
+
+# Name of the events carrying the seats left of a flight
+SEATS_EVENT = "seats"
+
+# Seconds between two reads of the outbox by a broker
+DEFAULT_POLL_INTERVAL = 0.25
+
+# Seconds without event after which a comment is sent, so that the proxies
+# do not close the connection and the dead clients are detected
+DEFAULT_HEARTBEAT = 15.0
+
+# Milliseconds the client waits before reconnecting (``retry`` field)
+DEFAULT_RETRY = 2000
+
+# Changes kept in the queue of a subscription before it falls back to the
+# outbox
+DEFAULT_QUEUE_SIZE = 100
+
+# Changes read from the outbox at once
+BATCH_SIZE = 500
+
+# Seconds the changes are kept in the outbox to resume the streams
+DEFAULT_RETENTION = 24 * 3600
+
+# Seconds between two prunings of the outbox by a broker
+PRUNE_INTERVAL = 600
+
+# Streams open at once in a process, see StreamLimiter
+DEFAULT_MAX_STREAMS = 100
+
+# Seconds sent in the Retry-After header of the streams refused
+STREAMS_RETRY_AFTER = 5
+
+
+def format_event(data, event_id=None, event=None):
+    """
+    :param data: the JSON serializable data of the event.
+    :param event_id: the id of the event, sent back by the client in the
+        ``Last-Event-ID`` header when it reconnects.
+    :param str event: the name of the event.
+    :return: the event in the ``text/event-stream`` format, as bytes.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append("id: %s" % event_id)
+    if event is not None:
+        lines.append("event: %s" % event)
+    lines.append("data: %s" % json.dumps(data, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def seats_event(flight_id, seats_left, event_id):
+    """
+    :return: the event carrying the seats left of a flight.
+    """
+    return format_event({"flight_id": flight_id, "nbSeatsLeft": seats_left},
+                        event_id, SEATS_EVENT)
+
+
+def parse_last_event_id(value):
+    """
+    :return: the id sent in a ``Last-Event-ID`` header, or ``None`` if it is
+        missing or not one of our ids.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if not value.isdigit():
+        return None
+    return int(value)
+
+
+class Subscription(object):
+    """
+    The changes of one flight waiting to be sent to one client.
+
+    """
+
+    def __init__(self, flight_id, queue_size=DEFAULT_QUEUE_SIZE):
+        self.flight_id = flight_id
+        self.queue = queue.Queue(queue_size)
+        #Set when a change could not be queued
+        self.overflowed = False
+
+    def put(self, change):
+        try:
+            self.queue.put_nowait(change)
+        except queue.Full:
+            self.overflowed = True
+
+
+class SeatChangeBroker(object):
+    """
+    Polls the outbox of a database and dispatches the changes to the
+    subscriptions of their flight.
+
+    The polling thread is started by the first subscription and stops when
+    the last one is removed.
+
+    :param engine: the :py:class:`~flight_reservation.flight_database.Engine`
+        of the database.
+    :param float poll_interval: seconds between two reads of the outbox.
+    :param int retention: seconds the changes are kept in the outbox.
+        ``None`` never removes them.
+
+    """
+
+    def __init__(self, engine, poll_interval=DEFAULT_POLL_INTERVAL,
+                 retention=DEFAULT_RETENTION):
+        super(SeatChangeBroker, self).__init__()
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.retention = retention
+        #flight_id: set of Subscription
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        #Id of the last change dispatched
+        self.last_id = 0
+        self._pruned = 0
+
+    def subscribe(self, flight_id, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :return: a new :py:class:`Subscription` to the changes of a flight
+            committed from now on. It must be removed with
+            :py:meth:`unsubscribe`.
+        """
+        subscription = Subscription(flight_id, queue_size)
+        with self._lock:
+            if self._thread is None:
+                #Read before the subscription is returned, so that the changes
+                #the broker does not dispatch are committed before the caller
+                #reads the outbox
+                connection = self.engine.connect()
+                try:
+                    self.last_id = connection.get_seat_change_range()[1]
+                finally:
+                    connection.close()
+                self._thread = threading.Thread(target=self._run,
+                                                 name="seat-change-broker")
+                self._thread.daemon = True
+                self._thread.start()
+            self._subscriptions.setdefault(flight_id, set()).add(subscription)
+        return subscription
+
+    def wake(self):
+        """
+        Wakes up the streams waiting for a change, see :py:func:`close_streams`.
+        """
+        with self._lock:
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.put(None)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.flight_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.flight_id]
+
+    @property
+    def subscriptions(self):
+        """
+        Number of subscriptions.
+        """
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def _run(self):
+        connection = self.engine.connect()
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscriptions:
+                        self._thread = None
+                        return
+                try:
+                    self.poll(connection)
+                except Exception:
+                    #The database may be locked or being restored, try again
+                    connection.close()
+                    connection = self.engine.connect()
+                time.sleep(self.poll_interval)
+        finally:
+            connection.close()
+
+    def poll(self, connection):
+        """
+        Reads the new changes of the outbox and dispatches them.
+
+        :return: the number of changes read.
+        """
+        count = 0
+        while True:
+            changes = connection.get_seat_changes(self.last_id, limit=BATCH_SIZE)
+            #End the read transaction
+            connection.con.commit()
+            if not changes:
+                break
+            with self._lock:
+                for change in changes:
+                    for subscription in self._subscriptions.get(change["flightid"], ()):
+                        subscription.put(change)
+                self.last_id = changes[-1]["changeid"]
+            count += len(changes)
+            if len(changes) < BATCH_SIZE:
+                break
+        now = time.time()
+        if self.retention is not None and now - self._pruned > PRUNE_INTERVAL:
+            self._pruned = now
+            connection.delete_seat_changes(int(now - self.retention))
+        return count
+
+
+#Absolute database path: SeatChangeBroker
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def broker_for(engine):
+    """
+    :return: the :py:class:`SeatChangeBroker` of the database of an engine,
+        shared by all the streams of the process.
+    """
+    path = os.path.abspath(engine.db_path)
+    with _brokers_lock:
+        broker = _brokers.get(path)
+        if broker is None:
+            broker = _brokers[path] = SeatChangeBroker(engine)
+        return broker
+
+
+class StreamLimiter(object):
+    """
+    Counts the streams open in the process and refuses new ones over a cap.
+
+    :param int max_streams: streams open at once. ``None`` does not limit
+        them.
+
+    """
+
+    def __init__(self, max_streams=DEFAULT_MAX_STREAMS):
+        super(StreamLimiter, self).__init__()
+        self.max_streams = max_streams
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        :return: True if a stream may be opened. It must then be released
+            with :py:meth:`release` when it is closed.
+        """
+        with self._lock:
+            if self.max_streams is not None and self.open >= self.max_streams:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+#Limiter of the streams of the process
+stream_limiter = StreamLimiter()
+
+#Set when the process stops serving: the streams end
+streams_closing = threading.Event()
+
+
+def close_streams():
+    """
+    Ends the streams of the process. Their clients receive the changes they
+    missed when they reconnect with their ``Last-Event-ID``. The streams
+    opened afterwards end after their first events.
+    """
+    streams_closing.set()
+    with _brokers_lock:
+        brokers = list(_brokers.values())
+    for broker in brokers:
+        broker.wake()
+
+
+class SeatStream(object):
+    """
+    The body of the event stream of a flight.
+
+    The subscription is taken when the stream is created. The first events
+    are the current state or the changes missed since ``last_event_id``,
+    then the changes as they are dispatched by the broker. Iterating ends
+    when :py:func:`close_streams` is called, otherwise the server closes the
+    stream when the client disconnects.
+
+    :param broker: the :py:class:`SeatChangeBroker` of the database.
+    :param int flight_id: the id of the flight.
+    :param state: ``(seats_left, last_change_id)`` read when the request was
+        received, see
+        :py:meth:`~flight_reservation.flight_database.Connection.get_flight_seats`.
+    :param int last_event_id: the id of the last event received by the
+        client, or ``None`` for a new client.
+    :param float heartbeat: seconds without event after which a comment is
+        sent.
+    :param int retry: milliseconds the client waits before reconnecting.
+    :param limiter: the :py:class:`StreamLimiter` the stream was acquired
+        from, released when it is closed.
+
+    """
+
+    def __init__(self, broker, flight_id, state, last_event_id=None,
+                 heartbeat=DEFAULT_HEARTBEAT, retry=DEFAULT_RETRY,
+                 queue_size=DEFAULT_QUEUE_SIZE, limiter=None):
+        self.broker = broker
+        self.limiter = limiter
+        self.flight_id = flight_id
+        self.seats_left, self.last_change_id = state
+        self.last_event_id = last_event_id
+        self.heartbeat = heartbeat
+        self.retry = retry
+        #Id of the last event sent
+        self.sent_id = last_event_id
+        self.subscription = broker.subscribe(flight_id, queue_size)
+        self._closed = False
+
+    def __iter__(self):
+        return self._events()
+
+    def _read_outbox(self):
+        """
+        :return: the changes of the flight after the last event sent, or its
+            current state if some of them were pruned from the outbox.
+        """
+        connection = self.broker.engine.connect()
+        try:
+            oldest, last = connection.get_seat_change_range()
+            if self.sent_id > last or (self.sent_id < last and
+                                       (oldest is None or oldest > self.sent_id + 1)):
+                state = connection.get_flight_seats(self.flight_id)
+                if state is None:
+                    return []
+                #Sent even if the client claims a greater id (the database was reset)
+                self.sent_id = -1
+                return [{"changeid": state[1], "seatsleft": state[0]}]
+            return connection.get_seat_changes(self.sent_id, self.flight_id)
+        finally:
+            connection.close()
+
+    def _events(self):
+        yield ("retry: %d\n\n" % self.retry).encode("ascii")
+        if self.sent_id is None:
+            yield seats_event(self.flight_id, self.seats_left, self.last_change_id)
+            self.sent_id = self.last_change_id
+        pending = self._read_outbox()
+        while not streams_closing.is_set():
+            for change in pending:
+                #The outbox and the queue may hold the same changes. None
+                #only wakes the stream up
+                if change is not None and change["changeid"] > self.sent_id:
+                    self.sent_id = change["changeid"]
+                    yield seats_event(self.flight_id, change["seatsleft"], change["changeid"])
+            if self.subscription.overflowed:
+                self.subscription.overflowed = False
+                self._drain()
+                pending = self._read_outbox()
+                continue
+            try:
+                pending = [self.subscription.queue.get(timeout=self.heartbeat)]
+            except queue.Empty:
+                pending = []
+                yield b": keep-alive\n\n"
+
+    def _drain(self):
+        try:
+            while True:
+                self.subscription.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.broker.unsubscribe(self.subscription)
+            if self.limiter is not None:
+                self.limiter.release()
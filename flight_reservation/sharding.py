@@ -0,0 +1,809 @@
+"""
+Created on 19.10.2026
+
+Date partitioned sharding of the flight booking database.
+
+With a single database file every booking goes through the same SQLite
+write lock. :py:class:`ShardedEngine` splits the data in several files:
+
+* a catalog database with the ``User`` and ``TemplateFlight`` tables and the
+  ``FlightShard`` directory telling in which shard every flight is;
+* one shard database per month of departure with the ``Flight``,
+  ``Reservation``, ``Ticket`` and ``SeatChange`` rows of the flights
+  departing that month.
+
+Bookings of flights departing in different months are written to different
+files and do not wait for each other, so the write throughput grows with the
+number of shards being written. Only the creation of users, template flights
+and flights writes to the catalog.
+
+The ids of the reservations and tickets created in a shard are allocated
+from a range of its own, ``id_span`` ids starting at
+:py:meth:`ShardMap.first_id`, so the shard of a row is found from its id.
+The rows imported with their original ids are searched in every shard.
+
+A flight stays in the shard of the departure date it was created with, even
+if its departure date is modified later. The foreign keys between the
+catalog and the shards are not checked by SQLite: :py:class:`ShardedConnection`
+checks the users and the template flights exist and deletes the rows of the
+shards when a user or a template flight is deleted.
+
+"""
+import io
+import os
+import sqlite3
+
+from flight_reservation.flight_database import (Engine, Connection, DateFormatException,
+                                                parse_date, DEFAULT_SCHEMA, DEFAULT_DATA_DUMP)
+
+DEFAULT_SHARD_DIRECTORY = "db/shards"
+DEFAULT_CATALOG_SCHEMA = "db/flight_catalog_schema.sql"
+DEFAULT_SHARD_SCHEMA = "db/flight_shard_schema.sql"
+
+CATALOG_NAME = "catalog.db"
+SHARD_PREFIX = "flight-"
+SHARD_SUFFIX = ".db"
+
+# Number of ids of each table reserved to a shard
+ID_SPAN = 10 ** 7
+
+# Tables of a shard whose ids are allocated from the range of the shard
+SHARD_SEQUENCES = ("Flight", "Reservation", "Ticket", "Waitlist", "SeatChange")
+
+
+class ShardMap(object):
+    """
+    Names and locates the shards.
+
+    The key of a shard is the month of departure of its flights, as
+    ``YYYY-MM``.
+
+    :param directory: the directory of the catalog and of the shards.
+    :param int id_span: number of ids of each table reserved to a shard.
+
+    """
+
+    def __init__(self, directory=None, id_span=ID_SPAN):
+        super(ShardMap, self).__init__()
+        self.directory = directory if directory is not None else DEFAULT_SHARD_DIRECTORY
+        self.id_span = id_span
+
+    @property
+    def catalog_path(self):
+        return os.path.join(self.directory, CATALOG_NAME)
+
+    def key(self, departure_date):
+        """
+        :param str departure_date: date with the format ``YYYY-MM-DD``.
+        :return: the key of the shard of the flights departing that day.
+        :raises ValueError: if the date is not well formed.
+        """
+        date = parse_date(departure_date)
+        return "%04d-%02d" % (date.year, date.month)
+
+    def number(self, key):
+        """
+        :return: the number of a shard, the months since year 0.
+        """
+        year, month = key.split("-")
+        return int(year) * 12 + int(month) - 1
+
+    def first_id(self, key):
+        """
+        :return: the id after which the ids of the rows created in a shard
+            are allocated.
+        """
+        return self.number(key) * self.id_span
+
+    def key_of_id(self, row_id):
+        """
+        :return: the key of the shard that allocated an id, or ``None`` for
+            the ids not allocated by a shard.
+        """
+        if not isinstance(row_id, int) or row_id < self.id_span:
+            return None
+        year, month = divmod(row_id // self.id_span, 12)
+        return "%04d-%02d" % (year, month + 1)
+
+    def path(self, key):
+        """
+        :return: the path of the database file of a shard.
+        """
+        return os.path.join(self.directory, SHARD_PREFIX + key + SHARD_SUFFIX)
+
+    def keys(self):
+        """
+        :return: the keys of the existing shards, oldest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[len(SHARD_PREFIX):-len(SHARD_SUFFIX)]
+                      for name in os.listdir(self.directory)
+                      if name.startswith(SHARD_PREFIX) and name.endswith(SHARD_SUFFIX))
+
+
+class ShardedEngine(Engine):
+    """
+    Engine of a database split in a catalog and one shard per month of
+    departure. The shards are created when their first flight is.
+
+    :Example:
+
+    >>> engine = ShardedEngine("db/shards")
+    >>> engine.create_tables()
+    >>> con = engine.connect()
+
+    :param directory: the directory of the catalog and of the shards.
+        Defaults to *db/shards*
+    :param catalog_schema: path to the .sql schema file of the catalog.
+        Defaults to *db/flight_catalog_schema.sql*
+    :param shard_schema: path to the .sql schema file of the shards.
+        Defaults to *db/flight_shard_schema.sql*
+    :param int id_span: number of ids of each table reserved to a shard.
+
+    """
+
+    def __init__(self, directory=None, catalog_schema=None, shard_schema=None, id_span=ID_SPAN):
+        self.shard_map = ShardMap(directory, id_span)
+        super(ShardedEngine, self).__init__(self.shard_map.catalog_path)
+        self.catalog_schema = catalog_schema if catalog_schema is not None else DEFAULT_CATALOG_SCHEMA
+        self.shard_schema = shard_schema if shard_schema is not None else DEFAULT_SHARD_SCHEMA
+
+    def connect(self):
+        """
+        Creates a connection to the catalog and, when they are needed, to
+        the shards.
+
+        :return: A ShardedConnection instance
+        :rtype: ShardedConnection
+
+        """
+        return ShardedConnection(self)
+
+    def engine_for_flight(self, flight_id):
+        """
+        :return: an :py:class:`Engine` of the shard of a flight, or ``None``
+            if the flight does not exist.
+        """
+        con = sqlite3.connect(self.db_path)
+        try:
+            row = con.execute('SELECT shard FROM FlightShard WHERE flight_id = ?',
+                              (flight_id,)).fetchone()
+        finally:
+            con.close()
+        if row is None:
+            return None
+        return Engine(self.shard_map.path(row[0]))
+
+    def remove_database(self):
+        """
+        Removes the catalog, the shards and, if it is empty, their directory
+        from the filesystem.
+
+        """
+        for key in self.shard_map.keys():
+            os.remove(self.shard_map.path(key))
+        super(ShardedEngine, self).remove_database()
+        if os.path.isdir(self.shard_map.directory) and not os.listdir(self.shard_map.directory):
+            os.rmdir(self.shard_map.directory)
+
+    def clear(self):
+        """
+        Removes all the records of the catalog and the shards. The catalog
+        keeps its schema, the shards are created again by the next flights.
+
+        """
+        for key in self.shard_map.keys():
+            os.remove(self.shard_map.path(key))
+        con = sqlite3.connect(self.db_path)
+        try:
+            with con:
+                con.execute("DELETE FROM FlightShard")
+                con.execute("DELETE FROM User")
+                con.execute("DELETE FROM TemplateFlight")
+        finally:
+            con.close()
+
+    def create_tables(self, schema=None):
+        """
+        Creates the directory and the tables of the catalog.
+
+        :param schema: path to the .sql schema file of the catalog. If this
+            parameter is None, the *catalog_schema* of the engine is used.
+
+        """
+        if not os.path.isdir(self.shard_map.directory):
+            os.makedirs(self.shard_map.directory)
+        super(ShardedEngine, self).create_tables(schema if schema is not None
+                                                 else self.catalog_schema)
+
+    def create_shard(self, key):
+        """
+        Creates the database of a shard if it does not exist yet, with the
+        sequences of its tables starting at :py:meth:`ShardMap.first_id`.
+        Several processes may create the same shard at the same time.
+
+        :return: the path of the database of the shard.
+        """
+        path = self.shard_map.path(key)
+        first_id = self.shard_map.first_id(key)
+        con = sqlite3.connect(path)
+        try:
+            with io.open(self.shard_schema, encoding="utf-8") as f:
+                con.executescript(f.read())
+            with con:
+                for table in SHARD_SEQUENCES:
+                    con.execute('INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? \
+                                 WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)',
+                                (table, first_id, table))
+        finally:
+            con.close()
+        return path
+
+    def populate_tables(self, dump=None):
+        """
+        Populates the catalog and the shards from a dump file written for
+        the single database schema, see :py:meth:`import_database`.
+
+        :param dump:  path to the .sql dump file. If this parmeter is
+            None, then *db/flight_data_dump.sql* is utilized.
+
+        """
+        source = sqlite3.connect(":memory:")
+        try:
+            with io.open(DEFAULT_SCHEMA, encoding="utf-8") as f:
+                source.executescript(f.read())
+            with io.open(dump if dump is not None else DEFAULT_DATA_DUMP, encoding="utf-8") as f:
+                source.executescript(f.read())
+            self.import_database(source)
+        finally:
+            source.close()
+
+    def import_database(self, source):
+        """
+        Copies the users, template flights, flights, reservations and
+        tickets of a single file database to the catalog and the shards,
+        keeping their ids. The catalog must have been created with
+        :py:meth:`create_tables`. The seat changes and the waitlists are not
+        copied.
+
+        :param source: sqlite3 connection to the database to import.
+        :return: dictionary ``{shard key: number of flights}``.
+        :raises ValueError: if the departure date of a flight is not well
+            formed or a reservation or ticket id is in the range of ids
+            allocated by the shards.
+        """
+        catalog = sqlite3.connect(self.db_path)
+        try:
+            with catalog:
+                catalog.executemany('INSERT INTO User VALUES(?,?,?,?,?,?,?,?)',
+                                    source.execute('SELECT user_id, lastName, firstName, '
+                                                   'phoneNumber, email, birthDate, gender, '
+                                                   'registrationDate FROM User'))
+                catalog.executemany('INSERT INTO TemplateFlight VALUES(?,?,?,?,?)',
+                                    source.execute('SELECT tflight_id, depTime, arrTime, origin, '
+                                                   'destination FROM TemplateFlight'))
+
+            #shard key: rows of each table
+            shards = {}
+            flight_keys = {}
+            for row in source.execute('SELECT flight_id, code, price, gate, depDate, arrDate, '
+                                      'nbInitialSeats, nbSeatsLeft, template_id FROM Flight'):
+                try:
+                    key = self.shard_map.key(row[4])
+                except (TypeError, ValueError):
+                    raise ValueError("The flight %s has an invalid departure date: %r"
+                                     % (row[0], row[4]))
+                flight_keys[row[0]] = key
+                shards.setdefault(key, ([], [], []))[0].append(row)
+            reservation_keys = {}
+            for row in source.execute('SELECT reservation_id, reference, re_date, creator_id, '
+                                      'flight_id FROM Reservation'):
+                self._check_imported_id("reservation", row[0])
+                key = flight_keys[row[4]]
+                reservation_keys[row[0]] = key
+                shards[key][1].append(row)
+            for row in source.execute('SELECT ticket_id, firstName, lastName, gender, age, '
+                                      'reservation_id, seat FROM Ticket'):
+                self._check_imported_id("ticket", row[0])
+                shards[reservation_keys[row[5]]][2].append(row)
+
+            for key, (flights, reservations, tickets) in sorted(shards.items()):
+                con = sqlite3.connect(self.create_shard(key))
+                try:
+                    #The flights are written last: their seats left already
+                    #count the tickets, which the triggers would take again
+                    with con:
+                        con.executemany('INSERT INTO Reservation VALUES(?,?,?,?,?)', reservations)
+                        con.executemany('INSERT INTO Ticket VALUES(?,?,?,?,?,?,?)', tickets)
+                        con.executemany('INSERT INTO Flight VALUES(?,?,?,?,?,?,?,?,?)', flights)
+                finally:
+                    con.close()
+                with catalog:
+                    catalog.executemany('INSERT INTO FlightShard VALUES(?,?,?)',
+                                        ((row[0], key, row[8]) for row in flights))
+        finally:
+            catalog.close()
+        return dict((key, len(rows[0])) for key, rows in shards.items())
+
+    def _check_imported_id(self, name, row_id):
+        if row_id >= self.shard_map.id_span:
+            raise ValueError("The %s id %d is in the range of ids allocated by the shards"
+                             % (name, row_id))
+
+
+class ShardedConnection(Connection):
+    """
+    API to access a sharded Flight Booking database, with the methods of
+    :py:class:`~flight_reservation.flight_database.Connection`.
+
+    The methods on users and template flights run on the catalog, through
+    :py:attr:`self.con`. The methods on flights, reservations and tickets
+    run on the :py:class:`~flight_reservation.flight_database.Connection` of
+    the shard of the row, opened the first time it is needed; the lists of
+    reservations and tickets are read from every shard and concatenated,
+    oldest shard first.
+
+    An instance of this class should not be instantiated directly using the
+    constructor. Instead use the :py:meth:`ShardedEngine.connect`.
+
+    :param engine: the :py:class:`ShardedEngine` of the database.
+
+    """
+
+    def __init__(self, engine):
+        super(ShardedConnection, self).__init__(engine.db_path)
+        self.engine = engine
+        self.shard_map = engine.shard_map
+        #shard key: Connection
+        self._shards = {}
+
+    @property
+    def db_time(self):
+        """
+        Total time, in seconds, spent in the catalog and the shards by this
+        connection.
+
+        """
+        return self.con.db_time + sum(shard.con.db_time for shard in self._shards.values())
+
+    def close(self):
+        """
+        Closes the connections to the shards and to the catalog, commiting
+        all changes.
+
+        """
+        for shard in self._shards.values():
+            shard.close()
+        self._shards = {}
+        super(ShardedConnection, self).close()
+
+    #SHARDS
+    def shard(self, key, create=False):
+        """
+        :param str key: the key of the shard.
+        :param bool create: create the shard if it does not exist.
+        :return: the :py:class:`Connection` to a shard, or ``None`` if it
+            does not exist.
+        """
+        shard = self._shards.get(key)
+        if shard is None:
+            if create:
+                self.engine.create_shard(key)
+            elif not os.path.exists(self.shard_map.path(key)):
+                return None
+            shard = self._shards[key] = Connection(self.shard_map.path(key))
+            #The statements of the shards are seen by the observers of the connection
+            shard.con.statement_listeners = self.con.statement_listeners
+            shard.seat_listeners = self.seat_listeners
+        return shard
+
+    def shards(self):
+        """
+        :return: the connections to all the shards, oldest first.
+        """
+        return [self.shard(key) for key in self.shard_map.keys()]
+
+    def flight_shard(self, flight_id):
+        """
+        :return: the connection to the shard of a flight, or ``None`` if the
+            flight does not exist.
+        """
+        cur = self.con.cursor()
+        cur.execute('SELECT shard FROM FlightShard WHERE flight_id = ?', (flight_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return self.shard(row[0])
+
+    def _row_shard(self, table, column, row_id):
+        key = self.shard_map.key_of_id(row_id)
+        if key is not None:
+            return self.shard(key)
+        #Rows imported with their original ids are searched in every shard
+        query = 'SELECT 1 FROM %s WHERE %s = ?' % (table, column)
+        for shard in self.shards():
+            cur = shard.con.cursor()
+            cur.execute(query, (row_id,))
+            if cur.fetchone() is not None:
+                return shard
+        return None
+
+    def reservation_shard(self, reservation_id):
+        """
+        :return: the connection to the shard of a reservation, or ``None``
+            if the reservation does not exist.
+        """
+        return self._row_shard("Reservation", "reservation_id", reservation_id)
+
+    def ticket_shard(self, ticket_id):
+        """
+        :return: the connection to the shard of a ticket, or ``None`` if the
+            ticket does not exist.
+        """
+        return self._row_shard("Ticket", "ticket_id", ticket_id)
+
+    #User Table API
+    def _delete_user_reservations(self, cur, user_id):
+        """
+        Deletes the waitlist entries, the reservations of a user and their
+        tickets in every shard, before the user is deleted from the catalog.
+        """
+        for shard in self.shards():
+            shard.set_foreign_keys_support()
+            shard._delete_user_reservations(shard.con.cursor(), user_id)
+            shard.con.commit()
+            shard._publish_seat_changes()
+
+    #TemplateFlight Table API
+    def delete_template_flight(self, tflight_id):
+        """
+        Removes a template flight and its flights.
+
+        :return: True if the template flight is deleted, False otherwise.
+        """
+        cur = self.con.cursor()
+        cur.execute('SELECT flight_id FROM FlightShard WHERE template_id = ?', (tflight_id,))
+        for row in cur.fetchall():
+            self.delete_flight(row[0])
+        return super(ShardedConnection, self).delete_template_flight(tflight_id)
+
+    #Flight Table API
+    def get_flight(self, flight_id):
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return None
+        return shard.get_flight(flight_id)
+
+    def get_flights_by_template(self, template_id):
+        cur = self.con.cursor()
+        cur.execute('SELECT DISTINCT shard FROM FlightShard WHERE template_id = ? ORDER BY shard',
+                    (template_id,))
+        flights = []
+        for row in cur.fetchall():
+            flights += self.shard(row[0]).get_flights_by_template(template_id)
+        return flights
+
+    def create_flight(self, flight):
+        """
+        Creates a flight in the shard of its departure date, which is
+        created if needed.
+
+        :return: the id of the flight, or None if it can not be created.
+        :raises: DateFormatException when the departure date is in
+            incorrect format
+        """
+        try:
+            key = self.shard_map.key(flight.get('departuredate'))
+        except (TypeError, ValueError):
+            raise DateFormatException("departure date  and arrival date format are incorrect.")
+        flight_id = flight.get('flightid', None)
+        template_id = flight.get('searchresultid', None)
+        if flight_id is not None and self.contains_flight(flight_id):
+            return None
+        if not self.contains_template_flight(template_id):
+            return None
+        shard = self.shard(key, create=True)
+        new_flight_id = shard.create_flight(flight)
+        if not isinstance(new_flight_id, int):
+            return new_flight_id
+        try:
+            cur = self.con.cursor()
+            cur.execute('INSERT INTO FlightShard VALUES(?,?,?)', (new_flight_id, key, template_id))
+            self.con.commit()
+        except sqlite3.IntegrityError:
+            #Created at the same time in another shard
+            shard.delete_flight(new_flight_id)
+            return None
+        return new_flight_id
+
+    def modify_flight(self, flight_id, flight):
+        """
+        Modifies a flight in its shard. The flight is not moved if its
+        departure date changes month.
+        """
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return False
+        template_id = flight.get('searchresultid')
+        if not self.contains_template_flight(template_id):
+            return None
+        modified = shard.modify_flight(flight_id, flight)
+        if modified:
+            cur = self.con.cursor()
+            cur.execute('UPDATE FlightShard SET template_id = ? WHERE flight_id = ?',
+                        (template_id, flight_id))
+            self.con.commit()
+        return modified
+
+    def delete_flight(self, flight_id):
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return False
+        deleted = shard.delete_flight(flight_id)
+        cur = self.con.cursor()
+        cur.execute('DELETE FROM FlightShard WHERE flight_id = ?', (flight_id,))
+        self.con.commit()
+        return deleted
+
+    #Reservation Table API
+    def get_reservation(self, reservation_id):
+        shard = self.reservation_shard(reservation_id)
+        if shard is None:
+            return None
+        return shard.get_reservation(reservation_id)
+
+    def get_reservation_list(self):
+        reservations = []
+        for shard in self.shards():
+            reservations += shard.get_reservation_list()
+        return reservations
+
+    def get_reservations_by_user(self, creator_id):
+        reservations = []
+        for shard in self.shards():
+            reservations += shard.get_reservations_by_user(creator_id)
+        return reservations
+
+    def get_reservations_by_flight(self, flight_id):
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return []
+        return shard.get_reservations_by_flight(flight_id)
+
+    def create_reservation(self, reservation):
+        """
+        Creates a reservation in the shard of its flight.
+
+        :return: the id of the reservation, or None if the user or the
+            flight does not exist or the user has already booked the flight.
+        """
+        if not self.contains_user(reservation.get('userid', None)):
+            return None
+        shard = self.flight_shard(reservation.get('flightid', None))
+        if shard is None:
+            return None
+        return shard.create_reservation(reservation)
+
+    def modify_reservation(self, reservationid, reference, userid, flightid):
+        """
+        Modifies a reservation in its shard. A reservation can not be moved
+        to a flight of another shard.
+        """
+        shard = self.reservation_shard(reservationid)
+        if shard is None:
+            return False
+        if self.flight_shard(flightid) is not shard or not self.contains_user(userid):
+            return None
+        return shard.modify_reservation(reservationid, reference, userid, flightid)
+
+    def delete_reservation(self, reservation_id):
+        shard = self.reservation_shard(reservation_id)
+        if shard is None:
+            return False
+        return shard.delete_reservation(reservation_id)
+
+    #Ticket Table API
+    def get_ticket(self, ticket_id):
+        shard = self.ticket_shard(ticket_id)
+        if shard is None:
+            return None
+        return shard.get_ticket(ticket_id)
+
+    def get_tickets(self):
+        tickets = []
+        for shard in self.shards():
+            tickets += shard.get_tickets()
+        return tickets
+
+    def get_tickets_by_reservation(self, reservation_id):
+        shard = self.reservation_shard(reservation_id)
+        if shard is None:
+            return []
+        return shard.get_tickets_by_reservation(reservation_id)
+
+    def create_ticket(self, ticket):
+        shard = self.reservation_shard(ticket.get('reservationid', None))
+        if shard is None:
+            return None
+        return shard.create_ticket(ticket)
+
+    def modify_ticket(self, ticket_id, ticket):
+        """
+        Modifies a ticket in its shard. A ticket can not be moved to a
+        reservation of another shard.
+        """
+        shard = self.ticket_shard(ticket_id)
+        if shard is None:
+            return False
+        if self.reservation_shard(ticket.get('reservationid', None)) is not shard:
+            return False
+        return shard.modify_ticket(ticket_id, ticket)
+
+    def delete_ticket(self, ticket_id):
+        shard = self.ticket_shard(ticket_id)
+        if shard is None:
+            return False
+        return shard.delete_ticket(ticket_id)
+
+    #Itinerary API
+    def create_itinerary(self, itinerary):
+        """
+        Books several flights at once, see
+        :py:meth:`Connection.create_itinerary`. The write locks of the
+        shards of the flights are taken in the order of their keys and held
+        until every flight is booked, so the reservations are committed only
+        once none of the flights can fail.
+
+        :return: dictionary ``{flight_id: reservation_id}``, or None if the
+            user or a flight does not exist, a flight is given twice or the
+            user has already booked one of the flights.
+        :raises NoMoreSeatsAvailableException: if a flight has not enough
+            seats left for the passengers.
+        """
+        user_id = itinerary.get('userid', None)
+        flight_ids = itinerary.get('flightids', [])
+        if not self.contains_user(user_id) or len(set(flight_ids)) != len(flight_ids):
+            return None
+        #shard key: flight ids
+        flights = {}
+        cur = self.con.cursor()
+        for flight_id in flight_ids:
+            cur.execute('SELECT shard FROM FlightShard WHERE flight_id = ?', (flight_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            flights.setdefault(row[0], []).append(flight_id)
+
+        reservations = {}
+        locked = []
+        try:
+            for key in sorted(flights):
+                shard = self.shard(key)
+                shard.set_foreign_keys_support()
+                shard_cur = shard.con.cursor()
+                if not shard.con.in_transaction:
+                    shard_cur.execute('BEGIN IMMEDIATE')
+                locked.append(shard)
+                booked = shard._book_itinerary(shard_cur, user_id, flights[key],
+                                               itinerary.get('tickets', []))
+                if booked is None:
+                    return None
+                reservations.update(booked)
+            for shard in locked:
+                shard.con.commit()
+            locked = []
+        finally:
+            for shard in locked:
+                shard.con.rollback()
+        for key in sorted(flights):
+            self.shard(key)._publish_seat_changes()
+        return reservations
+
+    #Waitlist Table API
+    def waitlist_shard(self, waitlist_id):
+        """
+        :return: the connection to the shard of a waitlist entry, or
+            ``None`` if the entry does not exist.
+        """
+        return self._row_shard("Waitlist", "waitlist_id", waitlist_id)
+
+    def get_waitlist_entry(self, waitlist_id):
+        shard = self.waitlist_shard(waitlist_id)
+        if shard is None:
+            return None
+        return shard.get_waitlist_entry(waitlist_id)
+
+    def get_waitlist(self, flight_id):
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return []
+        return shard.get_waitlist(flight_id)
+
+    def create_waitlist_entry(self, entry):
+        """
+        Adds a user to the waitlist of a flight, in the shard of the flight.
+
+        :return: the id of the entry, or None if the user or the flight does
+            not exist or the user is already in the waitlist of the flight.
+        """
+        if not self.contains_user(entry.get('userid', None)):
+            return None
+        shard = self.flight_shard(entry.get('flightid', None))
+        if shard is None:
+            return None
+        return shard.create_waitlist_entry(entry)
+
+    def delete_waitlist_entry(self, waitlist_id):
+        shard = self.waitlist_shard(waitlist_id)
+        if shard is None:
+            return False
+        return shard.delete_waitlist_entry(waitlist_id)
+
+    #SeatChange Table API
+    def get_seat_changes(self, after_id=0, flight_id=None, limit=None):
+        """
+        Extracts the changes of the seats left of a flight, from its shard.
+        The ids of the changes are only ordered within a shard, so a flight
+        must be given.
+        """
+        if flight_id is None:
+            raise ValueError("The seat changes of a sharded database are read per flight")
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return []
+        return shard.get_seat_changes(after_id, flight_id, limit)
+
+    def get_flight_seats(self, flight_id):
+        shard = self.flight_shard(flight_id)
+        if shard is None:
+            return None
+        return shard.get_flight_seats(flight_id)
+
+    #FareCalendar Table API
+    def get_fare_calendar(self, origin, destination, start, end):
+        """
+        Computes the lowest fares of a route from the flights of the shards
+        of the months between *start* and *end*: the template flights are
+        in the catalog and the flights in the shards, so the shards have no
+        ``FareCalendar`` table. A month of fares reads a single shard.
+        """
+        cur = self.con.cursor()
+        cur.execute('SELECT tflight_id FROM TemplateFlight WHERE origin = ? AND destination = ?',
+                    (origin, destination))
+        template_ids = [row[0] for row in cur.fetchall()]
+        fares = []
+        if not template_ids:
+            return fares
+        for key in self.shard_map.keys():
+            if start[:7] <= key <= end[:7]:
+                fares.extend(self.shard(key)._get_fares_of_templates(template_ids, start, end))
+        return fares
+
+    def _search_passengers(self, match, limit):
+        """
+        Searches the passengers of every shard.
+        """
+        passengers = []
+        for shard in self.shards():
+            passengers.extend(shard._search_passengers(match, limit))
+        return passengers
+
+    def reconcile_seats(self, fix=True):
+        """
+        Recomputes the seats left of the flights of every shard.
+        """
+        drift = {}
+        for shard in self.shards():
+            drift.update(shard.reconcile_seats(fix))
+        return drift
+
+    def get_seats_left(self):
+        """
+        Reads the seats left of the flights of every shard. The ids of the
+        changes are the ones of the shard of the flight.
+        """
+        seats = []
+        for shard in self.shards():
+            seats.extend(shard.get_seats_left())
+        return seats
@@ -0,0 +1,209 @@
+"""
+Created on 19.10.2026
+
+Slow query log.
+
+Every statement executed through a :py:class:`flight_database.Connection`
+that takes longer than a threshold is written, as one JSON object per line,
+to a rotating log file with its bound parameters, its duration, the
+``Connection`` method that executed it and the output of
+``EXPLAIN QUERY PLAN``. The entries can be read back with
+:py:func:`read_entries`, which the admin application serves on
+``/slow-queries``.
+
+Each process writes and rotates its own file, named after the log path and
+its pid (``db/slow_queries-<pid>.log``), so that the workers of ``serve.py``
+never rotate a file another worker is writing. :py:func:`read_entries`
+merges the files of all the processes.
+
+Enable it on the Flask application with :py:func:`enable`::
+
+    from flight_reservation import slow_query_log
+    slow_query_log.enable(app, threshold=0.05)
+
+"""
+import glob
+import heapq
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import threading
+import time
+
+from flight_reservation.sql_tracer import calling_method
+
+# Key of the Flask configuration holding the active slow query log
+CONFIG_KEY = "SLOW_QUERY_LOG"
+
+DEFAULT_PATH = "db/slow_queries.log"
+DEFAULT_THRESHOLD = 0.05
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Statements for which sqlite can produce a query plan
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+def explain(con, sql, parameters):
+    """
+    :return: the rows of ``EXPLAIN QUERY PLAN`` for *sql* as a list of
+        strings, or ``None`` if the statement cannot be explained.
+    """
+    if parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    #A plain cursor, the statement must not be reported again
+    cur = sqlite3.Connection.cursor(con, sqlite3.Cursor)
+    try:
+        cur.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+        return [row[-1] for row in cur.fetchall()]
+    except sqlite3.Error:
+        return None
+    finally:
+        cur.close()
+
+
+def _jsonable(parameters):
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return dict((key, _jsonable_value(value)) for key, value in parameters.items())
+    return [_jsonable_value(value) for value in parameters]
+
+
+def _jsonable_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "<%d bytes>" % len(value)
+    return value
+
+
+class SlowQueryLog(object):
+    """
+    Writes the statements slower than *threshold* to a rotating file per
+    process.
+
+    :param str path: log path. Each process writes to the file returned by
+        :py:meth:`process_path`, rotated when it reaches *max_bytes*, with
+        *backup_count* old files kept (``slow_queries-<pid>.log.1``...).
+    :param float threshold: minimum duration, in seconds, of a logged
+        statement.
+    :param int max_bytes: size of the log file that triggers a rotation.
+    :param int backup_count: number of rotated files kept.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, threshold=DEFAULT_THRESHOLD,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        super(SlowQueryLog, self).__init__()
+        self.path = path
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        #Pid of the process owning the handler: a forked worker opens its own
+        self._pid = None
+        self.handler = None
+
+    def process_path(self, pid=None):
+        """
+        :return: the file of the process *pid*, by default the current one.
+        """
+        root, ext = os.path.splitext(self.path)
+        return "%s-%d%s" % (root, pid or os.getpid(), ext)
+
+    def _handler(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.handler = logging.handlers.RotatingFileHandler(
+                    self.process_path(), maxBytes=self.max_bytes,
+                    backupCount=self.backup_count, delay=True)
+                self.handler.setFormatter(logging.Formatter("%(message)s"))
+            return self.handler
+
+    def attach(self, connection):
+        """
+        Starts logging the slow statements of *connection*.
+        """
+        con = connection.con
+
+        def _listener(sql, parameters, duration):
+            if duration >= self.threshold:
+                self.record(con, sql, parameters, duration, calling_method())
+
+        con.statement_listeners.append(_listener)
+
+    def record(self, con, sql, parameters, duration, method):
+        entry = {"timestamp": time.time(),
+                 "duration": duration,
+                 "method": method,
+                 "sql": sql,
+                 "parameters": _jsonable(parameters),
+                 "plan": explain(con, sql, parameters)}
+        record = logging.makeLogRecord({"msg": json.dumps(entry), "levelno": logging.WARNING,
+                                        "levelname": "WARNING"})
+        self._handler().handle(record)
+
+    def close(self):
+        if self.handler is not None:
+            self.handler.close()
+
+
+def read_entries(path=DEFAULT_PATH, limit=100, method=None, min_duration=None):
+    """
+    Reads the entries of a slow query log, from the files of all the
+    processes, including the rotated files.
+
+    :param str path: log path, as given to :py:class:`SlowQueryLog`.
+    :param int limit: maximum number of entries returned.
+    :param str method: only return the statements of this ``Connection``
+        method.
+    :param float min_duration: only return the statements that took at least
+        this number of seconds.
+    :return: list of dictionaries, newest first. Empty if *limit* is not
+        positive.
+    """
+    if limit <= 0:
+        return []
+    root, ext = os.path.splitext(path)
+    paths = glob.glob("%s-*%s" % (root, ext)) + glob.glob("%s-*%s.*" % (root, ext))
+    entries = []
+    for log_path in paths:
+        try:
+            with open(log_path) as f:
+                lines = f.readlines()
+        except OSError:
+            #Rotated while the files were listed
+            continue
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if method is not None and entry.get("method") != method:
+                continue
+            if min_duration is not None and entry.get("duration", 0) < min_duration:
+                continue
+            entries.append(entry)
+    return heapq.nlargest(limit, entries, key=lambda entry: entry.get("timestamp", 0))
+
+
+def enable(app, path=DEFAULT_PATH, threshold=DEFAULT_THRESHOLD, **kwargs):
+    """
+    Installs a :py:class:`SlowQueryLog` on the Flask application *app*.
+
+    :return: the slow query log
+    """
+    log = SlowQueryLog(path, threshold, **kwargs)
+    app.config[CONFIG_KEY] = log
+    return log
+
+
+def disable(app):
+    log = app.config.get(CONFIG_KEY)
+    if log is not None:
+        log.close()
+    app.config[CONFIG_KEY] = None
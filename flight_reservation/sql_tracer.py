@@ -0,0 +1,279 @@
+"""
+Created on 19.10.2026
+
+Optional tracer of the SQL statements executed while handling each request.
+
+Every statement run through a :py:class:`flight_database.Connection` is
+recorded with its parameters, its duration and the ``Connection`` method
+that executed it. At the end of the request the tracer logs the statements,
+flags the queries executed several times with the same parameters and the
+N+1 patterns (the same query executed many times with different
+parameters), and updates a summary per endpoint that can be written to a
+JSON file.
+
+The statements and the per request totals are logged at ``INFO``, the
+problems at ``WARNING``. The summary file is rewritten at most every
+``write_interval`` seconds and when the process exits.
+
+Enable it on the Flask application with :py:func:`enable`::
+
+    from flight_reservation import sql_tracer
+    sql_tracer.enable(app, summary_path="sql_trace_summary.json")
+
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flight_reservation.flight_database import Connection
+
+logger = logging.getLogger(__name__)
+
+# Key of the Flask configuration holding the active tracer
+CONFIG_KEY = "SQL_TRACER"
+
+# Number of executions of the same query, with different parameters, in one
+# request from which it is reported as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = 5
+
+# Minimum number of seconds between two writes of the summary file
+WRITE_INTERVAL = 5.0
+
+# Statements that are part of the connection setup and are never flagged
+IGNORED_PREFIXES = ("PRAGMA",)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+# Code objects of the Connection methods, used to find the calling method
+_CONNECTION_CODES = dict((value.__code__, name) for name, value in vars(Connection).items()
+                         if callable(value) and hasattr(value, "__code__"))
+
+
+def normalize(sql):
+    """
+    :return: the template of a statement: whitespace collapsed and literal
+        values replaced by ``?``.
+    """
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+def calling_method():
+    """
+    :return: the name of the outermost :py:class:`Connection` method in the
+        current call stack, or ``None``.
+    """
+    frame = sys._getframe(1)
+    method = None
+    while frame is not None:
+        name = _CONNECTION_CODES.get(frame.f_code)
+        if name is not None:
+            method = name
+        frame = frame.f_back
+    return method
+
+
+class Statement(object):
+    """
+    One statement executed during a request.
+    """
+
+    def __init__(self, sql, parameters, duration, method, expanded):
+        self.sql = sql
+        self.parameters = parameters
+        self.duration = duration
+        self.method = method
+        #Statements as run by sqlite, with the values bound, including the
+        #ones executed by triggers
+        self.expanded = expanded
+
+    def to_dict(self):
+        return {"sql": self.sql,
+                "parameters": list(self.parameters) if self.parameters is not None else None,
+                "duration": self.duration,
+                "method": self.method,
+                "expanded": self.expanded}
+
+
+class RequestTrace(object):
+    """
+    Statements executed while handling one request.
+
+    :param connection: the :py:class:`flight_database.Connection` of the
+        request.
+    """
+
+    def __init__(self, connection):
+        self.statements = []
+        self._pending = []
+        self._connection = connection
+        connection.con.set_trace_callback(self._pending.append)
+        connection.con.statement_listeners.append(self._executed)
+
+    def _executed(self, sql, parameters, duration):
+        if parameters is not None and not isinstance(parameters, (list, tuple)):
+            parameters = tuple(parameters) if not isinstance(parameters, dict) else \
+                tuple(sorted(parameters.items()))
+        self.statements.append(Statement(sql, parameters, duration, calling_method(),
+                                         self._pending[:]))
+        del self._pending[:]
+
+    def detach(self):
+        self._connection.con.set_trace_callback(None)
+        self._connection.con.statement_listeners.remove(self._executed)
+
+    def repeated(self):
+        """
+        :return: list of ``(sql, parameters, count)`` for the statements
+            executed more than once with the same parameters.
+        """
+        counts = Counter((statement.sql, statement.parameters)
+                         for statement in self.statements if not _ignored(statement.sql))
+        return [(sql, parameters, count) for (sql, parameters), count in counts.items()
+                if count > 1]
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """
+        :return: list of ``(template, count)`` for the queries executed at
+            least *threshold* times with different parameters.
+        """
+        executions = {}
+        for statement in self.statements:
+            if _ignored(statement.sql):
+                continue
+            executions.setdefault(normalize(statement.sql), set()).add(statement.parameters)
+        return [(template, len(parameters)) for template, parameters in executions.items()
+                if len(parameters) >= threshold]
+
+
+def _ignored(sql):
+    return sql.lstrip().upper().startswith(IGNORED_PREFIXES)
+
+
+class SqlTracer(object):
+    """
+    Collects the statements of every request and keeps a summary per
+    endpoint.
+
+    :param str summary_path: file where the summary is written, as JSON,
+        at the end of a request when ``write_interval`` seconds have passed
+        since the previous write, and by :py:meth:`write_summary`. If
+        ``None`` the summary is only kept in memory (see :py:meth:`summary`).
+    :param int n_plus_one_threshold: see :py:data:`N_PLUS_ONE_THRESHOLD`.
+    :param float write_interval: see :py:data:`WRITE_INTERVAL`.
+    """
+
+    def __init__(self, summary_path=None, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD,
+                 write_interval=WRITE_INTERVAL):
+        super(SqlTracer, self).__init__()
+        self.summary_path = summary_path
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.write_interval = write_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._endpoints = {}
+        #Time of the last write of the summary file, None before the first one
+        self._written_at = None
+
+    def start(self, connection):
+        """
+        Starts tracing the statements executed by *connection*.
+
+        :rtype: RequestTrace
+        """
+        return RequestTrace(connection)
+
+    def finish(self, trace, endpoint):
+        """
+        Stops *trace*, logs its statements and problems and adds it to the
+        summary of *endpoint*.
+        """
+        trace.detach()
+        repeated = trace.repeated()
+        n_plus_one = trace.n_plus_one(self.n_plus_one_threshold)
+        total = sum(statement.duration for statement in trace.statements)
+
+        logger.info("%s: %d statements in %.3f ms", endpoint, len(trace.statements),
+                    total * 1000)
+        for statement in trace.statements:
+            logger.info("%s: %.3f ms %s %s %r", endpoint, statement.duration * 1000,
+                        statement.method, statement.sql, statement.parameters)
+        for sql, parameters, count in repeated:
+            logger.warning("%s: query executed %d times with the same parameters %r: %s",
+                           endpoint, count, parameters, sql)
+        for template, count in n_plus_one:
+            logger.warning("%s: possible N+1, query executed %d times: %s",
+                           endpoint, count, template)
+
+        now = time.monotonic()
+        with self._lock:
+            summary = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "statements": 0, "max_statements": 0, "time": 0.0,
+                "repeated": 0, "n_plus_one": 0, "methods": Counter()})
+            summary["requests"] += 1
+            summary["statements"] += len(trace.statements)
+            summary["max_statements"] = max(summary["max_statements"], len(trace.statements))
+            summary["time"] += total
+            summary["repeated"] += sum(count - 1 for _, _, count in repeated)
+            summary["n_plus_one"] += len(n_plus_one)
+            summary["methods"].update(statement.method for statement in trace.statements)
+            due = self._written_at is None or now - self._written_at >= self.write_interval
+            if due:
+                self._written_at = now
+        if self.summary_path and due:
+            self.write_summary()
+
+    def summary(self):
+        """
+        :return: dictionary with, per endpoint, the number of requests and
+            statements, the maximum number of statements in one request, the
+            total time, the number of repeated queries and N+1 patterns found
+            and the number of statements per ``Connection`` method.
+        """
+        with self._lock:
+            return dict((endpoint, dict(values, methods=dict(values["methods"])))
+                        for endpoint, values in self._endpoints.items())
+
+    def write_summary(self):
+        """
+        Writes the current summary to :py:attr:`summary_path`, if set.
+        """
+        if not self.summary_path:
+            return
+        data = dict((endpoint, dict(values, methods=dict(
+            (str(method), count) for method, count in values["methods"].items())))
+            for endpoint, values in self.summary().items())
+        #The requests are not blocked while the file is written
+        with self._write_lock:
+            tmp_path = self.summary_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.summary_path)
+
+
+def enable(app, summary_path=None, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD,
+           write_interval=WRITE_INTERVAL):
+    """
+    Installs a :py:class:`SqlTracer` on the Flask application *app*. The
+    summary file is written a last time when the process exits.
+
+    :return: the tracer
+    """
+    tracer = SqlTracer(summary_path, n_plus_one_threshold, write_interval)
+    if summary_path:
+        atexit.register(tracer.write_summary)
+    app.config[CONFIG_KEY] = tracer
+    return tracer
+
+
+def disable(app):
+    tracer = app.config.get(CONFIG_KEY)
+    if tracer is not None:
+        atexit.unregister(tracer.write_summary)
+    app.config[CONFIG_KEY] = None
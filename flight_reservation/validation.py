@@ -0,0 +1,295 @@
+"""
+Created on 19.10.2026
+
+Validation of the request bodies against the JSON schemas of the resources.
+
+The schemas are the files of *static/schema*, the same documents that are
+sent to the clients by the schema urls. :py:meth:`SchemaRegistry.load` reads
+them all when the application starts and keeps, for every schema, the bytes
+sent to the clients with their ETag and its compiled validator, so that
+neither sending nor validating reads a file. Every schema is compiled once
+into a tree of closures: the keywords are looked up,
+the patterns compiled and the type checks chosen at compile time, so that
+validating a request is only a walk over the body. The validators do not
+stop at the first problem, they collect the errors of all the fields in a
+single pass.
+
+Only the subset of JSON Schema used by our schemas is supported: ``type``,
+``properties``, ``required``, ``items``, ``enum``, ``minimum``, ``maximum``,
+``minLength``, ``maxLength``, ``minItems``, ``maxItems``, ``pattern`` and
+``format``. The formats are the ones checked by
+:py:mod:`flight_reservation.flight_database` (``date``, ``email``, ``phone``
+and ``gate``) plus ``time``. Other keywords, such as ``title`` and
+``description``, are ignored.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+from flight_reservation.flight_database import (parse_date, EMAIL_PATTERN, GATE_PATTERN,
+                                                PHONE_NUMBER_PATTERN)
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "schema")
+
+TIME_PATTERN = re.compile(r"^([01]?\d|2[0-3]):([0-5]?\d)$")
+
+
+def _is_date(value):
+    try:
+        parse_date(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_time(value):
+    return TIME_PATTERN.fullmatch(value) is not None
+
+
+#Name of the format: function returning True when the string is valid
+FORMATS = {
+    "date": _is_date,
+    "time": _is_time,
+    "email": lambda value: EMAIL_PATTERN.match(value) is not None,
+    "phone": lambda value: PHONE_NUMBER_PATTERN.match(value) is not None,
+    "gate": lambda value: GATE_PATTERN.match(value) is not None,
+}
+
+#JSON type: function returning True when the value has the type. bool is a
+#subclass of int but true and false are not numbers in JSON.
+TYPES = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+    "null": lambda value: value is None,
+}
+
+
+def _error(path, message):
+    return "'%s' %s" % (path or "body", message)
+
+
+def _keyword_checks(schema):
+    """
+    Returns the (test, message) pairs of the keywords of *schema* that
+    apply to a value of the right type. The message follows the name of the
+    value in the error.
+    """
+    checks = []
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        checks.append((lambda value: value in allowed,
+                       "must be one of " + ", ".join(json.dumps(v) for v in allowed)))
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        checks.append((lambda value: value >= minimum,
+                       "must be greater than or equal to %s" % minimum))
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        checks.append((lambda value: value <= maximum,
+                       "must be less than or equal to %s" % maximum))
+    if "minLength" in schema:
+        min_length = schema["minLength"]
+        checks.append((lambda value: len(value) >= min_length,
+                       "must have at least %d characters" % min_length))
+    if "maxLength" in schema:
+        max_length = schema["maxLength"]
+        checks.append((lambda value: len(value) <= max_length,
+                       "must have at most %d characters" % max_length))
+    if "minItems" in schema:
+        min_items = schema["minItems"]
+        checks.append((lambda value: len(value) >= min_items,
+                       "must have at least %d items" % min_items))
+    if "maxItems" in schema:
+        max_items = schema["maxItems"]
+        checks.append((lambda value: len(value) <= max_items,
+                       "must have at most %d items" % max_items))
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        checks.append((lambda value: pattern.search(value) is not None,
+                       "does not match " + schema["pattern"]))
+    if "format" in schema:
+        try:
+            checks.append((FORMATS[schema["format"]],
+                           "is not a valid " + schema["format"]))
+        except KeyError:
+            raise ValueError("Unknown format %s" % schema["format"])
+    return checks
+
+
+def compile_schema(schema):
+    """
+    Compiles a JSON schema into a validator.
+
+    :param dict schema: the schema
+    :return: a function ``validate(value, path, errors)`` appending to the
+        list *errors* a message for every problem of *value*. *path* is the
+        name of the value used in the messages
+    :raises ValueError: if the schema uses an unknown type or format
+    """
+    type_name = schema.get("type")
+    if type_name is not None and type_name not in TYPES:
+        raise ValueError("Unknown type %s" % type_name)
+    has_type = TYPES.get(type_name)
+    type_message = "must be of type %s" % type_name
+    checks = _keyword_checks(schema)
+    properties = [(name, compile_schema(subschema))
+                  for name, subschema in schema.get("properties", {}).items()]
+    required = list(schema.get("required", ()))
+    items = compile_schema(schema["items"]) if "items" in schema else None
+
+    def validate(value, path, errors):
+        if has_type is not None and not has_type(value):
+            errors.append(_error(path, type_message))
+            return
+        for test, message in checks:
+            if not test(value):
+                errors.append(_error(path, message))
+        if isinstance(value, dict):
+            prefix = path + "." if path else ""
+            for name in required:
+                if name not in value:
+                    errors.append("'%s' is a required property" % (prefix + name))
+            for name, validate_property in properties:
+                if name in value:
+                    validate_property(value[name], prefix + name, errors)
+        elif items is not None and isinstance(value, list):
+            for index, item in enumerate(value):
+                items(item, "%s[%d]" % (path, index), errors)
+
+    return validate
+
+
+class SchemaRegistry(object):
+    """
+    Loads the schemas of a directory by name and caches their compiled
+    validators.
+
+    :param str directory: the directory of the *<name>.json* files.
+        Defaults to :py:data:`SCHEMA_DIR`
+    """
+
+    def __init__(self, directory=SCHEMA_DIR):
+        super(SchemaRegistry, self).__init__()
+        self.directory = directory
+        self._schemas = {}
+        self._validators = {}
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        """
+        Returns the names of the schema files of the directory.
+        """
+        return sorted(name[:-len(".json")] for name in os.listdir(self.directory)
+                      if name.endswith(".json") and not name.startswith("."))
+
+    def load(self):
+        """
+        Reads and compiles all the schemas of the directory, so that no
+        request reads a file.
+
+        :return: the names of the schemas
+        :raises ValueError: if a schema is not valid JSON or uses an unknown
+            type or format
+        """
+        names = self.names()
+        for name in names:
+            self.validator(name)
+            self.document(name)
+        return names
+
+    def path(self, name):
+        """
+        Returns the path of the file of the schema *name*.
+
+        :raises KeyError: if the name is not the name of a schema file
+        """
+        if not name or "/" in name or "\\" in name or name.startswith("."):
+            raise KeyError(name)
+        return os.path.join(self.directory, name + ".json")
+
+    def schema(self, name):
+        """
+        Returns the schema *name* as a dictionary.
+
+        :raises KeyError: if there is no schema with this name
+        """
+        try:
+            return self._schemas[name]
+        except KeyError:
+            pass
+        try:
+            with io.open(self.path(name), encoding="utf-8") as f:
+                schema = json.load(f)
+        except (IOError, OSError):
+            raise KeyError(name)
+        self._schemas[name] = schema
+        return schema
+
+    def validator(self, name):
+        """
+        Returns the compiled validator of the schema *name*.
+
+        :raises KeyError: if there is no schema with this name
+        """
+        try:
+            return self._validators[name]
+        except KeyError:
+            with self._lock:
+                if name not in self._validators:
+                    self._validators[name] = compile_schema(self.schema(name))
+                return self._validators[name]
+
+    def document(self, name):
+        """
+        Returns the schema *name* as sent to the clients.
+
+        :return: ``(body, etag)``, the JSON document as bytes and the hash of
+            its content
+        :raises KeyError: if there is no schema with this name
+        """
+        try:
+            return self._documents[name]
+        except KeyError:
+            pass
+        body = json.dumps(self.schema(name), separators=(",", ":")).encode("utf-8")
+        document = (body, hashlib.sha1(body).hexdigest())
+        self._documents[name] = document
+        return document
+
+    def validate(self, name, body, require=()):
+        """
+        Validates a request body against the schema *name*.
+
+        :param str name: name of the schema
+        :param body: the decoded JSON body
+        :param require: names of properties that are required in this
+            request in addition to the required properties of the schema
+        :return: the list of error messages, empty if the body is valid
+        """
+        errors = []
+        self.validator(name)(body, "", errors)
+        if isinstance(body, dict):
+            for field in require:
+                if field not in body:
+                    errors.append("'%s' is a required property" % field)
+        return errors
+
+
+#Registry of the schemas of static/schema
+registry = SchemaRegistry()
+
+
+def validate(name, body, require=()):
+    """
+    Validates *body* against the schema *name* of the default registry. See
+    :py:meth:`SchemaRegistry.validate`.
+    """
+    return registry.validate(name, body, require)
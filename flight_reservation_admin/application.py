@@ -1 +1 @@
-from flask import Flask#Define the application and the apiapp = Flask(__name__, static_folder='static', static_url_path='')app.debug=True
\ No newline at end of file
+from flask import Flask, jsonify, requestfrom flight_reservation import slow_query_logfrom flight_reservation_admin import assets#Define the application and the api#The files of build_static.py, when they exist, replace the static folderif assets.built():    app = Flask(__name__, static_folder=None)    assets.init_app(app)else:    app = Flask(__name__, static_folder='static', static_url_path='')app.debug=Trueapp.config.update({"SLOW_QUERY_LOG_PATH": slow_query_log.DEFAULT_PATH})@app.route('/slow-queries')def slow_queries():    """    Returns the newest entries of the slow query log as JSON.    Optional query parameters: limit (default 100), method (name of the    Connection method) and min_duration (in seconds).    """    try:        limit = int(request.args.get('limit', 100))        min_duration = request.args.get('min_duration')        min_duration = float(min_duration) if min_duration is not None else None    except ValueError:        return jsonify({"error": "limit and min_duration must be numbers"}), 400    entries = slow_query_log.read_entries(app.config["SLOW_QUERY_LOG_PATH"], limit=limit,                                          method=request.args.get('method'),                                          min_duration=min_duration)    return jsonify({"items": entries})
\ No newline at end of file
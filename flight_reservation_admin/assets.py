@@ -0,0 +1,319 @@
+"""
+Created on 19.10.2026
+
+Fingerprinted and precompressed static assets of the admin interface.
+
+The pages of the admin interface load the stylesheets and scripts of
+bootstrap, lobibox and jQuery one by one from ``static``, uncompressed and
+without cache headers, so every page load sends a dozen requests.
+:py:func:`build` (run by ``build_static.py``) reads the pages and writes to
+``build``:
+
+* one bundle of the stylesheets and one bundle of the scripts of each page,
+  in their order in the page;
+* the files the bundles and the pages reference (fonts, images), the
+  ``url()`` of the stylesheets being rewritten;
+* the pages, referencing the bundles instead of the original files.
+
+The assets are written under ``assets/`` with the hash of their content in
+their name, so their URL changes with their content and they can be cached
+forever. A ``.gz`` variant is written next to the compressible files.
+
+:py:func:`init_app` makes the admin application serve ``build`` when it
+exists: the assets with ``Cache-Control: immutable`` and the pages with
+``no-cache``, the ``.gz`` variant to the clients accepting gzip. The files
+are sent with ``send_file``, which uses the ``sendfile`` of the server
+(``wsgi.file_wrapper``) or ``X-Sendfile`` with ``USE_X_SENDFILE``. The
+other files are still served from ``static``.
+
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_file, send_from_directory, safe_join
+
+from flight_reservation.compression import parse_accept_encoding
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+BUILD_DIR = os.path.join(ROOT, "build")
+
+# Directory of the fingerprinted assets in the build
+ASSETS_DIR = "assets"
+MANIFEST = "manifest.json"
+
+# Characters of the content hash in the names of the assets
+HASH_LENGTH = 12
+
+# Files compressed in the build: the images and the woff fonts already are
+COMPRESSED_EXTENSIONS = (".css", ".js", ".html", ".svg", ".eot", ".ttf", ".otf", ".json")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+STYLESHEET_PATTERN = re.compile(r'<link\b[^>]*\brel="stylesheet"[^>]*>')
+SCRIPT_PATTERN = re.compile(r'<script\b[^>]*\bsrc="[^"]*"[^>]*>\s*</script>')
+REFERENCE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+CSS_URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^)\'"]*)\1\s*\)')
+CSS_IMPORT_PATTERN = re.compile(r'@import\s[^;]*;')
+
+
+def _local(url):
+    """
+    :return: the path of a URL relative to the page, without its query and
+        fragment, or ``None`` if it is not a file of the site.
+    """
+    if not url or url.startswith(("#", "/", "data:")) or re.match(r"^[a-z]+:", url):
+        return None
+    return re.split(r"[?#]", url, 1)[0]
+
+
+def _suffix(url):
+    """
+    :return: the query and fragment of a URL.
+    """
+    path = re.split(r"[?#]", url, 1)[0]
+    return url[len(path):]
+
+
+class Builder(object):
+    """
+    Writes the build of the admin pages, see :py:func:`build`.
+
+    :param str source: the directory of the pages and their files.
+    :param str target: the directory of the build.
+
+    """
+
+    def __init__(self, source, target):
+        super(Builder, self).__init__()
+        self.source = source
+        self.target = target
+        #Source path of a file: path in the build
+        self.manifest = {}
+        self.missing = set()
+
+    def write_asset(self, name, content):
+        """
+        Writes an asset in the build with the hash of its content in its name.
+
+        :param str name: the path of the file in the source directory.
+        :param bytes content: its content.
+        :return: its path in the build.
+        """
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        base, extension = posixpath.splitext(name)
+        path = posixpath.join(ASSETS_DIR, "%s.%s%s" % (base, digest, extension))
+        self.write(path, content)
+        return path
+
+    def write(self, path, content):
+        """
+        Writes a file in the build, with its ``.gz`` variant if it is
+        compressible.
+        """
+        full_path = os.path.join(self.target, *path.split("/"))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+        if path.endswith(COMPRESSED_EXTENSIONS):
+            #mtime 0: the same content always gives the same file
+            with open(full_path + ".gz", "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=9, mtime=0) as compressed:
+                    compressed.write(content)
+
+    def asset(self, name):
+        """
+        Writes a file of the source directory as it is.
+
+        :return: its path in the build, or ``None`` if it does not exist.
+        """
+        if name not in self.manifest:
+            full_path = os.path.join(self.source, *name.split("/"))
+            if not os.path.isfile(full_path):
+                self.missing.add(name)
+                return None
+            with open(full_path, "rb") as f:
+                self.manifest[name] = self.write_asset(name, f.read())
+        return self.manifest[name]
+
+    def stylesheet(self, name):
+        """
+        :return: the content of a stylesheet of the source directory, its
+            ``url()`` referencing the files in the build.
+        """
+        with io.open(os.path.join(self.source, *name.split("/")), encoding="utf-8") as f:
+            css = f.read()
+        directory = posixpath.dirname(name)
+
+        def replace(match):
+            url = match.group(2)
+            path = _local(url)
+            if path is None:
+                return match.group(0)
+            built = self.asset(posixpath.normpath(posixpath.join(directory, path)))
+            if built is None:
+                return match.group(0)
+            #The bundles are in the root of the assets
+            return "url(%s%s)" % (posixpath.relpath(built, ASSETS_DIR), _suffix(url))
+
+        return CSS_URL_PATTERN.sub(replace, css)
+
+    def bundle(self, tags, pattern, extension, read):
+        """
+        Writes the bundle of the files referenced by tags of a page.
+
+        :param list tags: the tags of the page.
+        :param str pattern: format of the tag of the bundle, receiving its
+            path.
+        :param str extension: the extension of the bundle.
+        :param read: callable returning the content of a file, as text.
+        :return: ``(tag of the bundle, tags bundled)``, or ``(None, [])``
+            if none of the files exists.
+        """
+        contents, bundled = [], []
+        for tag in tags:
+            name = _local(REFERENCE_PATTERN.search(tag).group(2))
+            if name is None:
+                continue
+            if not os.path.isfile(os.path.join(self.source, *name.split("/"))):
+                self.missing.add(name)
+                continue
+            contents.append(read(name))
+            bundled.append(tag)
+        if not bundled:
+            return None, []
+        if extension == ".css":
+            #The @import rules are ignored after the first rule of a stylesheet
+            imports = [rule for content in contents for rule in CSS_IMPORT_PATTERN.findall(content)]
+            contents = imports + [CSS_IMPORT_PATTERN.sub("", content) for content in contents]
+        #A script may not end with a semicolon or a new line
+        content = ("\n;\n" if extension == ".js" else "\n").join(contents).encode("utf-8")
+        return pattern % self.write_asset("bundle" + extension, content), bundled
+
+    def page(self, name):
+        """
+        Writes a page of the source directory, its stylesheets and its
+        scripts bundled, referencing the files in the build.
+        """
+        with io.open(os.path.join(self.source, name), encoding="utf-8") as f:
+            html = f.read()
+
+        def read_script(script):
+            with io.open(os.path.join(self.source, *script.split("/")), encoding="utf-8") as f:
+                return f.read()
+
+        for tags, pattern, extension, read in (
+                (STYLESHEET_PATTERN.findall(html),
+                 '<link rel="stylesheet" type="text/css" href="%s" />', ".css", self.stylesheet),
+                (SCRIPT_PATTERN.findall(html),
+                 '<script type="text/javascript" src="%s"></script>', ".js", read_script)):
+            tag, bundled = self.bundle(tags, pattern, extension, read)
+            if tag is None:
+                continue
+            #The bundle replaces the first tag bundled, the other ones are removed
+            html = html.replace(bundled[0], tag, 1)
+            for old in bundled[1:]:
+                html = re.sub(r"[ \t]*" + re.escape(old) + r"[ \t]*\n?", "", html, 1)
+
+        def replace(match):
+            path = _local(match.group(2))
+            if path is None or path.startswith(ASSETS_DIR + "/") or path.endswith(".html"):
+                return match.group(0)
+            built = self.asset(path)
+            if built is None:
+                return match.group(0)
+            return '%s="%s%s"' % (match.group(1), built, _suffix(match.group(2)))
+
+        self.write(name, REFERENCE_PATTERN.sub(replace, html).encode("utf-8"))
+
+
+def build(source=STATIC_DIR, target=BUILD_DIR):
+    """
+    Builds the pages of a directory and the files they use.
+
+    The build directory is replaced.
+
+    :param str source: the directory of the ``.html`` pages.
+    :param str target: the directory of the build.
+    :return: the :py:class:`Builder`, with the ``manifest`` of the files
+        written and the ``missing`` files referenced by the pages.
+    """
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    builder = Builder(source, target)
+    for name in sorted(os.listdir(source)):
+        if name.endswith(".html"):
+            builder.page(name)
+    with io.open(os.path.join(target, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(builder.manifest, f, indent=2, sort_keys=True)
+    return builder
+
+
+def accepts_gzip(header):
+    """
+    :return: whether an ``Accept-Encoding`` header accepts gzip.
+    """
+    codings = parse_accept_encoding(header)
+    return codings.get("gzip", codings.get("*", 0)) > 0
+
+
+def send_built_file(build_dir, filename):
+    """
+    :return: the response sending a file of the build, its ``.gz`` variant
+        if the client accepts it, or ``None`` if the file is not in the
+        build.
+    """
+    path = safe_join(build_dir, filename)
+    if path is None or not os.path.isfile(path) or filename.endswith(".gz"):
+        return None
+    compressed = path + ".gz"
+    has_variant = os.path.isfile(compressed)
+    use_variant = has_variant and accepts_gzip(request.headers.get("Accept-Encoding"))
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    response = send_file(compressed if use_variant else path, mimetype=mimetype,
+                         conditional=True)
+    if use_variant:
+        response.headers["Content-Encoding"] = "gzip"
+    if has_variant:
+        response.vary.add("Accept-Encoding")
+    if filename.startswith(ASSETS_DIR + "/"):
+        response.headers["Cache-Control"] = IMMUTABLE
+    else:
+        #The pages reference the current assets, they are revalidated
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def built(build_dir=BUILD_DIR):
+    """
+    :return: whether a build exists.
+    """
+    return os.path.isfile(os.path.join(build_dir, MANIFEST))
+
+
+def init_app(app, build_dir=BUILD_DIR, static_dir=STATIC_DIR):
+    """
+    Serves the files of the build, and the other files from the static
+    directory, on the root of a Flask application created without static
+    folder.
+
+    :return: ``True`` if there is a build to serve.
+    """
+    if not built(build_dir):
+        return False
+
+    def static(filename):
+        response = send_built_file(build_dir, filename)
+        if response is None:
+            response = send_from_directory(static_dir, filename)
+        return response
+
+    app.add_url_rule("/<path:filename>", endpoint="static", view_func=static)
+    return True
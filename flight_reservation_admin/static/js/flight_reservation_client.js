@@ -71,6 +71,31 @@ const DEFAULT_DATATYPE = "json";
  */
 const ENTRYPOINT = "/flight-booking-system/api/users"; //Entrypoint: Resource Users
 
+/**
+ * Milliseconds without typing before the search is sent
+ * @constant {number}
+ * @default
+ */
+const SEARCH_DELAY = 250;
+
+/**
+ * Minimum length of a search, the API ignores the words of one character
+ * @constant {number}
+ * @default
+ */
+const SEARCH_MIN_LENGTH = 2;
+
+/**
+ * URI template of the search, from the flight-booking-system:search control of the users list
+ * @type {string}
+ */
+var searchTemplate = null;
+
+/**
+ * Timer of the search being typed
+ */
+var searchTimer = null;
+
 
 /**
  * Associated rel attribute: Users Mason+JSON and users-all
@@ -114,6 +139,9 @@ function getUsers(apiurl) {
             appendUserToList(user["@controls"].self.href, getFullName(user));
         }
 
+        var search_ctrl = data["@controls"]["flight-booking-system:search"];
+        searchTemplate = search_ctrl ? search_ctrl.href : null;
+
         //Prepare the new_user_form to create a new user
         var create_ctrl = data["@controls"]["flight-booking-system:add-user"]
 
@@ -121,10 +149,7 @@ function getUsers(apiurl) {
             createFormFromSchema(create_ctrl.href, create_ctrl.schema, "new_user_form");
         }
         else if (create_ctrl.schemaUrl) {
-            $.ajax({
-                url: create_ctrl.schemaUrl,
-                dataType: DEFAULT_DATATYPE
-            }).done(function (data, textStatus, jqXHR) {
+            getSchema(create_ctrl.schemaUrl).done(function (data, textStatus, jqXHR) {
                 createFormFromSchema(create_ctrl.href, data, "new_user_form");
             }).fail(function (jqXHR, textStatus, errorThrown) {
                 if (DEBUG) {
@@ -143,6 +168,82 @@ function getUsers(apiurl) {
 }
 
 
+/**
+ * Associated rel attribute: flight-booking-system:search
+ *
+ * Sends an AJAX GET request to search the users and the passengers whose names, email or
+ * phone number contain words starting with the words of the query. An empty query lists all
+ * the users again, a query of one character does nothing.
+ *
+ * ONSUCCESS=> Show the matching users in the #user_list, best match first. A passenger is
+ *             shown with a link to the user owning the reservation of the ticket.
+ * ONERROR => Show an alert to the user.
+ *
+ * @param {string} query - The words searched.
+**/
+function searchUsers(query) {
+    query = query.trim();
+    if (!query || !searchTemplate) {
+        return getUsers();
+    }
+    if (query.length < SEARCH_MIN_LENGTH) {
+        return;
+    }
+    var apiurl = searchTemplate.replace("{?q,limit,offset}", "?q=" + encodeURIComponent(query));
+    return $.ajax({
+        url: apiurl,
+        type: 'get',
+        dataType:DEFAULT_DATATYPE
+    }).done(function (data, textStatus, jqXHR){
+        if (DEBUG) {
+            console.log ("RECEIVED RESPONSE: data:",data,"; textStatus:",textStatus);
+        }
+        $("#user_list").empty();
+        var results = data.items;
+        for (var i=0; i < results.length; i++){
+            var result = results[i];
+            if (result.kind == "user") {
+                appendUserToList(result["@controls"].self.href, getFullName(result));
+            }
+            else {
+                appendUserToList(result["@controls"].author.href,
+                                 getFullName(result) + " (passenger)");
+            }
+        }
+    }).fail(function (jqXHR, textStatus, errorThrown){
+        if (DEBUG) {
+            console.log ("RECEIVED ERROR: textStatus:",textStatus, ";error:",errorThrown);
+        }
+        alert_error("Could not search the users.  Please, try again");
+    });
+}
+
+
+/**
+ * Schemas already requested, by url. The schemas do not change while the page is open.
+ */
+var schemas = {};
+
+/**
+ * Fetch a JSON schema once per page: the following calls with the same url
+ * reuse the request.
+ *
+ * @param {string} url - The url of the schema.
+ * @returns {Object} The jqXHR of the request, receiving the schema in done().
+ */
+function getSchema(url) {
+    if (!(url in schemas)) {
+        schemas[url] = $.ajax({
+            url: url,
+            dataType: DEFAULT_DATATYPE
+        }).fail(function () {
+            //Fetched again the next time
+            delete schemas[url];
+        });
+    }
+    return schemas[url];
+}
+
 /**
  * Populate a form with the <input> elements contained in the <i>schema</i> input parameter.
  * The action attribute is filled in with the <i>url</i> parameter. Values are filled
@@ -296,10 +397,7 @@ function user_data(apiurl){
                     fillFormWithMasonData($form, data);
                 }
                 else if (user_links["edit"].schemaUrl) {
-                    $.ajax({
-                        url: user_links["edit"].schemaUrl,
-                        dataType: DEFAULT_DATATYPE
-                    }).done(function (schema, textStatus, jqXHR) {
+                    getSchema(user_links["edit"].schemaUrl).done(function (schema, textStatus, jqXHR) {
                         $form = createFormFromSchema(resource_url, schema, "edit_user_form");
                         $("#editUser").show();
                         fillFormWithMasonData($form, data);
@@ -815,6 +913,11 @@ $(function() {
   $("#createUser").on("click", handleCreateUser);
 
   $("#user_list").on("click", "li a", handleGetUser);
+  $("#user_search").on("input", function() {
+    var query = $(this).val();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(function() { searchUsers(query); }, SEARCH_DELAY);
+  });
 
   $.get({
     url: 'localhost:5000/flight-booking-system/api/users',
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Import-time report of the Flight Booking API.
+
+Imports a module in a fresh interpreter with ``python -X importtime``,
+several times, and reports the modules that cost the most to import (own
+time and cumulative time, the best of the runs to remove the noise), the
+cost per top level package and the cost of each module of this project.
+With ``--budget`` it exits with an error when the import of the module takes
+longer than the budget, so that it can run in the CI.
+
+Usage:
+    PYTHONPATH=. python3 import_time_report.py
+    PYTHONPATH=. python3 import_time_report.py flight_reservation.resources --budget 250
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Top level packages of this project
+PROJECT_PACKAGES = ("main", "flight_reservation", "flight_reservation_admin")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def parse_importtime(output):
+    """
+    Parses the output of ``python -X importtime``.
+
+    :return: list of ``(module, self_us, cumulative_us, depth)`` in the order
+        of the output (a module comes after the modules it imported).
+    """
+    entries = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2)),
+                            (len(match.group(3)) - 1) // 2))
+    return entries
+
+
+def measure(module, python=sys.executable, cwd=ROOT):
+    """
+    Imports *module* in a new interpreter.
+
+    :return: the parsed entries, see :py:func:`parse_importtime`.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = cwd + os.pathsep + env.get("PYTHONPATH", "")
+    #The byte code is written by a first import so that compiling is not measured
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    subprocess.run([python, "-c", "import " + module], cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = subprocess.run([python, "-X", "importtime", "-c", "import " + module],
+                            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError("importing %s failed:\n%s" % (module, result.stderr))
+    return parse_importtime(result.stderr)
+
+
+def best_of(runs):
+    """
+    Merges several runs keeping, for each module, the lowest times.
+
+    :return: dictionary ``{module: (self_us, cumulative_us)}``
+    """
+    merged = {}
+    for entries in runs:
+        for module, self_us, cumulative_us, _ in entries:
+            if module in merged:
+                old_self, old_cumulative = merged[module]
+                merged[module] = (min(old_self, self_us), min(old_cumulative, cumulative_us))
+            else:
+                merged[module] = (self_us, cumulative_us)
+    return merged
+
+
+def package_totals(times):
+    """
+    :return: dictionary ``{top level package: total own time in us}``
+    """
+    totals = {}
+    for module, (self_us, _) in times.items():
+        package = module.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main",
+                        help="module to import (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of imports, the best time is kept (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="number of modules listed (default: %(default)s)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="maximum import time of the module, in milliseconds")
+    parser.add_argument("--json", default=None,
+                        help="write the time of every module to this file")
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    times = best_of(runs)
+    total = times[args.module][1] / 1000.0
+
+    print("=" * 60)
+    print("⏱️  Import time of %s: %.1f ms (best of %d)" % (args.module, total, args.repeat))
+    print("=" * 60)
+    print("%-50s %10s %10s" % ("module", "self (ms)", "cumul (ms)"))
+    for module, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][0])[
+            :args.top]:
+        print("%-50s %10.2f %10.2f" % (module, self_us / 1000.0, cumulative_us / 1000.0))
+
+    print()
+    print("📦 Own time per package")
+    totals = package_totals(times)
+    for package, self_us in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print("%-50s %10.2f" % (package, self_us / 1000.0))
+
+    print()
+    print("🏠 Modules of the project")
+    for module, (self_us, cumulative_us) in sorted(times.items()):
+        if module.split(".")[0] in PROJECT_PACKAGES:
+            print("%-50s %10.2f %10.2f" % (module, self_us / 1000.0, cumulative_us / 1000.0))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict((module, {"self_us": self_us, "cumulative_us": cumulative_us})
+                           for module, (self_us, cumulative_us) in times.items()),
+                      f, indent=2, sort_keys=True)
+
+    if args.budget is not None:
+        print()
+        if total > args.budget:
+            print("❌ %s takes %.1f ms to import, over the budget of %.1f ms"
+                  % (args.module, total, args.budget))
+            return 1
+        print("✅ %s imports in %.1f ms, within the budget of %.1f ms"
+              % (args.module, total, args.budget))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,77 @@
-from werkzeug.serving import run_simple
+import os
+
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
-from flight_reservation.resources import app as flight_reservation
-from flight_reservation_admin.application import app as flight_reservation_admin
+from flight_reservation.resources import create_app
+from flight_reservation.metrics import MetricsMiddleware
+from flight_reservation.compression import CompressionMiddleware
+from flight_reservation.rate_limit import RateLimitMiddleware
+from flight_reservation.coalescing import CoalescingMiddleware
+from flight_reservation.lazy import LazyWSGIApp
+
+# The admin interface is only imported when it receives its first request
+admin_application = LazyWSGIApp("flight_reservation_admin.application:app")
+
+
+def configure(flight_reservation):
+    """
+    Configures the API application from the environment variables.
+    """
+    # Set FLIGHT_SHARD_DIR to serve a database split in per-month shards by
+    # shard_database.py
+    if os.environ.get("FLIGHT_SHARD_DIR"):
+        from flight_reservation.sharding import ShardedEngine
+        flight_reservation.config["Engine"] = ShardedEngine(os.environ["FLIGHT_SHARD_DIR"])
+    # Set FLIGHT_SQL_TRACE to the file where the per endpoint SQL summary is written
+    if os.environ.get("FLIGHT_SQL_TRACE"):
+        import logging
+        from flight_reservation import sql_tracer
+        logging.basicConfig(level=logging.INFO)
+        sql_tracer.enable(flight_reservation, summary_path=os.environ["FLIGHT_SQL_TRACE"])
+    # Set FLIGHT_SLOW_QUERY_MS to log the statements slower than this number of milliseconds
+    if os.environ.get("FLIGHT_SLOW_QUERY_MS"):
+        from flight_reservation import slow_query_log
+        slow_query_log.enable(flight_reservation, slow_query_log.DEFAULT_PATH,
+                              threshold=float(os.environ["FLIGHT_SLOW_QUERY_MS"]) / 1000)
+
+    # FLIGHT_SEAT_COUNTERS is set by serve.py --seat-counters to the shared
+    # memory block of the seat counters of the workers
+    if os.environ.get("FLIGHT_SEAT_COUNTERS"):
+        from flight_reservation import seat_counters
+        seat_counters.enable(flight_reservation,
+                             seat_counters.SeatCounterTable.attach(os.environ["FLIGHT_SEAT_COUNTERS"]))
+
+
+def create_application(flight_reservation=None):
+    """
+    Creates the WSGI application served: the API application, configured
+    from the environment, with the admin interface and the middlewares.
+
+    :param flight_reservation: the API application. Defaults to a new one,
+        see :py:func:`flight_reservation.resources.create_app`.
+    :return: the :py:class:`~flight_reservation.metrics.MetricsMiddleware`
+        wrapping them. The API application is kept in its
+        ``flight_reservation`` attribute.
+    """
+    if flight_reservation is None:
+        flight_reservation = create_app()
+    configure(flight_reservation)
+    # Concurrent identical GETs share one response, already compressed for their
+    # Accept-Encoding
+    coalescing = CoalescingMiddleware(CompressionMiddleware(DispatcherMiddleware(flight_reservation, {
+        '/flight-booking-system/admin': admin_application
+    })))
+    # Token buckets per client and load shedding, inside the metrics so that the
+    # rejected requests are counted
+    rate_limit = RateLimitMiddleware(coalescing)
+    application = MetricsMiddleware(rate_limit, url_map=flight_reservation.url_map)
+    application.add_collector(rate_limit.collect)
+    application.add_collector(coalescing.collect)
+    application.flight_reservation = flight_reservation
+    return application
+
 
-application = DispatcherMiddleware(flight_reservation, {
-    '/flight-booking-system/admin': flight_reservation_admin
-})
 if __name__ == '__main__':
-    run_simple('localhost', 8000, application,
+    from werkzeug.serving import run_simple
+    #Threaded, the seat streams stay open while the other requests are served
+    run_simple('localhost', 8000, create_application(), threaded=True,
                use_reloader=True, use_debugger=True, use_evalex=True)
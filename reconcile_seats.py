@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Recomputes the seats left of the flights of the Flight Booking database.
+
+The seats left of every flight are recomputed from its tickets in one
+grouped query and the flights whose seats left differ are corrected (see
+:py:meth:`flight_reservation.flight_database.Connection.reconcile_seats`).
+The triggers of the schema keep them right when tickets, reservations and
+users are deleted; run it once on a database written before them, with
+``--install-triggers`` to add them.
+
+Usage:
+    PYTHONPATH=. python3 reconcile_seats.py --dry-run
+    PYTHONPATH=. python3 reconcile_seats.py --install-triggers
+    PYTHONPATH=. python3 reconcile_seats.py --shards db/shards
+"""
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH,
+                        help="database to reconcile (default: %(default)s)")
+    parser.add_argument("--shards", default=None,
+                        help="directory of a sharded database, instead of --db")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only report the flights whose seats left are wrong")
+    parser.add_argument("--install-triggers", action="store_true",
+                        help="create the missing tables, indexes and triggers of the schema first")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("💺 Flight Booking API - Seat reconciliation")
+    print("=" * 60)
+    if args.shards is not None:
+        from flight_reservation.sharding import ShardedEngine
+        if not os.path.isdir(args.shards):
+            print("❌ No sharded database at %s" % args.shards)
+            return 1
+        engine = ShardedEngine(args.shards)
+    elif os.path.exists(args.db):
+        engine = database.Engine(args.db)
+    else:
+        print("❌ No database at %s" % args.db)
+        return 1
+
+    if args.install_triggers:
+        engine.create_tables()
+        if args.shards is not None:
+            for key in engine.shard_map.keys():
+                engine.create_shard(key)
+        print("🔧 Triggers installed")
+
+    connection = engine.connect()
+    try:
+        drift = connection.reconcile_seats(fix=not args.dry_run)
+    finally:
+        connection.close()
+    for flight_id, (seats_left, recomputed) in sorted(drift.items()):
+        print("✈️  Flight %s: %s seats left, %s recomputed" % (flight_id, seats_left, recomputed))
+    if args.dry_run:
+        print("🔍 %d flights to correct" % len(drift))
+    else:
+        print("✅ %d flights corrected" % len(drift))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
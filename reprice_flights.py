@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Reprices the flights of the Flight Booking database from their load factor.
+
+The price of every flight not departed yet is set to its base price
+multiplied by the factor of the pricing curve for its load factor and its
+days to departure (see :py:mod:`flight_reservation.repricing`). The flights
+are repriced by chunks, one transaction per chunk. Run it periodically, e.g.
+from cron. The curve can be given as a JSON file with the arguments of
+:py:class:`flight_reservation.repricing.PricingCurve`.
+
+Usage:
+    PYTHONPATH=. python3 reprice_flights.py --dry-run
+    PYTHONPATH=. python3 reprice_flights.py --curve pricing_curve.json
+    PYTHONPATH=. python3 reprice_flights.py --shards db/shards --today 2018-05-01
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation.repricing import PricingCurve, Repricer, DEFAULT_CHUNK_SIZE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH,
+                        help="database to reprice (default: %(default)s)")
+    parser.add_argument("--shards", default=None,
+                        help="directory of a sharded database, instead of --db")
+    parser.add_argument("--curve", default=None,
+                        help="JSON file of the pricing curve (default: the default curve)")
+    parser.add_argument("--today", default=None,
+                        help="reprice the flights departing this day or later, "
+                             "YYYY-MM-DD (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="flights repriced in one transaction (default: %(default)s)")
+    parser.add_argument("--pause", type=float, default=0,
+                        help="seconds waited between two chunks (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only count the flights whose price would change")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("💶 Flight Booking API - Flight repricing")
+    print("=" * 60)
+    if args.shards is not None:
+        from flight_reservation.sharding import ShardedEngine
+        if not os.path.isdir(args.shards):
+            print("❌ No sharded database at %s" % args.shards)
+            return 1
+        engine = ShardedEngine(args.shards)
+    elif os.path.exists(args.db):
+        engine = database.Engine(args.db)
+    else:
+        print("❌ No database at %s" % args.db)
+        return 1
+
+    try:
+        today = database.parse_date(args.today) if args.today else None
+        curve = None
+        if args.curve is not None:
+            with io.open(args.curve, encoding="utf-8") as f:
+                curve = PricingCurve.from_dict(json.load(f))
+        repricer = Repricer(engine, curve, args.chunk_size)
+    except (IOError, ValueError) as excp:
+        print("❌ %s" % excp)
+        return 1
+
+    start = time.time()
+    counts = repricer.reprice(today, dry_run=args.dry_run, pause=args.pause)
+    print("✈️  %d flights not departed yet" % counts["flights"])
+    if args.dry_run:
+        print("🔍 %d prices to change" % counts["repriced"])
+    else:
+        print("✅ %d prices changed in %.1f s" % (counts["repriced"], time.time() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
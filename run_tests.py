@@ -2,45 +2,206 @@
 """
 Test runner for Flight Booking API
 Runs all unit tests and displays a summary
+
+With --workers N the test modules are sharded across N worker processes.
+Every worker runs in its own temporary directory holding a copy of the
+schema, the data dump and the seeded test database, so the modules never
+share db/flight_test.db. The results of all the workers are merged into one
+summary.
 """
+import argparse
+import contextlib
+import fnmatch
+import io
 import os
+import shutil
 import sys
+import tempfile
+import time
 import unittest
-import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add project root to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
 
 # Note: Test database should be set up first using setup_test_db.py
 TEST_DB_PATH = 'db/flight_test.db'
-if not os.path.exists(TEST_DB_PATH):
-    print(f"⚠️  Test database not found: {TEST_DB_PATH}")
-    print(f"💡 Run: python3 setup_test_db.py\n")
-
-print("=" * 60)
-print("🧪 Flight Booking API - Test Suite")
-print("=" * 60)
-print()
-
-# Discover and run all tests
-loader = unittest.TestLoader()
-start_dir = 'test'
-suite = loader.discover(start_dir, pattern='database_api_tests_*.py')
-
-# Run tests with verbosity
-runner = unittest.TextTestRunner(verbosity=2)
-result = runner.run(suite)
-
-print()
-print("=" * 60)
-print("📊 Test Summary")
-print("=" * 60)
-print(f"Tests run: {result.testsRun}")
-print(f"✅ Passed: {result.testsRun - len(result.failures) - len(result.errors)}")
-print(f"❌ Failed: {len(result.failures)}")
-print(f"⚠️  Errors: {len(result.errors)}")
-print()
-
-# Exit with appropriate code
-sys.exit(0 if result.wasSuccessful() else 1)
+TEST_DIR = os.path.join(ROOT, 'test')
+DEFAULT_PATTERN = 'database_api_tests_*.py'
+#Files copied into the directory of every worker
+DB_FILES = ('db/flight_schema.sql', 'db/flight_data_dump.sql',
+            'db/flight_catalog_schema.sql', 'db/flight_shard_schema.sql',
+            'db/flight_archive_schema.sql')
+
+
+def find_modules(patterns):
+    """
+    Returns the file names of the test modules matching any of the patterns.
+
+    :param list patterns: shell patterns of the file names
+    :return: the sorted list of file names
+    """
+    return sorted(name for name in os.listdir(TEST_DIR)
+                  if name.endswith('.py') and any(fnmatch.fnmatch(name, p) for p in patterns))
+
+
+def _init_worker(parent):
+    """
+    Creates the private directory of the worker process inside *parent*,
+    copies the database scripts into it, builds the seeded test database and
+    makes it the working directory, so the relative db/ paths of the tests
+    point to the copy.
+    """
+    directory = tempfile.mkdtemp(prefix='worker-', dir=parent)
+    os.mkdir(os.path.join(directory, 'db'))
+    for name in DB_FILES:
+        shutil.copy(os.path.join(ROOT, name), os.path.join(directory, name))
+    os.chdir(directory)
+
+    from flight_reservation import flight_database as database
+    engine = database.SnapshotEngine(TEST_DB_PATH)
+    engine.create_tables()
+    engine.populate_tables()
+
+
+def _describe(errors):
+    return [(str(test), traceback) for test, traceback in errors]
+
+
+def run_module(name, verbosity=2):
+    """
+    Runs the tests of one module in the current process.
+
+    :param str name: the file name of the test module
+    :param int verbosity: verbosity of the unittest runner
+    :return: a picklable dictionary with the counts, the failures, the
+        errors and the captured output of the module
+    """
+    stream = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stream):
+        suite = unittest.TestLoader().discover(TEST_DIR, pattern=name)
+        result = unittest.TextTestRunner(stream=stream, verbosity=verbosity).run(suite)
+    return {
+        'module': name,
+        'pid': os.getpid(),
+        'run': result.testsRun,
+        'failures': _describe(result.failures),
+        'errors': _describe(result.errors),
+        'skipped': len(result.skipped),
+        'duration': time.perf_counter() - start,
+        'output': stream.getvalue(),
+    }
+
+
+def run_parallel(modules, workers, verbosity=2):
+    """
+    Shards the test modules across worker processes. Every module is
+    submitted as its own task, so an idle worker takes the next module.
+
+    :param list modules: file names of the test modules
+    :param int workers: number of worker processes
+    :param int verbosity: verbosity of the unittest runner
+    :return: the results of :py:func:`run_module`, in completion order
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix='flight-tests-') as parent, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(parent,)) as pool:
+        futures = [pool.submit(run_module, name, verbosity) for name in modules]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(result['output'], end='')
+            print(f"📦 {result['module']}: {result['run']} tests in "
+                  f"{result['duration']:.2f}s (worker {result['pid']})")
+            print()
+    return results
+
+
+def run_serial(patterns, verbosity=2):
+    """
+    Runs the test modules in this process against db/flight_test.db.
+
+    :param list patterns: shell patterns of the file names
+    :param int verbosity: verbosity of the unittest runner
+    :return: the merged results
+    """
+    if not os.path.exists(TEST_DB_PATH):
+        print(f"⚠️  Test database not found: {TEST_DB_PATH}")
+        print(f"💡 Run: python3 setup_test_db.py\n")
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite(loader.discover('test', pattern=pattern) for pattern in patterns)
+    runner = unittest.TextTestRunner(verbosity=verbosity)
+    result = runner.run(suite)
+    return [{
+        'run': result.testsRun,
+        'failures': _describe(result.failures),
+        'errors': _describe(result.errors),
+        'skipped': len(result.skipped),
+    }]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Flight Booking API tests")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes, 0 for one per CPU (default: 1)")
+    parser.add_argument("-p", "--pattern", action="append",
+                        help="pattern of the test files, can be repeated "
+                             "(default: %s)" % DEFAULT_PATTERN)
+    parser.add_argument("-v", "--verbosity", type=int, default=2)
+    args = parser.parse_args(argv)
+    patterns = args.pattern or [DEFAULT_PATTERN]
+    workers = args.workers or os.cpu_count() or 1
+
+    print("=" * 60)
+    print("🧪 Flight Booking API - Test Suite")
+    print("=" * 60)
+    print()
+
+    start = time.perf_counter()
+    if workers > 1:
+        modules = find_modules(patterns)
+        workers = min(workers, len(modules)) or 1
+        print(f"⚙️  {len(modules)} modules on {workers} workers")
+        print()
+        results = run_parallel(modules, workers, args.verbosity)
+    else:
+        results = run_serial(patterns, args.verbosity)
+    elapsed = time.perf_counter() - start
+
+    run = sum(r['run'] for r in results)
+    failures = [f for r in results for f in r['failures']]
+    errors = [e for r in results for e in r['errors']]
+    skipped = sum(r['skipped'] for r in results)
+
+    if workers > 1:
+        for kind, entries in (("FAIL", failures), ("ERROR", errors)):
+            for test, traceback in entries:
+                print("=" * 70)
+                print(f"{kind}: {test}")
+                print("-" * 70)
+                print(traceback)
+
+    print()
+    print("=" * 60)
+    print("📊 Test Summary")
+    print("=" * 60)
+    print(f"Tests run: {run}")
+    print(f"✅ Passed: {run - len(failures) - len(errors) - skipped}")
+    print(f"❌ Failed: {len(failures)}")
+    print(f"⚠️  Errors: {len(errors)}")
+    if skipped:
+        print(f"⏭️  Skipped: {skipped}")
+    if workers > 1:
+        busy = sum(r['duration'] for r in results)
+        print(f"⏱️  Wall time: {elapsed:.2f}s ({busy:.2f}s of tests on {workers} workers)")
+    print()
+
+    # Exit with appropriate code
+    return 0 if not failures and not errors else 1
+
 
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Production entry point of the Flight Booking API.
+
+Unlike ``main.py``, which runs a single process with the reloader and the
+interactive debugger, this launcher pre-forks one worker per CPU core on a
+shared listening socket, with the debug mode off. Every worker handles its
+requests in threads. Send ``SIGHUP`` to the master process to reload the
+code gracefully.
+
+Usage:
+    python3 serve.py
+    python3 serve.py --host 0.0.0.0 --port 8000 --workers 4 --max-requests 2000
+    python3 serve.py --seat-counters 4096
+    python3 serve.py --no-threaded
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation.metrics import METRICS_DIR_ENV
+from flight_reservation.prefork import PreforkServer, DEFAULT_MAX_REQUESTS
+from flight_reservation.seat_events import stream_limiter, close_streams, DEFAULT_MAX_STREAMS
+
+# Collections requested by the warmup to initialise Flask and fill the caches
+WARMUP_URLS = ["/flight-booking-system/api/users",
+               "/flight-booking-system/api/template-flights/"]
+
+
+def load_application():
+    """
+    Imports and creates the application in the worker, with the debug mode
+    off.
+    """
+    import main
+    from flight_reservation.resources import create_app
+
+    flight_reservation = create_app()
+    _production_mode(flight_reservation)
+    #The admin interface is still imported on its first request only
+    main.admin_application.on_load(_production_mode)
+    return main.create_application(flight_reservation)
+
+
+def _production_mode(flask_app):
+    flask_app.debug = False
+    flask_app.config["PROPAGATE_EXCEPTIONS"] = False
+
+
+def warmup(application):
+    """
+    Opens a database connection and sends a few requests through the whole
+    application so that the first real requests are not slower. It runs in
+    every new worker, so it does not read whole tables.
+    """
+    from werkzeug.test import Client
+    from werkzeug.wrappers import BaseResponse
+
+    application.flight_reservation.config["Engine"].connect().close()
+
+    #Not through the metrics and rate limit middlewares, the warmup requests
+    #are neither counted nor limited
+    client = Client(application.app.app, BaseResponse)
+    for url in WARMUP_URLS:
+        client.get(url, buffered=True)
+
+
+def worker_stop(application):
+    """
+    Ends the seat streams of the worker, which would otherwise keep it alive
+    while it waits for its requests.
+    """
+    close_streams()
+
+
+def worker_exit(application):
+    """
+    Writes the last metrics of the worker before it exits.
+    """
+    application.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="localhost",
+                        help="interface to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="port to listen on (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: one per core, %(default)s)")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
+                        help="requests served by a worker before it is replaced, "
+                             "0 to disable (default: %(default)s)")
+    parser.add_argument("--max-requests-jitter", type=int, default=DEFAULT_MAX_REQUESTS // 10,
+                        help="random extra requests per worker (default: %(default)s)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds given to the workers to finish on shutdown "
+                             "(default: %(default)s)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="do not warm up the workers")
+    parser.add_argument("--threaded", dest="threaded", action="store_true", default=True,
+                        help="handle every request of a worker in its own thread, so that "
+                             "identical concurrent GETs are coalesced and the seat streams "
+                             "do not hold a whole worker (default)")
+    parser.add_argument("--no-threaded", dest="threaded", action="store_false",
+                        help="handle the requests of a worker one at a time")
+    parser.add_argument("--max-streams", type=int, default=DEFAULT_MAX_STREAMS,
+                        help="seat streams open at once per worker, the others get a 503; "
+                             "none without threads (default: %(default)s)")
+    parser.add_argument("--seat-counters", type=int, default=0, metavar="CAPACITY",
+                        help="share the seats left of up to CAPACITY flights between the "
+                             "workers in shared memory (default: disabled)")
+    args = parser.parse_args(argv)
+
+    #Inherited by the workers. Without threads a stream would hold its
+    #worker until the client disconnects, so they are all refused
+    stream_limiter.max_streams = args.max_streams if args.threaded else 0
+    #All the workers write their metrics in the same directory
+    os.environ.setdefault(METRICS_DIR_ENV, tempfile.mkdtemp(prefix="flight_metrics_"))
+    #The workers attach the seat counters created by the master
+    seat_counters = None
+    if args.seat_counters:
+        from flight_reservation.seat_counters import SeatCounterTable, SEAT_COUNTERS_ENV
+        seat_counters = SeatCounterTable.create(args.seat_counters)
+        os.environ[SEAT_COUNTERS_ENV] = seat_counters.name
+
+    print("=" * 60)
+    print("🚀 Flight Booking API - Production server")
+    print("=" * 60)
+    server = PreforkServer(load_application, host=args.host, port=args.port,
+                           workers=args.workers, max_requests=args.max_requests,
+                           max_requests_jitter=args.max_requests_jitter,
+                           warmup=None if args.no_warmup else warmup,
+                           worker_stop=worker_stop, worker_exit=worker_exit,
+                           graceful_timeout=args.graceful_timeout,
+                           threaded=args.threaded)
+    try:
+        server.run()
+    finally:
+        if seat_counters is not None:
+            seat_counters.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
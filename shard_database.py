@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Splits a Flight Booking database in a catalog and per-month shards.
+
+The users and the template flights are copied to the catalog, the flights,
+reservations and tickets to the shard of the month of departure of their
+flight (see :py:mod:`flight_reservation.sharding`). The source database is
+not modified. Serve the result with ``FLIGHT_SHARD_DIR=<directory>``.
+
+Usage:
+    PYTHONPATH=. python3 shard_database.py
+    PYTHONPATH=. python3 shard_database.py --source db/flight.db --directory db/shards --force
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flight_reservation import flight_database as database
+from flight_reservation.sharding import ShardedEngine, DEFAULT_SHARD_DIRECTORY
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=database.DEFAULT_DB_PATH,
+                        help="database to split (default: %(default)s)")
+    parser.add_argument("--directory", default=DEFAULT_SHARD_DIRECTORY,
+                        help="directory of the catalog and the shards (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="replace the catalog and the shards already in the directory")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("🗂️  Flight Booking API - Database sharding")
+    print("=" * 60)
+    if not os.path.exists(args.source):
+        print("❌ No database at %s" % args.source)
+        return 1
+    engine = ShardedEngine(args.directory)
+    if os.path.exists(engine.db_path) or engine.shard_map.keys():
+        if not args.force:
+            print("❌ %s already holds a sharded database, use --force to replace it"
+                  % args.directory)
+            return 1
+        engine.remove_database()
+
+    engine.create_tables()
+    source = sqlite3.connect(args.source)
+    try:
+        flights = engine.import_database(source)
+    except ValueError as excp:
+        engine.remove_database()
+        print("❌ %s" % excp)
+        return 1
+    finally:
+        source.close()
+
+    print("📁 Catalog: %s" % engine.db_path)
+    for key in sorted(flights):
+        print("📦 %s: %d flights (%s)" % (key, flights[key], engine.shard_map.path(key)))
+    print("✅ %d flights in %d shards" % (sum(flights.values()), len(flights)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
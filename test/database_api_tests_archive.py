@@ -0,0 +1,115 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the archival of the departed flights.
+"""
+import os
+import sqlite3
+import unittest
+from datetime import datetime
+
+from flight_reservation import flight_database as database
+from flight_reservation.archive import Archiver
+
+#Path of the test archive, different from the deployment archive
+ARCHIVE_PATH = 'db/flight_archive_test.db'
+ENGINE = database.SnapshotEngine('db/flight_test.db', archive_path=ARCHIVE_PATH)
+
+
+class ArchiveTestCase(unittest.TestCase):
+    """
+    Test cases for the Archiver and the reads of the archive.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.archiver = Archiver(ENGINE)
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+        if os.path.exists(ARCHIVE_PATH):
+            os.remove(ARCHIVE_PATH)
+
+    def test_archive_departed(self):
+        """
+        Checks that the flights departed before the date are moved with their
+        reservations and tickets, which are still read from the archive
+        """
+        print('(' + self.test_archive_departed.__name__ + ')',
+              self.test_archive_departed.__doc__)
+        reservation = self.connection.get_reservation(11)
+        tickets = self.connection.get_tickets_by_reservation(11)
+        ticket = self.connection.get_ticket(1010)
+        self.connection.close()
+
+        counts = self.archiver.archive_departed(datetime(2018, 6, 1))
+        self.assertEqual(counts, {"flights": 1, "reservations": 1, "tickets": 2})
+
+        self.connection = ENGINE.connect()
+        self.assertIsNone(self.connection.get_flight(1111))
+        self.assertIsNotNone(self.connection.get_flight(1122))
+        self.assertEqual(self.connection.get_reservation(11), reservation)
+        self.assertEqual(self.connection.get_tickets_by_reservation(11), tickets)
+        self.assertEqual(self.connection.get_ticket(1010), ticket)
+        self.assertIsNone(self.connection.get_reservation(1))
+        #The rows left in the database are not read from the archive
+        self.assertEqual(len(self.connection.get_tickets_by_reservation(22)), 2)
+
+        #Nothing is read from the archive without an archive_path
+        connection = database.Engine(ENGINE.db_path).connect()
+        try:
+            self.assertIsNone(connection.get_reservation(11))
+            self.assertIsNone(connection.get_ticket(1010))
+        finally:
+            connection.close()
+
+    def test_chunks(self):
+        """
+        Checks that all the flights are moved by chunks and that archiving
+        again moves nothing
+        """
+        print('(' + self.test_chunks.__name__ + ')', self.test_chunks.__doc__)
+        archiver = Archiver(ENGINE, chunk_size=1)
+        counts = archiver.archive_departed(datetime(2019, 1, 1))
+        self.assertEqual(counts, {"flights": 3, "reservations": 4, "tickets": 5})
+        self.assertEqual(archiver.archive_departed(datetime(2019, 1, 1)),
+                         {"flights": 0, "reservations": 0, "tickets": 0})
+        for flight_id in (1111, 1122, 1133):
+            self.assertIsNone(self.connection.get_flight(flight_id))
+        self.assertEqual(self.connection.get_reservation(44)["flightid"], 1133)
+        self.assertEqual(self.connection.get_ticket(1050)["reservationid"], 44)
+        self.assertRaises(ValueError, Archiver, ENGINE, chunk_size=0)
+
+    def test_archive_read_only(self):
+        """
+        Checks that the archive is opened read only and that a missing
+        archive reads nothing
+        """
+        print('(' + self.test_archive_read_only.__name__ + ')',
+              self.test_archive_read_only.__doc__)
+        self.assertIsNone(self.connection.get_ticket(1))
+        self.assertEqual(self.connection.get_tickets_by_reservation(1), [])
+        self.assertIsNone(self.connection._archive)
+
+        self.archiver.create_archive()
+        self.assertIsNone(self.connection.get_ticket(1))
+        self.assertRaises(sqlite3.OperationalError, self.connection._archive.execute,
+                          "DELETE FROM Ticket")
+
+
+if __name__ == '__main__':
+    print('Start running archive tests')
+    unittest.main()
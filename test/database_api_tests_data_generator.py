@@ -0,0 +1,169 @@
+"""
+Created on 19.10.2026
+
+Testing of the synthetic data generator used for capacity testing.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from flight_reservation import flight_database as database
+from flight_reservation.data_generator import DataGenerator, reservation_reference
+
+CARDINALITIES = {'users': 200, 'templates': 10, 'flights': 40, 'reservations': 300}
+
+
+class DataGeneratorTestCase(unittest.TestCase):
+    """
+    Test cases for the DataGenerator class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _generate(self, name, **kwargs):
+        db_path = os.path.join(self.directory, name)
+        options = dict(CARDINALITIES)
+        options.update(kwargs)
+        counts = DataGenerator(db_path, **options).generate()
+        return db_path, counts
+
+    def _dump(self, db_path):
+        con = sqlite3.connect(db_path)
+        try:
+            return list(con.iterdump())
+        finally:
+            con.close()
+
+    def test_same_seed_same_database(self):
+        """
+        Checks that two databases generated with the same seed are identical
+        """
+        print('(' + self.test_same_seed_same_database.__name__ + ')',
+              self.test_same_seed_same_database.__doc__)
+        first, _ = self._generate("first.db", seed=3)
+        second, _ = self._generate("second.db", seed=3)
+        other, _ = self._generate("other.db", seed=4)
+        self.assertEqual(self._dump(first), self._dump(second))
+        self.assertNotEqual(self._dump(first), self._dump(other))
+
+    def test_in_memory_backup(self):
+        """
+        Checks that building in memory and writing with the backup API gives
+        the same database as the bulk inserts
+        """
+        print('(' + self.test_in_memory_backup.__name__ + ')',
+              self.test_in_memory_backup.__doc__)
+        direct, _ = self._generate("direct.db", seed=5)
+        backup, _ = self._generate("backup.db", seed=5, in_memory=True)
+        self.assertEqual(self._dump(direct), self._dump(backup))
+
+    def test_cardinalities_and_integrity(self):
+        """
+        Checks the number of rows and that the foreign keys, the seats left
+        and the unique reservation per user and flight are consistent
+        """
+        print('(' + self.test_cardinalities_and_integrity.__name__ + ')',
+              self.test_cardinalities_and_integrity.__doc__)
+        db_path, counts = self._generate("integrity.db")
+        self.assertEqual(counts['User'], CARDINALITIES['users'])
+        self.assertEqual(counts['TemplateFlight'], CARDINALITIES['templates'])
+        self.assertEqual(counts['Flight'], CARDINALITIES['flights'])
+        self.assertLessEqual(counts['Reservation'], CARDINALITIES['reservations'] * 1.1)
+        self.assertGreaterEqual(counts['Ticket'], counts['Reservation'])
+
+        con = sqlite3.connect(db_path)
+        try:
+            self.assertEqual(con.execute('PRAGMA foreign_key_check').fetchall(), [])
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM Reservation').fetchone()[0],
+                             counts['Reservation'])
+            wrong_seats = con.execute(
+                'SELECT COUNT(*) FROM Flight f WHERE nbSeatsLeft != nbInitialSeats - '
+                '(SELECT COUNT(*) FROM Ticket t JOIN Reservation r USING (reservation_id) '
+                'WHERE r.flight_id = f.flight_id)').fetchone()[0]
+            self.assertEqual(wrong_seats, 0)
+            duplicates = con.execute(
+                'SELECT COUNT(*) FROM (SELECT creator_id, flight_id FROM Reservation '
+                'GROUP BY creator_id, flight_id HAVING COUNT(*) > 1)').fetchone()[0]
+            self.assertEqual(duplicates, 0)
+        finally:
+            con.close()
+
+    def test_usable_through_connection(self):
+        """
+        Checks that the generated data is readable through the database API
+        and that the users have valid emails and phone numbers
+        """
+        print('(' + self.test_usable_through_connection.__name__ + ')',
+              self.test_usable_through_connection.__doc__)
+        db_path, counts = self._generate("api.db")
+        connection = database.Engine(db_path).connect()
+        try:
+            self.assertEqual(len(connection.get_users()), counts['User'])
+            user = connection.get_user(1)
+            user['email'] = 'new.' + user['email']
+            self.assertTrue(connection.modify_user(1, user))
+            self.assertEqual(len(connection.get_reservation_list()), counts['Reservation'])
+        finally:
+            connection.close()
+
+    def test_derived_tables_and_triggers(self):
+        """
+        Checks that the fare calendar and the search indexes are built at the
+        end of the load and that the triggers maintaining them are restored
+        """
+        print('(' + self.test_derived_tables_and_triggers.__name__ + ')',
+              self.test_derived_tables_and_triggers.__doc__)
+        db_path, counts = self._generate("derived.db")
+        con = sqlite3.connect(db_path)
+        try:
+            triggers = con.execute("SELECT COUNT(*) FROM sqlite_master "
+                                   "WHERE type = 'trigger'").fetchone()[0]
+            self.assertEqual(con.execute("SELECT SUM(nbFlights) FROM FareCalendar").fetchone()[0],
+                             counts['Flight'])
+            first_name, last_name = con.execute("SELECT firstName, lastName FROM User "
+                                                "WHERE user_id = 1").fetchone()
+        finally:
+            con.close()
+        empty = database.Engine(os.path.join(self.directory, "empty.db"))
+        empty.create_tables()
+        con = sqlite3.connect(empty.db_path)
+        try:
+            self.assertEqual(con.execute("SELECT COUNT(*) FROM sqlite_master "
+                                         "WHERE type = 'trigger'").fetchone()[0], triggers)
+        finally:
+            con.close()
+
+        connection = database.Engine(db_path).connect()
+        try:
+            results = connection.search("%s %s" % (first_name, last_name), limit=1000)
+            self.assertIn(1, [result['id'] for result in results if result['kind'] == 'user'])
+            self.assertTrue(any(result['kind'] == 'passenger' for result in
+                                connection.search(first_name, limit=1000)))
+        finally:
+            connection.close()
+
+    def test_reservation_references_are_unique(self):
+        """
+        Checks that the generated reservation references are distinct and
+        keep the format of the generated references
+        """
+        print('(' + self.test_reservation_references_are_unique.__name__ + ')',
+              self.test_reservation_references_are_unique.__doc__)
+        references = [reservation_reference(i) for i in range(1, 20001)]
+        self.assertEqual(len(set(references)), len(references))
+        self.assertRegex(references[0], r'^[A-Z]{2}[0-9]{2}[A-Z]$')
+
+
+if __name__ == '__main__':
+    print('Start running data generator tests')
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the fare calendar of the routes.
+"""
+import json
+import unittest
+
+from flight_reservation import flight_database as database
+import flight_reservation.resources as resources
+
+#Path to the database file, different from the deployment db
+ENGINE = database.SnapshotEngine('db/flight_test.db')
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+#A second flight of the route Finland - Spain, the day of the flight 1122
+NEW_FLIGHT = {'flightid': 1144,
+              'searchresultid': 1235,
+              'code': 'AY301',
+              'price': 120,
+              'departuredate': '2018-06-10',
+              'arrivaldate': '2018-06-10',
+              'gate': 'GATE03',
+              'totalseats': 50,
+              'seatsleft': 1}
+
+NEW_TICKET = {'reservationid': 22,
+              'firstname': 'James',
+              'lastname': 'Watt',
+              'gender': 'male',
+              'age': 34}
+
+
+class FareCalendarTestCase(unittest.TestCase):
+    """
+    Test cases for the FareCalendar table and its triggers.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def _june(self):
+        return self.connection.get_fare_calendar('Finland', 'Spain', '2018-06-01', '2018-07-01')
+
+    def test_get_fare_calendar(self):
+        """
+        Checks that the fares of the days of the month of a route are
+        returned, and that the full flights have no fare
+        """
+        print('(' + self.test_get_fare_calendar.__name__ + ')',
+              self.test_get_fare_calendar.__doc__)
+        self.assertEqual(self._june(), [{'date': '2018-06-10', 'minprice': 150,
+                                         'seatsleft': 15, 'flights': 1}])
+        self.assertEqual(self.connection.get_fare_calendar('Finland', 'Berlin',
+                                                           '2018-07-01', '2018-08-01'),
+                         [{'date': '2018-07-05', 'minprice': None, 'seatsleft': 0, 'flights': 1}])
+        self.assertEqual(self.connection.get_fare_calendar('Finland', 'Spain',
+                                                           '2018-07-01', '2018-08-01'), [])
+
+    def test_incremental_updates(self):
+        """
+        Checks that the fares follow the flights created, modified and
+        deleted and the tickets that fill them
+        """
+        print('(' + self.test_incremental_updates.__name__ + ')',
+              self.test_incremental_updates.__doc__)
+        self.connection.create_flight(NEW_FLIGHT)
+        self.assertEqual(self._june(), [{'date': '2018-06-10', 'minprice': 120,
+                                         'seatsleft': 16, 'flights': 2}])
+
+        #The cheapest flight is full: the fare is the one of the other flight
+        reservation_id = self.connection.create_reservation({'userid': 4, 'flightid': 1144})
+        ticket_id = self.connection.create_ticket(dict(NEW_TICKET, reservationid=reservation_id))
+        self.assertEqual(self._june()[0]['minprice'], 150)
+        self.connection.delete_ticket(ticket_id)
+        self.assertEqual(self._june()[0]['minprice'], 120)
+
+        #The flight moves to another day
+        self.connection.modify_flight(1144, dict(NEW_FLIGHT, departuredate='2018-06-11',
+                                                 arrivaldate='2018-06-11'))
+        self.assertEqual([fare['date'] for fare in self._june()], ['2018-06-10', '2018-06-11'])
+        self.assertEqual(self._june()[0]['minprice'], 150)
+
+        self.connection.delete_flight(1122)
+        self.assertEqual(self._june(), [{'date': '2018-06-11', 'minprice': 120,
+                                         'seatsleft': 1, 'flights': 1}])
+
+    def test_template_flight_changes(self):
+        """
+        Checks that the fares follow the route of the template flights and
+        that a deleted template flight leaves no fare
+        """
+        print('(' + self.test_template_flight_changes.__name__ + ')',
+              self.test_template_flight_changes.__doc__)
+        self.connection.modify_template_flight(1235, {'origin': 'Finland', 'destination': 'Italy',
+                                                      'departuretime': '10:50',
+                                                      'arrivaltime': '13:10'})
+        self.assertEqual(self._june(), [])
+        self.assertEqual(len(self.connection.get_fare_calendar('Finland', 'Italy',
+                                                               '2018-06-01', '2018-07-01')), 1)
+        self.connection.delete_template_flight(1235)
+        self.assertEqual(self.connection.get_fare_calendar('Finland', 'Italy',
+                                                           '2018-06-01', '2018-07-01'), [])
+
+        #The table is filled again from the flights. The SnapshotEngine
+        #would restore an empty database.
+        database.Engine(ENGINE.db_path).rebuild_fare_calendar()
+        self.assertEqual(len(self.connection.get_fare_calendar('Finland', 'France',
+                                                               '2018-05-01', '2018-06-01')), 1)
+
+    def test_fare_calendar_resource(self):
+        """
+        Checks that GET FareCalendar returns the fares of a month with the
+        links to the previous and next months
+        """
+        print('(' + self.test_fare_calendar_resource.__name__ + ')',
+              self.test_fare_calendar_resource.__doc__)
+        client = APP.test_client()
+        url = "/flight-booking-system/api/fare-calendar?origin=Finland&destination=Spain"
+        resp = client.get(url + "&month=2018-06")
+        self.assertEqual(resp.status_code, 200)
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(data["items"], [{"date": "2018-06-10", "minPrice": 150,
+                                          "seatsLeft": 15, "nbFlights": 1}])
+        self.assertTrue(data["@controls"]["prev"]["href"].endswith("month=2018-05"))
+        self.assertTrue(data["@controls"]["next"]["href"].endswith("month=2018-07"))
+
+        resp = client.get(url + "&month=2018-12")
+        self.assertTrue(json.loads(resp.data.decode("utf-8"))["@controls"]["next"]["href"]
+                        .endswith("month=2019-01"))
+        self.assertEqual(client.get(url + "&month=June").status_code, 400)
+        self.assertEqual(client.get(url).status_code, 400)
+
+        resp = client.get("/flight-booking-system/api/template-flights/1235")
+        control = json.loads(resp.data.decode("utf-8"))["@controls"]["flight-booking-system:fare-calendar"]
+        self.assertEqual(control["href"], "/flight-booking-system/api/fare-calendar"
+                                          "?origin=Finland&destination=Spain{&month}")
+
+
+if __name__ == '__main__':
+    print('Start running fare calendar tests')
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the booking of several flights at once.
+An itinerary has a data model represented by the following dictionary:
+
+itinerary = {'userid': ,
+             'flightids': [],
+             'tickets': [{'firstname': '',
+                          'lastname': '',
+                          'gender': '',
+                          'age': }]
+            }
+"""
+import unittest
+
+from flight_reservation import flight_database as database
+
+#Path to the database file, different from the deployment db
+ENGINE = database.SnapshotEngine('db/flight_test.db')
+
+#The user 4 has no reservation. The flights 1111 and 1122 have 10 and 15
+#seats left, the flight 1133 is full.
+USER_ID = 4
+TICKETS = [{'firstname': 'Anna', 'lastname': 'Virtanen', 'gender': 'female', 'age': 31},
+           {'firstname': 'Otto', 'lastname': 'Virtanen', 'gender': 'male', 'age': 3}]
+
+
+def new_itinerary(flight_ids, user_id=USER_ID, tickets=TICKETS):
+    return {'userid': user_id, 'flightids': flight_ids, 'tickets': tickets}
+
+
+class ItineraryDBAPITestCase(unittest.TestCase):
+    """
+    Test cases for the itinerary related methods.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def _seats_left(self):
+        return [self.connection.get_flight(flight_id)['seatsleft'] for flight_id in (1111, 1122)]
+
+    def test_create_itinerary(self):
+        """
+        Checks that a reservation with a ticket for every passenger is
+        created for every flight
+        """
+        print('(' + self.test_create_itinerary.__name__ + ')', self.test_create_itinerary.__doc__)
+        reservations = self.connection.create_itinerary(new_itinerary([1122, 1111]))
+        self.assertEqual(sorted(reservations), [1111, 1122])
+        for flight_id, reservation_id in reservations.items():
+            reservation = self.connection.get_reservation(reservation_id)
+            self.assertEqual((reservation['userid'], reservation['flightid']), (USER_ID, flight_id))
+            tickets = self.connection.get_tickets_by_reservation(reservation_id)
+            self.assertEqual(sorted(ticket['firstname'] for ticket in tickets), ['Anna', 'Otto'])
+            self.assertEqual(len(set(ticket['seat'] for ticket in tickets)), 2)
+        self.assertEqual(self._seats_left(), [8, 13])
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1111)[-1]['seatsleft'], 8)
+
+    def test_all_or_nothing(self):
+        """
+        Checks that nothing is booked when a flight has not enough seats
+        left or has already been booked by the user
+        """
+        print('(' + self.test_all_or_nothing.__name__ + ')', self.test_all_or_nothing.__doc__)
+        with self.assertRaises(database.NoMoreSeatsAvailableException) as raised:
+            self.connection.create_itinerary(new_itinerary([1111, 1133]))
+        self.assertEqual(raised.exception.flight_id, 1133)
+        with self.assertRaises(database.NoMoreSeatsAvailableException) as raised:
+            self.connection.create_itinerary(new_itinerary([1122, 1111], tickets=TICKETS * 6))
+        self.assertEqual(raised.exception.flight_id, 1111)
+        self.assertIsNone(self.connection.create_itinerary(new_itinerary([1111, 1122], user_id=2)))
+        self.assertEqual(self.connection.get_reservations_by_user(USER_ID), [])
+        self.assertEqual(len(self.connection.get_reservations_by_user(2)), 1)
+        self.assertEqual(self._seats_left(), [10, 15])
+
+    def test_create_itinerary_wrong(self):
+        """
+        Checks that the user and the flights must exist and that a flight
+        is booked once
+        """
+        print('(' + self.test_create_itinerary_wrong.__name__ + ')',
+              self.test_create_itinerary_wrong.__doc__)
+        self.assertIsNone(self.connection.create_itinerary(new_itinerary([1111, 1155])))
+        self.assertIsNone(self.connection.create_itinerary(new_itinerary([1111], user_id=200)))
+        self.assertIsNone(self.connection.create_itinerary(new_itinerary([1111, 1111])))
+        self.assertEqual(self.connection.get_reservations_by_user(USER_ID), [])
+        self.assertEqual(self._seats_left(), [10, 15])
+
+
+if __name__ == '__main__':
+    print('Start running itinerary tests')
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the batch repricing of the flights.
+"""
+import sqlite3
+import unittest
+from datetime import datetime
+
+from flight_reservation import flight_database as database
+from flight_reservation.repricing import PricingCurve, Repricer
+
+#Path to the database file, different from the deployment db
+ENGINE = database.SnapshotEngine('db/flight_test.db')
+
+#The flights 1111, 1122 and 1133 depart 5, 40 and 65 days later
+TODAY = datetime(2018, 5, 1)
+
+
+class PricingCurveTestCase(unittest.TestCase):
+    """
+    Test cases for the PricingCurve.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def test_factors(self):
+        """
+        Checks that the multipliers are interpolated between the points of
+        the curve and bounded
+        """
+        print('(' + self.test_factors.__name__ + ')', self.test_factors.__doc__)
+        curve = PricingCurve(load=((0, 0.8), (1, 1.6)), days=((0, 1.5), (10, 1)),
+                             min_factor=0.5, max_factor=2)
+        self.assertAlmostEqual(curve.factor(0.5, 10), 1.2)
+        self.assertAlmostEqual(curve.factor(0.5, 5), 1.5)
+        #The days after the last point have its multiplier
+        self.assertAlmostEqual(curve.factor(0, 100), 0.8)
+        self.assertAlmostEqual(curve.factor(1, 0), 2)
+        self.assertEqual(curve.prices([100, 100, 0], [50, 0, 0], [10, 0, 10], [100, 100, 100]),
+                         [120, 200, 80])
+        curve = PricingCurve(load=((0, 0.8), (1, 1.6)), days=((0, 1),), rounding=5)
+        self.assertEqual(curve.prices([100], [40], [3], [151]), [195])
+
+    def test_invalid_curves(self):
+        """
+        Checks that the curves with unsorted points, multipliers which are
+        not positive or wrong settings are refused
+        """
+        print('(' + self.test_invalid_curves.__name__ + ')', self.test_invalid_curves.__doc__)
+        self.assertRaises(ValueError, PricingCurve, load=((0.5, 1), (0.2, 1.2)))
+        self.assertRaises(ValueError, PricingCurve, days=((0, 0), (10, 1)))
+        self.assertRaises(ValueError, PricingCurve, load=())
+        self.assertRaises(ValueError, PricingCurve, min_factor=2, max_factor=1)
+        self.assertRaises(ValueError, PricingCurve, rounding=0)
+        self.assertRaises(ValueError, PricingCurve.from_dict, {"slope": 1})
+        curve = PricingCurve.from_dict({"days": [[0, 1]], "rounding": 10})
+        self.assertEqual((curve.max_days, curve.rounding), (0, 10))
+
+
+class RepricerTestCase(unittest.TestCase):
+    """
+    Test cases for the Repricer.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def _prices(self):
+        return dict((flight_id, self.connection.get_flight(flight_id)['price'])
+                    for flight_id in (1111, 1122, 1133))
+
+    def test_reprice(self):
+        """
+        Checks that the flights not departed yet are repriced from their
+        base price and that the fare calendar follows
+        """
+        print('(' + self.test_reprice.__name__ + ')', self.test_reprice.__doc__)
+        repricer = Repricer(ENGINE, chunk_size=2)
+        self.assertEqual(repricer.reprice(TODAY, dry_run=True), {"flights": 3, "repriced": 3})
+        self.assertEqual(self._prices(), {1111: 200, 1122: 150, 1133: 180})
+
+        self.assertEqual(repricer.reprice(TODAY), {"flights": 3, "repriced": 3})
+        self.assertEqual(self._prices(), {1111: 335, 1122: 192, 1133: 268})
+        self.assertEqual(self.connection.get_fare_calendar('Finland', 'Spain',
+                                                           '2018-06-01', '2018-07-01'),
+                         [{'date': '2018-06-10', 'minprice': 192, 'seatsleft': 15, 'flights': 1}])
+        #The curve is applied to the base prices, not to its own prices
+        self.assertEqual(repricer.reprice(TODAY), {"flights": 3, "repriced": 0})
+
+        #The departed flights keep their price
+        self.assertEqual(repricer.reprice(datetime(2018, 6, 1)), {"flights": 2, "repriced": 2})
+        self.assertEqual(self._prices(), {1111: 335, 1122: 221, 1133: 279})
+        con = sqlite3.connect(ENGINE.db_path)
+        try:
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM FareCalendarBatch').fetchone(), (0,))
+        finally:
+            con.close()
+        self.assertRaises(ValueError, Repricer, ENGINE, chunk_size=0)
+
+    def test_price_modified(self):
+        """
+        Checks that a price modified by hand is the new base price
+        """
+        print('(' + self.test_price_modified.__name__ + ')', self.test_price_modified.__doc__)
+        repricer = Repricer(ENGINE)
+        repricer.reprice(TODAY)
+        flight = self.connection.get_flight(1122)
+        flight['price'] = 100
+        self.assertTrue(self.connection.modify_flight(1122, flight))
+        self.assertEqual(repricer.reprice(TODAY), {"flights": 3, "repriced": 1})
+        self.assertEqual(self.connection.get_flight(1122)['price'], 128)
+
+        #Modifying another field keeps the base price
+        flight = self.connection.get_flight(1122)
+        flight['gate'] = 'GATE09'
+        self.assertTrue(self.connection.modify_flight(1122, flight))
+        self.assertEqual(repricer.reprice(TODAY), {"flights": 3, "repriced": 0})
+
+
+if __name__ == '__main__':
+    print('Start running repricing tests')
+    unittest.main()
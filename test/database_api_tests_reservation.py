@@ -22,7 +22,7 @@ from flight_reservation import flight_database as database
 
 #Path to the database file, different from the deployment db
 DB_PATH = 'db/flight_test.db'
-ENGINE = database.Engine(DB_PATH)
+ENGINE = database.SnapshotEngine(DB_PATH)
 
 #CONSTANTS DEFINING DIFFERENT USERS AND USER PROPERTIES
 RESERVATION1_ID = 11
@@ -325,6 +325,66 @@ class ReservationDBAPITestCase(unittest.TestCase):
         self.assertEqual(len(tickets_res2), 0)
 
 
+    def test_delete_reservation_returns_seats(self):
+        """
+        Test that the seats of the tickets deleted with a reservation or a
+        user are returned to their flight and recorded in the outbox
+        """
+        print('(' + self.test_delete_reservation_returns_seats.__name__ + ')', \
+              self.test_delete_reservation_returns_seats.__doc__)
+
+        # Reservation 11 has two tickets on the flight 1111
+        self.assertTrue(self.connection.delete_reservation(11))
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 12)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1111)[-1]["seatsleft"], 12)
+
+        # The user 5 has one ticket on the flight 1133
+        self.assertTrue(self.connection.delete_user(5))
+        self.assertEqual(self.connection.get_flight(1133)["seatsleft"], 1)
+        self.assertEqual(self.connection.get_flight(1122)["seatsleft"], 15)
+
+    def test_move_reservation_to_full_flight(self):
+        """
+        Test that a reservation can not be moved to a flight without enough
+        seats left for its tickets
+        """
+        print('(' + self.test_move_reservation_to_full_flight.__name__ + ')', \
+              self.test_move_reservation_to_full_flight.__doc__)
+
+        # Reservation 22 has two tickets on the flight 1122, 1133 is full
+        with self.assertRaises(database.NoMoreSeatsAvailableException):
+            self.connection.modify_reservation(RESERVATION2_ID, 'HJJJHW', OWNER_RES_22, 1133)
+        self.assertEqual(self.connection.get_reservation(RESERVATION2_ID)["flightid"], FLIGHTID_RES_22)
+        self.assertEqual(self.connection.get_flight(1122)["seatsleft"], 15)
+        self.assertEqual(self.connection.get_flight(1133)["seatsleft"], 0)
+
+        # The flight 1111 has 10 seats left
+        self.assertTrue(self.connection.modify_reservation(RESERVATION2_ID, 'HJJJHW', OWNER_RES_22, 1111))
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 8)
+        self.assertEqual(self.connection.get_flight(1122)["seatsleft"], 17)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1111)[-1]["seatsleft"], 8)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1122)[-1]["seatsleft"], 17)
+
+    def test_reconcile_seats(self):
+        """
+        Test that the seats left are recomputed from the tickets
+        """
+        print('(' + self.test_reconcile_seats.__name__ + ')', \
+              self.test_reconcile_seats.__doc__)
+
+        # The seats sold in the data dump are not all tickets
+        drift = {1111: (10, 88), 1122: (15, 88), 1133: (0, 89)}
+        self.assertEqual(self.connection.reconcile_seats(fix=False), drift)
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 10)
+        self.assertEqual(self.connection.reconcile_seats(), drift)
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 88)
+        self.assertEqual(self.connection.reconcile_seats(), {})
+
+        # The triggers keep them right
+        self.connection.delete_ticket(1010)
+        self.connection.delete_reservation(44)
+        self.assertEqual(self.connection.reconcile_seats(), {})
+
     def test_delete_reservation_nonexisting_id(self):
         """
         Test that deleting a reservation with nonexisting id
@@ -0,0 +1,131 @@
+"""
+Created on 19.10.2026
+
+Testing of the full-text search of the users and passengers.
+"""
+import json
+import unittest
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+
+ENGINE = database.SnapshotEngine("db/flight_test.db")
+SEARCH_URL = "/flight-booking-system/api/search"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+USER = {'lastname': 'Larue', 'firstname': 'Jules', 'phonenumber': '+358 40 7654321',
+        'email': 'jules.larue@oulu.fi', 'dateofBirth': '1996-02-12', 'gender': 'male'}
+
+
+class SearchTestCase(unittest.TestCase):
+    """
+    Test cases for the search of the database API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def _found(self, text, **kwargs):
+        return [(result["kind"], result["id"])
+                for result in self.connection.search(text, **kwargs)]
+
+    def test_search_query(self):
+        """
+        Checks that the punctuation of a search is not FTS5 syntax
+        """
+        print('(' + self.test_search_query.__name__ + ')', self.test_search_query.__doc__)
+        self.assertEqual(database.search_query('jac "tilt* OR'), '"jac"* "tilt"* "OR"*')
+        self.assertIsNone(database.search_query(' -*" '))
+        self.assertEqual(database.search_query("j tilt"), '"tilt"*')
+        self.assertEqual(self.connection.search("()"), [])
+
+    def test_prefix_matches(self):
+        """
+        Checks that every word matches the names, emails and phone numbers
+        starting with it, best match first
+        """
+        print('(' + self.test_prefix_matches.__name__ + ')', self.test_prefix_matches.__doc__)
+        self.assertEqual(sorted(self._found("JAC")),
+                         [("passenger", 1020), ("passenger", 1030), ("passenger", 1040),
+                          ("user", 2), ("user", 4)])
+        self.assertEqual(self._found("jac til"), [("passenger", 1020)])
+        self.assertEqual(self._found("niil.jain@jhj"), [("user", 5)])
+        self.assertEqual(self._found("9272"), [("user", 1)])
+        passenger = self.connection.search("molly")[0]
+        self.assertEqual((passenger["userid"], passenger["reservationid"]), (2, 22))
+
+        #Pages of the results
+        first = self._found("ja", limit=4)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(first + self._found("ja", limit=20, offset=4), self._found("ja"))
+
+    def test_index_in_sync(self):
+        """
+        Checks that the created, modified and deleted users and tickets are
+        searched
+        """
+        print('(' + self.test_index_in_sync.__name__ + ')', self.test_index_in_sync.__doc__)
+        user_id = self.connection.create_user(USER)
+        self.assertEqual(self._found("jul lar"), [("user", user_id)])
+        self.connection.modify_user(user_id, dict(USER, firstname="Julia"))
+        self.assertEqual(self._found("julia"), [("user", user_id)])
+        self.assertTrue(self.connection.delete_user(user_id))
+        self.assertEqual(self._found("jul"), [])
+
+        ticket_id = self.connection.create_ticket({"reservationid": 11, "firstname": "Jules",
+                                                   "lastname": "Larue", "gender": "male",
+                                                   "age": 20})
+        self.assertEqual(self._found("larue"), [("passenger", ticket_id)])
+        self.connection.delete_ticket(ticket_id)
+        self.assertEqual(self._found("larue"), [])
+        #The tickets deleted in cascade
+        self.assertTrue(self.connection.delete_user(2))
+        self.assertEqual(self._found("molly"), [])
+
+    def test_search_resource(self):
+        """
+        Checks the search resource and its pages
+        """
+        print('(' + self.test_search_resource.__name__ + ')', self.test_search_resource.__doc__)
+        client = APP.test_client()
+        resp = client.get(SEARCH_URL, query_string={"q": "jac", "limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(len(data["items"]), 2)
+        self.assertNotIn("prev", data["@controls"])
+        resp = client.get(data["@controls"]["next"]["href"])
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertIn("prev", data["@controls"])
+        resp = client.get(SEARCH_URL, query_string={"q": "molly"})
+        item = json.loads(resp.data.decode("utf-8"))["items"][0]
+        self.assertEqual((item["kind"], item["ticket_id"], item["user_id"]), ("passenger", 1040, 2))
+        self.assertEqual(item["@controls"]["author"]["href"], "/flight-booking-system/api/users/2")
+
+        for query in ({"q": "j *"}, {"q": "jac", "limit": 0}, {"q": "jac", "offset": "a"}):
+            self.assertEqual(client.get(SEARCH_URL, query_string=query).status_code, 400)
+
+        resp = client.get("/flight-booking-system/api/users")
+        control = json.loads(resp.data.decode("utf-8"))["@controls"]["flight-booking-system:search"]
+        self.assertTrue(control["isHrefTemplate"])
+
+
+if __name__ == '__main__':
+    print('Start running search tests')
+    unittest.main()
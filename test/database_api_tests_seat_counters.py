@@ -0,0 +1,211 @@
+"""
+Created on 19.10.2026
+
+Testing of the seat counters shared by the worker processes.
+"""
+import json
+import os
+import unittest
+from datetime import datetime
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import seat_counters
+from flight_reservation.seat_counters import SeatCounterTable
+
+ENGINE = database.SnapshotEngine("db/flight_test.db")
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+TICKET = {"reservationid": 11, "firstname": "Jules", "lastname": "Larue",
+          "gender": "male", "age": 20}
+
+
+class SeatCounterTableTestCase(unittest.TestCase):
+    """
+    Test cases for the SeatCounterTable.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def setUp(self):
+        self.table = SeatCounterTable.create(capacity=4)
+
+    def tearDown(self):
+        self.table.close()
+
+    def test_set_get(self):
+        """
+        Checks that the seats left are only replaced by the ones of a later
+        change and that a full table holds no more flights
+        """
+        print('(' + self.test_set_get.__name__ + ')', self.test_set_get.__doc__)
+        self.assertIsNone(self.table.get(1111))
+        self.assertTrue(self.table.set(1111, 10, 1))
+        self.assertTrue(self.table.set(1111, 9, 3))
+        self.assertFalse(self.table.set(1111, 10, 2))
+        self.assertEqual(self.table.get(1111), 9)
+
+        #The flights colliding with each other are all found
+        for flight_id in (5, 9, 13):
+            self.assertTrue(self.table.set(flight_id, flight_id, 1))
+        self.assertFalse(self.table.set(17, 17, 1))
+        self.assertEqual(self.table.flights(), {1111: 9, 5: 5, 9: 9, 13: 13})
+
+        self.assertTrue(self.table.remove(5))
+        self.assertFalse(self.table.remove(5))
+        self.assertEqual(self.table.get(9), 9)
+        self.assertIsNone(self.table.get(5))
+        self.assertTrue(self.table.set(17, 17, 1))
+        self.assertEqual(self.table.get(17), 17)
+        self.assertRaises(ValueError, SeatCounterTable.create, 0)
+
+    def test_flights_cycled_through_the_table(self):
+        """
+        Checks that the slots of the removed flights are freed, so that the
+        lookups stay short after more flights than the capacity went through
+        the table
+        """
+        print('(' + self.test_flights_cycled_through_the_table.__name__ + ')',
+              self.test_flights_cycled_through_the_table.__doc__)
+        expected = {}
+        for flight_id in range(1, 41):
+            self.assertTrue(self.table.set(flight_id, flight_id, 1))
+            expected[flight_id] = flight_id
+            if len(expected) == 3:
+                #Remove the flights in another order than they were added
+                removed = sorted(expected)[flight_id % 3]
+                self.assertTrue(self.table.remove(removed))
+                del expected[removed]
+            self.assertEqual(self.table.flights(), expected)
+            for other in range(1, 42):
+                self.assertEqual(self.table.get(other), expected.get(other))
+        for flight_id in list(expected):
+            self.assertTrue(self.table.remove(flight_id))
+        self.assertEqual(self.table.flights(), {})
+        #Every slot is empty again: a miss stops at the home slot
+        for index in range(self.table.capacity):
+            self.assertEqual(self.table._read(seat_counters.HEADER_SIZE
+                                              + index * seat_counters.SLOT_SIZE)[0],
+                             seat_counters.EMPTY)
+
+    def test_shared_between_processes(self):
+        """
+        Checks that the seats left written by a forked process are read by
+        its parent
+        """
+        print('(' + self.test_shared_between_processes.__name__ + ')',
+              self.test_shared_between_processes.__doc__)
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                table = SeatCounterTable.attach(self.table.name)
+                status = 0 if table.set(1122, 7, 4) else 1
+                table.close()
+            finally:
+                os._exit(status)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertEqual(self.table.get(1122), 7)
+
+
+class SeatCounterDatabaseTestCase(unittest.TestCase):
+    """
+    Test cases for the seat counters fed by the database.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.table = SeatCounterTable.create(capacity=16)
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        seat_counters.disable(APP)
+        self.table.close()
+        ENGINE.clear()
+
+    def test_committed_changes(self):
+        """
+        Checks that the tickets created and deleted update the seat counters
+        """
+        print('(' + self.test_committed_changes.__name__ + ')',
+              self.test_committed_changes.__doc__)
+        self.connection.seat_listeners.append(self.table.set)
+        self.connection.create_ticket(TICKET)
+        self.connection.delete_ticket(1030)
+        self.assertEqual(self.table.flights(), {1111: 9, 1122: 16})
+        self.assertRaises(database.NoMoreSeatsAvailableException, self.connection.create_ticket,
+                          dict(TICKET, reservationid=33))
+        self.assertIsNone(self.table.get(1133))
+
+    def test_reconcile(self):
+        """
+        Checks that the reconciliation loads the flights not departed yet
+        and removes the other ones
+        """
+        print('(' + self.test_reconcile.__name__ + ')', self.test_reconcile.__doc__)
+        self.table.set(1111, 3, 0)
+        self.table.set(1122, 3, 0)
+        self.assertEqual(self.table.reconcile(self.connection, datetime(2018, 6, 1)), 2)
+        self.assertEqual(self.table.flights(), {1122: 15, 1133: 0})
+
+        self.assertTrue(self.table.maybe_reconcile(self.connection))
+        self.assertFalse(self.table.maybe_reconcile(self.connection))
+
+    def test_full_flight_refused(self):
+        """
+        Checks that a booking of a flight the seat counters see full is
+        refused before the database is read, and that the flight resources
+        read the seats left from the database
+        """
+        print('(' + self.test_full_flight_refused.__name__ + ')',
+              self.test_full_flight_refused.__doc__)
+        #Only the flights not departed yet are loaded
+        flight = self.connection.get_flight(1122)
+        flight.update(departuredate="2100-01-01", arrivaldate="2100-01-01")
+        self.connection.modify_flight(1122, flight)
+        seat_counters.enable(APP, self.table)
+        client = APP.test_client()
+        resp = client.get("/flight-booking-system/api/flights/1122")
+        self.assertEqual(json.loads(resp.data.decode("utf-8"))["nbSeatsLeft"], 15)
+        #The first request reconciled the table
+        self.assertEqual(self.table.flights(), {1122: 15})
+
+        #A value only the counters know
+        self.table.set(1122, 1, 10 ** 6)
+        passenger = {"firstName": "Jules", "familyName": "Larue", "age": 20,
+                     "gender": "male", "seat": "1A"}
+        resp = client.post("/flight-booking-system/api/reservations",
+                           headers={"Content-Type": "application/json"},
+                           data=json.dumps({"user_id": 3, "flight_id": 1122,
+                                            "tickets": [passenger, passenger]}))
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(self.connection.get_reservations_by_user(3)[0]["flightid"], 1133)
+        resp = client.get("/flight-booking-system/api/flights/1122")
+        self.assertEqual(json.loads(resp.data.decode("utf-8"))["nbSeatsLeft"], 15)
+
+        #A single ticket is booked, the database still checks it
+        resp = client.post("/flight-booking-system/api/reservations",
+                           headers={"Content-Type": "application/json"},
+                           data=json.dumps({"user_id": 3, "flight_id": 1122, "tickets": [passenger]}))
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.connection.get_flight(1122)["seatsleft"], 14)
+
+if __name__ == '__main__':
+    print('Start running seat counters tests')
+    unittest.main()
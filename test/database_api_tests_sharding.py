@@ -0,0 +1,255 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the database split in a catalog and per-month
+shards.
+"""
+import sqlite3
+import unittest
+from datetime import datetime
+
+from flight_reservation import flight_database as database
+from flight_reservation.repricing import Repricer
+from flight_reservation.sharding import ShardedEngine, ShardMap
+
+#Directory of the test catalog and shards, different from the deployment db
+SHARD_DIRECTORY = 'db/flight_test_shards'
+ENGINE = ShardedEngine(SHARD_DIRECTORY)
+
+NEW_FLIGHT = {'searchresultid': 1235,
+              'flightid': 1144,
+              'code': 'AY301',
+              'price': 120,
+              'departuredate': '2018-09-03',
+              'arrivaldate': '2018-09-03',
+              'gate': 'GATE03',
+              'totalseats': 50,
+              'seatsleft': 50}
+
+NEW_TICKET = {'firstname': 'James',
+              'lastname': 'Watt',
+              'gender': 'male',
+              'age': 34}
+
+
+class ShardMapTestCase(unittest.TestCase):
+    """
+    Test cases for the ShardMap.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def test_keys_and_ids(self):
+        """
+        Checks the shard of a departure date and of an id
+        """
+        print('(' + self.test_keys_and_ids.__name__ + ')', self.test_keys_and_ids.__doc__)
+        shard_map = ShardMap("shards", id_span=1000)
+        self.assertEqual(shard_map.key("2018-05-06"), "2018-05")
+        self.assertRaises(ValueError, shard_map.key, "06-05-2018")
+        self.assertEqual(shard_map.first_id("2018-12"), (2018 * 12 + 11) * 1000)
+        self.assertEqual(shard_map.key_of_id(shard_map.first_id("2018-12") + 1), "2018-12")
+        self.assertEqual(shard_map.key_of_id(shard_map.first_id("2019-01") + 999), "2019-01")
+        self.assertIsNone(shard_map.key_of_id(999))
+        self.assertEqual(shard_map.path("2018-05"), "shards/flight-2018-05.db")
+
+
+class ShardedDBAPITestCase(unittest.TestCase):
+    """
+    Test cases for the ShardedConnection.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def test_imported_rows(self):
+        """
+        Checks that the rows of the dump are split by month of departure and
+        found with their original ids
+        """
+        print('(' + self.test_imported_rows.__name__ + ')', self.test_imported_rows.__doc__)
+        self.assertEqual(ENGINE.shard_map.keys(), ["2018-05", "2018-06", "2018-07"])
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 10)
+        self.assertIs(self.connection.flight_shard(1111), self.connection.shard("2018-05"))
+        self.assertEqual(self.connection.get_reservation(22)["flightid"], 1122)
+        self.assertEqual(self.connection.get_ticket(1050)["reservationid"], 44)
+        self.assertEqual(len(self.connection.get_tickets_by_reservation(11)), 2)
+        self.assertEqual(len(self.connection.get_reservation_list()), 4)
+        self.assertEqual(len(self.connection.get_tickets()), 5)
+        self.assertEqual(self.connection.get_user(1)["userid"], 1)
+        self.assertIsNone(self.connection.get_reservation(300))
+        self.assertFalse(self.connection.delete_ticket(35))
+
+    def test_new_rows(self):
+        """
+        Checks that a flight of a new month creates its shard and that the
+        ids of its reservations and tickets are allocated by the shard
+        """
+        print('(' + self.test_new_rows.__name__ + ')', self.test_new_rows.__doc__)
+        self.assertEqual(self.connection.create_flight(NEW_FLIGHT), 1144)
+        self.assertIn("2018-09", ENGINE.shard_map.keys())
+        self.assertIsNone(self.connection.create_flight(NEW_FLIGHT))
+        self.assertIsNone(self.connection.create_flight(dict(NEW_FLIGHT, flightid=1155,
+                                                             searchresultid=1)))
+
+        reservation_id = self.connection.create_reservation({'userid': 1, 'flightid': 1144})
+        self.assertEqual(ENGINE.shard_map.key_of_id(reservation_id), "2018-09")
+        self.assertIsNone(self.connection.create_reservation({'userid': 300, 'flightid': 1144}))
+        ticket_id = self.connection.create_ticket(dict(NEW_TICKET, reservationid=reservation_id))
+        self.assertEqual(ENGINE.shard_map.key_of_id(ticket_id), "2018-09")
+        self.assertEqual(self.connection.get_flight(1144)["seatsleft"], 49)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1144)[0]["seatsleft"], 49)
+
+        #Reads of several shards
+        self.assertEqual(sorted(res["flightid"] for res in
+                                self.connection.get_reservations_by_user(1)), [1111, 1144])
+        self.assertEqual([flight["flightid"] for flight in
+                          self.connection.get_flights_by_template(1235)], [1122, 1144])
+
+        #A reservation does not move to another shard
+        self.assertIsNone(self.connection.modify_reservation(reservation_id, "AB12CS", 1, 1122))
+        self.assertTrue(self.connection.modify_reservation(reservation_id, "AB12CS", 1, 1144))
+
+    def test_deletions(self):
+        """
+        Checks that deleting a user or a template flight deletes their rows
+        in the shards
+        """
+        print('(' + self.test_deletions.__name__ + ')', self.test_deletions.__doc__)
+        self.assertTrue(self.connection.delete_user(1))
+        self.assertIsNone(self.connection.get_reservation(11))
+        self.assertIsNone(self.connection.get_ticket(1010))
+        #The seats of the two tickets of the user are returned
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 12)
+        self.assertEqual(self.connection.reconcile_seats(fix=False),
+                         {1111: (12, 90), 1122: (15, 88), 1133: (0, 89)})
+        self.assertTrue(self.connection.delete_template_flight(1237))
+        self.assertIsNone(self.connection.get_flight(1133))
+        self.assertIsNone(self.connection.get_ticket(1050))
+        self.assertIsNone(ENGINE.engine_for_flight(1133))
+        self.assertTrue(self.connection.delete_flight(1122))
+        self.assertEqual(self.connection.get_reservation_list(), [])
+
+    def test_independent_writes(self):
+        """
+        Checks that a booking is written while another shard and the catalog
+        are locked by writers
+        """
+        print('(' + self.test_independent_writes.__name__ + ')',
+              self.test_independent_writes.__doc__)
+        writers = []
+        for path in (ENGINE.db_path, ENGINE.shard_map.path("2018-05")):
+            writer = sqlite3.connect(path, isolation_level=None)
+            writer.execute("BEGIN IMMEDIATE")
+            writers.append(writer)
+        try:
+            #Reservation 22 is on flight 1122, in the shard of June
+            self.assertIsNotNone(self.connection.create_ticket(dict(NEW_TICKET, reservationid=22)))
+            self.connection.close()
+        finally:
+            for writer in writers:
+                writer.execute("ROLLBACK")
+                writer.close()
+        self.connection = ENGINE.connect()
+        self.assertEqual(len(self.connection.get_tickets_by_reservation(22)), 3)
+        self.assertEqual(ENGINE.engine_for_flight(1122).db_path, ENGINE.shard_map.path("2018-06"))
+
+    def test_search(self):
+        """
+        Checks that the search finds the users of the catalog and the
+        passengers of every shard
+        """
+        print('(' + self.test_search.__name__ + ')', self.test_search.__doc__)
+        results = self.connection.search("jac")
+        self.assertEqual(sorted((result["kind"], result["id"]) for result in results),
+                         [("passenger", 1020), ("passenger", 1030), ("passenger", 1040),
+                          ("user", 2), ("user", 4)])
+        self.assertTrue(self.connection.delete_user(2))
+        self.assertEqual([result["id"] for result in self.connection.search("molly")], [])
+
+    def test_fare_calendar(self):
+        """
+        Checks that the fares of a route are computed from the shards of
+        the month
+        """
+        print('(' + self.test_fare_calendar.__name__ + ')', self.test_fare_calendar.__doc__)
+        self.assertEqual(self.connection.get_fare_calendar("Finland", "Spain",
+                                                           "2018-06-01", "2018-07-01"),
+                         [{"date": "2018-06-10", "minprice": 150, "seatsleft": 15, "flights": 1}])
+        self.assertEqual(self.connection.get_fare_calendar("Finland", "Spain",
+                                                           "2018-07-01", "2018-08-01"), [])
+        self.assertEqual(self.connection.get_fare_calendar("Finland", "Mars",
+                                                           "2018-06-01", "2018-07-01"), [])
+
+    def test_reprice(self):
+        """
+        Checks that the flights of every shard are repriced
+        """
+        print('(' + self.test_reprice.__name__ + ')', self.test_reprice.__doc__)
+        counts = Repricer(ENGINE).reprice(datetime(2018, 5, 1))
+        self.assertEqual(counts, {"flights": 3, "repriced": 3})
+        self.assertEqual([self.connection.get_flight(flight_id)["price"]
+                          for flight_id in (1111, 1122, 1133)], [335, 192, 268])
+        self.assertEqual(Repricer(ENGINE).reprice(datetime(2018, 5, 1)),
+                         {"flights": 3, "repriced": 0})
+
+    def test_waitlist(self):
+        """
+        Checks that the waitlist of a flight is kept in its shard and that
+        the seat of a deleted ticket is booked for its head
+        """
+        print('(' + self.test_waitlist.__name__ + ')', self.test_waitlist.__doc__)
+        entry = dict(NEW_TICKET, userid=1, flightid=1133, priority=0)
+        waitlist_id = self.connection.create_waitlist_entry(entry)
+        self.assertEqual(ENGINE.shard_map.key_of_id(waitlist_id), "2018-07")
+        self.assertIsNone(self.connection.create_waitlist_entry(dict(entry, userid=300)))
+        self.assertEqual(self.connection.get_waitlist_entry(waitlist_id)["position"], 1)
+        self.assertEqual(len(self.connection.get_waitlist(1133)), 1)
+
+        self.assertTrue(self.connection.delete_ticket(1050))
+        ticket_id = self.connection.get_waitlist_entry(waitlist_id)["ticketnumber"]
+        self.assertEqual(self.connection.get_ticket(ticket_id)["lastname"], "Watt")
+        self.assertTrue(self.connection.delete_waitlist_entry(waitlist_id))
+        self.assertFalse(self.connection.delete_waitlist_entry(waitlist_id))
+
+    def test_itinerary(self):
+        """
+        Checks that the flights of an itinerary are booked in their shards,
+        all or none
+        """
+        print('(' + self.test_itinerary.__name__ + ')', self.test_itinerary.__doc__)
+        itinerary = {'userid': 4, 'flightids': [1133, 1111], 'tickets': [NEW_TICKET]}
+        self.assertRaises(database.NoMoreSeatsAvailableException,
+                          self.connection.create_itinerary, itinerary)
+        self.assertEqual(self.connection.get_reservations_by_user(4), [])
+        self.assertIsNone(self.connection.create_itinerary(dict(itinerary, userid=300)))
+
+        reservations = self.connection.create_itinerary(dict(itinerary, flightids=[1122, 1111]))
+        self.assertEqual(ENGINE.shard_map.key_of_id(reservations[1111]), "2018-05")
+        self.assertEqual(ENGINE.shard_map.key_of_id(reservations[1122]), "2018-06")
+        self.assertEqual([self.connection.get_flight(flight_id)["seatsleft"]
+                          for flight_id in (1111, 1122)], [9, 14])
+        self.assertIsNone(self.connection.create_itinerary(dict(itinerary, flightids=[1122])))
+
+
+if __name__ == '__main__':
+    print('Start running sharding tests')
+    unittest.main()
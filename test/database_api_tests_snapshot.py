@@ -0,0 +1,78 @@
+"""
+Created on 19.10.2026
+
+Testing of the SnapshotEngine used to restore the test databases.
+"""
+import sqlite3
+import unittest
+
+from flight_reservation import flight_database as database
+
+DB_PATH = 'db/flight_test.db'
+ENGINE = database.SnapshotEngine(DB_PATH)
+TABLES = ('User', 'Reservation', 'Ticket', 'Flight', 'TemplateFlight')
+
+
+def _dump(db_path):
+    con = sqlite3.connect(db_path)
+    try:
+        return list(con.iterdump())
+    finally:
+        con.close()
+
+
+class SnapshotEngineTestCase(unittest.TestCase):
+    """
+    Test cases for the SnapshotEngine.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def tearDown(self):
+        ENGINE.remove_database()
+
+    def test_restore_matches_engine(self):
+        """
+        Checks that the restored database is the same as the one built by
+        executing the schema and the data dump
+        """
+        print('(' + self.test_restore_matches_engine.__name__ + ')',
+              self.test_restore_matches_engine.__doc__)
+        engine = database.Engine(DB_PATH)
+        engine.remove_database()
+        engine.create_tables()
+        engine.populate_tables()
+        expected = _dump(DB_PATH)
+        engine.remove_database()
+
+        ENGINE.create_tables()
+        ENGINE.populate_tables()
+        self.assertEqual(_dump(DB_PATH), expected)
+
+    def test_clear(self):
+        """
+        Checks that clear leaves the tables empty and undoes the changes
+        """
+        print('(' + self.test_clear.__name__ + ')', self.test_clear.__doc__)
+        ENGINE.populate_tables()
+        connection = ENGINE.connect()
+        connection.delete_user(1)
+        connection.close()
+        ENGINE.clear()
+        con = sqlite3.connect(DB_PATH)
+        try:
+            for table in TABLES:
+                self.assertEqual(con.execute('SELECT COUNT(*) FROM ' + table).fetchone()[0], 0)
+        finally:
+            con.close()
+        ENGINE.populate_tables()
+        connection = ENGINE.connect()
+        self.assertIsNotNone(connection.get_user(1))
+        connection.close()
+
+
+if __name__ == '__main__':
+    print('Start running snapshot engine tests')
+    unittest.main()
@@ -13,7 +13,7 @@ from flight_reservation import flight_database as database
 
 # Path to the database file, different from the deployment db
 DB_PATH = 'db/flight_test.db'
-ENGINE = database.Engine(DB_PATH)
+ENGINE = database.SnapshotEngine(DB_PATH)
 
 # Table names
 TABLE_USER = 'User'
@@ -19,7 +19,7 @@ from flight_reservation import flight_database as database
 
 #Path to the database file, different from the deployment db
 DB_PATH = 'db/flight_test.db'
-ENGINE = database.Engine(DB_PATH)
+ENGINE = database.SnapshotEngine(DB_PATH)
 
 #CONSTANTS DEFINING DIFFERENT TEMPLATE FLIGHTS PROPERTIES
 TEMPLATE_FLIGHTID_1234 = 1234
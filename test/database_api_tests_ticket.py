@@ -23,7 +23,7 @@ from flight_reservation import flight_database as database
 
 #Path to the database file, different from the deployment db
 DB_PATH = 'db/flight_test.db'
-ENGINE = database.Engine(DB_PATH)
+ENGINE = database.SnapshotEngine(DB_PATH)
 
 #CONSTANTS DEFINING DIFFERENT USERS AND USER PROPERTIES
 TICKETID_1010 = 1010
@@ -369,6 +369,44 @@ class TicketDBAPITestCase(unittest.TestCase):
         self.assertEqual(seats_left_before_insert, seats_left_after_insert - 1)
 
 
+    def test_move_ticket(self):
+        """
+        Checks that moving a ticket to a reservation of another flight moves
+        its seat
+        """
+        print('(' + self.test_move_ticket.__name__ + ')', \
+              self.test_move_ticket.__doc__)
+
+        # Reservation 22 is on the flight 1122
+        resp = self.connection.modify_ticket(TICKETID_1010, dict(MODIFIED_TICKET_1010, reservationid=22))
+        self.assertTrue(resp)
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 11)
+        self.assertEqual(self.connection.get_flight(1122)["seatsleft"], 14)
+        # Both changes are recorded in the outbox
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1111)[-1]["seatsleft"], 11)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1122)[-1]["seatsleft"], 14)
+
+    def test_move_ticket_to_full_flight(self):
+        """
+        Checks that a ticket can not be moved to a reservation of a full
+        flight, and that the schema rejects a ticket on a full flight
+        whatever writes it
+        """
+        print('(' + self.test_move_ticket_to_full_flight.__name__ + ')', \
+              self.test_move_ticket_to_full_flight.__doc__)
+
+        # Reservation 33 is on the full flight 1133
+        with self.assertRaises(database.NoMoreSeatsAvailableException):
+            self.connection.modify_ticket(TICKETID_1010, dict(MODIFIED_TICKET_1010, reservationid=33))
+        self.assertEqual(self.connection.get_ticket(TICKETID_1010)["reservationid"], 11)
+        self.assertEqual(self.connection.get_flight(1111)["seatsleft"], 10)
+        self.assertEqual(self.connection.get_flight(1133)["seatsleft"], 0)
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.connection.con.execute("INSERT INTO Ticket (firstName, lastName, gender, age, "
+                                        "reservation_id, seat) VALUES('James', 'Watt', 'male', 34, 33, 91)")
+        self.assertEqual(self.connection.get_flight(1133)["seatsleft"], 0)
+
     def test_delete_ticket_nonexisting_id(self):
         """
         Checks that we can not delete a ticket with a
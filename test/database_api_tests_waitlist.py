@@ -0,0 +1,183 @@
+"""
+Created on 19.10.2026
+
+Database interface testing of the waitlists of the full flights.
+A waitlist entry has a data model represented by the following dictionary:
+
+entry = {'waitlistid': ,
+         'flightid': ,
+         'userid': ,
+         'priority': ,
+         'firstname': '',
+         'lastname': '',
+         'gender': '',
+         'age': ,
+         'created': ,
+         'ticketnumber': ,
+         'position':
+        }
+"""
+import unittest
+
+from flight_reservation import flight_database as database
+
+#Path to the database file, different from the deployment db
+ENGINE = database.SnapshotEngine('db/flight_test.db')
+
+#The flight 1133 is full, its only ticket is 1050 of the reservation 44
+FULL_FLIGHT_ID = 1133
+
+
+def new_entry(user_id, priority=0, flight_id=FULL_FLIGHT_ID):
+    return {'userid': user_id,
+            'flightid': flight_id,
+            'priority': priority,
+            'firstname': 'Passenger',
+            'lastname': 'Of user %d' % user_id,
+            'gender': 'female',
+            'age': 30}
+
+
+class WaitlistDBAPITestCase(unittest.TestCase):
+    """
+    Test cases for the Waitlist related methods.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def _join(self, *users):
+        return [self.connection.create_waitlist_entry(new_entry(user_id, priority))
+                for user_id, priority in users]
+
+    def test_positions(self):
+        """
+        Checks that the waitlist is ordered by decreasing priority then by
+        arrival and that an entry can leave it
+        """
+        print('(' + self.test_positions.__name__ + ')', self.test_positions.__doc__)
+        first, second, third = self._join((1, 0), (2, 0), (4, 5))
+        self.assertEqual([(entry['userid'], entry['position'])
+                          for entry in self.connection.get_waitlist(FULL_FLIGHT_ID)],
+                         [(4, 1), (1, 2), (2, 3)])
+        entry = self.connection.get_waitlist_entry(second)
+        self.assertEqual((entry['flightid'], entry['priority'], entry['position'], entry['ticketnumber']),
+                         (FULL_FLIGHT_ID, 0, 3, None))
+
+        self.assertTrue(self.connection.delete_waitlist_entry(third))
+        self.assertEqual(self.connection.get_waitlist_entry(first)['position'], 1)
+        self.assertIsNone(self.connection.get_waitlist_entry(third))
+        self.assertFalse(self.connection.delete_waitlist_entry(third))
+
+    def test_create_waitlist_entry_wrong(self):
+        """
+        Checks that a user waits once for a flight and that the user and the
+        flight must exist
+        """
+        print('(' + self.test_create_waitlist_entry_wrong.__name__ + ')',
+              self.test_create_waitlist_entry_wrong.__doc__)
+        self.assertIsNotNone(self.connection.create_waitlist_entry(new_entry(1)))
+        self.assertIsNone(self.connection.create_waitlist_entry(new_entry(1, 3)))
+        self.assertIsNone(self.connection.create_waitlist_entry(new_entry(200)))
+        self.assertIsNone(self.connection.create_waitlist_entry(new_entry(1, flight_id=1155)))
+        self.assertEqual(len(self.connection.get_waitlist(FULL_FLIGHT_ID)), 1)
+
+    def test_seat_offered(self):
+        """
+        Checks that the seat of a deleted ticket is booked for the head of
+        the waitlist, in a new reservation of its user
+        """
+        print('(' + self.test_seat_offered.__name__ + ')', self.test_seat_offered.__doc__)
+        first, second = self._join((1, 0), (2, 1))
+        changes = len(self.connection.get_seat_changes(flight_id=FULL_FLIGHT_ID))
+        self.assertTrue(self.connection.delete_ticket(1050))
+
+        entry = self.connection.get_waitlist_entry(second)
+        self.assertIsNone(entry['position'])
+        ticket = self.connection.get_ticket(entry['ticketnumber'])
+        self.assertEqual((ticket['firstname'], ticket['lastname']), ('Passenger', 'Of user 2'))
+        reservation = self.connection.get_reservation(ticket['reservationid'])
+        self.assertEqual((reservation['userid'], reservation['flightid']), (2, FULL_FLIGHT_ID))
+        self.assertEqual(self.connection.get_flight(FULL_FLIGHT_ID)['seatsleft'], 0)
+        #The deletion and the booking are a single change of the seats left
+        self.assertEqual(len(self.connection.get_seat_changes(flight_id=FULL_FLIGHT_ID)), changes + 1)
+        self.assertEqual([entry['waitlistid'] for entry in self.connection.get_waitlist(FULL_FLIGHT_ID)],
+                         [first])
+
+        #The next seat goes to the existing reservation of the next user
+        reservation_id = self.connection.create_reservation({'userid': 1, 'flightid': FULL_FLIGHT_ID})
+        self.assertTrue(self.connection.delete_ticket(entry['ticketnumber']))
+        ticket_id = self.connection.get_waitlist_entry(first)['ticketnumber']
+        self.assertEqual(self.connection.get_ticket(ticket_id)['reservationid'], reservation_id)
+        self.assertEqual(self.connection.get_waitlist(FULL_FLIGHT_ID), [])
+
+    def test_seats_left(self):
+        """
+        Checks that an entry of a flight with seats left is served at once
+        and that the seats of a deleted reservation are offered
+        """
+        print('(' + self.test_seats_left.__name__ + ')', self.test_seats_left.__doc__)
+        waitlist_id = self.connection.create_waitlist_entry(new_entry(1, flight_id=1122))
+        self.assertIsNotNone(self.connection.get_waitlist_entry(waitlist_id)['ticketnumber'])
+        self.assertEqual(self.connection.get_flight(1122)['seatsleft'], 14)
+
+        first, = self._join((3, 0))
+        self.assertTrue(self.connection.delete_reservation(44))
+        self.assertIsNotNone(self.connection.get_waitlist_entry(first)['ticketnumber'])
+
+    def test_seats_moved(self):
+        """
+        Checks that the seats a moved ticket or reservation leave are booked
+        for the head of the waitlist and recorded in the outbox
+        """
+        print('(' + self.test_seats_moved.__name__ + ')', self.test_seats_moved.__doc__)
+        first, second = self._join((1, 0), (2, 0))
+        changes = len(self.connection.get_seat_changes(flight_id=FULL_FLIGHT_ID))
+
+        #The ticket 1050 of the reservation 44 moves to the flight 1122
+        ticket = dict(self.connection.get_ticket(1050), reservationid=22)
+        self.assertTrue(self.connection.modify_ticket(1050, ticket))
+        self.assertIsNotNone(self.connection.get_waitlist_entry(first)['ticketnumber'])
+        self.assertEqual(self.connection.get_flight(FULL_FLIGHT_ID)['seatsleft'], 0)
+        self.assertEqual(len(self.connection.get_seat_changes(flight_id=FULL_FLIGHT_ID)), changes + 1)
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1122)[-1]['seatsleft'], 14)
+
+        #The reservation of the first user moves to the flight 1122
+        reservation = self.connection.get_reservation(
+            self.connection.get_ticket(self.connection.get_waitlist_entry(first)['ticketnumber'])['reservationid'])
+        self.assertTrue(self.connection.modify_reservation(reservation['reservationid'], reservation['reference'],
+                                                           1, 1122))
+        self.assertIsNotNone(self.connection.get_waitlist_entry(second)['ticketnumber'])
+        self.assertEqual(self.connection.get_seat_changes(flight_id=1122)[-1]['seatsleft'], 13)
+
+    def test_delete_user(self):
+        """
+        Checks that a deleted user leaves the waitlists and that the seats
+        of their tickets are offered to the other users
+        """
+        print('(' + self.test_delete_user.__name__ + ')', self.test_delete_user.__doc__)
+        first, second = self._join((5, 9), (1, 0))
+        self.assertTrue(self.connection.delete_user(5))
+        self.assertIsNone(self.connection.get_waitlist_entry(first))
+        self.assertIsNotNone(self.connection.get_waitlist_entry(second)['ticketnumber'])
+
+
+if __name__ == '__main__':
+    print('Start running waitlist tests')
+    unittest.main()
@@ -15,7 +15,7 @@ import flight_reservation.flight_database as database
 import flight_reservation.resources as resources
 
 DB_PATH = "db/flight_test.db"
-ENGINE = database.Engine(DB_PATH)
+ENGINE = database.SnapshotEngine(DB_PATH)
 
 MASONJSON = "application/vnd.mason+json"
 JSON = "application/json"
@@ -33,13 +33,10 @@ FLIGHT_SCHEMA_URL = "/flight-booking-system/schema/user/flight"
 TEMPLATE_FLIGHT_SCHEMA_URL="/flight-booking-system/schema/template-flight"
 LINK_RELATIONS_URL = "/flight-booking-system/link-relations/"
 
-# Tell Flask that I am running it in testing mode.
-resources.app.config["TESTING"] = True
-# Necessary for correct translation in url_for
-resources.app.config["SERVER_NAME"] = "localhost:5000"
-
-# Database Engine utilized in our testing
-resources.app.config.update({"Engine": ENGINE})
+# Tell Flask that I am running it in testing mode. The SERVER_NAME is
+# necessary for correct translation in url_for, the Engine is the database
+# utilized in our testing
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
 
 # Other database parameters.
 NB_INITIAL_USERS = 5
@@ -78,10 +75,10 @@ class ResourcesAPITestCase(unittest.TestCase):
         # This method load the initial values from flight_data_dump.sql
         ENGINE.populate_tables()
         # Activate app_context for using url_for
-        self.app_context = resources.app.app_context()
+        self.app_context = APP.app_context()
         self.app_context.push()
         # Create a test client
-        self.client = resources.app.test_client()
+        self.client = APP.test_client()
 
     def tearDown(self):
         """
@@ -155,9 +152,9 @@ class UserTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/users/1"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.User)
 
     def test_wrong_url(self):
@@ -175,7 +172,7 @@ class UserTestCase(ResourcesAPITestCase):
         with a correct user
         """
         print("(" + self.test_get_user.__name__ + ")", self.test_get_user.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url1)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -495,9 +492,9 @@ class UsersTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/users"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.Users)
 
     def test_get_users(self):
@@ -506,7 +503,7 @@ class UsersTestCase(ResourcesAPITestCase):
         with correct users
         """
         print("(" + self.test_get_users.__name__ + ")", self.test_get_users.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -694,9 +691,9 @@ class ReservationTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/reservations/11"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.Reservation)
 
     def test_wrong_url(self):
@@ -714,7 +711,7 @@ class ReservationTestCase(ResourcesAPITestCase):
         response
         """
         print("(" + self.test_get_reservation.__name__ + ")", self.test_get_reservation.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url1)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -936,9 +933,9 @@ class ReservationsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/reservations"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions['reservations'].view_class
+            view_point = APP.view_functions['reservations'].view_class
             self.assertEqual(view_point, resources.Reservations)
 
 
@@ -1033,7 +1030,87 @@ class ReservationsTestCase(ResourcesAPITestCase):
                                 headers={"Content-Type": JSON},
                                 data=json.dumps(self.new_reservation_full_flight))
 
-        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(resp.status_code, 409)
+        error = json.loads(resp.data.decode("utf-8"))["@error"]
+        self.assertIn(resources.api.url_for(resources.FlightWaitlist, flight_id=1133, _external=False),
+                      error["@messages"][0])
+
+        # No reservation is left behind: the user can join the waitlist
+        resp = self.client.get(resources.api.url_for(resources.UserReservations, user_id=1))
+        self.assertEqual([item["reservation_id"] for item in
+                          json.loads(resp.data.decode("utf-8"))["items"]], [11])
+
+
+class ItinerariesTestCase(ResourcesAPITestCase):
+
+    # round trip of a user without reservation
+    itinerary = {
+        "user_id": 4,
+        "flight_ids": [1111, 1122],
+        "tickets": [
+            {
+                "firstName": "Jon",
+                "familyName": "Doe",
+                "age": 24,
+                "gender": "male"
+            }
+        ]
+    }
+
+    def setUp(self):
+        super(ItinerariesTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.Itineraries, _external=False)
+
+    def _post(self, itinerary):
+        return self.client.post(self.url, headers={"Content-Type": JSON},
+                                data=json.dumps(itinerary))
+
+    def test_book_itinerary(self):
+        """
+        Checks that POST Itinerary creates the reservations of all the
+        flights and lists them
+        """
+        print("(" + self.test_book_itinerary.__name__ + ")", self.test_book_itinerary.__doc__)
+        resp = self._post(self.itinerary)
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn("/users/4/reservations", resp.headers["Location"])
+        items = json.loads(resp.data.decode("utf-8"))["items"]
+        self.assertEqual([item["flight_id"] for item in items], [1111, 1122])
+        for item in items:
+            resp = self.client.get(item["@controls"]["self"]["href"])
+            self.assertEqual(resp.status_code, 200)
+
+        # The user has now booked the flights
+        resp = self._post(self.itinerary)
+        self.assertEqual(resp.status_code, 409)
+
+    def test_book_itinerary_full_flight(self):
+        """
+        Checks that POST Itinerary with a full flight returns 409 and books
+        none of the flights
+        """
+        print("(" + self.test_book_itinerary_full_flight.__name__ + ")",
+              self.test_book_itinerary_full_flight.__doc__)
+        resp = self._post(dict(self.itinerary, flight_ids=[1111, 1133]))
+        self.assertEqual(resp.status_code, 409)
+        error = json.loads(resp.data.decode("utf-8"))["@error"]
+        self.assertIn(resources.api.url_for(resources.FlightWaitlist, flight_id=1133, _external=False),
+                      error["@messages"][0])
+        resp = self.client.get(resources.api.url_for(resources.UserReservations, user_id=4))
+        self.assertEqual(json.loads(resp.data.decode("utf-8"))["items"], [])
+
+    def test_book_itinerary_wrong(self):
+        """
+        Checks that POST Itinerary returns 400 for an unknown flight or
+        user, a flight given twice or no flight
+        """
+        print("(" + self.test_book_itinerary_wrong.__name__ + ")", self.test_book_itinerary_wrong.__doc__)
+        for itinerary in (dict(self.itinerary, flight_ids=[1111, 1155]),
+                          dict(self.itinerary, user_id=200),
+                          dict(self.itinerary, flight_ids=[1111, 1111]),
+                          dict(self.itinerary, flight_ids=[])):
+            resp = self._post(itinerary)
+            self.assertEqual(resp.status_code, 400)
 
 
 class UserReservationsTestCase(ResourcesAPITestCase):
@@ -1062,9 +1139,9 @@ class UserReservationsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/users/1/reservations"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.UserReservations)
 
     def test_wrong_url(self):
@@ -1083,7 +1160,7 @@ class UserReservationsTestCase(ResourcesAPITestCase):
         and response
         """
         print("(" + self.test_get_user_reservations.__name__ + ")", self.test_get_user_reservations.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url1)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -1200,9 +1277,9 @@ class ReservationTicketsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/reservations/11/tickets"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.ReservationTickets)
 
     def test_wrong_url(self):
@@ -1222,7 +1299,7 @@ class ReservationTicketsTestCase(ResourcesAPITestCase):
         """
 
         print("(" + self.test_get_reservation_tickets.__name__ + ")", self.test_get_reservation_tickets.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url1)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -1346,9 +1423,9 @@ class TicketTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/tickets/1010"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.Ticket)
 
     def test_wrong_url(self):
@@ -1366,7 +1443,7 @@ class TicketTestCase(ResourcesAPITestCase):
         """
 
         print("(" + self.test_get_ticket.__name__ + ")", self.test_get_ticket.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url1)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -1575,9 +1652,9 @@ class TicketsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/tickets"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions['tickets'].view_class
+            view_point = APP.view_functions['tickets'].view_class
             self.assertEqual(view_point, resources.Tickets)
 
     def test_add_ticket(self):
@@ -1639,9 +1716,9 @@ class FlightTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/flights/1111"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.Flight)
 
     def test_wrong_url(self):
@@ -1659,7 +1736,7 @@ class FlightTestCase(ResourcesAPITestCase):
         response
         """
         print("(" + self.test_get_flight.__name__ + ")", self.test_get_flight.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -1752,6 +1829,94 @@ class FlightTestCase(ResourcesAPITestCase):
         self.assertEqual(err_data["resource_url"],
                          resources.api.url_for(resources.Flight, flight_id=self.flight_id_incorrect, _external=False))
 
+class FlightWaitlistTestCase(ResourcesAPITestCase):
+    full_flight_id = 1133
+    entry = {
+        "user_id": 1,
+        "priority": 2,
+        "firstName": "Jon",
+        "familyName": "Doe",
+        "age": 24,
+        "gender": "male"
+    }
+
+    def setUp(self):
+        super(FlightWaitlistTestCase, self).setUp()
+        self.url = resources.api.url_for(resources.FlightWaitlist,
+                                         flight_id=self.full_flight_id,
+                                         _external=False)
+
+    def test_join_waitlist(self):
+        """
+        Checks that POST to the waitlist of a full flight creates an entry
+        whose position can be read and that it is refused twice or when the
+        flight has seats left
+        """
+        print("(" + self.test_join_waitlist.__name__ + ")", self.test_join_waitlist.__doc__)
+        resp = self.client.post(self.url, headers={"Content-Type": JSON},
+                                data=json.dumps(self.entry))
+        self.assertEqual(resp.status_code, 201)
+        self.assertIn("Location", resp.headers)
+
+        resp = self.client.get(resp.headers["Location"])
+        self.assertEqual(resp.status_code, 200)
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual((data["flight_id"], data["user_id"], data["status"], data["position"]),
+                         (self.full_flight_id, 1, "waiting", 1))
+        self.assertIn("flight-booking-system:delete", data["@controls"])
+
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        items = json.loads(resp.data.decode("utf-8"))["items"]
+        self.assertEqual([(item["user_id"], item["position"]) for item in items], [(1, 1)])
+
+        resp = self.client.post(self.url, headers={"Content-Type": JSON},
+                                data=json.dumps(self.entry))
+        self.assertEqual(resp.status_code, 409)
+        resp = self.client.post(resources.api.url_for(resources.FlightWaitlist, flight_id=1111),
+                                headers={"Content-Type": JSON}, data=json.dumps(self.entry))
+        self.assertEqual(resp.status_code, 409)
+
+    def test_join_waitlist_wrong(self):
+        """
+        Checks that POST to the waitlist returns 404 for an unknown flight
+        and 400 for an unknown user or a wrong body
+        """
+        print("(" + self.test_join_waitlist_wrong.__name__ + ")", self.test_join_waitlist_wrong.__doc__)
+        resp = self.client.post(resources.api.url_for(resources.FlightWaitlist, flight_id=1155),
+                                headers={"Content-Type": JSON}, data=json.dumps(self.entry))
+        self.assertEqual(resp.status_code, 404)
+        entry = dict(self.entry, user_id=200)
+        resp = self.client.post(self.url, headers={"Content-Type": JSON}, data=json.dumps(entry))
+        self.assertEqual(resp.status_code, 400)
+        entry = dict(self.entry, priority=10)
+        resp = self.client.post(self.url, headers={"Content-Type": JSON}, data=json.dumps(entry))
+        self.assertEqual(resp.status_code, 400)
+
+    def test_seat_offered(self):
+        """
+        Checks that a ticket deleted on a full flight is booked for the head
+        of its waitlist and linked from the entry
+        """
+        print("(" + self.test_seat_offered.__name__ + ")", self.test_seat_offered.__doc__)
+        resp = self.client.post(self.url, headers={"Content-Type": JSON},
+                                data=json.dumps(self.entry))
+        location = resp.headers["Location"]
+        resp = self.client.delete(resources.api.url_for(resources.Ticket, ticket_id=1050))
+        self.assertEqual(resp.status_code, 204)
+
+        data = json.loads(self.client.get(location).data.decode("utf-8"))
+        self.assertEqual((data["status"], data["position"]), ("booked", None))
+        resp = self.client.get(data["@controls"]["flight-booking-system:ticket"]["href"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.data.decode("utf-8"))["familyName"], "Doe")
+
+        resp = self.client.delete(location)
+        self.assertEqual(resp.status_code, 204)
+        resp = self.client.get(location)
+        self.assertEqual(resp.status_code, 404)
+
+
 class FlightsTestCase(ResourcesAPITestCase):
     template1111_id = 1234
     flight = {
@@ -1836,9 +2001,9 @@ class FlightsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/template-flights/1234/flights"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.Flights)
 
     def test_wrong_url(self):
@@ -1855,7 +2020,7 @@ class FlightsTestCase(ResourcesAPITestCase):
         Checks that GET flights return correct status and response (for an existing template flight id)
         """
         print("(" + self.test_get_flights.__name__ + ")", self.test_get_flights.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -2029,9 +2194,9 @@ class TemplateFlightTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/template-flights/1234"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.TemplateFlight)
 
     def test_wrong_url(self):
@@ -2049,7 +2214,7 @@ class TemplateFlightTestCase(ResourcesAPITestCase):
         response
         """
         print("(" + self.test_get_templateflight.__name__ + ")", self.test_get_templateflight.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -2148,9 +2313,9 @@ class TemplateFlightsTestCase(ResourcesAPITestCase):
         """
         print("(" + self.test_url.__name__ + ")", self.test_url.__doc__)
         url = "/flight-booking-system/api/template-flights/"
-        with resources.app.test_request_context(url):
+        with APP.test_request_context(url):
             rule = flask.request.url_rule
-            view_point = resources.app.view_functions[rule.endpoint].view_class
+            view_point = APP.view_functions[rule.endpoint].view_class
             self.assertEqual(view_point, resources.TemplateFlights)
 
 
@@ -2160,7 +2325,7 @@ class TemplateFlightsTestCase(ResourcesAPITestCase):
         and response
         """
         print("(" + self.test_get_template_flights.__name__ + ")", self.test_get_template_flights.__doc__)
-        with resources.app.test_client() as client:
+        with APP.test_client() as client:
             resp = client.get(self.url)
             self.assertEqual(resp.status_code, 200)
             data = json.loads(resp.data.decode("utf-8"))
@@ -0,0 +1,118 @@
+"""
+Created on 19.10.2026
+
+Testing of the single-flight coalescing of identical GET requests.
+"""
+import threading
+import time
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+from flight_reservation.coalescing import CoalescingMiddleware, LEADER, FOLLOWER
+
+FLIGHTS_URL = "/flight-booking-system/api/template-flights/"
+
+
+class SlowApp(object):
+    """
+    Application blocking until released, counting its calls.
+    """
+
+    def __init__(self, headers=()):
+        self.calls = 0
+        self.release = threading.Event()
+        self.headers = [("Content-Type", "application/json")] + list(headers)
+
+    def __call__(self, environ, start_response):
+        self.calls += 1
+        self.release.wait(5)
+        start_response("200 OK", list(self.headers))
+        return [b'{"call": ', str(self.calls).encode("ascii"), b"}"]
+
+
+class CoalescingTestCase(unittest.TestCase):
+    """
+    Test cases for the CoalescingMiddleware.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def _concurrent_gets(self, middleware, count, headers=None):
+        client = Client(middleware, BaseResponse)
+        responses = [None] * count
+
+        def get(index):
+            responses[index] = client.get(FLIGHTS_URL, headers=headers, buffered=True)
+
+        threads = [threading.Thread(target=get, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        #Wait until every request has joined or started its call
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            with middleware._lock:
+                joined = sum(call.followers + 1 for call in middleware._calls.values())
+            if joined + middleware.requests["fallback"] >= count:
+                break
+            time.sleep(0.005)
+        middleware.app.release.set()
+        for thread in threads:
+            thread.join(5)
+        return responses
+
+    def test_identical_gets_share_one_call(self):
+        """
+        Checks that concurrent identical GETs run the application once and
+        all receive the same response
+        """
+        print('(' + self.test_identical_gets_share_one_call.__name__ + ')',
+              self.test_identical_gets_share_one_call.__doc__)
+        middleware = CoalescingMiddleware(SlowApp())
+        responses = self._concurrent_gets(middleware, 8)
+        self.assertEqual(middleware.app.calls, 1)
+        self.assertEqual(set(resp.data for resp in responses), {b'{"call": 1}'})
+        self.assertEqual(middleware.requests[LEADER], 1)
+        self.assertEqual(middleware.requests[FOLLOWER], 7)
+        self.assertEqual(middleware.ratio(), 7 / 8.0)
+        self.assertIn("flight_coalescing_ratio 0.875", middleware.collect())
+        self.assertEqual(middleware._calls, {})
+
+        #Nothing is cached once the leader is done
+        Client(middleware, BaseResponse).get(FLIGHTS_URL, buffered=True)
+        self.assertEqual(middleware.app.calls, 2)
+
+    def test_private_responses_are_not_shared(self):
+        """
+        Checks that the followers run the application themselves when the
+        response sets a cookie
+        """
+        print('(' + self.test_private_responses_are_not_shared.__name__ + ')',
+              self.test_private_responses_are_not_shared.__doc__)
+        middleware = CoalescingMiddleware(SlowApp([("Set-Cookie", "session=1")]))
+        responses = self._concurrent_gets(middleware, 4)
+        self.assertEqual(middleware.app.calls, 4)
+        self.assertEqual(middleware.requests[FOLLOWER], 0)
+        self.assertTrue(all(resp.status_code == 200 for resp in responses))
+
+    def test_key(self):
+        """
+        Checks that only the GETs of the API are coalesced and that the
+        representation headers are part of the key
+        """
+        print('(' + self.test_key.__name__ + ')', self.test_key.__doc__)
+        middleware = CoalescingMiddleware(SlowApp())
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": FLIGHTS_URL, "HTTP_HOST": "localhost"}
+        self.assertIsNotNone(middleware.key(environ))
+        self.assertNotEqual(middleware.key(environ),
+                            middleware.key(dict(environ, HTTP_ACCEPT_ENCODING="gzip")))
+        self.assertIsNone(middleware.key(dict(environ, REQUEST_METHOD="POST")))
+        self.assertIsNone(middleware.key(dict(environ, PATH_INFO="/flight-booking-system/admin/")))
+
+
+if __name__ == '__main__':
+    print('Start running coalescing tests')
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Created on 19.10.2026
+
+Testing of the response compression middleware.
+"""
+import gzip
+import json
+import unittest
+import zlib
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation.compression import CompressionMiddleware, negotiate, weak_etag
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+BASE_URL = "http://localhost:5000"
+USERS_URL = "/flight-booking-system/api/users"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+
+def _streaming_app(environ, start_response):
+    """
+    Application sending a JSON body in several chunks without Content-Length
+    """
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [b'{"items": [', b", ".join([b'{"name": "item"}'] * 200), b"]}"]
+
+
+class CompressionTestCase(unittest.TestCase):
+    """
+    Test cases for the CompressionMiddleware.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.client = Client(CompressionMiddleware(APP, min_size=200), BaseResponse)
+
+    def tearDown(self):
+        ENGINE.clear()
+
+    def _get(self, url, encoding=None, client=None):
+        headers = {"Accept-Encoding": encoding} if encoding is not None else {}
+        return (client or self.client).get(url, base_url=BASE_URL, headers=headers,
+                                           buffered=True)
+
+    def test_negotiation(self):
+        """
+        Checks the choice of the coding from the Accept-Encoding header
+        """
+        print('(' + self.test_negotiation.__name__ + ')', self.test_negotiation.__doc__)
+        self.assertEqual(negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate("deflate, gzip;q=0.5"), "deflate")
+        self.assertEqual(negotiate("*"), "gzip")
+        self.assertEqual(negotiate("gzip;q=0, deflate"), "deflate")
+        self.assertEqual(negotiate("br"), None)
+        self.assertEqual(negotiate(""), None)
+        self.assertEqual(negotiate(None), None)
+        self.assertEqual(negotiate("identity, gzip;q=0.5"), None)
+
+    def test_gzip_mason_response(self):
+        """
+        Checks that a Mason collection is sent gzipped and decodes to the
+        same document
+        """
+        print('(' + self.test_gzip_mason_response.__name__ + ')',
+              self.test_gzip_mason_response.__doc__)
+        plain = self._get(USERS_URL)
+        self.assertIsNone(plain.headers.get("Content-Encoding"))
+        self.assertEqual(plain.headers["Vary"], "Accept-Encoding")
+
+        resp = self._get(USERS_URL, "gzip, deflate")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertEqual(resp.headers["Vary"], "Accept-Encoding")
+        self.assertNotIn("Content-Length", resp.headers)
+        body = gzip.decompress(resp.data)
+        self.assertEqual(json.loads(body.decode("utf-8")), json.loads(plain.data.decode("utf-8")))
+        self.assertLess(len(resp.data), len(plain.data))
+
+    def test_deflate(self):
+        """
+        Checks that deflate responses are zlib streams
+        """
+        print('(' + self.test_deflate.__name__ + ')', self.test_deflate.__doc__)
+        resp = self._get(USERS_URL, "deflate")
+        self.assertEqual(resp.headers["Content-Encoding"], "deflate")
+        self.assertEqual(zlib.decompress(resp.data), self._get(USERS_URL).data)
+
+    def test_small_responses_are_not_compressed(self):
+        """
+        Checks that responses under the size threshold are sent unchanged
+        """
+        print('(' + self.test_small_responses_are_not_compressed.__name__ + ')',
+              self.test_small_responses_are_not_compressed.__doc__)
+        client = Client(CompressionMiddleware(APP, min_size=10 ** 6), BaseResponse)
+        resp = self._get(USERS_URL, "gzip", client)
+        self.assertIsNone(resp.headers.get("Content-Encoding"))
+        self.assertEqual(resp.data, self._get(USERS_URL).data)
+
+    def test_streamed_body_without_length(self):
+        """
+        Checks that a body without Content-Length is compressed chunk by chunk
+        with the requested level
+        """
+        print('(' + self.test_streamed_body_without_length.__name__ + ')',
+              self.test_streamed_body_without_length.__doc__)
+        expected = b"".join(_streaming_app({}, lambda *args: None))
+        for level in (1, 9):
+            client = Client(CompressionMiddleware(_streaming_app, min_size=100, level=level),
+                            BaseResponse)
+            resp = client.get("/", headers={"Accept-Encoding": "gzip"}, buffered=True)
+            self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(resp.data), expected)
+
+        client = Client(CompressionMiddleware(_streaming_app, min_size=10 ** 6), BaseResponse)
+        resp = client.get("/", headers={"Accept-Encoding": "gzip"}, buffered=True)
+        self.assertIsNone(resp.headers.get("Content-Encoding"))
+        self.assertEqual(resp.data, expected)
+
+    def test_head_and_no_content(self):
+        """
+        Checks that HEAD requests and 204 responses are not compressed
+        """
+        print('(' + self.test_head_and_no_content.__name__ + ')',
+              self.test_head_and_no_content.__doc__)
+        resp = self.client.head(USERS_URL, base_url=BASE_URL,
+                                headers={"Accept-Encoding": "gzip"}, buffered=True)
+        self.assertIsNone(resp.headers.get("Content-Encoding"))
+        resp = self.client.delete(USERS_URL + "/1", base_url=BASE_URL,
+                                  headers={"Accept-Encoding": "gzip"}, buffered=True)
+        self.assertEqual(resp.status_code, 204)
+        self.assertIsNone(resp.headers.get("Content-Encoding"))
+
+    def test_compressed_etag_is_weak(self):
+        """
+        Checks that the ETag of a compressed response is weak and still
+        revalidates the document
+        """
+        print('(' + self.test_compressed_etag_is_weak.__name__ + ')',
+              self.test_compressed_etag_is_weak.__doc__)
+        plain = self._get(resources.USER_SCHEMA_URL)
+        self.assertIsNone(plain.headers.get("Content-Encoding"))
+        self.assertFalse(plain.headers["ETag"].startswith("W/"))
+
+        resp = self._get(resources.USER_SCHEMA_URL, "gzip")
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertEqual(resp.headers["ETag"], "W/" + plain.headers["ETag"])
+        self.assertEqual(weak_etag(resp.headers["ETag"]), resp.headers["ETag"])
+
+        resp = self.client.get(resources.USER_SCHEMA_URL, base_url=BASE_URL, buffered=True,
+                               headers={"Accept-Encoding": "gzip",
+                                        "If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(resp.status_code, 304)
+
+
+if __name__ == '__main__':
+    print('Start running compression tests')
+    unittest.main()
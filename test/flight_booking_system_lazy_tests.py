@@ -0,0 +1,93 @@
+"""
+Created on 19.10.2026
+
+Testing of the lazily loaded WSGI applications and of the start up imports.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+from flight_reservation.lazy import LazyWSGIApp, import_string
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _hello_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"hello"]
+
+
+class LazyWSGIAppTestCase(unittest.TestCase):
+    """
+    Test cases for the LazyWSGIApp.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def test_loaded_on_first_request(self):
+        """
+        Checks that the factory is called once, on the first request, and
+        that the on_load callbacks receive the application
+        """
+        print('(' + self.test_loaded_on_first_request.__name__ + ')',
+              self.test_loaded_on_first_request.__doc__)
+        calls = []
+
+        def factory():
+            calls.append("factory")
+            return _hello_app
+
+        lazy = LazyWSGIApp(factory)
+        lazy.on_load(lambda app: calls.append(app))
+        self.assertFalse(lazy.loaded)
+        self.assertEqual(calls, [])
+
+        client = Client(lazy, BaseResponse)
+        self.assertEqual(client.get("/").data, b"hello")
+        self.assertEqual(client.get("/").data, b"hello")
+        self.assertEqual(calls, ["factory", _hello_app])
+        lazy.on_load(lambda app: calls.append("late"))
+        self.assertEqual(calls[-1], "late")
+
+    def test_import_string(self):
+        """
+        Checks the import of "module:attribute" strings
+        """
+        print('(' + self.test_import_string.__name__ + ')', self.test_import_string.__doc__)
+        self.assertIs(import_string("os.path:join"), os.path.join)
+        self.assertIs(import_string("os"), os)
+        lazy = LazyWSGIApp("flight_reservation_admin.application:app")
+        from flight_reservation_admin.application import app
+        self.assertIs(lazy.load(), app)
+
+    def test_main_does_not_import_optional_modules(self):
+        """
+        Checks that importing main does not load the admin interface nor the
+        optional tracing modules
+        """
+        print('(' + self.test_main_does_not_import_optional_modules.__name__ + ')',
+              self.test_main_does_not_import_optional_modules.__doc__)
+        env = dict(os.environ)
+        env.pop("FLIGHT_SQL_TRACE", None)
+        env.pop("FLIGHT_SLOW_QUERY_MS", None)
+        env["PYTHONPATH"] = ROOT
+        code = ("import sys, main; print(','.join(sorted(m for m in sys.modules "
+                "if m.startswith('flight_reservation'))))")
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                         universal_newlines=True)
+        modules = output.strip().split(",")
+        self.assertIn("flight_reservation.resources", modules)
+        for module in ("flight_reservation_admin.application", "flight_reservation.sql_tracer",
+                       "flight_reservation.slow_query_log"):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == '__main__':
+    print('Start running lazy application tests')
+    unittest.main()
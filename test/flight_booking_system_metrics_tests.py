@@ -0,0 +1,213 @@
+"""
+Created on 19.10.2026
+
+Testing of the metrics middleware and of the /metrics endpoint.
+"""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import metrics
+from flight_reservation.metrics import MetricsMiddleware, MetricsRegistry, merge_snapshots, \
+    render_prometheus
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+BASE_URL = "http://localhost:5000"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+USER_RULE = "/flight-booking-system/api/users/<int:user_id>"
+
+
+def _value(text, name, **labels):
+    """
+    Returns the value of the sample *name* with the given labels (all of them
+    must be present in the sample) or None.
+    """
+    for line in text.splitlines():
+        match = re.match(r'^(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        sample_labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(sample_labels.get(key) == str(value) for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+class MetricsTestCase(unittest.TestCase):
+    """
+    Test cases for the MetricsMiddleware.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.middleware = MetricsMiddleware(APP, url_map=APP.url_map)
+        self.client = Client(self.middleware, BaseResponse)
+
+    def tearDown(self):
+        ENGINE.clear()
+
+    def _get(self, path):
+        return self.client.get(path, base_url=BASE_URL, buffered=True)
+
+    def test_request_metrics(self):
+        """
+        Checks that the requests are counted per endpoint rule and status and
+        that latency, size and database time are recorded
+        """
+        print('(' + self.test_request_metrics.__name__ + ')',
+              self.test_request_metrics.__doc__)
+        self.assertEqual(self._get("/flight-booking-system/api/users/1").status_code, 200)
+        self.assertEqual(self._get("/flight-booking-system/api/users/2").status_code, 200)
+        self.assertEqual(self._get("/flight-booking-system/api/users/999").status_code, 404)
+
+        resp = self._get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["Content-Type"].startswith("text/plain"))
+        text = resp.get_data(as_text=True)
+        self.assertEqual(_value(text, "flight_http_requests_total",
+                                endpoint=USER_RULE, method="GET", status=200), 2)
+        self.assertEqual(_value(text, "flight_http_requests_total",
+                                endpoint=USER_RULE, method="GET", status=404), 1)
+        self.assertEqual(_value(text, "flight_http_request_duration_seconds_count",
+                                endpoint=USER_RULE), 3)
+        self.assertEqual(_value(text, "flight_http_request_duration_seconds_bucket",
+                                endpoint=USER_RULE, le="+Inf"), 3)
+        self.assertGreater(_value(text, "flight_http_response_size_bytes_sum",
+                                  endpoint=USER_RULE), 0)
+        self.assertEqual(_value(text, "flight_db_time_seconds_count", endpoint=USER_RULE), 3)
+        self.assertGreater(_value(text, "flight_db_time_seconds_sum", endpoint=USER_RULE), 0)
+        self.assertEqual(_value(text, "flight_http_requests_in_flight"), 0)
+
+    def test_unmatched_paths_share_a_label(self):
+        """
+        Checks that unknown paths do not create one series per path
+        """
+        print('(' + self.test_unmatched_paths_share_a_label.__name__ + ')',
+              self.test_unmatched_paths_share_a_label.__doc__)
+        self._get("/unknown/1")
+        self._get("/unknown/2")
+        text = self._get("/metrics").get_data(as_text=True)
+        self.assertEqual(_value(text, "flight_http_requests_total",
+                                endpoint="other", status=404), 2)
+        self.assertNotIn("/unknown/", text)
+
+    def test_unhandled_exception(self):
+        """
+        Checks that an exception raised by the application is counted and
+        re-raised
+        """
+        print('(' + self.test_unhandled_exception.__name__ + ')',
+              self.test_unhandled_exception.__doc__)
+
+        def failing_app(environ, start_response):
+            raise RuntimeError("boom")
+
+        middleware = MetricsMiddleware(failing_app)
+        with self.assertRaises(RuntimeError):
+            Client(middleware, BaseResponse).get("/boom", buffered=True)
+        text = Client(middleware, BaseResponse).get("/metrics").get_data(as_text=True)
+        self.assertEqual(_value(text, "flight_http_request_exceptions_total", endpoint="/boom"), 1)
+        self.assertEqual(_value(text, "flight_http_requests_total",
+                                endpoint="/boom", status=500), 1)
+        self.assertEqual(_value(text, "flight_http_requests_in_flight"), 0)
+
+    def test_multiprocess_aggregation(self):
+        """
+        Checks that /metrics sums the metrics written by every process and
+        drops the gauges of dead processes
+        """
+        print('(' + self.test_multiprocess_aggregation.__name__ + ')',
+              self.test_multiprocess_aggregation.__doc__)
+        directory = tempfile.mkdtemp()
+        try:
+            other = MetricsRegistry()
+            other.inc("flight_http_requests_total",
+                      (("endpoint", USER_RULE), ("method", "GET"), ("status", "200")), 5)
+            other.inc("flight_http_requests_in_flight", (), 7)
+            middleware = MetricsMiddleware(APP, url_map=APP.url_map,
+                                           multiprocess_dir=directory)
+            middleware.registry = other
+            middleware.flush()
+            #Move the file to a pid that cannot be alive
+            os.rename(middleware._path(),
+                      os.path.join(directory, "metrics-%d-1.json" % (2 ** 22 + 1)))
+
+            middleware = MetricsMiddleware(APP, url_map=APP.url_map,
+                                           multiprocess_dir=directory)
+            Client(middleware, BaseResponse).get("/flight-booking-system/api/users/1",
+                                                 base_url=BASE_URL, buffered=True)
+            text = Client(middleware, BaseResponse).get("/metrics").get_data(as_text=True)
+            self.assertEqual(_value(text, "flight_http_requests_total",
+                                    endpoint=USER_RULE, status=200), 6)
+            self.assertEqual(_value(text, "flight_http_requests_in_flight"), 0)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_exited_processes_are_folded(self):
+        """
+        Checks that the files of the exited processes, including one whose
+        pid was reused, are folded in a single file without losing counts
+        """
+        print('(' + self.test_exited_processes_are_folded.__name__ + ')',
+              self.test_exited_processes_are_folded.__doc__)
+        directory = tempfile.mkdtemp()
+        try:
+            labels = (("endpoint", USER_RULE), ("method", "GET"), ("status", "200"))
+            middleware = MetricsMiddleware(APP, url_map=APP.url_map,
+                                           multiprocess_dir=directory)
+            #A pid that cannot be alive, and the pid of this process started
+            #at another time
+            exited = ((2 ** 22 + 1, 1), (os.getpid(), metrics.process_start(os.getpid()) + 1))
+            for pid, start in exited:
+                other = MetricsRegistry()
+                other.inc("flight_http_requests_total", labels, 3)
+                middleware.registry = other
+                middleware.flush()
+                os.rename(middleware._path(),
+                          os.path.join(directory, "metrics-%d-%d.json" % (pid, start)))
+            middleware.registry = MetricsRegistry()
+            middleware.registry.inc("flight_http_requests_total", labels, 1)
+
+            for _ in range(2):
+                values = middleware.collect()
+                self.assertEqual(values[("flight_http_requests_total", labels)], 7)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             sorted([metrics.DEAD_PROCESSES_FILE, metrics.LOCK_FILE,
+                                     os.path.basename(middleware._path())]))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_label_escaping(self):
+        """
+        Checks that label values are escaped in the exposition format
+        """
+        print('(' + self.test_label_escaping.__name__ + ')', self.test_label_escaping.__doc__)
+        registry = MetricsRegistry()
+        registry.inc("flight_http_request_exceptions_total", (("endpoint", 'a"b\\c\nd'),))
+        text = render_prometheus(merge_snapshots([(registry.snapshot(), True)]))
+        self.assertIn('flight_http_request_exceptions_total{endpoint="a\\"b\\\\c\\nd"} 1', text)
+
+
+if __name__ == '__main__':
+    print('Start running metrics tests')
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Created on 19.10.2026
+
+Testing of the pre-forking server used in production.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import unittest
+import urllib.request
+
+from flight_reservation.prefork import PreforkServer
+
+
+def _load_app():
+    def pid_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        if environ["PATH_INFO"] == "/hang":
+            #A request that never ends, like an event stream
+            time.sleep(3600)
+        return [str(os.getpid()).encode("ascii")]
+    return pid_app
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class ServerTestMixin(object):
+    """
+    Runs a PreforkServer with :py:attr:`options` in a forked master for
+    every test.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def setUp(self):
+        self.server = PreforkServer(_load_app, host="127.0.0.1", port=0, **self.options)
+        self.server.bind()
+        self.master = os.fork()
+        if self.master == 0:
+            status = 0
+            try:
+                sys.stderr = open(os.devnull, "w")
+                self.server.run()
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        self.server.listener.close()
+        self.url = "http://127.0.0.1:%d/" % self.server.port
+
+    def tearDown(self):
+        os.kill(self.master, signal.SIGTERM)
+        _, status = os.waitpid(self.master, 0)
+        self.assertEqual(status, 0)
+
+    def _pid(self):
+        deadline = time.time() + 10
+        while True:
+            try:
+                with urllib.request.urlopen(self.url, timeout=5) as resp:
+                    return int(resp.read())
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "the pre-forking server needs fork")
+class PreforkServerTestCase(ServerTestMixin, unittest.TestCase):
+    """
+    Test cases for the PreforkServer.
+    """
+
+    options = {"workers": 2, "max_requests": 3, "graceful_timeout": 5}
+
+    def test_workers_are_recycled(self):
+        """
+        Checks that the requests are served by the forked workers and that a
+        worker is replaced after max_requests requests
+        """
+        print('(' + self.test_workers_are_recycled.__name__ + ')',
+              self.test_workers_are_recycled.__doc__)
+        pids = [self._pid() for _ in range(12)]
+        self.assertNotIn(self.master, pids)
+        self.assertNotIn(os.getpid(), pids)
+        for pid in set(pids):
+            self.assertLessEqual(pids.count(pid), 3)
+        self.assertGreaterEqual(len(set(pids)), 4)
+
+    def test_graceful_reload(self):
+        """
+        Checks that after SIGHUP the requests are served by new workers
+        """
+        print('(' + self.test_graceful_reload.__name__ + ')', self.test_graceful_reload.__doc__)
+        before = self._pid()
+        os.kill(self.master, signal.SIGHUP)
+        time.sleep(1)
+        after = set(self._pid() for _ in range(2))
+        self.assertNotIn(before, after)
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "the pre-forking server needs fork")
+class StoppingWorkerTestCase(ServerTestMixin, unittest.TestCase):
+    """
+    Test cases for the workers that can not finish their requests.
+    """
+
+    options = {"workers": 1, "max_requests": 3, "graceful_timeout": 1, "threaded": True}
+
+    def test_stopping_worker_is_replaced_and_killed(self):
+        """
+        Checks that a recycled worker with a request that never ends is
+        replaced at once and killed after the graceful timeout
+        """
+        print('(' + self.test_stopping_worker_is_replaced_and_killed.__name__ + ')',
+              self.test_stopping_worker_is_replaced_and_killed.__doc__)
+        old = self._pid()
+        hang = threading.Thread(target=self._hang)
+        hang.daemon = True
+        hang.start()
+        time.sleep(0.5)
+        self.assertEqual(self._pid(), old)
+        #The worker stops after this third request
+        self._pid()
+        new = self._pid()
+        self.assertNotEqual(new, old)
+        deadline = time.time() + 10
+        while _running(old) and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertFalse(_running(old))
+        self.assertEqual(self._pid(), new)
+
+    def _hang(self):
+        try:
+            urllib.request.urlopen(self.url + "hang", timeout=30).read()
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    print('Start running prefork server tests')
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Created on 19.10.2026
+
+Testing of the rate limiting and load shedding middleware.
+"""
+import json
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+from flight_reservation.rate_limit import RateLimitMiddleware, READ, WRITE, ADMITTED, LIMITED
+
+RESERVATIONS_URL = "/flight-booking-system/api/reservations"
+
+
+def _ok_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitTestCase(unittest.TestCase):
+    """
+    Test cases for the RateLimitMiddleware.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimitMiddleware(_ok_app, read_rate=10, read_burst=5, write_rate=1,
+                                           write_burst=2, max_in_flight=3, max_clients=100,
+                                           clock=self.clock)
+        self.client = Client(self.limiter, BaseResponse)
+
+    def _request(self, method="GET", address="10.0.0.1", headers=None):
+        return self.client.open(RESERVATIONS_URL, method=method, headers=headers,
+                                environ_base={"REMOTE_ADDR": address}, buffered=True)
+
+    def test_write_budget(self):
+        """
+        Checks that the writes beyond the burst get a 429 Mason error with
+        Retry-After and that the bucket refills with time
+        """
+        print('(' + self.test_write_budget.__name__ + ')', self.test_write_budget.__doc__)
+        self.assertEqual([self._request("POST").status_code for _ in range(3)], [200, 200, 429])
+        resp = self._request("POST")
+        self.assertEqual(resp.headers["Retry-After"], "1")
+        self.assertTrue(resp.headers["Content-Type"].startswith("application/vnd.mason+json"))
+        error = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(error["resource_url"], RESERVATIONS_URL)
+        self.assertIn("@messages", error["@error"])
+
+        #Reads have their own budget
+        self.assertEqual(self._request("GET").status_code, 200)
+        #Other clients too
+        self.assertEqual(self._request("POST", address="10.0.0.2").status_code, 200)
+        self.assertEqual(self._request("POST", headers={"X-Api-Key": "partner"}).status_code, 200)
+
+        self.clock.now += 1
+        self.assertEqual(self._request("POST").status_code, 200)
+        self.assertEqual(self._request("POST").status_code, 429)
+
+    def test_shedding(self):
+        """
+        Checks that the requests get a 503 when too many requests are in
+        flight and that the finished requests leave the count
+        """
+        print('(' + self.test_shedding.__name__ + ')', self.test_shedding.__doc__)
+        for address in ("10.0.1.1", "10.0.1.2", "10.0.1.3"):
+            self.assertEqual(self.limiter.admit(address, READ)[0], ADMITTED)
+        resp = self._request()
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.headers["Retry-After"], "1")
+        self.limiter.release(READ)
+        self.assertEqual(self._request().status_code, 200)
+        self.assertEqual(self.limiter.in_flight, 2)
+
+    def test_bounded_buckets(self):
+        """
+        Checks that the least recently used buckets are evicted and the
+        decisions exported
+        """
+        print('(' + self.test_bounded_buckets.__name__ + ')', self.test_bounded_buckets.__doc__)
+        for i in range(250):
+            self.limiter.admit("client-%d" % i, WRITE)
+            self.limiter.release(WRITE)
+        self.assertEqual(len(self.limiter._buckets), 100)
+        self.assertNotIn(("client-0", WRITE), self.limiter._buckets)
+        self.assertEqual(self.limiter.admit("client-249", WRITE), (ADMITTED, 0))
+        self.limiter.release(WRITE)
+        self.assertEqual(self.limiter.admit("client-249", WRITE), (LIMITED, 1.0))
+        lines = self.limiter.collect()
+        self.assertIn('flight_rate_limit_decisions_total{budget="write",decision="admitted"} 251',
+                      lines)
+        self.assertIn("flight_rate_limit_buckets 100", lines)
+        self.assertIn("flight_rate_limit_in_flight 0", lines)
+
+
+if __name__ == '__main__':
+    print('Start running rate limit tests')
+    unittest.main()
@@ -0,0 +1,290 @@
+"""
+Created on 19.10.2026
+
+Testing of the seat changes outbox and of the Server-Sent Events stream.
+"""
+import json
+import threading
+import time
+import unittest
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import seat_events
+from flight_reservation.compression import CompressionMiddleware
+from flight_reservation.rate_limit import RateLimitMiddleware
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+SEATS_URL = "/flight-booking-system/api/flights/1111/seats"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+TICKET = {"reservationid": 11, "firstname": "Jules", "lastname": "Larue",
+          "gender": "male", "age": 20}
+
+
+def _parse(chunk):
+    """
+    :return: dictionary of the fields of one event, with the data decoded.
+    """
+    fields = {}
+    for line in chunk.decode("utf-8").strip().split("\n"):
+        name, _, value = line.partition(": ")
+        fields[name] = json.loads(value) if name == "data" else value
+    return fields
+
+
+class SeatChangeOutboxTestCase(unittest.TestCase):
+    """
+    Test cases for the SeatChange outbox written by the database API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.connection = ENGINE.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        ENGINE.clear()
+
+    def test_changes_recorded_with_the_seats(self):
+        """
+        Checks that creating and deleting a ticket and modifying the seats of
+        a flight record the new seats left in the outbox
+        """
+        print('(' + self.test_changes_recorded_with_the_seats.__name__ + ')',
+              self.test_changes_recorded_with_the_seats.__doc__)
+        self.assertEqual(self.connection.get_seat_change_range(), (None, 0))
+        self.connection.create_ticket(TICKET)
+        self.connection.delete_ticket(1030)
+        flight = self.connection.get_flight(1111)
+        self.connection.modify_flight(1111, flight)
+        flight["seatsleft"] = 5
+        self.connection.modify_flight(1111, flight)
+
+        changes = self.connection.get_seat_changes()
+        self.assertEqual([(change["changeid"], change["flightid"], change["seatsleft"])
+                          for change in changes], [(1, 1111, 9), (2, 1122, 16), (3, 1111, 5)])
+        self.assertEqual([change["changeid"] for change in
+                          self.connection.get_seat_changes(1, flight_id=1111)], [3])
+        self.assertEqual(self.connection.get_seat_change_range(), (1, 3))
+        self.assertEqual(self.connection.get_flight_seats(1111), (5, 3))
+        self.assertIsNone(self.connection.get_flight_seats(1))
+
+        #The ids keep increasing once the old changes are pruned
+        self.assertEqual(self.connection.delete_seat_changes(int(time.time()) + 1), 3)
+        self.assertEqual(self.connection.get_seat_change_range(), (None, 3))
+
+    def test_full_flight_records_nothing(self):
+        """
+        Checks that a ticket refused because the flight is full leaves the
+        outbox unchanged
+        """
+        print('(' + self.test_full_flight_records_nothing.__name__ + ')',
+              self.test_full_flight_records_nothing.__doc__)
+        self.assertRaises(database.NoMoreSeatsAvailableException, self.connection.create_ticket,
+                          dict(TICKET, reservationid=33))
+        self.assertEqual(self.connection.get_seat_changes(), [])
+
+
+class SeatStreamTestCase(unittest.TestCase):
+    """
+    Test cases for the event stream of the seats left of a flight.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.client = APP.test_client()
+        self.broker = seat_events.broker_for(ENGINE)
+
+    def tearDown(self):
+        #The polling thread stops with the last stream, before the database is reset
+        deadline = time.time() + 5
+        while self.broker._thread is not None and time.time() < deadline:
+            time.sleep(0.01)
+        ENGINE.clear()
+
+    def _book(self, count=1):
+        connection = ENGINE.connect()
+        try:
+            for _ in range(count):
+                connection.create_ticket(TICKET)
+        finally:
+            connection.close()
+
+    def test_stream(self):
+        """
+        Checks that a client receives the current seats left, then the
+        changes as they are committed
+        """
+        print('(' + self.test_stream.__name__ + ')', self.test_stream.__doc__)
+        resp = self.client.get(SEATS_URL)
+        try:
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.mimetype, seat_events.EVENT_STREAM)
+            self.assertEqual(resp.headers["Cache-Control"], "no-cache")
+            events = iter(resp.response)
+            self.assertEqual(next(events), b"retry: 2000\n\n")
+            self.assertEqual(_parse(next(events)), {
+                "id": "0", "event": "seats", "data": {"flight_id": 1111, "nbSeatsLeft": 10}})
+            self.assertEqual(self.broker.subscriptions, 1)
+
+            self._book(2)
+            self.assertEqual(_parse(next(events))["data"]["nbSeatsLeft"], 9)
+            self.assertEqual(_parse(next(events)), {
+                "id": "2", "event": "seats", "data": {"flight_id": 1111, "nbSeatsLeft": 8}})
+        finally:
+            resp.close()
+        self.assertEqual(self.broker.subscriptions, 0)
+
+        resp = self.client.get("/flight-booking-system/api/flights/1/seats")
+        self.assertEqual(resp.status_code, 404)
+        data = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(data["@error"]["@message"], "Unknown flight")
+
+    def test_resume(self):
+        """
+        Checks that a client reconnecting with Last-Event-ID receives the
+        changes it missed, or the current state if they are not available
+        """
+        print('(' + self.test_resume.__name__ + ')', self.test_resume.__doc__)
+        self._book(3)
+        resp = self.client.get(SEATS_URL, headers={"Last-Event-ID": "1"})
+        try:
+            events = iter(resp.response)
+            next(events)
+            self.assertEqual([_parse(next(events))["id"] for _ in range(2)], ["2", "3"])
+        finally:
+            resp.close()
+
+        #An id the database never sent: the current state
+        resp = self.client.get(SEATS_URL, headers={"Last-Event-ID": "99"})
+        try:
+            events = iter(resp.response)
+            next(events)
+            self.assertEqual(_parse(next(events)), {
+                "id": "3", "event": "seats", "data": {"flight_id": 1111, "nbSeatsLeft": 7}})
+        finally:
+            resp.close()
+
+    def test_stream_limit(self):
+        """
+        Checks that the streams over the limit of the process get a 503 and
+        that a closed stream frees its slot
+        """
+        print('(' + self.test_stream_limit.__name__ + ')', self.test_stream_limit.__doc__)
+        limiter = seat_events.stream_limiter
+        max_streams, limiter.max_streams = limiter.max_streams, 1
+        try:
+            resp = self.client.get(SEATS_URL)
+            try:
+                self.assertEqual(resp.status_code, 200)
+                refused = self.client.get(SEATS_URL)
+                self.assertEqual(refused.status_code, 503)
+                self.assertEqual(refused.headers["Retry-After"],
+                                 str(seat_events.STREAMS_RETRY_AFTER))
+            finally:
+                resp.close()
+            self.assertEqual(limiter.open, 0)
+            resp = self.client.get(SEATS_URL)
+            self.assertEqual(resp.status_code, 200)
+            resp.close()
+        finally:
+            limiter.max_streams = max_streams
+
+    def test_slow_client(self):
+        """
+        Checks that a client whose queue is full reads the changes it missed
+        from the outbox
+        """
+        print('(' + self.test_slow_client.__name__ + ')', self.test_slow_client.__doc__)
+        connection = ENGINE.connect()
+        state = connection.get_flight_seats(1111)
+        connection.close()
+        stream = seat_events.SeatStream(self.broker, 1111, state, queue_size=1)
+        try:
+            events = iter(stream)
+            next(events)
+            next(events)
+            self._book(3)
+            deadline = time.time() + 5
+            while not stream.subscription.overflowed and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(stream.subscription.overflowed)
+            self.assertEqual([_parse(next(events))["data"]["nbSeatsLeft"] for _ in range(3)],
+                             [9, 8, 7])
+        finally:
+            stream.close()
+
+    def test_close_streams(self):
+        """
+        Checks that the streams waiting for a change end when the worker
+        closes them
+        """
+        print('(' + self.test_close_streams.__name__ + ')', self.test_close_streams.__doc__)
+        resp = self.client.get(SEATS_URL)
+        try:
+            events = iter(resp.response)
+            next(events)
+            next(events)
+            rest = []
+            reader = threading.Thread(target=lambda: rest.extend(events))
+            reader.start()
+            time.sleep(0.2)
+            seat_events.close_streams()
+            reader.join(5)
+            self.assertFalse(reader.is_alive())
+            self.assertEqual(rest, [])
+        finally:
+            resp.close()
+            seat_events.streams_closing.clear()
+
+    def test_middlewares(self):
+        """
+        Checks that the stream is neither compressed nor counted in flight
+        """
+        print('(' + self.test_middlewares.__name__ + ')', self.test_middlewares.__doc__)
+        limiter = RateLimitMiddleware(CompressionMiddleware(APP, min_size=1))
+        resp = Client(limiter, BaseResponse).get(SEATS_URL, base_url="http://localhost:5000",
+                                                 headers={"Accept-Encoding": "gzip"})
+        try:
+            self.assertEqual(resp.status_code, 200)
+            self.assertIsNone(resp.headers.get("Content-Encoding"))
+            self.assertEqual(limiter.in_flight, 0)
+            events = iter(resp.response)
+            next(events)
+            self.assertEqual(_parse(next(events))["id"], "0")
+        finally:
+            resp.close()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    print('Start running seat events tests')
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Created on 19.10.2026
+
+Testing of the slow query log and of the admin /slow-queries endpoint.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import slow_query_log
+from flight_reservation_admin.application import app as admin
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    """
+    Test cases for the SlowQueryLog.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "slow.log")
+
+    def tearDown(self):
+        slow_query_log.disable(APP)
+        shutil.rmtree(self.directory)
+        ENGINE.clear()
+
+    def test_slow_statements_are_logged(self):
+        """
+        Checks that the statements over the threshold are logged with their
+        parameters, calling method and query plan
+        """
+        print('(' + self.test_slow_statements_are_logged.__name__ + ')',
+              self.test_slow_statements_are_logged.__doc__)
+        slow_query_log.enable(APP, self.path, threshold=0)
+        resp = APP.test_client().get("/flight-booking-system/api/users/1/reservations")
+        self.assertEqual(resp.status_code, 200)
+
+        entries = slow_query_log.read_entries(self.path, method="get_reservations_by_user")
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertEqual(entry["parameters"], [1])
+        self.assertGreaterEqual(entry["duration"], 0)
+        self.assertIn("Reservation", entry["sql"])
+        self.assertTrue(entry["plan"])
+        self.assertTrue(any("Reservation" in step for step in entry["plan"]))
+
+    def test_threshold(self):
+        """
+        Checks that the statements faster than the threshold are not logged
+        """
+        print('(' + self.test_threshold.__name__ + ')', self.test_threshold.__doc__)
+        slow_query_log.enable(APP, self.path, threshold=60)
+        APP.test_client().get("/flight-booking-system/api/users/1")
+        self.assertEqual(slow_query_log.read_entries(self.path), [])
+
+    def test_rotation(self):
+        """
+        Checks that the log is rotated and that the rotated files are read
+        """
+        print('(' + self.test_rotation.__name__ + ')', self.test_rotation.__doc__)
+        log = slow_query_log.SlowQueryLog(self.path, threshold=0, max_bytes=2000,
+                                          backup_count=10)
+        connection = ENGINE.connect()
+        try:
+            log.attach(connection)
+            for _ in range(10):
+                connection.get_users()
+        finally:
+            connection.close()
+            log.close()
+        self.assertTrue(os.path.exists(log.process_path() + ".1"))
+        entries = slow_query_log.read_entries(self.path, limit=1000, method="get_users")
+        self.assertEqual(len([entry for entry in entries if "SELECT" in entry["sql"]]), 10)
+        self.assertEqual(len(slow_query_log.read_entries(self.path, limit=3)), 3)
+
+    def test_process_files_are_merged(self):
+        """
+        Checks that every process writes its own file and that the entries of
+        all the files are read back newest first
+        """
+        print('(' + self.test_process_files_are_merged.__name__ + ')',
+              self.test_process_files_are_merged.__doc__)
+        log = slow_query_log.SlowQueryLog(self.path, threshold=0)
+        #The entries of a forked worker
+        pid = os.fork()
+        if not pid:
+            connection = ENGINE.connect()
+            log.attach(connection)
+            connection.get_user(1)
+            connection.close()
+            log.close()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        connection = ENGINE.connect()
+        try:
+            log.attach(connection)
+            connection.get_users()
+        finally:
+            connection.close()
+            log.close()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(log.process_path(pid)))
+        entries = slow_query_log.read_entries(self.path)
+        methods = [entry["method"] for entry in entries]
+        self.assertIn("get_user", methods)
+        self.assertEqual(methods[0], "get_users")
+        timestamps = [entry["timestamp"] for entry in entries]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_limit(self):
+        """
+        Checks that no entry is returned when the limit is zero or negative
+        """
+        print('(' + self.test_limit.__name__ + ')', self.test_limit.__doc__)
+        log = slow_query_log.SlowQueryLog(self.path, threshold=0)
+        connection = ENGINE.connect()
+        try:
+            log.attach(connection)
+            connection.get_users()
+        finally:
+            connection.close()
+            log.close()
+        self.assertEqual(len(slow_query_log.read_entries(self.path, limit=1)), 1)
+        self.assertEqual(slow_query_log.read_entries(self.path, limit=0), [])
+        self.assertEqual(slow_query_log.read_entries(self.path, limit=-5), [])
+
+    def test_admin_endpoint(self):
+        """
+        Checks that the admin application serves the entries of the log
+        """
+        print('(' + self.test_admin_endpoint.__name__ + ')', self.test_admin_endpoint.__doc__)
+        slow_query_log.enable(APP, self.path, threshold=0)
+        APP.test_client().get("/flight-booking-system/api/users/1")
+        admin.config["SLOW_QUERY_LOG_PATH"] = self.path
+        try:
+            client = admin.test_client()
+            resp = client.get("/slow-queries?method=get_user&limit=5")
+            self.assertEqual(resp.status_code, 200)
+            items = json.loads(resp.data.decode("utf-8"))["items"]
+            self.assertTrue(items)
+            self.assertTrue(all(item["method"] == "get_user" for item in items))
+            self.assertEqual(client.get("/slow-queries?limit=x").status_code, 400)
+        finally:
+            admin.config["SLOW_QUERY_LOG_PATH"] = slow_query_log.DEFAULT_PATH
+
+
+if __name__ == '__main__':
+    print('Start running slow query log tests')
+    unittest.main()
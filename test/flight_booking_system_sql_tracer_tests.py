@@ -0,0 +1,129 @@
+"""
+Created on 19.10.2026
+
+Testing of the SQL statement tracer.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import sql_tracer
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+JSON = "application/json"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+TICKET_RULE = "/flight-booking-system/api/tickets/<int:ticket_id>"
+
+
+class SqlTracerTestCase(unittest.TestCase):
+    """
+    Test cases for the SqlTracer.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.directory = tempfile.mkdtemp()
+        self.summary_path = os.path.join(self.directory, "summary.json")
+        self.tracer = sql_tracer.enable(APP, summary_path=self.summary_path)
+        self.client = APP.test_client()
+
+    def tearDown(self):
+        sql_tracer.disable(APP)
+        shutil.rmtree(self.directory)
+        ENGINE.clear()
+
+    def test_repeated_queries_in_ticket_put(self):
+        """
+        Checks that the SELECT run several times by PUT Ticket is reported as
+        a repeated query with the calling method
+        """
+        print('(' + self.test_repeated_queries_in_ticket_put.__name__ + ')',
+              self.test_repeated_queries_in_ticket_put.__doc__)
+        ticket = {"firstName": "James", "familyName": "Watt", "age": 49,
+                  "gender": "male", "seat": "21A"}
+        with self.assertLogs(sql_tracer.logger, "WARNING") as logs:
+            resp = self.client.put("/flight-booking-system/api/tickets/1010",
+                                   data=json.dumps(ticket), headers={"Content-Type": JSON})
+        self.assertEqual(resp.status_code, 204)
+        self.assertTrue(any("same parameters" in line for line in logs.output))
+
+        summary = self.tracer.summary()[TICKET_RULE]
+        self.assertEqual(summary["requests"], 1)
+        self.assertGreater(summary["repeated"], 0)
+        self.assertGreaterEqual(summary["methods"]["get_ticket"], 2)
+        self.assertIn("modify_ticket", summary["methods"])
+        with open(self.summary_path) as f:
+            self.assertEqual(json.load(f)[TICKET_RULE]["statements"], summary["statements"])
+
+    def test_summary_writes_are_throttled(self):
+        """
+        Checks that the summary file is not rewritten after every request and
+        that the statements are logged at INFO
+        """
+        print('(' + self.test_summary_writes_are_throttled.__name__ + ')',
+              self.test_summary_writes_are_throttled.__doc__)
+        with self.assertLogs(sql_tracer.logger, "INFO") as logs:
+            for _ in range(2):
+                self.assertEqual(self.client.get("/flight-booking-system/api/users").status_code, 200)
+        self.assertTrue(any("SELECT" in line for line in logs.output))
+        with open(self.summary_path) as f:
+            self.assertEqual(json.load(f)["/flight-booking-system/api/users"]["requests"], 1)
+        self.tracer.write_summary()
+        with open(self.summary_path) as f:
+            self.assertEqual(json.load(f)["/flight-booking-system/api/users"]["requests"], 2)
+
+    def test_n_plus_one(self):
+        """
+        Checks that the same query executed with many different parameters is
+        reported as an N+1 pattern
+        """
+        print('(' + self.test_n_plus_one.__name__ + ')', self.test_n_plus_one.__doc__)
+        connection = ENGINE.connect()
+        try:
+            trace = self.tracer.start(connection)
+            for user_id in range(1, 6):
+                connection.get_user(user_id)
+            self.assertEqual(trace.repeated(), [])
+            n_plus_one = trace.n_plus_one()
+            self.assertEqual(len(n_plus_one), 1)
+            self.assertEqual(n_plus_one[0][1], 5)
+            self.assertEqual(trace.statements[-1].method, "get_user")
+            self.assertTrue(any("SELECT" in line for line in trace.statements[-1].expanded))
+            with self.assertLogs(sql_tracer.logger, "WARNING"):
+                self.tracer.finish(trace, "users")
+            self.assertEqual(self.tracer.summary()["users"]["n_plus_one"], 1)
+        finally:
+            connection.close()
+
+    def test_normalize(self):
+        """
+        Checks that the literals and whitespace are removed from the query
+        templates
+        """
+        print('(' + self.test_normalize.__name__ + ')', self.test_normalize.__doc__)
+        self.assertEqual(sql_tracer.normalize("SELECT * FROM User\n  WHERE user_id = 12 "
+                                              "AND email = 'a''b'"),
+                         "SELECT * FROM User WHERE user_id = ? AND email = ?")
+
+
+if __name__ == '__main__':
+    print('Start running sql tracer tests')
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Created on 19.10.2026
+
+Testing of the fingerprinted and precompressed assets of the admin interface.
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask
+
+from flight_reservation_admin import assets
+
+
+class StaticAssetsTestCase(unittest.TestCase):
+    """
+    Test cases for the build and the serving of the admin assets.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        cls.target = tempfile.mkdtemp()
+        cls.builder = assets.build(assets.STATIC_DIR, cls.target)
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        shutil.rmtree(cls.target)
+
+    def setUp(self):
+        app = Flask(__name__, static_folder=None)
+        app.config["TESTING"] = True
+        self.assertTrue(assets.init_app(app, self.target))
+        self.client = app.test_client()
+
+    def _read(self, path):
+        with open(os.path.join(self.target, path), "rb") as f:
+            return f.read()
+
+    def _bundles(self, page):
+        return re.findall(r'"(assets/bundle\.[0-9a-f]+\.(?:css|js))"', self._read(page).decode("utf-8"))
+
+    def test_build(self):
+        """
+        Checks that the pages reference one bundle of stylesheets and one of
+        scripts, fingerprinted and compressed, and that every file referenced
+        exists
+        """
+        print('(' + self.test_build.__name__ + ')', self.test_build.__doc__)
+        self.assertEqual(self.builder.missing, set())
+        with open(os.path.join(self.target, assets.MANIFEST)) as f:
+            self.assertEqual(json.load(f), self.builder.manifest)
+        for page in ("ui-users.html", "ui-flights.html"):
+            html = self._read(page).decode("utf-8")
+            self.assertEqual(len(re.findall(r"<script\b", html)), 1)
+            self.assertEqual(len(re.findall(r'rel="stylesheet"', html)), 1)
+            self.assertEqual(gzip.decompress(self._read(page + ".gz")), self._read(page))
+            for bundle in self._bundles(page):
+                self.assertEqual(gzip.decompress(self._read(bundle + ".gz")), self._read(bundle))
+
+        css = [path for path in self._bundles("ui-users.html") if path.endswith(".css")][0]
+        content = self._read(css).decode("utf-8")
+        self.assertTrue(content.startswith("@import "))
+        for url in re.findall(r"url\(([^)'\"]+)\)", content):
+            if not url.startswith(("data:", "http")):
+                self.assertTrue(os.path.isfile(os.path.join(self.target, "assets", url.split("?")[0].split("#")[0])), url)
+
+        #The same content gives the same names
+        target = tempfile.mkdtemp()
+        try:
+            self.assertEqual(assets.build(assets.STATIC_DIR, target).manifest, self.builder.manifest)
+            self.assertEqual(self._bundles("ui-users.html"),
+                             re.findall(r'"(assets/bundle\.[^"]+)"',
+                                        open(os.path.join(target, "ui-users.html")).read()))
+        finally:
+            shutil.rmtree(target)
+
+    def test_serve(self):
+        """
+        Checks that the assets are sent gzipped to the clients accepting it
+        and cached forever, and that the pages are revalidated
+        """
+        print('(' + self.test_serve.__name__ + ')', self.test_serve.__doc__)
+        bundle = self._bundles("ui-users.html")[0]
+        resp = self.client.get("/" + bundle, headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertEqual(resp.headers["Cache-Control"], assets.IMMUTABLE)
+        self.assertIn("Accept-Encoding", resp.headers["Vary"])
+        self.assertEqual(gzip.decompress(resp.data), self._read(bundle))
+        resp.close()
+
+        resp = self.client.get("/" + bundle, headers={"Accept-Encoding": "gzip;q=0"})
+        self.assertNotIn("Content-Encoding", resp.headers)
+        self.assertEqual(resp.data, self._read(bundle))
+        etag = resp.headers["ETag"]
+        resp.close()
+        resp = self.client.get("/" + bundle, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        resp.close()
+
+        resp = self.client.get("/ui-users.html")
+        self.assertEqual(resp.headers["Cache-Control"], "no-cache")
+        self.assertEqual(resp.mimetype, "text/html")
+        resp.close()
+
+    def test_fallback(self):
+        """
+        Checks that the files outside of the build are served from the static
+        directory and that the gzip variants are not served directly
+        """
+        print('(' + self.test_fallback.__name__ + ')', self.test_fallback.__doc__)
+        resp = self.client.get("/js/flight_reservation_client.js")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["Cache-Control"], assets.IMMUTABLE)
+        resp.close()
+        self.assertEqual(self.client.get("/ui-users.html.gz").status_code, 404)
+        self.assertEqual(self.client.get("/missing.css").status_code, 404)
+        self.assertFalse(assets.init_app(Flask(__name__), os.path.join(self.target, "none")))
+
+
+if __name__ == '__main__':
+    print('Start running static assets tests')
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Created on 19.10.2026
+
+Testing of the validation of the request bodies and of the schema urls.
+"""
+import json
+import unittest
+
+import flight_reservation.flight_database as database
+import flight_reservation.resources as resources
+from flight_reservation import validation
+
+DB_PATH = "db/flight_test.db"
+ENGINE = database.SnapshotEngine(DB_PATH)
+JSON = "application/json"
+
+APP = resources.create_app({"TESTING": True, "SERVER_NAME": "localhost:5000", "Engine": ENGINE})
+
+
+class ValidationTestCase(unittest.TestCase):
+    """
+    Test cases for the compiled validators.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+
+    def test_all_errors_in_one_pass(self):
+        """
+        Checks that the errors of every field are reported, including the
+        fields of the items of an array
+        """
+        print('(' + self.test_all_errors_in_one_pass.__name__ + ')',
+              self.test_all_errors_in_one_pass.__doc__)
+        errors = validation.validate("reservation", {
+            "user_id": True,
+            "tickets": [{"firstName": "Jon", "familyName": "Doe", "age": -1, "gender": "male",
+                         "seat": "21A"}, "10B"]})
+        self.assertEqual(sorted(errors), sorted([
+            "'user_id' must be of type integer",
+            "'flight_id' is a required property",
+            "'tickets[0].age' must be greater than or equal to 0",
+            "'tickets[1]' must be of type object",
+        ]))
+        self.assertEqual(validation.validate("user", []), ["'body' must be of type object"])
+
+    def test_formats(self):
+        """
+        Checks the date, time, email, phone and gate formats
+        """
+        print('(' + self.test_formats.__name__ + ')', self.test_formats.__doc__)
+        validate = validation.compile_schema({
+            "type": "object",
+            "properties": {name: {"type": "string", "format": name}
+                           for name in ("date", "time", "email", "phone", "gate")}})
+        errors = []
+        validate({"date": "2018-02-28", "time": "9:30", "email": "jules.larue@example.com",
+                  "phone": "+33 065837465", "gate": "GATE10"}, "", errors)
+        self.assertEqual(errors, [])
+        validate({"date": "2018-02-30", "time": "24:00", "email": "jules.larue",
+                  "phone": "P 9272", "gate": "10"}, "", errors)
+        self.assertEqual(len(errors), 5)
+        self.assertRaises(ValueError, validation.compile_schema, {"format": "color"})
+
+    def test_array_length(self):
+        """
+        Checks the minimum and maximum numbers of items of an array
+        """
+        print('(' + self.test_array_length.__name__ + ')', self.test_array_length.__doc__)
+        validate = validation.compile_schema({"type": "array", "minItems": 1, "maxItems": 2})
+        errors = []
+        validate([1], "flights", errors)
+        validate([1, 2], "flights", errors)
+        self.assertEqual(errors, [])
+        validate([], "flights", errors)
+        validate([1, 2, 3], "flights", errors)
+        self.assertEqual(errors, ["'flights' must have at least 1 items",
+                                  "'flights' must have at most 2 items"])
+
+    def test_require(self):
+        """
+        Checks the properties required only by one request
+        """
+        print('(' + self.test_require.__name__ + ')', self.test_require.__doc__)
+        ticket = {"firstName": "Jules", "familyName": "Larue", "age": 20, "gender": "male"}
+        self.assertEqual(validation.validate("ticket", ticket), [])
+        self.assertEqual(validation.validate("ticket", ticket, require=("seat",)),
+                         ["'seat' is a required property"])
+        self.assertRaises(KeyError, validation.registry.validator, "../user")
+
+
+class ValidatedRequestsTestCase(unittest.TestCase):
+    """
+    Test cases for the validation of the requests of the API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        print("Testing ", cls.__name__)
+        ENGINE.remove_database()
+        ENGINE.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        print("Testing ENDED for ", cls.__name__)
+        ENGINE.remove_database()
+
+    def setUp(self):
+        ENGINE.populate_tables()
+        self.client = APP.test_client()
+
+    def tearDown(self):
+        ENGINE.clear()
+
+    def test_invalid_flight(self):
+        """
+        Checks that POST Flights returns one message per invalid field
+        """
+        print('(' + self.test_invalid_flight.__name__ + ')', self.test_invalid_flight.__doc__)
+        flight = {"flightid": 1144, "code": "AY123", "price": "cheap",
+                  "departuredate": "2018-09-33", "arrivaldate": "2018-09-04", "gate": "10",
+                  "totalseats": 100, "seatsleft": 15}
+        resp = self.client.post("/flight-booking-system/api/template-flights/1237/flights",
+                                data=json.dumps(flight), headers={"Content-Type": JSON})
+        self.assertEqual(resp.status_code, 400)
+        messages = json.loads(resp.data.decode("utf-8"))["@error"]["@messages"]
+        self.assertEqual(sorted(messages), ["'departuredate' is not a valid date",
+                                            "'gate' is not a valid gate",
+                                            "'price' must be of type number"])
+
+    def test_send_json_schema(self):
+        """
+        Checks that every schema url sends its own schema
+        """
+        print('(' + self.test_send_json_schema.__name__ + ')', self.test_send_json_schema.__doc__)
+        for url in (resources.USER_SCHEMA_URL, resources.RESERVATION_SCHEMA_URL,
+                    resources.TICKET_SCHEMA_URL, resources.FLIGHT_SCHEMA_URL,
+                    resources.TEMPLATE_FLIGHT_SCHEMA_URL):
+            resp = self.client.get(url + "/")
+            self.assertEqual(resp.status_code, 200)
+            name = resources.SCHEMA_NAMES[url[len("/flight-booking-system/schema/"):]]
+            self.assertEqual(json.loads(resp.data.decode("utf-8")),
+                             validation.registry.schema(name))
+            resp.close()
+        self.assertEqual(self.client.get("/flight-booking-system/schema/unknown/").status_code, 404)
+
+    def test_schema_cache(self):
+        """
+        Checks that the schemas are loaded at startup and sent with an ETag,
+        without redirect, and that a known ETag receives 304 Not Modified
+        """
+        print('(' + self.test_schema_cache.__name__ + ')', self.test_schema_cache.__doc__)
+        self.assertEqual(validation.registry.load(), sorted(set(resources.SCHEMA_NAMES.values())))
+        resp = self.client.get(resources.USER_SCHEMA_URL)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Cache-Control"],
+                         "public, max-age=%d" % resources.SCHEMA_MAX_AGE)
+        body, etag = validation.registry.document("user")
+        self.assertEqual(resp.data, body)
+        self.assertEqual(resp.headers["ETag"], '"%s"' % etag)
+        resp.close()
+
+        resp = self.client.get(resources.USER_SCHEMA_URL, headers={"If-None-Match": '"%s"' % etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, b"")
+        resp.close()
+        resp = self.client.get(resources.TICKET_SCHEMA_URL, headers={"If-None-Match": '"%s"' % etag})
+        self.assertEqual(resp.status_code, 200)
+        resp.close()
+
+
+if __name__ == '__main__':
+    print('Start running validation tests')
+    unittest.main()